@@ -1,25 +1,63 @@
 """OpenAI GPT client wrapper.
 
 Handles calling ChatCompletion API to get readability and recommendations.
+
+:class:`GPTClient` is fully asynchronous and adds what a shared service needs
+around the raw API call:
+
+* a concurrency semaphore and a per-request timeout;
+* retries with jittered exponential backoff on rate limits and transient errors;
+* a prompt-hash → :class:`AIResult` cache (memory LRU, optionally SQLite),
+  keyed by model and :data:`PROMPT_VERSION`;
+* optional micro-batching: snapshots of several pages requested within a short
+  window are sent as one completion and split back into per-page results,
+  with a rough token estimate keeping each batch within a budget.
+
+Set ``OPENAI_BASE_URL`` to point the client at a local stand-in for the OpenAI
+endpoint (see ``benchmarks/openai_stub.py``).
+
+The ``openai`` package is imported on the first model call, not with this
+module: a process that serves audits without AI never loads it.
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
+import math
 import os
-from dataclasses import dataclass, field
-from typing import List, Optional
-
-import openai
+import random
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Sequence
 
 from app.parsers.html_parser import ParsedPage
+from app.storage.cache import SQLiteStore
+
+if TYPE_CHECKING:
+    import openai
 
 logger = logging.getLogger(__name__)
 
-__all__ = ["AIResult", "analyze_with_gpt"]
+__all__ = [
+    "AIResult",
+    "GPTClient",
+    "ai_enabled",
+    "estimate_tokens",
+    "get_client",
+    "close_client",
+    "analyze_with_gpt_async",
+    "analyze_with_gpt",
+]
+
+# Bump whenever the prompts change so cached answers to old prompts are not reused.
+PROMPT_VERSION = "1"
 
-# Configure OpenAI key from environment variable
-openai.api_key = os.getenv("OPENAI_API_KEY")
+DEFAULT_MODEL = os.getenv("LP_AI_MODEL", "gpt-3.5-turbo")
+_MAX_BACKOFF = 30.0  # seconds; also caps a server-sent Retry-After
 
 
 @dataclass
@@ -34,6 +72,13 @@ _SYSTEM_PROMPT = (
     "Return JSON only. Keys: readability (easy/medium/hard), recommendations (list of 5 short strings)."
 )
 
+_BATCH_SYSTEM_PROMPT = (
+    "You are an expert landing page optimization assistant. "
+    "You will receive several landing page snapshots, each starting with a line '### Page <id>'. "
+    "Evaluate every page independently. Return JSON only: "
+    '{"pages": [{"id": <id>, "readability": "easy|medium|hard", "recommendations": [5 short strings]}]}.'
+)
+
 
 def _build_user_prompt(parsed: ParsedPage) -> str:
     headings = []
@@ -55,29 +100,411 @@ def _build_user_prompt(parsed: ParsedPage) -> str:
     return prompt
 
 
-def analyze_with_gpt(parsed: ParsedPage, model: str = "gpt-3.5-turbo") -> AIResult | None:
-    """Call OpenAI and get AIResult. Returns None on failure."""
-    if not openai.api_key:
-        logger.warning("OPENAI_API_KEY is not set. Skipping AI analysis.")
-        return None
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: ~4 ASCII characters or ~2 non-ASCII characters per token."""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii // 2 + 1
 
-    messages = [
-        {"role": "system", "content": _SYSTEM_PROMPT},
-        {"role": "user", "content": _build_user_prompt(parsed)},
-    ]
 
+def _parse_result(content: str) -> AIResult:
+    """Turn a single-page completion into an AIResult (tolerating non-JSON answers)."""
     try:
-        response = openai.ChatCompletion.create(model=model, messages=messages)
-        content = response.choices[0].message.content.strip()
-        # Attempt to parse JSON
+        data = json.loads(_strip_fences(content))
+        readability = str(data.get("readability", "unknown"))
+        recs = [str(r) for r in data.get("recommendations", [])][:5]
+    except (json.JSONDecodeError, AttributeError):
+        readability = "unknown"
+        recs = content.split("\n")[:5]
+    return AIResult(readability=readability, recommendations=recs, raw=content)
+
+
+def _strip_fences(content: str) -> str:
+    match = re.search(r"```(?:json)?\s*(.*?)```", content, re.DOTALL)
+    return match.group(1) if match else content
+
+
+class _ResultCache:
+    """Prompt-hash → AIResult cache: memory LRU in front of an optional SQLite table.
+
+    Memory hits are answered on the event loop; SQLite reads and writes run in a worker thread.
+    """
+
+    def __init__(self, max_entries: int = 10_000, store: SQLiteStore | None = None) -> None:
+        self.max_entries = max_entries
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, AIResult] = OrderedDict()
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_prompt: str) -> str:
+        digest = hashlib.sha256(f"{system_prompt}\n\n{user_prompt}".encode("utf-8")).hexdigest()
+        return f"{model}:{PROMPT_VERSION}:{digest}"
+
+    async def get(self, key: str) -> Optional[AIResult]:
+        result = self._memory.get(key)
+        if result is None and self.store is not None:
+            data = await asyncio.to_thread(self.store.get, key)
+            if data is not None:
+                result = AIResult(**data)
+                self._remember(key, result)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._memory.move_to_end(key)
+        return result
+
+    async def put(self, key: str, result: AIResult) -> None:
+        await self.put_many([(key, result)])
+
+    async def put_many(self, items: Sequence[tuple[str, AIResult]]) -> None:
+        """Store several results; one SQLite transaction for all of them."""
+        for key, result in items:
+            self._remember(key, result)
+        if self.store is not None and items:
+            rows = [(key, asdict(result)) for key, result in items]
+            await asyncio.to_thread(self.store.put_many, rows, time.time())
+
+    def _remember(self, key: str, result: AIResult) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+@dataclass
+class _Pending:
+    prompt: str
+    tokens: int
+    future: asyncio.Future
+
+
+class GPTClient:
+    """Async OpenAI client with concurrency limit, retries, caching and batching.
+
+    Args:
+        api_key: OpenAI key; AI analysis is skipped when empty.
+        base_url: Alternative API endpoint (e.g. a local stub server).
+        model: Chat model name.
+        concurrency: Maximum number of completions in flight.
+        timeout: Per-request timeout (seconds).
+        max_retries: Retries on rate limits / transient errors.
+        cache: Shared result cache.
+        batch_size: Maximum pages per completion; 1 disables batching.
+        batch_token_budget: Estimated prompt tokens allowed per batched completion.
+        batch_wait: How long to wait for more pages before sending a batch (seconds).
+    """
+
+    def __init__(
+        self,
+        api_key: str | None,
+        base_url: str | None = None,
+        model: str = DEFAULT_MODEL,
+        concurrency: int = 4,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        cache: _ResultCache | None = None,
+        batch_size: int = 1,
+        batch_token_budget: int = 3000,
+        batch_wait: float = 0.05,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = cache if cache is not None else _ResultCache()
+        self.batch_size = max(1, batch_size)
+        self.batch_token_budget = batch_token_budget
+        self.batch_wait = batch_wait
+
+        self._client: openai.AsyncOpenAI | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._pending: list[_Pending] = []
+        self._pending_tokens = 0
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()  # batched completions in flight
+
+    @classmethod
+    def from_env(cls, cache: _ResultCache | None = None) -> "GPTClient":
+        if cache is None:
+            db = os.getenv("LP_AI_CACHE_DB")
+            cache = _ResultCache(store=SQLiteStore(db, table="ai_cache") if db else None)
+        return cls(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            concurrency=int(os.getenv("LP_AI_CONCURRENCY", "4")),
+            timeout=float(os.getenv("LP_AI_TIMEOUT", "30")),
+            max_retries=int(os.getenv("LP_AI_MAX_RETRIES", "3")),
+            cache=cache,
+            batch_size=int(os.getenv("LP_AI_BATCH_SIZE", "1")),
+            batch_token_budget=int(os.getenv("LP_AI_BATCH_TOKENS", "3000")),
+            batch_wait=float(os.getenv("LP_AI_BATCH_WAIT_MS", "50")) / 1000,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    # -- public API ----------------------------------------------------------
+
+    async def analyze(self, parsed: ParsedPage) -> AIResult | None:
+        """Analyze one page. Returns None on failure or when no API key is configured."""
+        if not self.enabled:
+            logger.warning("OPENAI_API_KEY is not set. Skipping AI analysis.")
+            return None
+
+        prompt = _build_user_prompt(parsed)
+        key = self.cache.key(self.model, _SYSTEM_PROMPT, prompt)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        if self.batch_size > 1:
+            result = await self._enqueue(prompt)
+        else:
+            result = await self._complete_one(prompt)
+        if result is not None:
+            await self.cache.put(key, result)
+        return result
+
+    async def analyze_many(self, pages: Sequence[ParsedPage]) -> list[AIResult | None]:
+        """Analyze several pages, packing them into as few completions as the budget allows."""
+        if not self.enabled:
+            logger.warning("OPENAI_API_KEY is not set. Skipping AI analysis.")
+            return [None] * len(pages)
+
+        prompts = [_build_user_prompt(p) for p in pages]
+        keys = [self.cache.key(self.model, _SYSTEM_PROMPT, p) for p in prompts]
+        results: list[AIResult | None] = list(await asyncio.gather(*(self.cache.get(k) for k in keys)))
+        todo = [i for i, r in enumerate(results) if r is None]
+
+        batches = self.plan_batches([prompts[i] for i in todo])
+        done = await asyncio.gather(*(self._complete_batch([prompts[todo[j]] for j in b]) for b in batches))
+        fresh: list[tuple[str, AIResult]] = []
+        for batch, batch_results in zip(batches, done):
+            for j, result in zip(batch, batch_results):
+                i = todo[j]
+                results[i] = result
+                if result is not None:
+                    fresh.append((keys[i], result))
+        await self.cache.put_many(fresh)
+        return results
+
+    def plan_batches(self, prompts: Sequence[str]) -> list[list[int]]:
+        """Group prompt indexes into batches within ``batch_size`` and the token budget."""
+        batches: list[list[int]] = []
+        current: list[int] = []
+        tokens = 0
+        for i, prompt in enumerate(prompts):
+            cost = estimate_tokens(prompt)
+            if current and (len(current) >= self.batch_size or tokens + cost > self.batch_token_budget):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(i)
+            tokens += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    async def close(self) -> None:
+        """Cancel queued and in-flight batches (their callers get None) and close the HTTP client."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for pending in self._pending:
+            if not pending.future.done():
+                pending.future.set_result(None)
+        self._pending, self._pending_tokens = [], 0
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    # -- micro-batching ------------------------------------------------------
+
+    async def _enqueue(self, prompt: str) -> AIResult | None:
+        loop = asyncio.get_running_loop()
+        tokens = estimate_tokens(prompt)
+        if self._pending and self._pending_tokens + tokens > self.batch_token_budget:
+            self._flush()
+        pending = _Pending(prompt, tokens, loop.create_future())
+        self._pending.append(pending)
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_wait, self._flush)
+        return await pending.future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._run_pending(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_pending(self, batch: list[_Pending]) -> None:
+        try:
+            results = await self._complete_batch([p.prompt for p in batch])
+        except asyncio.CancelledError:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_result(None)
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Batched OpenAI call failed: %s", exc)
+            results = [None] * len(batch)
+        for pending, result in zip(batch, results):
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    # -- API calls -----------------------------------------------------------
+
+    async def _complete_one(self, prompt: str) -> AIResult | None:
+        content = await self._chat(_SYSTEM_PROMPT, prompt)
+        return _parse_result(content) if content is not None else None
+
+    async def _complete_batch(self, prompts: Sequence[str]) -> list[AIResult | None]:
+        if len(prompts) == 1:
+            return [await self._complete_one(prompts[0])]
+
+        user_prompt = "\n\n".join(f"### Page {i + 1}\n{p}" for i, p in enumerate(prompts))
+        content = await self._chat(_BATCH_SYSTEM_PROMPT, user_prompt)
+        results: list[AIResult | None] = [None] * len(prompts)
+        if content is not None:
+            try:
+                pages = json.loads(_strip_fences(content)).get("pages", [])
+            except (json.JSONDecodeError, AttributeError):
+                pages = []
+            for page in pages:
+                try:
+                    idx = int(page.get("id")) - 1
+                except (TypeError, ValueError, AttributeError):
+                    continue
+                if 0 <= idx < len(prompts) and results[idx] is None:
+                    results[idx] = AIResult(
+                        readability=str(page.get("readability", "unknown")),
+                        recommendations=[str(r) for r in page.get("recommendations", [])][:5],
+                        raw=json.dumps(page, ensure_ascii=False),
+                    )
+        # Pages the model skipped or garbled are retried on their own.
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            retried = await asyncio.gather(*(self._complete_one(prompts[i]) for i in missing))
+            for i, result in zip(missing, retried):
+                results[i] = result
+        return results
+
+    async def _chat(self, system_prompt: str, user_prompt: str) -> str | None:
+        """One chat completion with concurrency limit, timeout and retries. None on failure."""
+        import openai
+
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, timeout=self.timeout, max_retries=0
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await self._client.chat.completions.create(model=self.model, messages=messages)
+                return (response.choices[0].message.content or "").strip()
+            except (
+                openai.RateLimitError,
+                openai.APITimeoutError,
+                openai.APIConnectionError,
+                openai.InternalServerError,
+            ) as exc:
+                if attempt == self.max_retries:
+                    logger.error("OpenAI call failed after %d attempts: %s", attempt + 1, exc)
+                    return None
+                delay = self._backoff(attempt, exc)
+                logger.warning("OpenAI call failed (%s), retrying in %.2fs", type(exc).__name__, delay)
+                await asyncio.sleep(delay)
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("OpenAI call failed: %s", exc)
+                return None
+        return None
+
+    @staticmethod
+    def _backoff(attempt: int, exc: Exception) -> float:
+        """Exponential backoff with full jitter, honouring Retry-After when given.
+
+        Retry-After is used only as a number of seconds, capped at the maximum
+        backoff; anything else (e.g. an HTTP date) falls back to the jittered delay.
+        """
+        response = getattr(exc, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after is not None:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                delay = math.nan
+            if math.isfinite(delay) and delay >= 0:
+                return min(delay, _MAX_BACKOFF)
+        return random.uniform(0, min(_MAX_BACKOFF, 0.5 * 2**attempt))
+
+
+# -----------------------------------------------------------------------------
+#   Module-level helpers
+# -----------------------------------------------------------------------------
+
+_client: GPTClient | None = None
+
+
+def get_client() -> GPTClient:
+    """Return the process-wide client configured from the environment."""
+    global _client
+    if _client is None:
+        _client = GPTClient.from_env()
+    return _client
+
+
+async def close_client() -> None:
+    if _client is not None:
+        await _client.close()
+
+
+def ai_enabled() -> bool:
+    """Return True when an OpenAI key is configured."""
+    return get_client().enabled
+
+
+async def analyze_with_gpt_async(parsed: ParsedPage) -> AIResult | None:
+    """Analyze a page with the shared client. Returns None on failure."""
+    return await get_client().analyze(parsed)
+
+
+def analyze_with_gpt(parsed: ParsedPage, model: str = DEFAULT_MODEL) -> AIResult | None:
+    """Blocking helper for scripts: call OpenAI and get AIResult. Returns None on failure."""
+    shared = get_client()
+    client = GPTClient(
+        api_key=shared.api_key,
+        base_url=shared.base_url,
+        model=model,
+        timeout=shared.timeout,
+        max_retries=shared.max_retries,
+        cache=shared.cache,
+    )
+
+    async def run() -> AIResult | None:
         try:
-            data = json.loads(content)
-            readability = str(data.get("readability", "unknown"))
-            recs = [str(r) for r in data.get("recommendations", [])][:5]
-        except json.JSONDecodeError:
-            readability = "unknown"
-            recs = content.split("\n")[:5]
-        return AIResult(readability=readability, recommendations=recs, raw=content)
-    except Exception as exc:  # noqa: BLE001
-        logger.exception("OpenAI call failed: %s", exc)
-        return None 
\ No newline at end of file
+            return await client.analyze(parsed)
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
@@ -4,124 +4,356 @@ Implements simple heuristic checks based on the parsed HTML data.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
-from enum import Enum
-from typing import List
+from typing import List, Optional
 
+from app.analyzers.rules import Outcome, Rule, RuleRegistry, RuleResult, RuleStatus, in_range
 from app.collectors.http_fetcher import FetchResult
+from app.collectors.site_files import SiteFiles
 from app.parsers.html_parser import ParsedPage
 
-__all__ = ["RuleStatus", "RuleResult", "evaluate_basic"]
+__all__ = ["RuleStatus", "RuleResult", "BASIC_RULES", "evaluate_basic"]
 
+OK, WARNING, ERROR = RuleStatus.OK, RuleStatus.WARNING, RuleStatus.ERROR
 
-class RuleStatus(str, Enum):
-    OK = "OK"
-    WARNING = "WARNING"
-    ERROR = "ERROR"
 
+# Rules ----------------------------------------------------------------------
 
-@dataclass
-class RuleResult:
-    name: str
-    status: RuleStatus
-    message: str
+# Site rules are skipped for audits without robots.txt / sitemap information.
+_NO_SITE = Outcome(None, when=lambda f, t: f["site_checked"] == 0)
+# Page-weight rules are skipped for audits whose subresources were not probed.
+_NO_WEIGHT = Outcome(None, when=lambda f, t: f["weight_checked"] == 0)
 
-
-# Helper functions -----------------------------------------------------------
-
-def _range_status(value: int, low: int, high: int) -> RuleStatus:
-    if low <= value <= high:
-        return RuleStatus.OK
-    return RuleStatus.WARNING
+BASIC_RULES = RuleRegistry(
+    [
+        Rule(
+            "ssl",
+            "SSL",
+            features=("ssl_ok",),
+            outcomes=(
+                Outcome(OK, "SSL-сертификат корректен.", when=lambda f, t: f["ssl_ok"]),
+                Outcome(ERROR, "Сайт не использует корректный SSL-сертификат."),
+            ),
+        ),
+        Rule(
+            "title",
+            "Title",
+            features=("title_len",),
+            outcomes=(
+                Outcome(ERROR, "Title отсутствует.", when=lambda f, t: f["title_len"] == 0),
+                Outcome(
+                    OK,
+                    "Title присутствует и имеет оптимальную длину.",
+                    when=lambda f, t: in_range(f["title_len"], t["min_length"], t["max_length"]),
+                ),
+                Outcome(WARNING, "Title длиной {title_len} символов — рекомендуется {min_length}–{max_length}."),
+            ),
+        ),
+        Rule(
+            "meta_description",
+            "Meta description",
+            features=("description_len",),
+            outcomes=(
+                Outcome(WARNING, "Meta description отсутствует.", when=lambda f, t: f["description_len"] == 0),
+                Outcome(
+                    OK,
+                    "Meta description присутствует.",
+                    when=lambda f, t: in_range(f["description_len"], t["min_length"], t["max_length"]),
+                ),
+                Outcome(WARNING, "Meta description слишком короткий/длинный."),
+            ),
+        ),
+        Rule(
+            "h1",
+            "H1",
+            features=("h1_count",),
+            outcomes=(
+                Outcome(OK, "На странице ровно один H1.", when=lambda f, t: f["h1_count"] == 1),
+                Outcome(ERROR, "H1 отсутствует.", when=lambda f, t: f["h1_count"] == 0),
+                Outcome(WARNING, "На странице {h1_count} тегов H1 — рекомендуется один."),
+            ),
+        ),
+        Rule(
+            "word_count",
+            "Длина текста",
+            features=("word_count",),
+            outcomes=(
+                Outcome(
+                    WARNING,
+                    "Текст слишком короткий ({word_count} слов). Рекомендуется ≥ {min_words}.",
+                    when=lambda f, t: f["word_count"] < t["min_words"],
+                ),
+                Outcome(
+                    WARNING,
+                    "Текст слишком длинный ({word_count} слов). Рекомендуется ≤ {max_words} для лендинга.",
+                    when=lambda f, t: f["word_count"] > t["max_words"],
+                ),
+                Outcome(OK, "Длина текста оптимальна."),
+            ),
+        ),
+        Rule(
+            "readability",
+            "Читаемость",
+            features=("word_count", "flesch"),
+            outcomes=(
+                Outcome(None, when=lambda f, t: f["word_count"] < t["min_words"]),
+                Outcome(
+                    OK,
+                    "Текст читается легко (индекс Флеша {flesch:.0f}).",
+                    when=lambda f, t: f["flesch"] >= t["easy_score"],
+                ),
+                Outcome(
+                    OK,
+                    "Текст средней сложности (индекс Флеша {flesch:.0f}).",
+                    when=lambda f, t: f["flesch"] >= t["min_score"],
+                ),
+                Outcome(
+                    WARNING,
+                    "Текст сложен для чтения (индекс Флеша {flesch:.0f}, рекомендуется ≥ {min_score}):"
+                    " сократите предложения и длинные слова.",
+                ),
+            ),
+        ),
+        Rule(
+            "alt_text",
+            "Alt-тексты",
+            features=("images_total", "alt_missing_pct"),
+            outcomes=(
+                Outcome(WARNING, "На странице нет изображений.", when=lambda f, t: f["images_total"] == 0),
+                Outcome(OK, "Все изображения имеют alt-текст.", when=lambda f, t: f["alt_missing_pct"] == 0),
+                Outcome(
+                    WARNING,
+                    "{alt_missing_pct:.0f}% изображений без alt-текста.",
+                    when=lambda f, t: f["alt_missing_pct"] < t["error_percent"],
+                ),
+                Outcome(ERROR, "{alt_missing_pct:.0f}% изображений без alt-текста."),
+            ),
+        ),
+        Rule(
+            "forms",
+            "Формы",
+            features=("forms_count",),
+            outcomes=(
+                Outcome(OK, "На странице обнаружены формы.", when=lambda f, t: f["forms_count"] > 0),
+                Outcome(WARNING, "Формы для сбора лидов не найдены."),
+            ),
+        ),
+        Rule(
+            "analytics",
+            "Аналитика",
+            features=("analytics_count", "analytics"),
+            outcomes=(
+                Outcome(OK, "Найдены скрипты: {analytics}", when=lambda f, t: f["analytics_count"] > 0),
+                Outcome(WARNING, "Скрипты аналитики не обнаружены."),
+            ),
+        ),
+        Rule(
+            "page_size",
+            "Размер страницы",
+            features=("truncated", "html_bytes", "html_kb"),
+            outcomes=(
+                Outcome(
+                    ERROR,
+                    "HTML больше {html_kb:.0f} КБ — загрузка прервана, анализ выполнен по началу страницы.",
+                    when=lambda f, t: f["truncated"],
+                ),
+                Outcome(
+                    WARNING,
+                    "HTML весит {html_kb:.0f} КБ — рекомендуется не более {max_mb} МБ.",
+                    when=lambda f, t: f["html_bytes"] > t["max_mb"] * 1024 * 1024,
+                ),
+                Outcome(OK, "Размер HTML {html_kb:.0f} КБ."),
+            ),
+        ),
+        # robots.txt / sitemap rules, reported only when the site files were collected.
+        Rule(
+            "robots",
+            "robots.txt",
+            features=(
+                "site_checked", "robots_pending", "robots_found", "robots_fetched", "robots_status", "robots_error",
+            ),
+            outcomes=(
+                _NO_SITE,
+                Outcome(None, when=lambda f, t: f["robots_pending"]),  # still downloading
+                Outcome(OK, "Файл robots.txt найден.", when=lambda f, t: f["robots_found"]),
+                Outcome(
+                    WARNING,
+                    "Файл robots.txt не найден (HTTP {robots_status}).",
+                    when=lambda f, t: f["robots_fetched"],
+                ),
+                Outcome(WARNING, "Не удалось получить robots.txt: {robots_error}"),
+            ),
+        ),
+        Rule(
+            "indexing",
+            "Индексация",
+            features=("site_checked", "robots_checked", "disallowed_agents"),
+            outcomes=(
+                _NO_SITE,
+                Outcome(None, when=lambda f, t: f["robots_checked"] == 0),
+                Outcome(
+                    OK,
+                    "robots.txt не запрещает индексацию страницы.",
+                    when=lambda f, t: f["disallowed_agents"] == "",
+                ),
+                Outcome(ERROR, "Страница закрыта от индексации в robots.txt для {disallowed_agents}."),
+            ),
+        ),
+        Rule(
+            "sitemap",
+            "sitemap.xml",
+            features=(
+                "site_checked", "sitemap_pending", "sitemap_found", "sitemap_truncated",
+                "sitemap_urls", "sitemap_files", "sitemap_error",
+            ),
+            outcomes=(
+                _NO_SITE,
+                Outcome(None, when=lambda f, t: f["sitemap_pending"]),  # still downloading
+                Outcome(
+                    OK,
+                    "Sitemap найден: {sitemap_urls} URL в {sitemap_files} файл(ах). Прочитан не полностью.",
+                    when=lambda f, t: f["sitemap_found"] & f["sitemap_truncated"],
+                ),
+                Outcome(
+                    OK,
+                    "Sitemap найден: {sitemap_urls} URL в {sitemap_files} файл(ах).",
+                    when=lambda f, t: f["sitemap_found"],
+                ),
+                Outcome(WARNING, "Sitemap не найден ({sitemap_error}).", when=lambda f, t: f["sitemap_error"] != ""),
+                Outcome(WARNING, "Sitemap не найден."),
+            ),
+        ),
+        Rule(
+            "sitemap_url",
+            "URL в sitemap",
+            features=("site_checked", "in_sitemap", "sitemap_truncated"),
+            outcomes=(
+                _NO_SITE,
+                Outcome(OK, "Страница указана в sitemap.", when=lambda f, t: f["in_sitemap"] == 1),
+                Outcome(
+                    WARNING,
+                    "Страница не найдена в прочитанной части sitemap.",
+                    when=lambda f, t: (f["in_sitemap"] == 0) & f["sitemap_truncated"],
+                ),
+                Outcome(WARNING, "Страница не найдена в sitemap.", when=lambda f, t: f["in_sitemap"] == 0),
+                Outcome(None),
+            ),
+        ),
+        # Page-weight rules, reported only when the scripts, styles, images and fonts were probed.
+        Rule(
+            "page_weight",
+            "Вес страницы",
+            features=("weight_checked", "weight_kb", "weight_mb", "weight_assets", "weight_note"),
+            outcomes=(
+                _NO_WEIGHT,
+                Outcome(
+                    ERROR,
+                    "Страница вместе с ресурсами весит {weight_mb:.1f} МБ (проверено файлов: {weight_assets})"
+                    " — рекомендуется не более {max_mb} МБ.{weight_note}",
+                    when=lambda f, t: f["weight_mb"] > t["error_mb"],
+                ),
+                Outcome(
+                    WARNING,
+                    "Страница вместе с ресурсами весит {weight_mb:.1f} МБ (проверено файлов: {weight_assets})"
+                    " — рекомендуется не более {max_mb} МБ.{weight_note}",
+                    when=lambda f, t: f["weight_mb"] > t["max_mb"],
+                ),
+                Outcome(
+                    OK,
+                    "Страница вместе с ресурсами весит {weight_kb:.0f} КБ"
+                    " (проверено файлов: {weight_assets}).{weight_note}",
+                ),
+            ),
+        ),
+        Rule(
+            "render_blocking",
+            "Блокирующие ресурсы",
+            features=("weight_checked", "blocking_count", "blocking_kb", "blocking_assets"),
+            outcomes=(
+                _NO_WEIGHT,
+                Outcome(
+                    OK,
+                    "Скрипты и стили в <head> не блокируют отрисовку.",
+                    when=lambda f, t: f["blocking_count"] == 0,
+                ),
+                Outcome(
+                    WARNING,
+                    "Файлов, блокирующих отрисовку: {blocking_count} ({blocking_kb:.0f} КБ) — {blocking_assets}."
+                    " Добавьте скриптам async/defer, встройте критический CSS.",
+                    when=lambda f, t: (f["blocking_count"] > t["max_resources"]) | (f["blocking_kb"] > t["max_kb"]),
+                ),
+                Outcome(OK, "Файлов, блокирующих отрисовку: {blocking_count} ({blocking_kb:.0f} КБ)."),
+            ),
+        ),
+        Rule(
+            "compression",
+            "Сжатие",
+            features=(
+                "weight_checked", "compressible_count", "uncompressed_count", "uncompressed_kb", "uncompressed_assets",
+            ),
+            outcomes=(
+                _NO_WEIGHT,
+                Outcome(None, when=lambda f, t: f["compressible_count"] == 0),
+                Outcome(
+                    OK,
+                    "Скрипты и стили передаются сжатыми (gzip / brotli).",
+                    when=lambda f, t: f["uncompressed_count"] == 0,
+                ),
+                Outcome(
+                    WARNING,
+                    "Текстовых файлов без сжатия: {uncompressed_count} ({uncompressed_kb:.0f} КБ)"
+                    " — {uncompressed_assets}. Включите gzip или brotli на сервере.",
+                ),
+            ),
+        ),
+        Rule(
+            "caching",
+            "Кэширование",
+            features=(
+                "weight_checked", "cacheable_count", "short_cache_count", "short_cache_pct", "short_cache_assets",
+            ),
+            outcomes=(
+                _NO_WEIGHT,
+                Outcome(None, when=lambda f, t: f["cacheable_count"] == 0),
+                Outcome(
+                    OK,
+                    "Все ресурсы кэшируются браузером не меньше недели.",
+                    when=lambda f, t: f["short_cache_count"] == 0,
+                ),
+                Outcome(
+                    WARNING,
+                    "Кэшируются меньше недели или без Cache-Control {short_cache_count} из {cacheable_count}"
+                    " файлов — {short_cache_assets}.",
+                    when=lambda f, t: f["short_cache_pct"] > t["max_percent"],
+                ),
+                Outcome(OK, "Кэшируются меньше недели {short_cache_count} из {cacheable_count} файлов."),
+            ),
+        ),
+        Rule(
+            "heavy_assets",
+            "Крупные файлы",
+            features=("weight_checked", "largest_kb", "largest_asset"),
+            outcomes=(
+                _NO_WEIGHT,
+                Outcome(None, when=lambda f, t: f["largest_kb"] == 0),
+                Outcome(
+                    WARNING,
+                    "Самый крупный файл — {largest_asset} ({largest_kb:.0f} КБ), рекомендуется не более {max_kb} КБ.",
+                    when=lambda f, t: f["largest_kb"] > t["max_kb"],
+                ),
+                Outcome(OK, "Самый крупный файл — {largest_asset} ({largest_kb:.0f} КБ)."),
+            ),
+        ),
+    ]
+)
 
 
 # Main evaluation -----------------------------------------------------------
 
-def evaluate_basic(parsed: ParsedPage, fetch: FetchResult) -> List[RuleResult]:
-    """Evaluate basic marketing/SEO rules and return list of results."""
-    results: list[RuleResult] = []
-
-    # SSL check
-    if fetch.ssl_ok:
-        results.append(RuleResult("SSL", RuleStatus.OK, "SSL-сертификат корректен."))
-    else:
-        results.append(
-            RuleResult("SSL", RuleStatus.ERROR, "Сайт не использует корректный SSL-сертификат.")
-        )
-
-    # Title tag
-    if parsed.title:
-        if 20 <= len(parsed.title) <= 70:
-            status = RuleStatus.OK
-            msg = "Title присутствует и имеет оптимальную длину."
-        else:
-            status = RuleStatus.WARNING
-            msg = f"Title длиной {len(parsed.title)} символов — рекомендуется 20–70."
-    else:
-        status = RuleStatus.ERROR
-        msg = "Title отсутствует."
-    results.append(RuleResult("Title", status, msg))
-
-    # Meta description
-    if parsed.meta_description:
-        status = RuleStatus.OK if 50 <= len(parsed.meta_description) <= 160 else RuleStatus.WARNING
-        msg = "Meta description присутствует." if status == RuleStatus.OK else "Meta description слишком короткий/длинный."
-    else:
-        status = RuleStatus.WARNING
-        msg = "Meta description отсутствует."
-    results.append(RuleResult("Meta description", status, msg))
-
-    # Headings
-    h1_count = len(parsed.headings.get(1, []))
-    if h1_count == 1:
-        status = RuleStatus.OK
-        msg = "На странице ровно один H1."
-    elif h1_count == 0:
-        status = RuleStatus.ERROR
-        msg = "H1 отсутствует."
-    else:
-        status = RuleStatus.WARNING
-        msg = f"На странице {h1_count} тегов H1 — рекомендуется один."
-    results.append(RuleResult("H1", status, msg))
-
-    # Word count
-    if parsed.word_count < 200:
-        status = RuleStatus.WARNING
-        msg = f"Текст слишком короткий ({parsed.word_count} слов). Рекомендуется ≥ 200."
-    elif parsed.word_count > 2000:
-        status = RuleStatus.WARNING
-        msg = (
-            f"Текст слишком длинный ({parsed.word_count} слов). Рекомендуется ≤ 2000 для лендинга."
-        )
-    else:
-        status = RuleStatus.OK
-        msg = "Длина текста оптимальна."
-    results.append(RuleResult("Длина текста", status, msg))
-
-    # Images alt
-    if parsed.images_total == 0:
-        results.append(RuleResult("Alt-тексты", RuleStatus.WARNING, "На странице нет изображений."))
-    else:
-        percent_missing = parsed.images_without_alt / parsed.images_total * 100
-        if percent_missing == 0:
-            status = RuleStatus.OK
-            msg = "Все изображения имеют alt-текст."
-        else:
-            status = RuleStatus.WARNING if percent_missing < 50 else RuleStatus.ERROR
-            msg = f"{percent_missing:.0f}% изображений без alt-текста."
-        results.append(RuleResult("Alt-тексты", status, msg))
-
-    # Forms
-    if parsed.forms_count > 0:
-        results.append(RuleResult("Формы", RuleStatus.OK, "На странице обнаружены формы."))
-    else:
-        results.append(RuleResult("Формы", RuleStatus.WARNING, "Формы для сбора лидов не найдены."))
-
-    # Analytics
-    if parsed.analytics:
-        msg = "; ".join(parsed.analytics)
-        results.append(RuleResult("Аналитика", RuleStatus.OK, f"Найдены скрипты: {msg}"))
-    else:
-        results.append(RuleResult("Аналитика", RuleStatus.WARNING, "Скрипты аналитики не обнаружены."))
+def evaluate_basic(parsed: ParsedPage, fetch: FetchResult, site: Optional[SiteFiles] = None) -> List[RuleResult]:
+    """Evaluate basic marketing/SEO rules and return list of results.
 
-    return results 
\ No newline at end of file
+    robots.txt / sitemap rules are added only when ``site`` is given, page-weight
+    rules only when ``fetch.page_weight`` is set.
+    Thresholds come from :func:`app.analyzers.rules.default_thresholds`.
+    """
+    return BASIC_RULES.evaluate(parsed, fetch, site)
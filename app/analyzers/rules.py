@@ -0,0 +1,339 @@
+"""Declarative rule registry for LP Screening.
+
+A rule is declared once, as data:
+
+* a stable id (used as the key in the thresholds config) and a display name;
+* the named page features it reads (see :data:`FEATURES`);
+* an ordered list of :class:`Outcome` objects – the first one whose condition
+  holds decides the status and the message.
+
+Conditions combine comparisons with ``&`` and ``|`` only, so one declaration
+evaluates a single page on Python scalars (:meth:`RuleRegistry.evaluate`) and
+a whole batch of pages on NumPy columns (:mod:`app.analyzers.vectorized`) with
+the same result.
+
+Thresholds are read from ``data/thresholds.json`` next to this module, with an
+optional override file from ``LP_RULES_CONFIG`` merged on top::
+
+    {"title": {"min_length": 20, "max_length": 70}, "forms": {"enabled": false}}
+"""
+from __future__ import annotations
+
+import json
+import os
+import string
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterable, Mapping, Optional, Sequence
+from urllib.parse import urlsplit
+
+from app.analyzers.text import reading_ease
+from app.collectors.http_fetcher import FetchResult
+from app.collectors.site_files import SiteFiles
+from app.parsers.html_parser import ParsedPage
+
+__all__ = [
+    "RuleStatus",
+    "RuleResult",
+    "Feature",
+    "FEATURES",
+    "Outcome",
+    "Rule",
+    "RuleRegistry",
+    "in_range",
+    "load_thresholds",
+    "default_thresholds",
+]
+
+_DEFAULT_PATH = Path(__file__).parent / "data" / "thresholds.json"
+
+
+class RuleStatus(str, Enum):
+    OK = "OK"
+    WARNING = "WARNING"
+    ERROR = "ERROR"
+
+
+@dataclass
+class RuleResult:
+    name: str
+    status: RuleStatus
+    message: str
+
+
+# Features -------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Feature:
+    """A named value computed from one audited page.
+
+    Numeric features (numbers and booleans) can be used in conditions and are
+    packed into NumPy columns for batch evaluation; other values only appear
+    in messages.
+    """
+
+    name: str
+    extract: Callable[[ParsedPage, FetchResult, Optional[SiteFiles]], Any]
+    numeric: bool = True
+
+
+def _alt_missing_pct(parsed: ParsedPage) -> float:
+    if not parsed.images_total:
+        return 0.0
+    return parsed.images_without_alt / parsed.images_total * 100
+
+
+def _disallowed_agents(fetch: FetchResult, site: Optional[SiteFiles]) -> str:
+    if site is None or not fetch.final_url or site.robots is None:
+        return ""
+    return ", ".join(site.disallowed_for(fetch.final_url))
+
+
+def _asset_list(assets: list, limit: int = 3) -> str:
+    """Short names of the first assets of a list: host-less path tails, then "и ещё N"."""
+    names = []
+    for asset in assets[:limit]:
+        path = urlsplit(asset.url).path.rstrip("/")
+        names.append(path.rsplit("/", 1)[-1] or asset.url)
+    if len(assets) > limit:
+        names.append(f"и ещё {len(assets) - limit}")
+    return ", ".join(names)
+
+
+def _weight(fetch: FetchResult, value: Callable[[Any], Any], default: Any = 0) -> Any:
+    """A value of the page weight, or ``default`` when the subresources were not probed."""
+    return value(fetch.page_weight) if fetch.page_weight is not None else default
+
+
+def _assets_kb(fetch: FetchResult, group: str) -> float:
+    """Size of one group of the page's assets (a list property of PageWeight), in KiB."""
+    return _weight(fetch, lambda w: sum(asset.size for asset in getattr(w, group)) / 1024)
+
+
+def _assets_named(fetch: FetchResult, group: str) -> str:
+    return _weight(fetch, lambda w: _asset_list(getattr(w, group)), "")
+
+
+def _largest_kb(weight: Any) -> float:
+    largest = weight.largest(1)
+    return largest[0].size / 1024 if largest else 0.0
+
+
+def _short_cache_pct(weight: Any) -> float:
+    cacheable = weight.cacheable
+    return len(weight.short_cache) / len(cacheable) * 100 if cacheable else 0.0
+
+
+def _in_sitemap(fetch: FetchResult, site: Optional[SiteFiles]) -> int:
+    """1 / 0 if the page is / is not listed, -1 if it cannot be told."""
+    if site is None or not fetch.final_url:
+        return -1
+    listed = site.in_sitemap(fetch.final_url)
+    return -1 if listed is None else int(listed)
+
+
+FEATURES: dict[str, Feature] = {
+    f.name: f
+    for f in (
+        Feature("ssl_ok", lambda p, f, s: f.ssl_ok),
+        Feature("title_len", lambda p, f, s: len(p.title or "")),
+        Feature("description_len", lambda p, f, s: len(p.meta_description or "")),
+        Feature("h1_count", lambda p, f, s: p.heading_counts.get(1, 0)),
+        Feature("word_count", lambda p, f, s: p.word_count),
+        Feature("flesch", lambda p, f, s: reading_ease(p)),
+        Feature("images_total", lambda p, f, s: p.images_total),
+        Feature("alt_missing_pct", lambda p, f, s: _alt_missing_pct(p)),
+        Feature("forms_count", lambda p, f, s: p.forms_count),
+        Feature("analytics_count", lambda p, f, s: len(p.analytics)),
+        Feature("analytics", lambda p, f, s: "; ".join(p.analytics), numeric=False),
+        Feature("html_bytes", lambda p, f, s: f.bytes_read),
+        Feature("html_kb", lambda p, f, s: f.bytes_read / 1024),
+        Feature("truncated", lambda p, f, s: f.truncated),
+        # robots.txt / sitemap of the page's origin (present only when ``site`` is given).
+        Feature("site_checked", lambda p, f, s: s is not None),
+        Feature("robots_found", lambda p, f, s: s is not None and s.robots_found),
+        Feature(
+            "robots_pending",
+            lambda p, f, s: s is not None and not s.complete and s.robots_status is None and not s.robots_error,
+        ),
+        Feature("robots_fetched", lambda p, f, s: s is not None and s.robots_status is not None),
+        Feature("robots_status", lambda p, f, s: s.robots_status if s is not None else None, numeric=False),
+        Feature("robots_error", lambda p, f, s: s.robots_error if s is not None else None, numeric=False),
+        Feature("robots_checked", lambda p, f, s: s is not None and bool(f.final_url) and s.robots is not None),
+        Feature("disallowed_agents", lambda p, f, s: _disallowed_agents(f, s), numeric=False),
+        Feature("sitemap_pending", lambda p, f, s: s is not None and not s.complete),
+        Feature("sitemap_found", lambda p, f, s: s is not None and s.sitemap_found),
+        Feature("sitemap_urls", lambda p, f, s: s.sitemap_urls if s is not None else 0),
+        Feature("sitemap_files", lambda p, f, s: len(s.sitemaps) if s is not None else 0),
+        Feature("sitemap_truncated", lambda p, f, s: s is not None and s.sitemap_truncated),
+        Feature("sitemap_error", lambda p, f, s: (s.sitemap_error or "") if s is not None else "", numeric=False),
+        Feature("in_sitemap", lambda p, f, s: _in_sitemap(f, s)),
+        # Scripts, styles, images and fonts of the page (present only when they were probed).
+        Feature("weight_checked", lambda p, f, s: f.page_weight is not None),
+        Feature("weight_kb", lambda p, f, s: _weight(f, lambda w: w.total_bytes / 1024)),
+        Feature("weight_mb", lambda p, f, s: _weight(f, lambda w: w.total_bytes / 1024 / 1024)),
+        Feature("weight_assets", lambda p, f, s: _weight(f, lambda w: len(w.assets))),
+        Feature(
+            "weight_note",
+            lambda p, f, s: _weight(f, lambda w: "" if w.complete else " Размер части ресурсов не определён.", ""),
+            numeric=False,
+        ),
+        Feature("blocking_count", lambda p, f, s: _weight(f, lambda w: len(w.render_blocking))),
+        Feature("blocking_kb", lambda p, f, s: _assets_kb(f, "render_blocking")),
+        Feature("blocking_assets", lambda p, f, s: _assets_named(f, "render_blocking"), numeric=False),
+        Feature("compressible_count", lambda p, f, s: _weight(f, lambda w: len(w.compressible))),
+        Feature("uncompressed_count", lambda p, f, s: _weight(f, lambda w: len(w.uncompressed))),
+        Feature("uncompressed_kb", lambda p, f, s: _assets_kb(f, "uncompressed")),
+        Feature("uncompressed_assets", lambda p, f, s: _assets_named(f, "uncompressed"), numeric=False),
+        Feature("cacheable_count", lambda p, f, s: _weight(f, lambda w: len(w.cacheable))),
+        Feature("short_cache_count", lambda p, f, s: _weight(f, lambda w: len(w.short_cache))),
+        Feature("short_cache_pct", lambda p, f, s: _weight(f, _short_cache_pct)),
+        Feature("short_cache_assets", lambda p, f, s: _assets_named(f, "short_cache"), numeric=False),
+        Feature("largest_kb", lambda p, f, s: _weight(f, _largest_kb)),
+        Feature("largest_asset", lambda p, f, s: _weight(f, lambda w: _asset_list(w.largest(1)), ""), numeric=False),
+    )
+}
+
+
+def in_range(value: Any, low: Any, high: Any) -> Any:
+    """``low <= value <= high`` for a scalar or element-wise for a column."""
+    return (value >= low) & (value <= high)
+
+
+# Rules ----------------------------------------------------------------------
+
+Condition = Callable[[Mapping[str, Any], Mapping[str, Any]], Any]
+
+
+@dataclass(frozen=True)
+class Outcome:
+    """One possible result of a rule.
+
+    ``when`` receives the features and the rule's thresholds; ``None`` means
+    "otherwise". A ``status`` of ``None`` means the rule is not reported for
+    the page. ``message`` is a :meth:`str.format` template over the features
+    and thresholds.
+    """
+
+    status: Optional[RuleStatus]
+    message: str = ""
+    when: Optional[Condition] = None
+    fields: tuple[str, ...] = field(init=False, default=())
+
+    def __post_init__(self) -> None:
+        names = tuple(name for _, name, _, _ in string.Formatter().parse(self.message) if name)
+        object.__setattr__(self, "fields", names)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        return self.message.format_map(values) if self.fields else self.message
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    name: str  # shown in reports
+    features: tuple[str, ...]
+    outcomes: tuple[Outcome, ...]
+
+    def __post_init__(self) -> None:
+        unknown = [name for name in self.features if name not in FEATURES]
+        if unknown:
+            raise ValueError(f"Rule {self.id!r}: unknown features {unknown}")
+        if not self.outcomes or self.outcomes[-1].when is not None:
+            raise ValueError(f"Rule {self.id!r}: the last outcome must have no condition")
+
+    def decide(self, features: Mapping[str, Any], params: Mapping[str, Any]) -> Outcome:
+        for outcome in self.outcomes:
+            if outcome.when is None or outcome.when(features, params):
+                return outcome
+        raise AssertionError("unreachable: the last outcome is unconditional")
+
+
+class RuleRegistry:
+    """Ordered collection of rules; results come out in registration order."""
+
+    def __init__(self, rules: Iterable[Rule] = ()) -> None:
+        self._rules: dict[str, Rule] = {}
+        # (thresholds, [(rule, params)], [(feature, extract)]) for the last thresholds used.
+        self._plan: tuple | None = None
+        for rule in rules:
+            self.register(rule)
+
+    def register(self, rule: Rule) -> Rule:
+        if rule.id in self._rules:
+            raise ValueError(f"Rule {rule.id!r} is already registered")
+        self._rules[rule.id] = rule
+        self._plan = None
+        return rule
+
+    def __iter__(self):
+        return iter(self._rules.values())
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def __getitem__(self, rule_id: str) -> Rule:
+        return self._rules[rule_id]
+
+    def active(self, thresholds: Mapping[str, Mapping[str, Any]]) -> list[Rule]:
+        """Rules not switched off with ``"enabled": false``."""
+        return [rule for rule in self if thresholds.get(rule.id, {}).get("enabled", True)]
+
+    @staticmethod
+    def features_of(rules: Sequence[Rule]) -> list[str]:
+        """Features read by ``rules``, in first-use order."""
+        return list(dict.fromkeys(name for rule in rules for name in rule.features))
+
+    def evaluate(
+        self,
+        parsed: ParsedPage,
+        fetch: FetchResult,
+        site: Optional[SiteFiles] = None,
+        thresholds: Optional[Mapping[str, Mapping[str, Any]]] = None,
+    ) -> list[RuleResult]:
+        """Evaluate every active rule for one page."""
+        thresholds = thresholds if thresholds is not None else default_thresholds()
+        steps, extractors = self.plan(thresholds)
+        values = {name: extract(parsed, fetch, site) for name, extract in extractors}
+        results: list[RuleResult] = []
+        for rule, params in steps:
+            outcome = rule.decide(values, params)
+            if outcome.status is not None:
+                message = outcome.render({**params, **values}) if outcome.fields else outcome.message
+                results.append(RuleResult(rule.name, outcome.status, message))
+        return results
+
+    def plan(self, thresholds: Mapping[str, Mapping[str, Any]]) -> tuple[list, list]:
+        """Active rules with their thresholds and the feature extractors they need.
+
+        Cached for the last ``thresholds`` object seen, which is therefore
+        treated as immutable.
+        """
+        plan = self._plan
+        if plan is None or plan[0] is not thresholds:
+            rules = self.active(thresholds)
+            steps = [(rule, thresholds.get(rule.id, {})) for rule in rules]
+            extractors = [(name, FEATURES[name].extract) for name in self.features_of(rules)]
+            plan = self._plan = (thresholds, steps, extractors)
+        return plan[1], plan[2]
+
+
+# Thresholds -----------------------------------------------------------------
+
+def load_thresholds(path: str | os.PathLike | None = None) -> dict[str, dict[str, Any]]:
+    """Bundled thresholds with the rules in ``path`` (if given) merged on top."""
+    with open(_DEFAULT_PATH, encoding="utf-8") as fh:
+        thresholds: dict[str, dict[str, Any]] = json.load(fh)
+    if path is not None:
+        with open(path, encoding="utf-8") as fh:
+            for rule_id, params in json.load(fh).items():
+                thresholds.setdefault(rule_id, {}).update(params)
+    return thresholds
+
+
+@lru_cache(maxsize=1)
+def default_thresholds() -> dict[str, dict[str, Any]]:
+    """Thresholds from ``LP_RULES_CONFIG`` over the bundled file (loaded once per process)."""
+    return load_thresholds(os.getenv("LP_RULES_CONFIG") or None)
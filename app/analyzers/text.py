@@ -0,0 +1,286 @@
+"""Local text analysis for LP Screening: readability and keyword relevance.
+
+Works from a :class:`ParsedPage` without any network call, so readability is
+available for every audit and the GPT analysis is only an enrichment.
+
+Readability is the Flesch reading ease: the original formula for English and
+Oborneva's adaptation for Russian::
+
+    EN: 206.835 - 1.015 * words/sentences - 84.6 * syllables/word
+    RU: 206.835 - 1.3   * words/sentences - 60.1 * syllables/word
+
+Word and sentence counts come from the parser. Syllables per word are
+estimated from the first few thousand characters of ``text_content`` (the
+excerpt when the page was parsed with ``keep_text=False``), which keeps the
+cost per page constant.
+
+Keyword relevance scores the page against user-supplied keywords with TF-IDF.
+Each keyword is reduced to word stems and matched as a phrase of word
+prefixes, so inflected forms count ("доставка" matches "доставки", "доставку").
+IDF is computed over the pages analysed together: for a batch it favours
+keywords that set a page apart; for a single page it is constant.
+
+:func:`analyze_texts` evaluates a whole batch at once, with NumPy when it is
+installed.
+"""
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+
+from app.parsers.html_parser import ParsedPage
+
+try:  # Optional fast path
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+__all__ = [
+    "KeywordScore",
+    "TextScores",
+    "flesch_reading_ease",
+    "readability_level",
+    "reading_ease",
+    "normalize_keywords",
+    "analyze_text",
+    "analyze_texts",
+]
+
+_RU_VOWELS = "аеёиоуыэюя"
+_EN_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+
+# Inflection endings stripped from keywords (longest first); the rest is matched as a word prefix.
+_ENDINGS = sorted(
+    {
+        "иями", "ями", "ами", "ием", "иях", "ого", "его", "ому", "ему", "ыми", "ими",
+        "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ую", "юю",
+        "ов", "ев", "ам", "ям", "ах", "ях", "ом", "ем",
+        "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+        "ing", "ed", "es", "s", "e",
+    },
+    key=len,
+    reverse=True,
+)
+_MIN_STEM = 3
+_SAMPLE_CHARS = 5000  # text sampled for syllables per word
+_MAX_KEYWORDS = 20
+
+# Keyword density (% of words) that earns the full text part of the relevance score.
+TARGET_DENSITY = 1.0
+
+
+@dataclass
+class KeywordScore:
+    keyword: str
+    count: int  # occurrences in the visible text (in the excerpt for compact pages)
+    density: float  # % of the page's words taken by the keyword
+    tfidf: float
+    in_title: bool
+    in_headings: bool
+
+
+@dataclass
+class TextScores:
+    language: str  # "ru" or "en"
+    words: int
+    sentences: int
+    words_per_sentence: float
+    syllables_per_word: float
+    flesch: float  # reading ease: higher is easier
+    readability: str  # easy / medium / hard
+    sampled: bool = False  # syllables per word estimated from part of the text
+    relevance: Optional[float] = None  # 0–100 against the keywords; None without keywords
+    keywords: List[KeywordScore] = field(default_factory=list)
+
+
+# Readability ----------------------------------------------------------------
+
+def flesch_reading_ease(words_per_sentence: float, syllables_per_word: float, language: str = "ru") -> float:
+    if language == "ru":
+        return 206.835 - 1.3 * words_per_sentence - 60.1 * syllables_per_word
+    return 206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word
+
+
+def readability_level(score: float) -> str:
+    """The same easy / medium / hard scale as the GPT analysis."""
+    if score >= 60:
+        return "easy"
+    if score >= 30:
+        return "medium"
+    return "hard"
+
+
+def _syllables(text: str) -> tuple[str, int]:
+    """Dominant language and syllable count: Russian vowels plus English vowel groups."""
+    lowered = text.lower()
+    ru = sum(map(lowered.count, _RU_VOWELS))
+    en = len(_EN_VOWEL_GROUP_RE.findall(lowered))
+    return ("ru" if ru >= en else "en"), ru + en
+
+
+def _text_counts(page: ParsedPage) -> tuple[str, float, bool, int]:
+    """Language, syllables per word, whether they were sampled, and the words in ``text_content``."""
+    text = page.text_content
+    words = len(text.split()) if page.text_truncated else page.word_count
+    sampled = page.text_truncated or len(text) > _SAMPLE_CHARS
+    if len(text) > _SAMPLE_CHARS:
+        text = text[: text.rfind(" ", 0, _SAMPLE_CHARS) + 1 or _SAMPLE_CHARS]
+    language, syllables = _syllables(text)
+    sample_words = len(text.split()) if sampled else words
+    return language, syllables / sample_words if sample_words else 0.0, sampled, words
+
+
+def reading_ease(page: ParsedPage) -> float:
+    """Flesch reading ease of one page (0 for a page without text)."""
+    language, syllables_per_word, _, _ = _text_counts(page)
+    if not page.word_count:
+        return 0.0
+    return flesch_reading_ease(page.word_count / max(page.sentence_count, 1), syllables_per_word, language)
+
+
+# Keywords -------------------------------------------------------------------
+
+@lru_cache(maxsize=4096)
+def _stem(word: str) -> str:
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+@lru_cache(maxsize=256)
+def _keyword_pattern(keyword: str) -> tuple[re.Pattern, int]:
+    """Regex matching ``keyword`` as a phrase of word prefixes, and its length in words."""
+    stems = [re.escape(_stem(word)) for word in re.findall(r"\w+", keyword.lower())]
+    # The word boundary is checked after the first stem so that the regex engine
+    # can scan for the literal prefix: about ten times faster than a leading \b.
+    first = stems[0] + r"(?<=\b" + stems[0] + ")"
+    return re.compile(r"\w*\W+".join([first, *stems[1:]]) + r"\w*"), len(stems)
+
+
+def normalize_keywords(keywords: Iterable[str]) -> list[str]:
+    """Lower-cased, whitespace-collapsed, de-duplicated keywords (at most 20)."""
+    result: dict[str, None] = {}
+    for keyword in keywords:
+        keyword = " ".join(keyword.split()).lower()
+        if keyword and re.search(r"\w", keyword):
+            result[keyword] = None
+    return list(result)[:_MAX_KEYWORDS]
+
+
+def _keyword_counts(page: ParsedPage, patterns: Sequence[tuple[re.Pattern, int]]) -> list[tuple[int, bool, bool]]:
+    text = page.text_content.lower()
+    title = (page.title or "").lower()
+    headings = " | ".join(h for texts in page.headings.values() for h in texts).lower()
+    return [
+        (len(pattern.findall(text)), bool(pattern.search(title)), bool(pattern.search(headings)))
+        for pattern, _ in patterns
+    ]
+
+
+# Batch analysis -------------------------------------------------------------
+
+def _score_numpy(words, sentences, text, counts, lengths, target_density):
+    """Per-page readability and keyword scores as lists, computed with NumPy arrays."""
+    n, k = len(words), len(lengths)
+    w = np.asarray(words, dtype=float)
+    wps = w / np.maximum(np.asarray(sentences, dtype=float), 1)
+    spw = np.asarray([t[1] for t in text], dtype=float)
+    ru = np.asarray([t[0] == "ru" for t in text], dtype=bool)
+    flesch = np.where(ru, 206.835 - 1.3 * wps - 60.1 * spw, 206.835 - 1.015 * wps - 84.6 * spw)
+    flesch = np.where(w > 0, flesch, 0.0)
+    if not k:
+        return wps.tolist(), spw.tolist(), flesch.tolist(), None, None, None
+    c = np.asarray([[x[0] for x in row] for row in counts], dtype=float).reshape(n, k)
+    in_title = np.asarray([[x[1] for x in row] for row in counts], dtype=bool).reshape(n, k)
+    in_headings = np.asarray([[x[2] for x in row] for row in counts], dtype=bool).reshape(n, k)
+    # Keywords are counted in the text kept with the page: the excerpt in compact mode.
+    safe_words = np.maximum(np.asarray([t[3] for t in text], dtype=float), 1)[:, None]
+    density = c * np.asarray(lengths, dtype=float) / safe_words * 100
+    idf = np.log((1 + n) / (1 + (c > 0).sum(axis=0))) + 1
+    tfidf = c / safe_words * idf
+    part = 0.5 * np.minimum(1.0, density / target_density) + 0.25 * in_title + 0.25 * in_headings
+    relevance = (part * idf).sum(axis=1) / idf.sum() * 100
+    return wps.tolist(), spw.tolist(), flesch.tolist(), density.tolist(), tfidf.tolist(), relevance.tolist()
+
+
+def _score_python(words, sentences, text, counts, lengths, target_density):
+    """Same as :func:`_score_numpy` without NumPy."""
+    n, k = len(words), len(lengths)
+    wps = [w / max(s, 1) for w, s in zip(words, sentences)]
+    spw = [t[1] for t in text]
+    flesch = [flesch_reading_ease(a, t[1], t[0]) if w else 0.0 for a, t, w in zip(wps, text, words)]
+    if not k:
+        return wps, spw, flesch, None, None, None
+    idf = [math.log((1 + n) / (1 + sum(1 for row in counts if row[j][0]))) + 1 for j in range(k)]
+    density, tfidf, relevance = [], [], []
+    for page_text, row in zip(text, counts):
+        safe_words = max(page_text[3], 1)
+        density.append([row[j][0] * lengths[j] / safe_words * 100 for j in range(k)])
+        tfidf.append([row[j][0] / safe_words * idf[j] for j in range(k)])
+        part = [
+            0.5 * min(1.0, density[-1][j] / target_density) + 0.25 * row[j][1] + 0.25 * row[j][2] for j in range(k)
+        ]
+        relevance.append(sum(p * x for p, x in zip(part, idf)) / sum(idf) * 100)
+    return wps, spw, flesch, density, tfidf, relevance
+
+
+def analyze_texts(
+    pages: Sequence[ParsedPage],
+    keywords: Iterable[str] = (),
+    target_density: float = TARGET_DENSITY,
+) -> list[TextScores]:
+    """Readability and keyword relevance for many pages at once.
+
+    The relevance of a page is the IDF-weighted mean over keywords of
+    ``0.5 * min(1, density / target_density) + 0.25 * in_title + 0.25 * in_headings``,
+    scaled to 0–100.
+    """
+    if not pages:
+        return []
+    keywords = normalize_keywords(keywords)
+    patterns = [_keyword_pattern(keyword) for keyword in keywords]
+    words = [p.word_count for p in pages]
+    sentences = [p.sentence_count for p in pages]
+    text = [_text_counts(p) for p in pages]
+    counts = [_keyword_counts(p, patterns) for p in pages]
+    score = _score_numpy if np is not None else _score_python
+    wps, spw, flesch, density, tfidf, relevance = score(
+        words, sentences, text, counts, [length for _, length in patterns], target_density
+    )
+
+    results: list[TextScores] = []
+    for i, page_text in enumerate(text):
+        scores = TextScores(
+            language=page_text[0],
+            words=words[i],
+            sentences=sentences[i],
+            words_per_sentence=round(wps[i], 2),
+            syllables_per_word=round(spw[i], 2),
+            flesch=round(flesch[i], 1),
+            readability=readability_level(flesch[i]),
+            sampled=page_text[2],
+        )
+        if keywords:
+            scores.relevance = round(relevance[i], 1)
+            scores.keywords = [
+                KeywordScore(
+                    keyword=keyword,
+                    count=counts[i][j][0],
+                    density=round(density[i][j], 2),
+                    tfidf=round(tfidf[i][j], 4),
+                    in_title=counts[i][j][1],
+                    in_headings=counts[i][j][2],
+                )
+                for j, keyword in enumerate(keywords)
+            ]
+        results.append(scores)
+    return results
+
+
+def analyze_text(page: ParsedPage, keywords: Iterable[str] = ()) -> TextScores:
+    """Readability and keyword relevance of one page."""
+    return analyze_texts([page], keywords)[0]
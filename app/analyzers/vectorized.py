@@ -0,0 +1,164 @@
+"""Columnar batch evaluation of the rule registry.
+
+:meth:`RuleRegistry.evaluate` walks the rules page by page. For batch and crawl
+audits :func:`evaluate_matrix` instead extracts each feature for all pages at
+once into a NumPy column and evaluates every rule condition once per batch
+(``np.select`` picks the first matching outcome for all pages together). The
+result is a :class:`RuleMatrix` of outcome indexes; per-page
+:class:`RuleResult` lists, identical to the per-page path, are built from it
+only when asked for, and status counts can be read without building them.
+
+NumPy is optional: without it, and for batches too small to pay off, pages are
+evaluated one by one.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Mapping, Optional, Sequence
+
+from app.analyzers.basic import BASIC_RULES
+from app.analyzers.rules import FEATURES, Rule, RuleRegistry, RuleResult, default_thresholds
+from app.collectors.http_fetcher import FetchResult
+from app.collectors.site_files import SiteFiles
+from app.parsers.html_parser import ParsedPage
+
+try:  # Optional fast path
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+__all__ = [
+    "PageItem",
+    "RuleMatrix",
+    "pack_features",
+    "select_outcomes",
+    "evaluate_matrix",
+    "evaluate_batch",
+    "MIN_BATCH",
+]
+
+PageItem = tuple[ParsedPage, FetchResult, Optional[SiteFiles]]
+
+# Below this many pages the per-page path is faster than building columns.
+MIN_BATCH = 16
+
+
+class RuleMatrix:
+    """Outcome of every active rule for every page of a batch.
+
+    ``choices[r, i]`` is the index of the outcome of ``rules[r]`` for page ``i``.
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[Rule],
+        thresholds: Mapping[str, Mapping[str, Any]],
+        choices: "np.ndarray",
+        values: Mapping[str, list],
+    ) -> None:
+        self.rules = list(rules)
+        self.thresholds = thresholds
+        self.choices = choices
+        self._values = values
+
+    def __len__(self) -> int:
+        return self.choices.shape[1]
+
+    def counts(self) -> dict[str, Counter]:
+        """Rule name -> status -> number of pages, without building per-page results."""
+        counts: dict[str, Counter] = {}
+        for rule, choice in zip(self.rules, self.choices):
+            per_outcome = np.bincount(choice, minlength=len(rule.outcomes))
+            counter = counts.setdefault(rule.name, Counter())
+            for outcome, n in zip(rule.outcomes, per_outcome.tolist()):
+                if outcome.status is not None and n:
+                    counter[outcome.status] += n
+        return counts
+
+    def results(self) -> list[list[RuleResult]]:
+        """Per-page results, equal to :meth:`RuleRegistry.evaluate` for each page."""
+        pages: list[list[RuleResult]] = [[] for _ in range(len(self))]
+        for rule, choice in zip(self.rules, self.choices):
+            params = self.thresholds.get(rule.id, {})
+            for index, outcome in enumerate(rule.outcomes):
+                if outcome.status is None:
+                    continue
+                rows = np.flatnonzero(choice == index).tolist()
+                if not rows:
+                    continue
+                name, status = rule.name, outcome.status
+                if not outcome.fields:
+                    for i in rows:
+                        pages[i].append(RuleResult(name, status, outcome.message))
+                    continue
+                # Many pages share a message ("... 1 H1 ..."): render each distinct one once.
+                names = [field for field in outcome.fields if field in self._values]
+                columns = [self._values[field] for field in names]
+                rendered: dict[tuple, str] = {}
+                for i in rows:
+                    key = tuple(column[i] for column in columns)
+                    message = rendered.get(key)
+                    if message is None:
+                        message = rendered[key] = outcome.render({**params, **dict(zip(names, key))})
+                    pages[i].append(RuleResult(name, status, message))
+        return pages
+
+
+def pack_features(
+    items: Sequence[PageItem], names: Sequence[str]
+) -> tuple[dict[str, "np.ndarray"], dict[str, list]]:
+    """Extract ``names`` for all pages: NumPy columns for conditions, Python lists for messages."""
+    values: dict[str, list] = {}
+    columns: dict[str, np.ndarray] = {}
+    for name in names:
+        feature = FEATURES[name]
+        extract = feature.extract
+        column = [extract(parsed, fetch, site) for parsed, fetch, site in items]
+        values[name] = column
+        columns[name] = np.asarray(column) if feature.numeric else np.array(column, dtype=object)
+    return columns, values
+
+
+def select_outcomes(
+    rules: Sequence[Rule],
+    thresholds: Mapping[str, Mapping[str, Any]],
+    columns: Mapping[str, "np.ndarray"],
+    n: int,
+) -> "np.ndarray":
+    """Outcome index of every rule for every page: an ``(len(rules), n)`` array."""
+    choices = np.empty((len(rules), n), dtype=np.int16)
+    for r, rule in enumerate(rules):
+        params = thresholds.get(rule.id, {})
+        conditions = [
+            np.broadcast_to(np.asarray(outcome.when(columns, params), dtype=bool), (n,))
+            for outcome in rule.outcomes[:-1]
+        ]
+        # First matching outcome wins; the last one is unconditional.
+        last = len(rule.outcomes) - 1
+        choices[r] = np.select(conditions, list(range(last)), default=last) if conditions else last
+    return choices
+
+
+def evaluate_matrix(
+    items: Sequence[PageItem],
+    registry: RuleRegistry = BASIC_RULES,
+    thresholds: Optional[Mapping[str, Mapping[str, Any]]] = None,
+) -> RuleMatrix:
+    """Evaluate every active rule of ``registry`` over all ``items`` at once (requires NumPy)."""
+    if np is None:
+        raise RuntimeError("numpy is required for vectorized rule evaluation")
+    thresholds = thresholds if thresholds is not None else default_thresholds()
+    rules = registry.active(thresholds)
+    columns, values = pack_features(items, registry.features_of(rules))
+    return RuleMatrix(rules, thresholds, select_outcomes(rules, thresholds, columns, len(items)), values)
+
+
+def evaluate_batch(
+    items: Sequence[PageItem],
+    registry: RuleRegistry = BASIC_RULES,
+    thresholds: Optional[Mapping[str, Mapping[str, Any]]] = None,
+) -> list[list[RuleResult]]:
+    """Rule results for many pages; same as calling ``registry.evaluate`` for each."""
+    if np is None or len(items) < MIN_BATCH:
+        return [registry.evaluate(parsed, fetch, site, thresholds) for parsed, fetch, site in items]
+    return evaluate_matrix(items, registry, thresholds).results()
@@ -0,0 +1,293 @@
+"""Readers for stored page snapshots: HTML dumps, tarballs and WARC archives.
+
+:func:`iter_records` yields the HTML pages found in a list of inputs, in a
+deterministic order, as :class:`ArchiveRecord` objects:
+
+* a directory — every ``.html`` / ``.htm`` / ``.xhtml`` file below it (also
+  gzip-compressed, ``.html.gz``), sorted by path;
+* a tarball (``.tar``, ``.tar.gz``, ``.tgz``, ``.tar.bz2``, ``.tar.xz``) — the
+  same files, read as a stream in archive order;
+* a WARC file (``.warc``, ``.warc.gz``; per-record gzip is handled) — HTML
+  ``response`` and ``resource`` records. Chunked transfer encoding and gzip /
+  deflate content encoding of the stored HTTP responses are undone;
+* a single HTML file.
+
+Nothing is unpacked to disk, and a record's body is read only after its
+headers show an HTML page; other records are skipped without being buffered.
+Pages from files get the URL ``base_url + relative path`` when ``base_url`` is
+given, a ``file://`` URL otherwise.
+"""
+from __future__ import annotations
+
+import gzip
+import os
+import tarfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, Optional, Sequence
+
+from app.collectors.http_fetcher import MAX_BODY_BYTES
+
+__all__ = ["ArchiveRecord", "ReaderStats", "iter_records"]
+
+_HTML_SUFFIXES = (".html", ".htm", ".xhtml")
+_TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+_SKIP_CHUNK = 1024 * 1024
+
+
+@dataclass(slots=True)
+class ArchiveRecord:
+    url: str
+    content: bytes
+    content_type: Optional[str] = None  # Content-Type of the stored response, if any
+    status_code: int = 200
+    truncated: bool = False  # body exceeded the size cap and was cut off
+    source: str = ""  # file (and member / offset) the record was read from
+
+
+@dataclass
+class ReaderStats:
+    records: int = 0  # HTML pages yielded
+    skipped_type: int = 0  # WARC records that are not HTML responses
+    skipped_status: int = 0  # HTML responses with a status other than 2xx
+    truncated: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "records": self.records,
+            "skipped_type": self.skipped_type,
+            "skipped_status": self.skipped_status,
+            "truncated": self.truncated,
+        }
+
+
+def _is_html_name(name: str) -> bool:
+    name = name.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return name.endswith(_HTML_SUFFIXES)
+
+
+def _file_url(path: str, base_url: Optional[str]) -> str:
+    if base_url:
+        if path.lower().endswith(".gz"):
+            path = path[:-3]
+        return base_url.rstrip("/") + "/" + path.lstrip("/")
+    return Path(path).resolve().as_uri()
+
+
+def _read_capped(stream: BinaryIO, limit: int, max_bytes: int) -> tuple[bytes, bool]:
+    """Read ``limit`` bytes, keeping at most ``max_bytes`` of them."""
+    body = stream.read(min(limit, max_bytes))
+    rest = limit - len(body)
+    truncated = rest > 0
+    while rest > 0:
+        skipped = len(stream.read(min(rest, _SKIP_CHUNK)))
+        if not skipped:
+            break
+        rest -= skipped
+    return body, truncated
+
+
+def _maybe_gunzip(name: str, data: bytes, max_bytes: int) -> tuple[bytes, bool]:
+    if not name.lower().endswith(".gz"):
+        return data, False
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body = decompressor.decompress(data, max_bytes)
+    return body, bool(decompressor.unconsumed_tail)
+
+
+# Directories, single files and tarballs -------------------------------------------
+
+
+def _iter_directory(root: str, base_url: Optional[str], max_bytes: int) -> Iterator[ArchiveRecord]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if not _is_html_name(name):
+                continue
+            path = os.path.join(dirpath, name)
+            yield _file_record(path, os.path.relpath(path, root).replace(os.sep, "/"), base_url, max_bytes)
+
+
+def _file_record(path: str, relative: str, base_url: Optional[str], max_bytes: int) -> ArchiveRecord:
+    with open(path, "rb") as f:
+        if path.lower().endswith(".gz"):
+            with gzip.GzipFile(fileobj=f) as gz:
+                content, truncated = _read_capped(gz, max_bytes + 1, max_bytes)
+                truncated = truncated or len(gz.read(1)) > 0
+        else:
+            content, truncated = _read_capped(f, os.fstat(f.fileno()).st_size, max_bytes)
+    return ArchiveRecord(
+        url=_file_url(relative if base_url else path, base_url),
+        content=content,
+        truncated=truncated,
+        source=path,
+    )
+
+
+def _iter_tar(path: str, base_url: Optional[str], max_bytes: int) -> Iterator[ArchiveRecord]:
+    with tarfile.open(path, mode="r|*") as archive:  # stream mode: members in archive order, no seeking
+        for member in archive:
+            if not member.isfile() or not _is_html_name(member.name):
+                continue
+            stream = archive.extractfile(member)
+            if stream is None:
+                continue
+            data, truncated = _read_capped(stream, member.size, max_bytes)
+            content, gz_truncated = _maybe_gunzip(member.name, data, max_bytes)
+            name = str(PurePosixPath(member.name))
+            yield ArchiveRecord(
+                url=_file_url(name, base_url) if base_url else f"{Path(path).resolve().as_uri()}#{name}",
+                content=content,
+                truncated=truncated or gz_truncated,
+                source=f"{path}:{name}",
+            )
+
+
+# WARC -------------------------------------------------------------------------
+
+
+def _parse_headers(lines: list[bytes]) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    for line in lines:
+        name, sep, value = line.decode("latin-1").partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _read_header_block(stream: BinaryIO, limit: int) -> tuple[list[bytes], int]:
+    """Lines up to the first empty line, and the bytes consumed (at most ``limit``)."""
+    lines: list[bytes] = []
+    consumed = 0
+    while consumed < limit:
+        line = stream.readline(limit - consumed)
+        if not line:
+            break
+        consumed += len(line)
+        if not line.strip():
+            break
+        lines.append(line.rstrip(b"\r\n"))
+    return lines, consumed
+
+
+def _dechunk(data: bytes) -> bytes:
+    out = []
+    position = 0
+    while position < len(data):
+        end = data.find(b"\r\n", position)
+        if end < 0:
+            break
+        size = int(data[position:end].split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            break
+        out.append(data[end + 2 : end + 2 + size])
+        position = end + 2 + size + 2
+    return b"".join(out)
+
+
+def _decode_body(body: bytes, headers: dict[str, str], max_bytes: int) -> bytes:
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        body = _dechunk(body)
+    encoding = headers.get("content-encoding", "").lower()
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        wbits = 16 + zlib.MAX_WBITS if encoding != "deflate" else zlib.MAX_WBITS
+        try:
+            body = zlib.decompressobj(wbits).decompress(body, max_bytes)
+        except zlib.error:
+            if encoding != "deflate":
+                raise
+            body = zlib.decompressobj(-zlib.MAX_WBITS).decompress(body, max_bytes)  # raw deflate
+    return body
+
+
+def _is_html_type(content_type: Optional[str]) -> bool:
+    return content_type is not None and content_type.split(";")[0].strip().lower() in _HTML_TYPES
+
+
+def _iter_warc(path: str, max_bytes: int, stats: ReaderStats) -> Iterator[ArchiveRecord]:
+    with open(path, "rb") as raw:
+        compressed = raw.read(2) == b"\x1f\x8b"
+        raw.seek(0)
+        # GzipFile reads concatenated members, so per-record gzip needs nothing special.
+        stream: BinaryIO = gzip.GzipFile(fileobj=raw) if compressed else raw
+        index = 0
+        while True:
+            line = stream.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue  # blank lines between records
+            if not line.startswith(b"WARC/"):
+                raise ValueError(f"{path}: expected a WARC record header, got {line[:40]!r}")
+            lines, _ = _read_header_block(stream, 1 << 20)
+            warc = _parse_headers(lines)
+            length = int(warc.get("content-length", "0"))
+            record_type = warc.get("warc-type", "")
+            url = warc.get("warc-target-uri", "").strip("<>")
+            index += 1
+            source = f"{path}#{index}"
+
+            if record_type == "response" and warc.get("content-type", "").startswith("application/http"):
+                head, consumed = _read_header_block(stream, length)
+                http = _parse_headers(head[1:])
+                status_line = head[0].split() if head else []
+                status = int(status_line[1]) if len(status_line) > 1 and status_line[1].isdigit() else 0
+                content_type = http.get("content-type")
+                remaining = length - consumed
+                if not _is_html_type(content_type):
+                    stats.skipped_type += 1
+                    _read_capped(stream, remaining, 0)
+                    continue
+                if not 200 <= status < 300:
+                    stats.skipped_status += 1
+                    _read_capped(stream, remaining, 0)
+                    continue
+                body, truncated = _read_capped(stream, remaining, max_bytes)
+                body = _decode_body(body, http, max_bytes)
+                yield ArchiveRecord(url, body, content_type, status, truncated, source)
+            elif record_type == "resource" and _is_html_type(warc.get("content-type")):
+                body, truncated = _read_capped(stream, length, max_bytes)
+                yield ArchiveRecord(url, body, warc.get("content-type"), 200, truncated, source)
+            else:
+                stats.skipped_type += 1
+                _read_capped(stream, length, 0)
+
+
+# Inputs -----------------------------------------------------------------------
+
+
+def iter_records(
+    inputs: Sequence[str],
+    base_url: Optional[str] = None,
+    max_bytes: int = MAX_BODY_BYTES,
+    stats: ReaderStats | None = None,
+) -> Iterator[ArchiveRecord]:
+    """HTML pages from ``inputs`` (directories, tarballs, WARC files or HTML files), in order.
+
+    Args:
+        inputs: Paths, read one after another.
+        base_url: Base URL for pages read from files and tarballs.
+        max_bytes: Body size cap; longer bodies are cut off and marked ``truncated``.
+        stats: Optional counters of yielded and skipped records.
+    """
+    stats = stats if stats is not None else ReaderStats()
+    for path in inputs:
+        name = path.lower()
+        if os.path.isdir(path):
+            records = _iter_directory(path, base_url, max_bytes)
+        elif name.endswith(_TAR_SUFFIXES):
+            records = _iter_tar(path, base_url, max_bytes)
+        elif name.endswith((".warc", ".warc.gz")):
+            records = _iter_warc(path, max_bytes, stats)
+        elif _is_html_name(name):
+            records = iter([_file_record(path, os.path.basename(path), base_url, max_bytes)])
+        else:
+            raise ValueError(f"{path}: not a directory, tarball, WARC or HTML file")
+        for record in records:
+            stats.records += 1
+            stats.truncated += record.truncated
+            yield record
@@ -0,0 +1,129 @@
+"""Character encoding detection for fetched pages.
+
+Works on raw bytes and tries the cheap signals first:
+
+1. a byte order mark;
+2. the ``charset`` parameter of the Content-Type header;
+3. ``<meta charset>`` / ``<meta http-equiv="Content-Type">`` within the first
+   :data:`SNIFF_BYTES` of the document;
+4. strict UTF-8 validation;
+5. statistical detection (charset-normalizer, if installed) — last resort only.
+
+Every result carries the name of the step that produced it so it can be
+reported in :class:`~app.collectors.http_fetcher.FetchResult`.
+"""
+from __future__ import annotations
+
+import codecs
+import re
+from typing import Optional
+
+try:  # Optional: only used when nothing cheaper decides
+    from charset_normalizer import from_bytes
+except ImportError:  # pragma: no cover - depends on environment
+    from_bytes = None
+
+__all__ = ["SNIFF_BYTES", "normalize_charset", "sniff_encoding", "detect_encoding"]
+
+# How much of the document is scanned for a <meta> declaration.
+SNIFF_BYTES = 4096
+
+# Statistical detection looks at no more than this many bytes.
+_DETECT_SAMPLE = 64 * 1024
+
+# Fallback when the body is not valid UTF-8 and detection is unavailable:
+# our client sites are predominantly Russian.
+FALLBACK_ENCODING = "cp1251"
+
+_BOMS: tuple[tuple[bytes, str], ...] = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+?charset\s*=\s*["']?\s*([a-z0-9_:.\-]+)""", re.IGNORECASE)
+_HEADER_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?\s*([a-z0-9_:.\-]+)""", re.IGNORECASE)
+
+
+def normalize_charset(label: Optional[str]) -> Optional[str]:
+    """Map a charset label to a Python codec name, or None if unknown."""
+    if not label:
+        return None
+    try:
+        return codecs.lookup(label.strip()).name
+    except LookupError:
+        return None
+
+
+def _from_bom(data: bytes) -> Optional[str]:
+    for bom, name in _BOMS:
+        if data.startswith(bom):
+            return name
+    return None
+
+
+def _from_meta(head: bytes) -> Optional[str]:
+    match = _META_CHARSET_RE.search(head[:SNIFF_BYTES])
+    if not match:
+        return None
+    name = normalize_charset(match.group(1).decode("ascii", "ignore"))
+    # A document that could be parsed as ASCII can't really be UTF-16 (WHATWG rule).
+    if name and name.startswith("utf-16"):
+        return "utf-8"
+    return name
+
+
+def _is_utf8(data: bytes) -> bool:
+    try:
+        data.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        # A multi-byte sequence cut off at the end of a sample is still UTF-8.
+        return exc.reason == "unexpected end of data" and exc.start >= len(data) - 3
+    return True
+
+
+def _statistical(data: bytes) -> Optional[str]:
+    if from_bytes is None:
+        return None
+    best = from_bytes(data[:_DETECT_SAMPLE]).best()
+    return normalize_charset(best.encoding) if best else None
+
+
+def sniff_encoding(content_type: Optional[str], head: bytes) -> tuple[Optional[str], Optional[str]]:
+    """Decide the encoding from the cheap signals only (BOM, header, <meta>).
+
+    Returns:
+        ``(encoding, source)`` where source is ``"bom"``, ``"header"`` or
+        ``"meta"``; ``(None, None)`` if none of them is conclusive.
+    """
+    name = _from_bom(head)
+    if name:
+        return name, "bom"
+    if content_type:
+        match = _HEADER_CHARSET_RE.search(content_type)
+        name = normalize_charset(match.group(1)) if match else None
+        if name:
+            return name, "header"
+    name = _from_meta(head)
+    if name:
+        return name, "meta"
+    return None, None
+
+
+def detect_encoding(content_type: Optional[str], body: bytes) -> tuple[str, str]:
+    """Determine the encoding of a complete (or sampled) body.
+
+    Returns:
+        ``(encoding, source)``; source is one of ``"bom"``, ``"header"``,
+        ``"meta"``, ``"utf-8"`` (body validated as UTF-8), ``"detected"``
+        (statistical detection) or ``"fallback"``.
+    """
+    name, source = sniff_encoding(content_type, body)
+    if name:
+        return name, source
+    if _is_utf8(body):
+        return "utf-8", "utf-8"
+    name = _statistical(body)
+    if name:
+        return name, "detected"
+    return FALLBACK_ENCODING, "fallback"
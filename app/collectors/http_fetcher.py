@@ -3,32 +3,71 @@
 Responsible for:
 1. Retrieving the raw HTML of a landing page.
 2. Basic SSL validation (checks https scheme and catches SSL errors).
+
+Two flavours are provided: the blocking :func:`fetch_html` (kept for scripts and
+tooling) and the non-blocking :func:`fetch_html_async` used by the API. The async
+variant reuses a single pooled :class:`aiohttp.ClientSession` so that keep-alive
+connections and resolved DNS entries are shared between audits.
+
+``requests`` and ``aiohttp`` are imported by the functions that use them, so
+modules that only need :class:`FetchResult` (rule evaluation in process-pool
+workers, the offline CLI) do not load an HTTP client.
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Optional, Protocol
 from urllib.parse import urlparse
 
-import requests
-from requests.exceptions import SSLError, RequestException
+from app.collectors.charset import detect_encoding
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from app.collectors.page_weight import PageWeight  # imports this module
 
-__all__ = ["FetchResult", "fetch_html"]
+__all__ = ["FetchResult", "BodySink", "fetch_html", "fetch_html_async", "get_session", "close_session"]
 
 
 @dataclass
 class FetchResult:
     """Represents the result of fetching a page."""
 
-    html: Optional[str]
+    content: Optional[bytes]  # raw body
     status_code: Optional[int]
     final_url: Optional[str]
     ssl_ok: bool
     error: Optional[str] = None
 
+    # Validators for conditional requests and a digest of the raw body.
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    not_modified: bool = False  # server answered 304 to a conditional request
+    bytes_read: int = 0  # size of the downloaded body
+    truncated: bool = False  # body exceeded the size cap and was cut off
+    streamed: bool = False  # body was handed to a sink chunk by chunk instead of kept in ``content``
+
+    # Encoding of the body and how it was determined (see app.collectors.charset).
+    encoding: Optional[str] = None
+    encoding_source: Optional[str] = None
+
+    # Transfer cost of the page with its scripts, styles, images and fonts (see app.collectors.page_weight).
+    page_weight: Optional[PageWeight] = None
+
     @property
     def success(self) -> bool:
-        return self.error is None and self.html is not None
+        return self.error is None and (self.content is not None or self.streamed)
+
+    @property
+    def html(self) -> Optional[str]:
+        """The body decoded with the detected encoding (decoded on every access)."""
+        if self.content is None:
+            return None
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
 
 
 # Default headers – helps some sites respond with full HTML.
@@ -47,8 +86,12 @@ def fetch_html(url: str, timeout: int = 10, allow_redirects: bool = True) -> Fet
         allow_redirects: Follow redirects (True by default).
 
     Returns:
-        FetchResult containing HTML (or error message) and SSL status.
+        FetchResult containing the raw body (or error message), its detected
+        encoding and SSL status.
     """
+    import requests
+    from requests.exceptions import SSLError, RequestException
+
     parsed = urlparse(url)
     ssl_expected = parsed.scheme == "https"
 
@@ -60,16 +103,20 @@ def fetch_html(url: str, timeout: int = 10, allow_redirects: bool = True) -> Fet
         final_scheme = urlparse(response.url).scheme
         ssl_ok = ssl_expected and final_scheme == "https"
 
+        encoding, encoding_source = detect_encoding(response.headers.get("Content-Type"), response.content)
         return FetchResult(
-            html=response.text,
+            content=response.content,
             status_code=response.status_code,
             final_url=response.url,
             ssl_ok=ssl_ok,
+            bytes_read=len(response.content),
+            encoding=encoding,
+            encoding_source=encoding_source,
         )
 
     except SSLError as exc:
         return FetchResult(
-            html=None,
+            content=None,
             status_code=None,
             final_url=None,
             ssl_ok=False,
@@ -77,9 +124,195 @@ def fetch_html(url: str, timeout: int = 10, allow_redirects: bool = True) -> Fet
         )
     except RequestException as exc:
         return FetchResult(
-            html=None,
+            content=None,
             status_code=None,
             final_url=None,
             ssl_ok=ssl_expected,  # Cannot determine; assume expected value
             error=f"Request error: {exc}",
-        ) 
\ No newline at end of file
+        )
+
+
+# -----------------------------------------------------------------------------
+#   Async fetcher with a shared connection pool
+# -----------------------------------------------------------------------------
+
+# Pool tuning (overridable via environment variables).
+POOL_LIMIT = int(os.getenv("LP_FETCH_POOL_LIMIT", "100"))
+POOL_LIMIT_PER_HOST = int(os.getenv("LP_FETCH_POOL_LIMIT_PER_HOST", "8"))
+DNS_CACHE_TTL = int(os.getenv("LP_FETCH_DNS_TTL", "300"))
+KEEPALIVE_TIMEOUT = float(os.getenv("LP_FETCH_KEEPALIVE", "30"))
+
+CONNECT_TIMEOUT = float(os.getenv("LP_FETCH_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("LP_FETCH_READ_TIMEOUT", "10"))
+TTFB_TIMEOUT = float(os.getenv("LP_FETCH_TTFB_TIMEOUT", "10"))  # until response headers arrive
+TOTAL_TIMEOUT = float(os.getenv("LP_FETCH_TOTAL_TIMEOUT", "30"))  # whole request incl. body
+
+MAX_BODY_BYTES = int(os.getenv("LP_FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+_session: aiohttp.ClientSession | None = None
+
+
+class BodySink(Protocol):
+    """Consumer of a streamed response body (e.g. :class:`~app.parsers.html_parser.PageExtractor`)."""
+
+    def begin(self, content_type: str | None) -> None:
+        """Called once headers are known, with the Content-Type header value."""
+
+    def feed(self, chunk: bytes) -> None:
+        """Called for every body chunk."""
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the process-wide pooled session, creating it on first use.
+
+    Must be called from within a running event loop.
+    """
+    import aiohttp
+
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMIT,
+            limit_per_host=POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        _session = aiohttp.ClientSession(connector=connector, headers=HEADERS)
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared session (called on application shutdown)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def fetch_html_async(
+    url: str,
+    connect_timeout: float = CONNECT_TIMEOUT,
+    read_timeout: float = READ_TIMEOUT,
+    allow_redirects: bool = True,
+    etag: str | None = None,
+    last_modified: str | None = None,
+    max_bytes: int = MAX_BODY_BYTES,
+    ttfb_timeout: float = TTFB_TIMEOUT,
+    total_timeout: float = TOTAL_TIMEOUT,
+    sink: BodySink | None = None,
+) -> FetchResult:
+    """Non-blocking counterpart of :func:`fetch_html`.
+
+    The body is read in chunks and never more than ``max_bytes`` of it is
+    downloaded; a longer body is cut off and reported as ``truncated``.
+
+    Args:
+        url: Target page URL.
+        connect_timeout: Time allowed to establish the connection (seconds).
+        read_timeout: Maximum gap between received chunks (seconds).
+        allow_redirects: Follow redirects (True by default).
+        etag: Previously seen ETag, sent as ``If-None-Match``.
+        last_modified: Previously seen Last-Modified, sent as ``If-Modified-Since``.
+        max_bytes: Body size cap.
+        ttfb_timeout: Time allowed until the response headers arrive (seconds).
+        total_timeout: Budget for the whole request including the body (seconds).
+        sink: If given, every body chunk is passed to it (e.g. an incremental
+            parser) and the body is not kept; ``content`` is then None and
+            ``streamed`` is set. Encoding detection is left to the sink.
+
+    Returns:
+        FetchResult containing the raw body (or error message), its detected
+        encoding and SSL status. When the server answers 304, ``not_modified``
+        is set and ``content`` is None.
+    """
+    import aiohttp
+
+    ssl_expected = urlparse(url).scheme == "https"
+    timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout, sock_read=read_timeout)
+
+    headers: dict[str, str] = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    try:
+        request = get_session().get(url, timeout=timeout, allow_redirects=allow_redirects, headers=headers)
+        response = await asyncio.wait_for(request, timeout=ttfb_timeout)
+        async with response:
+            response.raise_for_status()
+
+            final_url = str(response.url)
+            ssl_ok = ssl_expected and response.url.scheme == "https"
+            validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+
+            if response.status == 304:
+                return FetchResult(
+                    content=None,
+                    status_code=response.status,
+                    final_url=final_url,
+                    ssl_ok=ssl_ok,
+                    not_modified=True,
+                    **validators,
+                )
+
+            if sink is not None:
+                sink.begin(response.headers.get("Content-Type"))
+
+            digest = hashlib.sha256()
+            chunks: list[bytes] = []
+            bytes_read = 0
+            truncated = False
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                if bytes_read + len(chunk) > max_bytes:
+                    chunk = chunk[: max_bytes - bytes_read]
+                    truncated = True
+                bytes_read += len(chunk)
+                digest.update(chunk)
+                if sink is not None:
+                    sink.feed(chunk)
+                else:
+                    chunks.append(chunk)
+                if truncated:
+                    break
+
+            content = None
+            encoding = encoding_source = None
+            if sink is None:
+                content = b"".join(chunks)
+                encoding, encoding_source = detect_encoding(response.headers.get("Content-Type"), content)
+
+            return FetchResult(
+                content=content,
+                encoding=encoding,
+                encoding_source=encoding_source,
+                status_code=response.status,
+                final_url=final_url,
+                ssl_ok=ssl_ok,
+                content_hash=digest.hexdigest(),
+                bytes_read=bytes_read,
+                truncated=truncated,
+                streamed=sink is not None,
+                **validators,
+            )
+
+    except aiohttp.ClientSSLError as exc:
+        return FetchResult(
+            content=None,
+            status_code=None,
+            final_url=None,
+            ssl_ok=False,
+            error=f"SSL error: {exc}",
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+        return FetchResult(
+            content=None,
+            status_code=None,
+            final_url=None,
+            ssl_ok=ssl_expected,  # Cannot determine; assume expected value
+            error=f"Request error: {str(exc) or type(exc).__name__}",
+        )
@@ -0,0 +1,393 @@
+"""Page-weight collector for LP Screening.
+
+The HTML is only part of what a landing page costs to load. For the scripts,
+stylesheets, images and preloaded fonts the parser found on the page
+(:attr:`ParsedPage.subresources <app.parsers.html_parser.ParsedPage>`), this
+collector finds out, without downloading them:
+
+* the transfer size — ``Content-Length`` of a ``HEAD`` response; when the
+  server refuses ``HEAD`` or does not send the size (typical for compressed
+  responses), a ``GET`` of the first byte (``Range: bytes=0-0``), whose
+  ``Content-Range`` gives the full size. A server that ignores the range and
+  sends no length has the body counted up to ``max_asset_bytes``;
+* the compression (``Content-Encoding``) of text assets;
+* how long browsers may cache the file (``Cache-Control`` / ``Expires``).
+
+Probes go through the shared connection pool of
+:mod:`app.collectors.http_fetcher`, at most ``concurrency`` at a time per page,
+and a page gets ``budget`` seconds for all of them; assets not probed in time
+are reported as skipped. Render-blocking files are probed first, images last.
+
+Landing pages of one site, and of many sites, load the same files from the
+same CDNs, so probe results are cached per asset URL with a TTL (failed
+probes for a shorter ``error_ttl``, so that an asset that hangs does not use
+up the budget of every page), and concurrent probes of one URL share a single
+request.
+"""
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import aiohttp
+
+from app.collectors.http_fetcher import CHUNK_SIZE, FetchResult, get_session
+from app.parsers.html_parser import ParsedPage, Subresource
+from app.pipeline.singleflight import SingleFlight
+
+__all__ = ["AssetProbe", "PageAsset", "PageWeight", "PageWeightCollector", "LONG_CACHE_TTL"]
+
+# Browsers advertise these; probes must see what a browser would receive.
+_PROBE_HEADERS = {"Accept": "*/*", "Accept-Encoding": "gzip, deflate, br, zstd"}
+_RANGE_HEADERS = {**_PROBE_HEADERS, "Range": "bytes=0-0"}
+
+# HEAD answers after which the probe is retried with a ranged GET.
+_HEAD_REFUSED = frozenset({403, 405, 501})
+
+_COMPRESSED = frozenset({"gzip", "br", "deflate", "zstd", "compress"})
+# Content types that compress well; images and woff fonts are compressed already.
+_TEXT_TYPES = ("text/", "javascript", "json", "xml", "svg", "font/ttf", "font/otf", "x-font-ttf", "fontobject")
+# Smaller files fit in the first packets anyway; not worth compressing.
+MIN_COMPRESS_BYTES = 1400
+
+# Files cached for less than this (or without Cache-Control / Expires) are re-validated too often.
+LONG_CACHE_TTL = 7 * 24 * 3600
+
+# Blocking files first: they delay the first paint. Images last: there are many of them.
+_PROBE_ORDER = {"stylesheet": 1, "script": 2, "font": 3, "image": 4}
+
+
+def _cache_ttl(headers) -> Optional[int]:
+    """Seconds a browser may reuse the response without asking; None if the headers do not say."""
+    cache_control = headers.get("Cache-Control", "").lower()
+    directives = {}
+    for part in cache_control.split(","):
+        name, _, value = part.strip().partition("=")
+        directives[name] = value.strip('"')
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    if "max-age" in directives:
+        try:
+            return max(0, int(directives["max-age"]))
+        except ValueError:
+            return 0
+    expires = headers.get("Expires")
+    if expires is None:
+        return None
+    try:
+        expires_at = email.utils.parsedate_to_datetime(expires).timestamp()
+    except (TypeError, ValueError):
+        return 0  # invalid dates mean "already expired"
+    try:
+        now = email.utils.parsedate_to_datetime(headers["Date"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        now = time.time()
+    return max(0, int(expires_at - now))
+
+
+def _content_range_total(value: str | None) -> Optional[int]:
+    """Full size from ``Content-Range: bytes 0-0/12345``."""
+    if not value:
+        return None
+    total = value.rpartition("/")[2].strip()
+    return int(total) if total.isdigit() else None
+
+
+@dataclass(slots=True)
+class AssetProbe:
+    """What loading one asset URL costs; shared by every page that loads it."""
+
+    url: str
+    status: Optional[int] = None  # final HTTP status, None if the probe failed
+    size: Optional[int] = None  # bytes on the wire (after compression), None if unknown
+    content_type: Optional[str] = None
+    content_encoding: Optional[str] = None
+    cache_ttl: Optional[int] = None  # seconds, see _cache_ttl
+    error: Optional[str] = None
+    probed_at: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and self.status < 400
+
+    @property
+    def compressed(self) -> bool:
+        return (self.content_encoding or "").lower() in _COMPRESSED
+
+    @property
+    def compressible(self) -> bool:
+        content_type = (self.content_type or "").lower()
+        return any(kind in content_type for kind in _TEXT_TYPES)
+
+
+@dataclass(slots=True)
+class PageAsset:
+    url: str  # absolute
+    kind: str  # see Subresource.kind
+    render_blocking: bool
+    probe: AssetProbe
+
+    @property
+    def size(self) -> int:
+        return self.probe.size or 0
+
+
+@dataclass
+class PageWeight:
+    """Transfer cost of a page and the files it loads."""
+
+    html_bytes: int
+    assets: list[PageAsset] = field(default_factory=list)  # probed, in probe order
+    found: int = 0  # distinct subresource URLs on the page
+    skipped: int = 0  # not probed: over the per-page limit or out of time
+    cache_hits: int = 0  # probes answered from the cache
+    elapsed: float = 0.0  # seconds
+
+    @property
+    def assets_bytes(self) -> int:
+        return sum(asset.size for asset in self.assets)
+
+    @property
+    def total_bytes(self) -> int:
+        return self.html_bytes + self.assets_bytes
+
+    @property
+    def unknown_size(self) -> int:
+        """Probed assets whose size could not be determined (failed probes included, HTTP errors not)."""
+        return sum(asset.probe.size is None and not self._is_broken(asset) for asset in self.assets)
+
+    @property
+    def complete(self) -> bool:
+        return not self.skipped and not self.unknown_size
+
+    def bytes_by_kind(self) -> dict[str, int]:
+        totals: dict[str, int] = {}
+        for asset in self.assets:
+            totals[asset.kind] = totals.get(asset.kind, 0) + asset.size
+        return totals
+
+    @staticmethod
+    def _is_broken(asset: PageAsset) -> bool:
+        return asset.probe.status is not None and asset.probe.status >= 400
+
+    @property
+    def broken(self) -> list[PageAsset]:
+        """Assets answered with an HTTP error."""
+        return [asset for asset in self.assets if self._is_broken(asset)]
+
+    @property
+    def render_blocking(self) -> list[PageAsset]:
+        return [asset for asset in self.assets if asset.render_blocking]
+
+    @property
+    def compressible(self) -> list[PageAsset]:
+        """Loaded text assets large enough to be worth compressing."""
+        return [
+            asset
+            for asset in self.assets
+            if asset.probe.ok and asset.probe.compressible and asset.size >= MIN_COMPRESS_BYTES
+        ]
+
+    @property
+    def uncompressed(self) -> list[PageAsset]:
+        return [asset for asset in self.compressible if not asset.probe.compressed]
+
+    @property
+    def cacheable(self) -> list[PageAsset]:
+        return [asset for asset in self.assets if asset.probe.ok]
+
+    @property
+    def short_cache(self) -> list[PageAsset]:
+        """Loaded assets cached for less than :data:`LONG_CACHE_TTL`."""
+        return [
+            asset
+            for asset in self.cacheable
+            if asset.probe.cache_ttl is None or asset.probe.cache_ttl < LONG_CACHE_TTL
+        ]
+
+    def largest(self, n: int = 5) -> list[PageAsset]:
+        return sorted((asset for asset in self.assets if asset.size), key=lambda asset: -asset.size)[:n]
+
+
+class PageWeightCollector:
+    """Probes the subresources of pages, caching results per asset URL.
+
+    Args:
+        ttl: How long a probe result is reused for the same URL (seconds).
+        error_ttl: The same for failed probes (timeouts, connection errors).
+        max_entries: Asset URLs kept in memory (LRU).
+        concurrency: Probes running at once for one page.
+        budget: Time for all probes of one page (seconds).
+        probe_timeout: Time for one probe (seconds).
+        max_assets: Subresources probed per page; the rest are skipped.
+        max_asset_bytes: Body bytes counted when a server sends neither the
+            size nor a range; the size is then at least this.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        error_ttl: float = 300,
+        max_entries: int = 50_000,
+        concurrency: int = 6,
+        budget: float = 8.0,
+        probe_timeout: float = 5.0,
+        max_assets: int = 100,
+        max_asset_bytes: int = 10 * 1024 * 1024,
+    ) -> None:
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_entries = max_entries
+        self.concurrency = concurrency
+        self.budget = budget
+        self.probe_timeout = probe_timeout
+        self.max_assets = max_assets
+        self.max_asset_bytes = max_asset_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, AssetProbe]] = OrderedDict()  # url -> (expires, probe)
+        self._inflight: SingleFlight[AssetProbe] = SingleFlight()
+
+    @classmethod
+    def from_env(cls) -> "PageWeightCollector":
+        return cls(
+            ttl=float(os.getenv("LP_PAGE_WEIGHT_TTL", "3600")),
+            error_ttl=float(os.getenv("LP_PAGE_WEIGHT_ERROR_TTL", "300")),
+            max_entries=int(os.getenv("LP_PAGE_WEIGHT_MAX_ENTRIES", "50000")),
+            concurrency=int(os.getenv("LP_PAGE_WEIGHT_CONCURRENCY", "6")),
+            budget=float(os.getenv("LP_PAGE_WEIGHT_BUDGET", "8")),
+            probe_timeout=float(os.getenv("LP_PAGE_WEIGHT_PROBE_TIMEOUT", "5")),
+            max_assets=int(os.getenv("LP_PAGE_WEIGHT_MAX_ASSETS", "100")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def coalesced(self) -> int:
+        return self._inflight.coalesced
+
+    # Pages ------------------------------------------------------------------
+
+    @staticmethod
+    def resolve(base_url: str, resources: list[Subresource]) -> list[tuple[str, Subresource]]:
+        """Absolute http(s) URLs of ``resources``, deduplicated, in probe order."""
+        found: dict[str, Subresource] = {}
+        for resource in resources:
+            try:
+                url = urldefrag(urljoin(base_url, resource.url)).url
+            except ValueError:  # e.g. a malformed IPv6 host
+                continue
+            if urlsplit(url).scheme in ("http", "https") and url not in found:
+                found[url] = resource
+        return sorted(found.items(), key=lambda item: (not item[1].render_blocking, _PROBE_ORDER[item[1].kind]))
+
+    async def collect(self, parsed: ParsedPage, fetch: FetchResult, page_url: str) -> PageWeight:
+        """Probe the subresources of a parsed page within the time budget."""
+        started = time.perf_counter()
+        resources = self.resolve(fetch.final_url or page_url, parsed.subresources)
+        weight = PageWeight(html_bytes=fetch.bytes_read, found=len(resources))
+        selected = resources[: self.max_assets]
+        weight.skipped = len(resources) - len(selected)
+
+        probes: dict[str, AssetProbe] = {}
+        missing: list[str] = []
+        for url, _ in selected:
+            cached = self.cached(url)
+            if cached is not None:
+                probes[url] = cached
+            else:
+                missing.append(url)
+        weight.cache_hits = len(probes)
+
+        if missing:
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def run(url: str) -> None:
+                async with semaphore:
+                    probes[url] = await self.probe(url)
+
+            tasks = [asyncio.ensure_future(run(url)) for url in missing]
+            _, pending = await asyncio.wait(tasks, timeout=self.budget)
+            for task in pending:
+                # Shared probes keep running for the cache (see SingleFlight); this page stops waiting.
+                task.cancel()
+
+        for url, resource in selected:
+            if url in probes:
+                weight.assets.append(PageAsset(url, resource.kind, resource.render_blocking, probes[url]))
+            else:
+                weight.skipped += 1
+        weight.elapsed = time.perf_counter() - started
+        return weight
+
+    # Assets -----------------------------------------------------------------
+
+    def cached(self, url: str) -> Optional[AssetProbe]:
+        entry = self._entries.get(url)
+        if entry is None or time.time() >= entry[0]:
+            return None
+        self._entries.move_to_end(url)
+        self.hits += 1
+        return entry[1]
+
+    async def probe(self, url: str) -> AssetProbe:
+        """Probe one asset URL (cached, shared between concurrent callers)."""
+        cached = self.cached(url)
+        if cached is not None:
+            return cached
+        self.misses += 1
+        return await self._inflight.do(url, lambda: self._load(url))
+
+    async def _load(self, url: str) -> AssetProbe:
+        probe = AssetProbe(url)
+        try:
+            await asyncio.wait_for(self._probe(probe), timeout=self.probe_timeout)
+        except asyncio.TimeoutError:
+            probe.error = "Timeout"
+        except aiohttp.ClientError as exc:
+            probe.error = str(exc) or type(exc).__name__
+        probe.probed_at = time.time()
+        # Failures may be transient: they are probed again sooner.
+        self._entries[url] = (probe.probed_at + (self.ttl if probe.error is None else self.error_ttl), probe)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return probe
+
+    async def _probe(self, probe: AssetProbe) -> None:
+        session = get_session()
+        async with session.head(probe.url, allow_redirects=True, headers=_PROBE_HEADERS) as response:
+            self._read_headers(probe, response)
+            # Some servers answer HEAD with "Content-Length: 0"; a GET tells the real size.
+            if response.status not in _HEAD_REFUSED and (response.status >= 400 or probe.size):
+                return
+        # Compressed bodies are never decoded: their size on the wire is what is measured.
+        async with session.get(
+            probe.url, allow_redirects=True, headers=_RANGE_HEADERS, auto_decompress=False
+        ) as response:
+            self._read_headers(probe, response)
+            if response.status == 206:
+                probe.size = _content_range_total(response.headers.get("Content-Range"))
+            elif response.status < 400 and probe.size is None:
+                size = 0
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size >= self.max_asset_bytes:
+                        break
+                probe.size = size
+
+    @staticmethod
+    def _read_headers(probe: AssetProbe, response: aiohttp.ClientResponse) -> None:
+        headers = response.headers
+        probe.status = response.status
+        probe.size = response.content_length if response.status < 300 else None
+        probe.content_type = headers.get("Content-Type")
+        probe.content_encoding = headers.get("Content-Encoding")
+        probe.cache_ttl = _cache_ttl(headers)
@@ -0,0 +1,347 @@
+"""robots.txt and sitemap.xml collector for LP Screening.
+
+For the origin of an audited page, fetches ``/robots.txt`` and the sitemaps it
+lists (``/sitemap.xml`` if none are listed) and summarises them in
+:class:`SiteFiles`. Results are cached per origin with a TTL, because many
+audited landing pages live on the same domains, and concurrent requests for one
+origin share a single download.
+
+Sitemaps (including sitemap indexes and ``.xml.gz`` files) are parsed while
+they download with :class:`xml.etree.ElementTree.XMLPullParser`; processed
+elements are discarded immediately and the listed URLs go into a Bloom filter,
+so memory stays small even for sitemaps with tens of thousands of URLs.
+
+An audit waits for the download of its origin only up to ``wait`` seconds
+(:meth:`SiteFilesCollector.get_within`); past that it gets what is known so
+far (:attr:`SiteFiles.complete` is False) while the download goes on and fills
+the per-origin cache for the next audits.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+from xml.etree import ElementTree
+
+from app.collectors.http_fetcher import CHUNK_SIZE, get_session
+from app.pipeline.singleflight import SingleFlight
+from app.storage.bloom import ScalableBloomFilter
+from app.storage.cache import normalize_url
+
+__all__ = ["SiteFiles", "SiteFilesCollector"]
+
+# User agents whose robots.txt rules are checked for the audited URL.
+ROBOTS_AGENTS = ("Googlebot", "Yandex")
+
+ROBOTS_MAX_BYTES = 512 * 1024  # Google ignores anything past 500 KiB
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _url_key(url: str) -> str:
+    """Same result as :func:`normalize_url`, with a fast path for plain URLs (sitemaps list thousands)."""
+    scheme, sep, rest = url.partition("://")
+    host, _, path = rest.partition("/")
+    if not sep or any(c in host for c in "@?#[") or "#" in path:
+        return normalize_url(url)
+    scheme = scheme.lower()
+    host, _, port = host.lower().partition(":")
+    if port:
+        if not port.isdigit():
+            return normalize_url(url)
+        if int(port) != _DEFAULT_PORTS.get(scheme):
+            host = f"{host}:{int(port)}"
+    return f"{scheme}://{host}/{path}"
+
+
+@dataclass
+class SiteFiles:
+    """robots.txt / sitemap summary for one origin."""
+
+    origin: str  # scheme://host[:port]
+    robots_status: Optional[int] = None  # HTTP status of /robots.txt, None if it could not be fetched
+    robots_error: Optional[str] = None
+    robots: Optional[RobotFileParser] = None  # parsed rules (None if no usable robots.txt)
+
+    sitemaps: list[str] = field(default_factory=list)  # sitemap files read
+    sitemap_urls: int = 0  # page URLs listed across all sitemaps
+    sitemap_error: Optional[str] = None
+    sitemap_truncated: bool = False  # stopped early at a file / size / URL limit
+    complete: bool = True  # False: still downloading; only robots.txt (if already read) is filled in
+    _urls: ScalableBloomFilter = field(default_factory=ScalableBloomFilter, repr=False)
+
+    @property
+    def robots_found(self) -> bool:
+        return self.robots_status is not None and 200 <= self.robots_status < 300
+
+    @property
+    def sitemap_found(self) -> bool:
+        return self.sitemap_urls > 0
+
+    def disallowed_for(self, url: str) -> list[str]:
+        """User agents from :data:`ROBOTS_AGENTS` that robots.txt forbids to crawl ``url``."""
+        if self.robots is None:
+            return []
+        return [agent for agent in ROBOTS_AGENTS if not self.robots.can_fetch(agent, url)]
+
+    def in_sitemap(self, url: str) -> Optional[bool]:
+        """Whether ``url`` is listed in the sitemaps (None if there are none).
+
+        Backed by a Bloom filter: a False answer is exact, a True answer is
+        wrong with a probability of about 1%.
+        """
+        if not self.sitemap_found:
+            return None
+        return _url_key(url.strip()) in self._urls
+
+
+class _SitemapReader:
+    """Streaming sitemap parser: feed raw (optionally gzipped) chunks."""
+
+    def __init__(self, files: "SiteFiles", max_urls: int, max_bytes: int) -> None:
+        self._files = files
+        self._max_urls = max_urls
+        self._max_bytes = max_bytes
+        self._parser = ElementTree.XMLPullParser(events=("start", "end"))
+        self._root: ElementTree.Element | None = None
+        self._gunzip: zlib._Decompress | None = None
+        self._first = True
+        self.bytes_read = 0  # decompressed bytes
+        self.children: list[str] = []  # sitemaps listed by a sitemap index
+        self.done = False  # hit a limit; stop reading
+
+    def pieces(self, chunk: bytes) -> Iterator[bytes]:
+        """Split a downloaded chunk into XML pieces of at most CHUNK_SIZE, gunzipping if needed."""
+        if self._first:
+            self._first = False
+            if chunk[:2] == b"\x1f\x8b":
+                self._gunzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._gunzip is None:
+            yield chunk
+            return
+        # Decompress in bounded pieces so a gzip bomb cannot blow up memory.
+        data = self._gunzip.decompress(chunk, CHUNK_SIZE)
+        while data:
+            yield data
+            tail = self._gunzip.unconsumed_tail
+            data = self._gunzip.decompress(tail, CHUNK_SIZE) if tail else b""
+
+    def feed(self, chunk: bytes) -> None:
+        for piece in self.pieces(chunk):
+            self.feed_xml(piece)
+            if self.done:
+                break
+
+    def feed_xml(self, data: bytes) -> None:
+        self.bytes_read += len(data)
+        if self.bytes_read > self._max_bytes:
+            self._files.sitemap_truncated = True
+            self.done = True
+            return
+        self._parser.feed(data)
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                continue
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if tag not in ("url", "sitemap"):
+                continue
+            loc = next((c.text for c in elem if c.tag.rsplit("}", 1)[-1] == "loc"), None)
+            if loc and loc.strip():
+                if tag == "sitemap":
+                    self.children.append(loc.strip())
+                else:
+                    self._files._urls.add(_url_key(loc.strip()))
+                    self._files.sitemap_urls += 1
+            # Completed entries are dropped from the tree: memory stays constant.
+            self._root.clear()
+            if self._files.sitemap_urls >= self._max_urls:
+                self._files.sitemap_truncated = True
+                self.done = True
+                return
+
+    def close(self) -> None:
+        if not self.done:
+            self._parser.close()
+
+
+class SiteFilesCollector:
+    """Fetches and caches :class:`SiteFiles` per origin.
+
+    Args:
+        ttl: How long a result is reused for the same origin (seconds).
+        max_entries: Origins kept in memory (LRU).
+        timeout: Time budget for robots.txt and all sitemaps of one origin (seconds).
+        max_sitemaps: Maximum sitemap files read per origin (indexes included).
+        max_sitemap_bytes: Maximum decompressed size of one sitemap file.
+        max_urls: Maximum page URLs recorded per origin.
+        wait: How long :meth:`get_within` waits for a download in progress (seconds).
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        max_entries: int = 1000,
+        timeout: float = 20.0,
+        max_sitemaps: int = 20,
+        max_sitemap_bytes: int = 50 * 1024 * 1024,
+        max_urls: int = 500_000,
+        wait: float = 0.5,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.max_sitemaps = max_sitemaps
+        self.max_sitemap_bytes = max_sitemap_bytes
+        self.max_urls = max_urls
+        self.wait = wait
+        self._loading: dict[str, SiteFiles] = {}  # origins being downloaded, filled in as they go
+        self._entries: OrderedDict[str, tuple[float, SiteFiles]] = OrderedDict()
+        self._inflight: SingleFlight[SiteFiles] = SingleFlight()
+
+    @classmethod
+    def from_env(cls) -> "SiteFilesCollector":
+        return cls(
+            ttl=float(os.getenv("LP_SITE_FILES_TTL", "3600")),
+            max_entries=int(os.getenv("LP_SITE_FILES_MAX_ENTRIES", "1000")),
+            timeout=float(os.getenv("LP_SITE_FILES_TIMEOUT", "20")),
+            max_sitemaps=int(os.getenv("LP_SITEMAP_MAX_FILES", "20")),
+            max_sitemap_bytes=int(os.getenv("LP_SITEMAP_MAX_BYTES", str(50 * 1024 * 1024))),
+            max_urls=int(os.getenv("LP_SITEMAP_MAX_URLS", "500000")),
+            wait=float(os.getenv("LP_SITE_FILES_WAIT", "0.5")),
+        )
+
+    @staticmethod
+    def origin(url: str) -> str:
+        parts = urlsplit(normalize_url(url))
+        return f"{parts.scheme}://{parts.netloc}"
+
+    async def get(self, url: str) -> SiteFiles:
+        """Return robots/sitemap information for the origin of ``url``."""
+        origin = self.origin(url)
+        cached = self._entries.get(origin)
+        if cached is not None and time.time() - cached[0] < self.ttl:
+            self._entries.move_to_end(origin)
+            return cached[1]
+        return await self._inflight.do(origin, lambda: self._load(origin))
+
+    async def get_within(self, url: str, task: asyncio.Future | None = None) -> SiteFiles:
+        """Like :meth:`get`, but wait at most ``wait`` seconds.
+
+        ``task`` is a :meth:`get` already running for ``url``. If it has not
+        finished in time, it keeps running (and fills the cache), and the caller
+        gets a snapshot with ``complete=False``: robots.txt if it has been read,
+        no sitemap information.
+        """
+        if task is None:
+            task = asyncio.ensure_future(self.get(url))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.wait)
+        except asyncio.TimeoutError:
+            return self.partial(url)
+
+    def partial(self, url: str) -> SiteFiles:
+        """What is known so far about the origin of ``url``, as an incomplete snapshot."""
+        origin = self.origin(url)
+        files = self._loading.get(origin)
+        if files is None:
+            return SiteFiles(origin=origin, complete=False)
+        return SiteFiles(
+            origin=origin,
+            robots_status=files.robots_status,
+            robots_error=files.robots_error,
+            robots=files.robots,
+            complete=False,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def _load(self, origin: str) -> SiteFiles:
+        files = SiteFiles(origin=origin)
+        self._loading[origin] = files
+        try:
+            await asyncio.wait_for(self._collect(files), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            if files.robots_status is None and files.robots_error is None:
+                files.robots_error = "Timeout"
+            files.sitemap_error = files.sitemap_error or "Timeout"
+            files.sitemap_truncated = True
+        except ValueError as exc:  # e.g. an undecodable or malformed sitemap location
+            files.sitemap_error = str(exc)
+        finally:
+            del self._loading[origin]
+        self._entries[origin] = (time.time(), files)
+        self._entries.move_to_end(origin)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return files
+
+    async def _collect(self, files: SiteFiles) -> None:
+        sitemaps = await self._fetch_robots(files)
+        queue = sitemaps or [urljoin(files.origin, "/sitemap.xml")]
+        seen: set[str] = set()
+        while queue and len(seen) < self.max_sitemaps:
+            sitemap_url = queue.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            queue.extend(await self._read_sitemap(files, sitemap_url))
+            if files.sitemap_urls >= self.max_urls:
+                break
+        if queue:
+            files.sitemap_truncated = True
+
+    async def _fetch_robots(self, files: SiteFiles) -> list[str]:
+        """Fetch and parse robots.txt; return the sitemap URLs it declares."""
+        import aiohttp  # not needed by processes that only evaluate rules on SiteFiles
+
+        try:
+            async with get_session().get(urljoin(files.origin, "/robots.txt")) as response:
+                if response.status >= 400:
+                    files.robots_status = response.status
+                    return []
+                status = response.status
+                body = await response.content.read(ROBOTS_MAX_BYTES)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            files.robots_error = str(exc) or type(exc).__name__
+            return []
+        parser = RobotFileParser()
+        parser.parse(body.decode("utf-8", errors="replace").splitlines())
+        # Both set together, after parsing: a snapshot taken meanwhile sees robots.txt as not read yet.
+        files.robots_status, files.robots = status, parser
+        return parser.site_maps() or []
+
+    async def _read_sitemap(self, files: SiteFiles, url: str) -> list[str]:
+        """Stream one sitemap file; return child sitemaps if it is an index."""
+        import aiohttp
+
+        reader = _SitemapReader(files, self.max_urls, self.max_sitemap_bytes)
+        try:
+            async with get_session().get(url) as response:
+                if response.status >= 400:
+                    if not files.sitemaps:
+                        files.sitemap_error = f"HTTP {response.status}"
+                    return []
+                files.sitemaps.append(url)
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    for piece in reader.pieces(chunk):
+                        reader.feed_xml(piece)
+                        if reader.done:
+                            break
+                        await asyncio.sleep(0)  # parsing is CPU work; let other audits run
+                    if reader.done:
+                        break
+            reader.close()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            files.sitemap_error = str(exc) or type(exc).__name__
+        except (ElementTree.ParseError, zlib.error) as exc:
+            files.sitemap_error = f"{url}: {exc}"
+        return reader.children
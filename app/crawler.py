@@ -0,0 +1,88 @@
+"""Command-line site crawler for LP Screening.
+
+Crawls a site from a landing page, audits every page with the basic rules and
+prints the site summary as JSON. Per-page results can be written as NDJSON.
+
+Usage::
+
+    python -m app.crawler https://example.com --max-pages 500 --max-depth 3 --output pages.ndjson
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from app.collectors.http_fetcher import close_session
+from app.collectors.page_weight import PageWeightCollector
+from app.collectors.site_files import SiteFilesCollector
+from app.pipeline.core import AuditPipeline
+from app.pipeline.crawl import CrawlConfig, CrawlSummary, SiteCrawler
+from app.pipeline.executor import CPUExecutor
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    config = CrawlConfig(
+        max_pages=args.max_pages,
+        max_depth=args.max_depth,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        respect_robots=not args.ignore_robots,
+        delay=args.delay,
+    )
+    executor = CPUExecutor.from_env()
+    site_files = SiteFilesCollector.from_env()
+    stream_parse = os.getenv("LP_STREAM_PARSE", "").lower() in ("1", "true", "yes")
+    pipeline = AuditPipeline.default(
+        None,
+        executor,
+        stream_parse=stream_parse,
+        site_files=site_files,
+        ai=False,
+        keep_text=False,
+        page_weight=PageWeightCollector.from_env() if args.page_weight else None,
+    )
+    crawler = SiteCrawler(pipeline, site_files, config)
+    summary = CrawlSummary()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        await executor.warm()
+        async for page in crawler.crawl(args.url, summary):
+            if out is not None:
+                out.write(json.dumps(page.as_dict(), ensure_ascii=False) + "\n")
+            if not args.quiet:
+                status = page.error or page.status_code
+                print(f"[{summary.pages}] depth={page.depth} {status} {page.url}", file=sys.stderr)
+    finally:
+        if out is not None:
+            out.close()
+        await close_session()
+        executor.shutdown()
+    return summary.as_dict()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Crawl a site and audit every page.")
+    parser.add_argument("url", help="start page")
+    parser.add_argument("--max-pages", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=None, help="seconds between requests (default: robots.txt Crawl-delay)")
+    parser.add_argument("--ignore-robots", action="store_true", help="do not apply robots.txt rules")
+    parser.add_argument(
+        "--page-weight", action="store_true", help="also probe the scripts, styles, images and fonts of every page"
+    )
+    parser.add_argument("--output", help="write per-page results to this NDJSON file")
+    parser.add_argument("--quiet", action="store_true", help="do not print progress")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(_run(args))
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,182 +1,753 @@
-from fastapi import FastAPI
-from pydantic import BaseModel, HttpUrl
-from fastapi.responses import HTMLResponse, FileResponse
+"""LP Screening API.
+
+Приложение собирает :func:`create_app` по настройкам (:mod:`app.settings`).
+``uvicorn app.main:app`` создаёт его при первом обращении к ``app``;
+``uvicorn --factory app.main:create_app`` — явно.
+
+Тяжёлые подсистемы загружаются при первом использовании: клиент OpenAI — при
+первом запросе к модели, HTML-отчёты (jinja2) и выгрузка CSV/Parquet — при
+первом запросе к ним. Воркер, который отвечает только на /audit без ИИ, их не
+импортирует; ``LP_PRELOAD`` загружает их заранее при старте.
+"""
+import asyncio
+import importlib
+import json
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Annotated, Callable, Literal
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field, HttpUrl
+from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
-from app.collectors.http_fetcher import fetch_html, FetchResult
-from app.parsers.html_parser import parse_html, ParsedPage
-from app.analyzers.basic import evaluate_basic, RuleResult, RuleStatus
-from app.ai.gpt_client import analyze_with_gpt, AIResult
-from app.reports.renderer import render_report
+from app.collectors.http_fetcher import fetch_html_async, close_session
+from app.collectors.page_weight import PageWeightCollector
+from app.collectors.site_files import SiteFilesCollector
+from app.analyzers.text import normalize_keywords
+from app.ai.gpt_client import ai_enabled, close_client
+from app.pipeline.batch import BatchStats, run_batch
+from app.pipeline.core import AuditContext, AuditPipeline
+from app.pipeline.crawl import CrawlConfig, CrawlSummary, SiteCrawler
+from app.pipeline.executor import CPUExecutor
+from app.pipeline.metrics import Counter, PipelineMetrics
+from app.pipeline.monitor import Monitor, MonitorConfig, MonitorTarget
+from app.pipeline.singleflight import SingleFlight
+from app.settings import PRELOAD_MODULES, Settings, get_settings
+from app.storage.cache import AuditCache, CacheEntry, SQLiteStore, normalize_url
+from app.storage.history import HistoryStore
+from app.storage.similarity import SimilarityIndex
+from app.schemas import AuditResponse, audit_response
+
+
+@dataclass
+class AuditRun:
+    """Результат аудита вместе со значением заголовка Server-Timing."""
+
+    audit: AuditResponse
+    server_timing: str
+
+
+def _cache_key(url: str, keywords: list[str]) -> str:
+    """Ключ кэша: нормализованный URL и, если заданы, ключевые слова."""
+    key = normalize_url(url)
+    return f"{key} kw={','.join(keywords)}" if keywords else key
+
+
+# Вызывается после каждого этапа конвейера (потоковая выдача результатов)
+StageCallback = Callable[[str, AuditContext], None]
+
+
+class Services:
+    """Кэш, история, конвейеры и мониторинг одного приложения; создаются в :func:`create_app`."""
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        # Кэш результатов аудита: LRU в памяти + (опционально) SQLite на диске
+        self.audit_cache = AuditCache(
+            ttl=settings.cache_ttl,
+            max_entries=settings.cache_max_entries,
+            store=SQLiteStore(settings.cache_db) if settings.cache_db else None,
+        )
+        # История аудитов (SQLite, запись пакетами в фоновом потоке); None — отключена
+        self.history = HistoryStore.from_env(settings.history_db) if settings.history_db else None
+        # Одновременные аудиты одного и того же URL выполняются один раз
+        self.inflight_audits: SingleFlight[AuditRun] = SingleFlight()
+
+        # Конвейер аудита и его метрики (/metrics)
+        self.metrics = PipelineMetrics()
+        self.cpu_executor = CPUExecutor.from_env()
+        # robots.txt и sitemap загружаются параллельно со страницей и кэшируются по домену
+        self.site_files = SiteFilesCollector.from_env() if settings.site_files else None
+        # Вес страницы: скрипты, стили, изображения и шрифты проверяются HEAD-запросами,
+        # результаты кэшируются по URL файла
+        self.page_weight = PageWeightCollector.from_env() if settings.page_weight else None
+        # Отпечатки проверенных страниц: поиск почти-дубликатов и повторное использование рекомендаций ИИ
+        self.similarity = SimilarityIndex.from_env(settings.similarity_db) if settings.similarity else None
+        self.pipeline = AuditPipeline.default(
+            self.metrics,
+            self.cpu_executor,
+            stream_parse=settings.stream_parse,
+            site_files=self.site_files,
+            similarity=self.similarity,
+            page_weight=self.page_weight,
+        )
+        # Обход сайта: те же этапы, но без ИИ; от текста страниц остаются только хэш и начальный фрагмент
+        self.crawl_pipeline = AuditPipeline.default(
+            self.metrics,
+            self.cpu_executor,
+            stream_parse=settings.stream_parse,
+            site_files=self.site_files,
+            ai=False,
+            keep_text=False,
+            similarity=self.similarity,
+            page_weight=self.page_weight,
+        )
+        self.cache_events = self.metrics.register(
+            Counter("lp_cache_events_total", "Audit cache lookups by result.", ("event",))
+        )
+        # Мониторинг: периодические проверки URL; полный аудит — только если страница изменилась
+        self.monitor = Monitor(
+            self.pipeline,
+            MonitorConfig.from_env(),
+            store=(
+                SQLiteStore(settings.monitor_db, table="monitor_targets", max_entries=1_000_000)
+                if settings.monitor_db
+                else None
+            ),
+            on_change=self._record_monitor_change,
+        )
+
+    async def start(self) -> None:
+        # Парсер и процессы пула загружаются до первого запроса; остальное — по LP_PRELOAD
+        for name in self.settings.preload:
+            importlib.import_module(PRELOAD_MODULES[name])
+        await self.cpu_executor.warm()
+        if self.similarity is not None:
+            await self.similarity.load()
+        await self.monitor.start()
+
+    async def stop(self) -> None:
+        await self.monitor.stop()
+        await close_session()
+        await close_client()
+        self.cpu_executor.shutdown()
+        if self.audit_cache.store is not None:
+            self.audit_cache.store.close()
+        if self.history is not None:
+            self.history.close()
+        if self.similarity is not None:
+            self.similarity.close()
+
+    def _record_monitor_change(self, target: MonitorTarget, ctx: AuditContext) -> None:
+        if self.history is not None:
+            self.history.record(target.url, audit_response(ctx).model_dump(mode="json"))
+
+    async def audit_url(
+        self, url: str, keywords: list[str] | None = None, on_stage: StageCallback | None = None
+    ) -> AuditRun:
+        """Аудит URL с объединением одновременных запросов.
+
+        Параллельные запросы одного и того же (нормализованного) URL с теми же
+        ключевыми словами — из /audit, /audit/html, /audit/stream или пакетного
+        аудита — ждут один общий конвейер. ``on_stage`` вызывается, только если
+        этот запрос сам запустил конвейер (не взят из кэша и не присоединился к
+        уже идущему аудиту).
+        """
+        keywords = normalize_keywords(keywords or ())
+        return await self.inflight_audits.do(
+            _cache_key(url, keywords), lambda: self._audit_cached(url, keywords, on_stage)
+        )
+
+    async def _audit_cached(self, url: str, keywords: list[str], on_stage: StageCallback | None = None) -> AuditRun:
+        """Аудит URL с учётом кэша.
+
+        Свежая запись возвращается сразу. Устаревшая перепроверяется условным GET:
+        при 304 или неизменившемся хэше тела парсинг, правила и ИИ пропускаются.
+        """
+        audit_cache, pipeline, history = self.audit_cache, self.pipeline, self.history
+        started = time.perf_counter()
+        key = _cache_key(url, keywords)
+        entry = await audit_cache.get(key)
+        if entry is not None and audit_cache.is_fresh(entry):
+            audit_cache.stats.hits += 1
+            self.cache_events.inc("hit")
+            duration = (time.perf_counter() - started) * 1000
+            return AuditRun(AuditResponse.model_validate(entry.payload), f"cache;desc=hit;dur={duration:.1f}")
+
+        ctx = AuditContext(url=url, keywords=tuple(keywords))
+        if entry is None:
+            audit_cache.stats.misses += 1
+            self.cache_events.inc("miss")
+        else:
+            with pipeline.timed(ctx, "fetch"):
+                ctx.fetch = await fetch_html_async(url, etag=entry.etag, last_modified=entry.last_modified)
+            unchanged = ctx.fetch.success and ctx.fetch.content_hash == entry.content_hash
+            if ctx.fetch.not_modified or unchanged:
+                audit_cache.stats.revalidated += 1
+                self.cache_events.inc("revalidated")
+                ctx.cached = True
+                pipeline.finish(ctx)
+                keys = [key] + ([_cache_key(entry.final_url, keywords)] if entry.final_url else [])
+                await audit_cache.touch(keys, entry, ctx.fetch.etag, ctx.fetch.last_modified)
+                if history is not None:
+                    history.record(url, entry.payload)  # страница не изменилась — тот же результат
+                timing = f"{ctx.server_timing()}, cache;desc=revalidated"
+                return AuditRun(AuditResponse.model_validate(entry.payload), timing)
+            audit_cache.stats.refreshed += 1
+            self.cache_events.inc("refreshed")
+
+        ctx = await pipeline.run(url, ctx, on_stage=on_stage)
+        audit = audit_response(ctx)
+        payload = audit.model_dump(mode="json")
+        if history is not None:
+            history.record(url, payload)  # только постановка в очередь записи
+        fetch_result = ctx.fetch
+        # Без рекомендаций из-за сбоя ИИ результат не кэшируется: иначе перепроверка (304 или тот же хэш)
+        # отдавала бы его, пока не изменится сама страница. Следующий запрос повторит аудит целиком.
+        # То же, если robots.txt и sitemap ещё загружаются: следующий аудит возьмёт их из кэша домена.
+        incomplete = ctx.ai_failed or (ctx.site is not None and not ctx.site.complete)
+        if fetch_result.success and not incomplete:
+            keys = [key] + ([_cache_key(fetch_result.final_url, keywords)] if fetch_result.final_url else [])
+            await audit_cache.put(
+                keys,
+                CacheEntry(
+                    payload=payload,
+                    final_url=fetch_result.final_url,
+                    etag=fetch_result.etag,
+                    last_modified=fetch_result.last_modified,
+                    content_hash=fetch_result.content_hash,
+                    stored_at=time.time(),
+                ),
+            )
+        return AuditRun(audit, ctx.server_timing())
+
+
+def _services(request: Request) -> Services:
+    return request.app.state.services
+
+
+ServicesDep = Annotated[Services, Depends(_services)]
+
+router = APIRouter()
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """Приложение с сервисами по настройкам (по умолчанию — из переменных окружения)."""
+    settings = settings or get_settings()
+    services = Services(settings)
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        await services.start()
+        try:
+            yield
+        finally:
+            await services.stop()
+
+    application = FastAPI(
+        title="LP Screening API",
+        description="API для экспресс-аудита посадочных страниц.",
+        version="0.1.0",
+        lifespan=lifespan,
+    )
+    application.state.services = services
+    application.include_router(router)
+    application.mount("/static", StaticFiles(directory=settings.static_dir), name="static")
+    return application
+
 
-app = FastAPI(
-    title="LP Screening API",
-    description="API для экспресс-аудита посадочных страниц.",
-    version="0.1.0",
-)
+def __getattr__(name: str) -> FastAPI:
+    # ``app`` создаётся при первом обращении (uvicorn app.main:app), а не при импорте модуля
+    if name == "app":
+        globals()["app"] = application = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class AuditRequest(BaseModel):
     url: HttpUrl
+    keywords: list[str] = Field([], max_length=20)  # ключевые слова для оценки релевантности текста
 
 
-# -----------------------------
-#   Response Models
-# -----------------------------
+def _split_keywords(keywords: str | None) -> list[str] | None:
+    """Ключевые слова из параметра запроса (через запятую)."""
+    return keywords.split(",") if keywords else None
 
 
-class FetchInfo(BaseModel):
-    success: bool
-    ssl_ok: bool
-    status_code: int | None = None
-    error: str | None = None
+@router.post("/audit", response_model=AuditResponse)
+async def run_audit(request: AuditRequest, response: Response, services: ServicesDep):
+    """
+    Запускает аудит для указанного URL.
+    """
+    run = await services.audit_url(str(request.url), request.keywords)
+    response.headers["Server-Timing"] = run.server_timing
+    return run.audit
+
+
+# -------------------------------------------------
+#   Batch audit endpoint
+# -------------------------------------------------
 
 
-class AuditResponse(BaseModel):
-    message: str
-    fetch: FetchInfo
-    parse: "ParseInfo | None" = None
-    rules: list["RuleResponse"] | None = None
-    ai: "AIResponse | None" = None
+class BatchAuditRequest(BaseModel):
+    urls: list[HttpUrl] = Field(..., min_length=1)
+    concurrency: int = Field(10, ge=1, le=100)
+    per_host: int = Field(2, ge=1, le=20)
+    keywords: list[str] = Field([], max_length=20)
+    # ndjson — поток результатов (по умолчанию); csv / parquet — выгрузка плоских строк; html — сводный отчёт
+    format: Literal["ndjson", "csv", "parquet", "html"] = "ndjson"
 
 
-class ParseInfo(BaseModel):
-    title: str | None
-    description_present: bool
-    h1_count: int
-    h2_count: int
-    h3_count: int
-    forms: int
-    rules: list["RuleResponse"] | None = None
+class BatchAuditItem(BaseModel):
+    url: str
+    failed_stage: str | None = None
+    result: AuditResponse | None = None
 
 
-class RuleResponse(BaseModel):
-    name: str
-    status: RuleStatus
-    message: str
+async def _audit_response(services: Services, url: str, keywords: list[str] | None = None) -> AuditResponse:
+    return (await services.audit_url(url, keywords)).audit
 
 
-class AIResponse(BaseModel):
-    readability: str
-    recommendations: list[str]
+def _failed_stage(audit: AuditResponse) -> str | None:
+    """Определяет, на каком шаге конвейера аудит не удался (None — успех)."""
+    if not audit.fetch.success:
+        if audit.fetch.error and audit.fetch.error.startswith("SSL error"):
+            return "ssl"
+        return "fetch"
+    if audit.parse is None:
+        return "parse"
+    if audit.ai is None and ai_enabled():
+        return "ai"
+    return None
 
 
-@app.post("/audit", response_model=AuditResponse)
-async def run_audit(request: AuditRequest):
+@router.post("/audit/batch")
+async def run_batch_audit(request: BatchAuditRequest, services: ServicesDep):
     """
-    Запускает аудит для указанного URL.
+    Запускает аудит списка URL и отдаёт результаты по мере готовности.
+
+    В формате NDJSON (по умолчанию) последняя строка потока содержит статистику
+    пакета: ``{"stats": {...}}``. Форматы ``csv`` и ``parquet`` — выгрузка по строке
+    на URL, ``html`` — сводный отчёт, строки которого появляются по мере готовности.
     """
-    # Шаг 1. Забираем HTML и проверяем SSL
-    fetch_result: FetchResult = fetch_html(request.url)
-
-    fetch_info = FetchInfo(
-        success=fetch_result.success,
-        ssl_ok=fetch_result.ssl_ok,
-        status_code=fetch_result.status_code,
-        error=fetch_result.error,
+    from app.reports.export import MEDIA_TYPES, export_stream, parquet_available
+
+    if request.format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Для выгрузки в Parquet установите pyarrow.")
+    stats = BatchStats()
+    outcomes = run_batch(
+        (str(u) for u in request.urls),
+        lambda url: _audit_response(services, url, request.keywords),
+        _failed_stage,
+        concurrency=request.concurrency,
+        per_host=request.per_host,
+        stats=stats,
     )
 
-    parse_info: ParseInfo | None = None
-    if fetch_result.success and fetch_result.html:
-        parsed: ParsedPage = parse_html(fetch_result.html, request.url)
-        parse_info = ParseInfo(
-            title=parsed.title,
-            description_present=bool(parsed.meta_description),
-            h1_count=len(parsed.headings.get(1, [])),
-            h2_count=len(parsed.headings.get(2, [])),
-            h3_count=len(parsed.headings.get(3, [])),
-            forms=parsed.forms_count,
+    async def items():
+        async for outcome in outcomes:
+            yield outcome.url, outcome.result, outcome.failed_stage
+
+    if request.format == "html":
+        from app.reports.renderer import stream_summary
+
+        return StreamingResponse(stream_summary(items()), media_type="text/html; charset=utf-8")
+    if request.format in ("csv", "parquet"):
+        return StreamingResponse(
+            export_stream(request.format, items()),
+            media_type=MEDIA_TYPES[request.format],
+            headers={"Content-Disposition": f'attachment; filename="audit.{request.format}"'},
         )
 
-    rules_resp: list[RuleResponse] | None = None
-    if parse_info and fetch_result.success:
-        rule_results: list[RuleResult] = evaluate_basic(parsed, fetch_result)
-        rules_resp = [RuleResponse(name=r.name, status=r.status, message=r.message) for r in rule_results]
-
-    ai_resp: AIResponse | None = None
-    if parse_info and fetch_result.success:
-        ai_result: AIResult | None = analyze_with_gpt(parsed)
-        if ai_result:
-            ai_resp = AIResponse(
-                readability=ai_result.readability,
-                recommendations=ai_result.recommendations,
-            )
+    async def stream():
+        async for outcome in outcomes:
+            item = BatchAuditItem(url=outcome.url, failed_stage=outcome.failed_stage, result=outcome.result)
+            yield item.model_dump_json() + "\n"
+        yield json.dumps({"stats": stats.as_dict()}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# -------------------------------------------------
+#   Site crawl endpoint
+# -------------------------------------------------
+
+
+class CrawlRequest(BaseModel):
+    url: HttpUrl
+    max_pages: int = Field(100, ge=1, le=10_000)
+    max_depth: int = Field(3, ge=0, le=10)
+    concurrency: int = Field(10, ge=1, le=50)
+    per_host: int = Field(4, ge=1, le=20)
+    respect_robots: bool = True
+    delay: float | None = Field(None, ge=0, le=60)  # пауза между запросами, с; None — Crawl-delay из robots.txt
+
 
-    return AuditResponse(
-        message="Аудит выполнен.",
-        fetch=fetch_info,
-        parse=parse_info,
-        rules=rules_resp,
-        ai=ai_resp,
+@router.post("/crawl")
+async def run_crawl(request: CrawlRequest, services: ServicesDep):
+    """
+    Обходит внутренние ссылки сайта (в ширину) и проверяет каждую страницу базовыми правилами.
+
+    Результаты по страницам отдаются в формате NDJSON по мере готовности; последняя
+    строка содержит сводку по сайту: ``{"summary": {...}}``.
+    """
+    config = CrawlConfig(
+        max_pages=request.max_pages,
+        max_depth=request.max_depth,
+        concurrency=request.concurrency,
+        per_host=request.per_host,
+        respect_robots=request.respect_robots,
+        delay=request.delay,
     )
+    crawler = SiteCrawler(services.crawl_pipeline, services.site_files, config)
+    summary = CrawlSummary()
+
+    async def stream():
+        async for page in crawler.crawl(str(request.url), summary):
+            yield json.dumps(page.as_dict(), ensure_ascii=False) + "\n"
+        yield json.dumps({"summary": summary.as_dict()}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# -------------------------------------------------
+#   Streaming audit endpoint (Server-Sent Events)
+# -------------------------------------------------
+
+# Разделы ответа, готовые после каждого этапа конвейера
+_STAGE_SECTIONS = {
+    "fetch": {"fetch"},
+    "parse": {"parse"},
+    "weight": {"weight"},
+    "text": {"text"},
+    "rules": {"rules"},
+    "ai": {"ai"},
+}
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
 
-# Serve UI
 
+@router.get("/audit/stream")
+async def audit_stream(services: ServicesDep, url: HttpUrl, keywords: str | None = None):
+    """
+    Запускает аудит и отдаёт результаты по мере готовности (Server-Sent Events).
 
-@app.get("/", response_class=HTMLResponse)
-def read_root():
-    return FileResponse("app/static/index.html")
+    После каждого этапа приходит событие с готовыми разделами ответа: ``fetch``,
+    ``parse``, ``weight``, ``text``, ``rules``, ``ai`` — так загрузка и правила видны, не
+    дожидаясь ИИ. Последнее событие ``done`` содержит полный ответ, как у /audit,
+    и Server-Timing; если результат взят из кэша или аудит этого URL уже шёл,
+    приходит только оно. При ошибке последним приходит событие ``failed``.
+    """
+    events: asyncio.Queue[tuple[str, str] | None] = asyncio.Queue()
+
+    def on_stage(name: str, ctx: AuditContext) -> None:
+        sections = _STAGE_SECTIONS.get(name)
+        if name == "fetch" and ctx.parsed is not None:
+            sections = {"fetch", "parse"}  # при потоковом разборе страница разбирается во время загрузки
+        if sections and ctx.fetch is not None:
+            events.put_nowait((name, audit_response(ctx).model_dump_json(include=sections)))
+
+    async def stream():
+        # Аудит не отменяется при отключении клиента: результат всё равно попадёт в кэш
+        task = asyncio.ensure_future(services.audit_url(str(url), _split_keywords(keywords), on_stage))
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        while (event := await events.get()) is not None:
+            yield _sse(*event)
+        try:
+            run = task.result()
+        except Exception as exc:
+            yield _sse("failed", json.dumps({"error": str(exc)}, ensure_ascii=False))
+            return
+        done = {"audit": run.audit.model_dump(mode="json"), "server_timing": run.server_timing}
+        yield _sse("done", json.dumps(done, ensure_ascii=False))
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # -------------------------------------------------
-#   HTML report endpoint
+#   Audit history endpoints
 # -------------------------------------------------
 
 
-@app.get("/audit/html", response_class=HTMLResponse)
-async def audit_html(url: HttpUrl):
-    """Возвращает HTML-отчёт для заданного URL."""
-    # Повторяем те же шаги, что и в /audit
-    fetch_result: FetchResult = fetch_html(str(url))
+def _history(services: Services) -> HistoryStore:
+    history = services.history
+    if history is None:
+        raise HTTPException(status_code=404, detail="История аудитов отключена (задайте LP_HISTORY_DB).")
+    return history
+
+
+def _url_or_domain(url: HttpUrl | None, domain: str | None) -> dict:
+    if (url is None) == (domain is None):
+        raise HTTPException(status_code=422, detail="Укажите ровно один из параметров: url или domain.")
+    return {"url": str(url)} if url is not None else {"domain": domain}
+
+
+@router.get("/history")
+async def history_runs(
+    services: ServicesDep, url: HttpUrl, limit: int = Query(20, ge=1, le=500), before: float | None = None
+):
+    """Аудиты URL, от новых к старым; ``before`` — время (Unix) для следующей страницы."""
+    return await asyncio.to_thread(_history(services).runs, str(url), limit, before)
+
+
+@router.get("/history/latest")
+async def history_latest(
+    services: ServicesDep,
+    url: HttpUrl | None = None,
+    domain: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Последний аудит URL или каждой страницы домена."""
+    return await asyncio.to_thread(_history(services).latest, limit=limit, offset=offset, **_url_or_domain(url, domain))
+
+
+@router.get("/history/runs/{run_id}")
+async def history_run(run_id: int, services: ServicesDep):
+    """Сохранённый аудит целиком."""
+    run = await asyncio.to_thread(_history(services).get, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Аудит не найден.")
+    return run
+
+
+@router.get("/history/trend")
+async def history_trend(
+    services: ServicesDep,
+    url: HttpUrl | None = None,
+    domain: str | None = None,
+    since: float | None = None,
+    until: float | None = None,
+    bucket: float = Query(86400, gt=0),
+):
+    """Число OK / WARNING / ERROR по каждому правилу в интервалах ``bucket`` секунд."""
+    return await asyncio.to_thread(
+        _history(services).trend, since=since, until=until, bucket=bucket, **_url_or_domain(url, domain)
+    )
+
 
-    parsed: ParsedPage | None = None
-    if fetch_result.success and fetch_result.html:
-        parsed = parse_html(fetch_result.html, str(url))
+@router.get("/history/diff")
+async def history_diff(services: ServicesDep, a: int | None = None, b: int | None = None, url: HttpUrl | None = None):
+    """Различия между аудитами ``a`` и ``b`` по полям; с ``url`` — между двумя последними аудитами URL."""
+    store = _history(services)
+    if url is not None:
+        runs = await asyncio.to_thread(store.runs, str(url), 2)
+        if len(runs) < 2:
+            raise HTTPException(status_code=404, detail="Для сравнения нужно хотя бы два аудита URL.")
+        b, a = runs[0]["id"], runs[1]["id"]
+    if a is None or b is None:
+        raise HTTPException(status_code=422, detail="Укажите a и b или url.")
+    diff = await asyncio.to_thread(store.diff, a, b)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Аудит не найден.")
+    return diff
 
-    rule_results: list[RuleResult] | None = None
-    if parsed:
-        rule_results = evaluate_basic(parsed, fetch_result)
 
-    ai_result: AIResult | None = None
-    if parsed:
-        ai_result = analyze_with_gpt(parsed)
+@router.get("/history/stats")
+async def history_stats(services: ServicesDep):
+    """Число сохранённых аудитов и URL, состояние очереди записи."""
+    return await asyncio.to_thread(_history(services).stats)
 
-    # Build dataclass instances we already defined for renderer.
-    fetch_info = FetchInfo(
-        success=fetch_result.success,
-        ssl_ok=fetch_result.ssl_ok,
-        status_code=fetch_result.status_code,
-        error=fetch_result.error,
+
+# -------------------------------------------------
+#   Monitoring endpoints
+# -------------------------------------------------
+
+
+class MonitorTargetsRequest(BaseModel):
+    urls: list[HttpUrl] = Field(..., min_length=1, max_length=100_000)
+    interval: float | None = Field(
+        None, gt=0, description="Интервал проверки, секунды (от LP_MONITOR_MIN_INTERVAL до LP_MONITOR_MAX_INTERVAL)"
     )
 
-    parse_info: ParseInfo | None = None
-    if parsed:
-        parse_info = ParseInfo(
-            title=parsed.title,
-            description_present=bool(parsed.meta_description),
-            h1_count=len(parsed.headings.get(1, [])),
-            h2_count=len(parsed.headings.get(2, [])),
-            h3_count=len(parsed.headings.get(3, [])),
-            forms=parsed.forms_count,
-        )
 
-    ai_resp: AIResponse | None = None
-    if ai_result:
-        ai_resp = AIResponse(
-            readability=ai_result.readability,
-            recommendations=ai_result.recommendations,
-        )
+@router.post("/monitor/targets")
+async def monitor_add(req: MonitorTargetsRequest, services: ServicesDep):
+    """Поставить URL на мониторинг (для уже добавленных — изменить интервал)."""
+    monitor = services.monitor
+    config = monitor.config
+    try:
+        added = await monitor.add([str(url) for url in req.urls], req.interval)
+    except ValueError:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Интервал проверки должен быть от {config.min_interval:g} до {config.max_interval:g} с.",
+        ) from None
+    return {"added": added, "targets": len(monitor)}
+
+
+@router.delete("/monitor/targets")
+async def monitor_remove(url: HttpUrl, services: ServicesDep):
+    """Снять URL с мониторинга."""
+    monitor = services.monitor
+    if not await monitor.remove(str(url)):
+        raise HTTPException(status_code=404, detail="URL не отслеживается.")
+    return {"targets": len(monitor)}
+
+
+@router.get("/monitor/targets")
+async def monitor_targets(
+    services: ServicesDep,
+    url: HttpUrl | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Отслеживаемые URL: расписание, последняя проверка, статусы правил."""
+    monitor = services.monitor
+    if url is not None:
+        target = monitor.get(str(url))
+        if target is None:
+            raise HTTPException(status_code=404, detail="URL не отслеживается.")
+        return monitor.describe(target)
+    return [monitor.describe(target) for target in monitor.targets(limit, offset)]
+
+
+@router.get("/monitor/alerts")
+async def monitor_alerts(services: ServicesDep, limit: int = Query(100, ge=1, le=1000)):
+    """Последние ухудшения правил (OK → WARNING/ERROR, WARNING → ERROR), от новых к старым."""
+    return [alert.as_dict() for alert in list(services.monitor.alerts)[::-1][:limit]]
+
+
+@router.get("/monitor/stats")
+async def monitor_stats(services: ServicesDep):
+    """Число отслеживаемых URL, просроченных проверок и счётчики проверок."""
+    monitor = services.monitor
+    return {"targets": len(monitor), "backlog": monitor.backlog(), **monitor.stats}
+
+
+# -------------------------------------------------
+#   Near-duplicate endpoints
+# -------------------------------------------------
+
 
-    html = render_report(
-        url=str(url),
-        fetch=fetch_info,
-        parse=parse_info,
-        rules=rule_results,
-        ai=ai_resp,
+def _similarity(services: Services) -> SimilarityIndex:
+    similarity = services.similarity
+    if similarity is None:
+        raise HTTPException(status_code=404, detail="Поиск почти-дубликатов отключён (LP_SIMILARITY=0).")
+    return similarity
+
+
+@router.get("/similarity/near")
+async def similarity_near(services: ServicesDep, url: HttpUrl, limit: int = Query(10, ge=1, le=100)):
+    """Проверенные страницы с почти тем же содержимым, что и у URL, от ближайших."""
+    index = _similarity(services)
+    page = index.get(str(url))
+    if page is None:
+        raise HTTPException(status_code=404, detail="URL не проверялся или слишком короткий для сравнения.")
+    return [
+        {"url": match.url, "distance": match.distance}
+        for match in index.near(page.simhash, exclude=page.url, limit=limit)
+    ]
+
+
+@router.get("/similarity/clusters")
+async def similarity_clusters(
+    services: ServicesDep,
+    domain: str,
+    min_size: int = Query(2, ge=2),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Группы почти одинаковых страниц домена, от самых больших."""
+    clusters = await asyncio.to_thread(_similarity(services).clusters, domain, min_size)
+    return {
+        "domain": domain.lower(),
+        "clusters": len(clusters),
+        "duplicate_pages": sum(len(cluster) - 1 for cluster in clusters),
+        "items": [
+            {
+                "size": len(cluster),
+                "urls": [page.url for page in cluster],
+                "ai_analyzed": [page.url for page in cluster if page.ai is not None],
+            }
+            for cluster in clusters[:limit]
+        ],
+    }
+
+
+@router.get("/similarity/stats")
+async def similarity_stats(services: ServicesDep):
+    """Число страниц в индексе и счётчики поиска почти-дубликатов."""
+    index = _similarity(services)
+    return {"pages": len(index), "max_distance": index.max_distance, **index.stats.as_dict()}
+
+
+# Serve UI (static files are mounted in create_app)
+
+
+@router.get("/", response_class=HTMLResponse)
+def read_root(services: ServicesDep):
+    return FileResponse(f"{services.settings.static_dir}/index.html")
+
+
+# -------------------------------------------------
+#   HTML report endpoint
+# -------------------------------------------------
+
+
+@router.get("/audit/html", response_class=HTMLResponse)
+async def audit_html(services: ServicesDep, url: HttpUrl, keywords: str | None = None):
+    """Возвращает HTML-отчёт для заданного URL (ключевые слова — через запятую)."""
+    from app.reports.renderer import stream_report
+
+    # Тот же конвейер (и кэш), что и в /audit
+    run = await services.audit_url(str(url), _split_keywords(keywords))
+    audit = run.audit
+
+    def render():
+        # Отчёт отдаётся по частям по мере рендеринга; время рендеринга попадает только в /metrics.
+        # Части рендерятся в разных потоках пула, поэтому время считается для каждой части отдельно.
+        parts = stream_report(
+            url=str(url),
+            fetch=audit.fetch,
+            parse=audit.parse,
+            rules=audit.rules,
+            text=audit.text,
+            ai=audit.ai,
+        )
+        wall = cpu = 0.0
+        while True:
+            wall0, cpu0 = time.perf_counter(), time.thread_time()
+            part = next(parts, None)
+            wall += time.perf_counter() - wall0
+            cpu += time.thread_time() - cpu0
+            if part is None:
+                break
+            yield part
+        services.metrics.stage_seconds.observe(wall, "render", "success")
+        services.metrics.stage_cpu_seconds.observe(cpu, "render", "success")
+
+    return StreamingResponse(
+        render(), media_type="text/html; charset=utf-8", headers={"Server-Timing": run.server_timing}
     )
 
-    return HTMLResponse(content=html) 
\ No newline at end of file
+
+@router.get("/cache/stats")
+async def cache_stats(services: ServicesDep):
+    """Счётчики кэша аудитов (hit/miss/revalidate) для подбора TTL."""
+    audit_cache, inflight_audits = services.audit_cache, services.inflight_audits
+    site_files, page_weight = services.site_files, services.page_weight
+    return {
+        "entries": len(audit_cache),
+        "ttl": audit_cache.ttl,
+        **audit_cache.stats.as_dict(),
+        "inflight": len(inflight_audits),
+        "coalesced": inflight_audits.coalesced,
+        "site_files_domains": len(site_files) if site_files is not None else 0,
+        "page_weight_assets": len(page_weight) if page_weight is not None else 0,
+        "page_weight_hits": page_weight.hits if page_weight is not None else 0,
+        "page_weight_misses": page_weight.misses if page_weight is not None else 0,
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(services: ServicesDep):
+    """Метрики конвейера в текстовом формате Prometheus."""
+    return PlainTextResponse(services.metrics.render(), media_type="text/plain; version=0.0.4")
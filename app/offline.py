@@ -0,0 +1,347 @@
+"""Offline bulk audit of stored pages for LP Screening.
+
+Audits HTML pages from directories, tarballs and WARC archives (see
+:mod:`app.collectors.archives`) without fetching them again. Pages are sent
+to a process pool in chunks; every worker parses its chunk, evaluates the
+basic rules and scores the text for the whole chunk at once and encodes the
+output rows itself, so the main process only reads input and writes bytes.
+With ``--ai`` the AI recommendations are requested from the main process.
+
+Results are written as JSONL (full audits, the shape of ``/audit/batch``) or
+CSV (flat rows, see :mod:`app.reports.export`), in input order with
+``--ordered`` or as chunks finish otherwise. A checkpoint next to the output
+records which chunks are written and the output size at that point;
+``--resume`` cuts the output back to that size and skips those chunks, so an
+interrupted run continues without duplicated or lost rows. The inputs are
+read again on resume, but skipped chunks are not parsed.
+
+Usage::
+
+    python -m app.offline crawl.warc.gz dumps/ --output audit.jsonl --workers 8
+    python -m app.offline site.tar.gz --base-url https://example.com --output audit.csv --resume
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from typing import Iterator, Optional
+
+from app.ai.gpt_client import ai_enabled, close_client, get_client
+from app.analyzers.basic import RuleStatus
+from app.analyzers.text import analyze_texts, normalize_keywords
+from app.analyzers.vectorized import evaluate_batch
+from app.collectors.archives import ArchiveRecord, ReaderStats, iter_records
+from app.collectors.charset import detect_encoding
+from app.collectors.http_fetcher import FetchResult
+from app.parsers.html_parser import TEXT_EXCERPT_CHARS, ParsedPage, parse_html
+from app.pipeline.core import AuditContext
+from app.reports.export import CSVExporter, JSONLExporter
+from app.schemas import AIResponse, AuditResponse, audit_response
+
+FORMATS = ("jsonl", "csv")
+
+
+@dataclass
+class _ChunkResult:
+    index: int
+    data: bytes  # encoded rows; empty when the AI stage still has to run
+    pages: int
+    failed: int
+    statuses: dict[str, Counter]  # rule -> status -> pages
+    # With AI: (url, audit, page for the prompt, failed_stage) per record, encoded in the main process.
+    pending: list[tuple[str, Optional[AuditResponse], Optional[ParsedPage], Optional[str]]] = field(default_factory=list)
+
+
+def _exporter(fmt: str, out: io.BytesIO):
+    return JSONLExporter(out) if fmt == "jsonl" else CSVExporter(out, header=False)
+
+
+def _audit_chunk(index: int, records: list[ArchiveRecord], fmt: str, keywords: tuple[str, ...], ai: bool) -> _ChunkResult:
+    """Parse, check and encode one chunk (runs in a worker process)."""
+    audits: list[tuple[str, Optional[AuditContext], Optional[str]]] = []
+    for record in records:
+        try:
+            encoding, source = detect_encoding(record.content_type, record.content)
+            fetch = FetchResult(
+                content=record.content,
+                status_code=record.status_code,
+                final_url=record.url,
+                ssl_ok=record.url.startswith("https://"),
+                bytes_read=len(record.content),
+                truncated=record.truncated,
+                encoding=encoding,
+                encoding_source=source,
+            )
+            ctx = AuditContext(url=record.url, keywords=keywords, fetch=fetch)
+            ctx.parsed = parse_html(record.content, record.url, encoding=encoding, keep_text=True)
+            audits.append((record.url, ctx, None))
+        except Exception:  # noqa: BLE001 - one broken page must not stop the run
+            audits.append((record.url, None, "parse"))
+
+    parsed = [ctx for _, ctx, _ in audits if ctx is not None]
+    for ctx, rules in zip(parsed, evaluate_batch([(ctx.parsed, ctx.fetch, None) for ctx in parsed])):
+        ctx.rules = rules
+    for ctx, scores in zip(parsed, analyze_texts([ctx.parsed for ctx in parsed], keywords)):
+        ctx.text = scores
+
+    statuses: dict[str, Counter] = defaultdict(Counter)
+    for ctx in parsed:
+        for rule in ctx.rules:
+            statuses[rule.name][rule.status.value] += 1
+    result = _ChunkResult(index, b"", len(records), len(records) - len(parsed), dict(statuses))
+    if ai:
+        for url, ctx, failed_stage in audits:
+            if ctx is None:
+                result.pending.append((url, None, None, failed_stage))
+                continue
+            # The prompt needs no more than an excerpt of the text.
+            page = replace(
+                ctx.parsed,
+                text_content=ctx.parsed.text_content[:TEXT_EXCERPT_CHARS],
+                text_truncated=True,
+                internal_links=[],
+            )
+            result.pending.append((url, audit_response(ctx), page, None))
+        return result
+
+    out = io.BytesIO()
+    exporter = _exporter(fmt, out)
+    for url, ctx, failed_stage in audits:
+        exporter.write(url, audit_response(ctx) if ctx is not None else None, failed_stage)
+    exporter.close()
+    result.data = out.getvalue()
+    return result
+
+
+@dataclass
+class Checkpoint:
+    """Progress of a run, saved next to the output."""
+
+    inputs: list[str]
+    format: str
+    chunk_size: int
+    limit: int = 0  # part of the chunk layout: the last chunk ends at the limit
+    written_below: int = 0  # every chunk with a lower index is written
+    written: list[int] = field(default_factory=list)  # chunks at or above written_below that are written
+    output_bytes: int = 0
+    pages: int = 0
+    failed: int = 0
+    statuses: dict[str, dict[str, int]] = field(default_factory=dict)
+    finished: bool = False
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def is_written(self, index: int) -> bool:
+        return index < self.written_below or index in self._written_set
+
+    def mark_written(self, result: _ChunkResult, output_bytes: int) -> None:
+        self._written_set.add(result.index)
+        while self.written_below in self._written_set:
+            self._written_set.discard(self.written_below)
+            self.written_below += 1
+        self.written = sorted(self._written_set)
+        self.output_bytes = output_bytes
+        self.pages += result.pages
+        self.failed += result.failed
+        for rule, counts in result.statuses.items():
+            totals = self.statuses.setdefault(rule, {})
+            for status, count in counts.items():
+                totals[status] = totals.get(status, 0) + count
+
+    def __post_init__(self) -> None:
+        self._written_set = set(self.written)
+
+
+def _chunks(records: Iterator[ArchiveRecord], size: int) -> Iterator[tuple[int, list[ArchiveRecord]]]:
+    for index in itertools.count():
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield index, chunk
+
+
+async def _add_ai(result: _ChunkResult, fmt: str) -> None:
+    """Request AI recommendations for a chunk's pages and encode its rows."""
+    pages = [page for _, _, page, _ in result.pending if page is not None]
+    answers = iter(await get_client().analyze_many(pages))
+    out = io.BytesIO()
+    exporter = _exporter(fmt, out)
+    for url, audit, page, failed_stage in result.pending:
+        if page is not None:
+            ai = next(answers)
+            if ai is not None:
+                audit.ai = AIResponse(readability=ai.readability, recommendations=ai.recommendations)
+            else:
+                failed_stage = "ai"
+        exporter.write(url, audit, failed_stage)
+    exporter.close()
+    result.data = out.getvalue()
+    result.pending = []
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint.json"
+    checkpoint = Checkpoint.load(checkpoint_path) if args.resume else None
+    if checkpoint is not None and (
+        checkpoint.inputs != args.inputs
+        or checkpoint.format != fmt
+        or checkpoint.chunk_size != args.chunk_size
+        or checkpoint.limit != args.limit
+    ):
+        raise SystemExit(f"{checkpoint_path} belongs to a run with other inputs, format, chunk size or limit")
+    if checkpoint is None:
+        checkpoint = Checkpoint(inputs=list(args.inputs), format=fmt, chunk_size=args.chunk_size, limit=args.limit)
+    resumed_pages = checkpoint.pages
+
+    out = open(args.output, "r+b" if checkpoint.output_bytes else "wb")
+    out.truncate(checkpoint.output_bytes)  # drop rows written after the last checkpoint
+    out.seek(checkpoint.output_bytes)
+    if fmt == "csv" and not checkpoint.output_bytes:
+        header = io.BytesIO()
+        CSVExporter(header).close()
+        out.write(header.getvalue())
+
+    def save() -> None:
+        out.flush()
+        os.fsync(out.fileno())
+        checkpoint.save(checkpoint_path)
+
+    workers = args.workers or os.cpu_count() or 1
+    keywords = tuple(normalize_keywords(args.keywords.split(","))) if args.keywords else ()
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    reader_stats = ReaderStats()
+    records = iter_records(args.inputs, base_url=args.base_url, stats=reader_stats)
+    if args.limit:
+        records = itertools.islice(records, args.limit)
+    chunks = _chunks(records, args.chunk_size)
+    window = asyncio.Semaphore(workers * 2)  # chunks read, in the pool, or waiting to be written
+    done: dict[int, _ChunkResult] = {}
+    written = asyncio.Event()
+    order: list[int] = []  # chunk indexes in submission order (for --ordered)
+    started = time.perf_counter()
+    last_save = time.monotonic()
+
+    def write(result: _ChunkResult) -> None:
+        nonlocal last_save
+        out.write(result.data)
+        checkpoint.mark_written(result, out.tell())
+        window.release()
+        if time.monotonic() - last_save >= args.checkpoint_every:
+            save()
+            last_save = time.monotonic()
+        if not args.quiet:
+            pages = checkpoint.pages - resumed_pages
+            rate = pages / (time.perf_counter() - started)
+            print(f"\r{checkpoint.pages:,} pages, {rate:,.0f} pages/s", end="", file=sys.stderr)
+
+    def flush_ordered() -> None:
+        while order and order[0] in done:
+            write(done.pop(order.pop(0)))
+
+    async def process(index: int, chunk: list[ArchiveRecord]) -> None:
+        result = await loop.run_in_executor(pool, _audit_chunk, index, chunk, fmt, keywords, args.ai)
+        if args.ai:
+            await _add_ai(result, fmt)
+        if args.ordered:
+            done[index] = result
+            flush_ordered()
+        else:
+            write(result)
+        written.set()
+
+    tasks: set[asyncio.Task] = set()
+    try:
+        while True:
+            await window.acquire()
+            item = await asyncio.to_thread(next, chunks, None)
+            if item is None:
+                window.release()
+                break
+            index, chunk = item
+            if checkpoint.is_written(index):
+                window.release()
+                continue
+            order.append(index)
+            task = asyncio.ensure_future(process(index, chunk))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        checkpoint.finished = True
+    finally:
+        for task in tasks:
+            task.cancel()
+        save()
+        out.close()
+        pool.shutdown(cancel_futures=True)
+        if args.ai:
+            await close_client()
+        if not args.quiet:
+            print(file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    pages = checkpoint.pages - resumed_pages
+    return {
+        "pages": checkpoint.pages,
+        "failed": checkpoint.failed,
+        "resumed_from": resumed_pages,
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(pages / elapsed, 1) if elapsed > 0 else 0.0,
+        "input": reader_stats.as_dict(),
+        "rules": {
+            rule: {status: counts.get(status, 0) for status in (s.value for s in RuleStatus)}
+            for rule, counts in checkpoint.statuses.items()
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Audit stored pages (HTML dumps, tarballs, WARC) without fetching them.")
+    parser.add_argument("inputs", nargs="+", help="directories, tarballs, WARC files (.warc, .warc.gz) or HTML files")
+    parser.add_argument("--output", required=True, help="JSONL or CSV file with one row per page")
+    parser.add_argument("--format", choices=FORMATS, help="output format (default: from the output file name)")
+    parser.add_argument("--base-url", help="URL prefix for pages read from directories and tarballs")
+    parser.add_argument("--keywords", help="comma-separated keywords for the relevance score")
+    parser.add_argument("--ai", action="store_true", help="also request AI recommendations (needs OPENAI_API_KEY)")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="pages per worker job")
+    parser.add_argument("--ordered", action="store_true", help="write rows in input order")
+    parser.add_argument("--limit", type=int, default=0, help="audit at most this many pages")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from its checkpoint")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument("--checkpoint-every", type=float, default=10.0, help="seconds between checkpoints")
+    parser.add_argument("--quiet", action="store_true", help="do not print progress")
+    args = parser.parse_args(argv)
+    if args.ai and not ai_enabled():
+        parser.error("--ai needs OPENAI_API_KEY")
+
+    summary = asyncio.run(_run(args))
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Technology fingerprinting for LP Screening.
+
+Detects analytics counters, tag managers, CRMs, chat widgets, A/B testing tools,
+ad pixels and consent managers by scanning the raw HTML once.
+
+Signatures are case-insensitive literal substrings loaded from a JSON database
+(``data/fingerprints.json`` next to this module, or ``LP_FINGERPRINTS_PATH``)::
+
+    {"version": 1, "technologies": [
+        {"name": "Hotjar", "category": "analytics", "patterns": ["static.hotjar.com"]}
+    ]}
+
+All patterns are compiled into one regular expression factored as a trie, so
+at every position of the page the matcher follows a single branch of the trie
+instead of trying each signature in turn: scan cost grows with page size, not
+with the number of signatures. Patterns contained in a longer matched pattern
+are reported as well (the role of Aho-Corasick output links).
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+__all__ = ["ANALYTICS_CATEGORIES", "Signature", "Detection", "FingerprintDB", "FingerprintScanner", "default_db", "detect_technologies"]
+
+_DEFAULT_PATH = Path(__file__).parent / "data" / "fingerprints.json"
+
+# Categories counted as analytics by the "Аналитика" rule.
+ANALYTICS_CATEGORIES = frozenset({"analytics", "tag-manager"})
+
+# Characters of context kept around a match as evidence.
+_SNIPPET_RADIUS = 40
+
+
+@dataclass(frozen=True)
+class Signature:
+    name: str  # technology name
+    category: str
+    pattern: str  # lower-case literal
+
+
+@dataclass(frozen=True)
+class Detection:
+    """A detected technology and where in the document it was first seen."""
+
+    name: str
+    category: str
+    pattern: str  # signature that matched
+    offset: int  # character offset of the match in the decoded document
+    snippet: str  # surrounding text
+
+
+def _trie_regex(patterns: Iterable[str]) -> str:
+    """Build a regex matching any of ``patterns``, preferring the longest match."""
+    trie: dict = {}
+    for pattern in patterns:
+        node = trie
+        for ch in pattern:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node: dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            return "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+class FingerprintDB:
+    """Compiled signature database."""
+
+    def __init__(self, signatures: Iterable[Signature]) -> None:
+        self.signatures = list(signatures)
+        by_pattern: dict[str, list[Signature]] = {}
+        for sig in self.signatures:
+            by_pattern.setdefault(sig.pattern, []).append(sig)
+        self._by_pattern = by_pattern
+
+        # For every pattern, the signatures of all patterns it contains (itself included)
+        # with their offset inside it, so overlapped shorter signatures are not lost.
+        self._outputs: dict[str, list[tuple[int, Signature]]] = {}
+        for pattern in by_pattern:
+            outputs = []
+            for other, sigs in by_pattern.items():
+                pos = pattern.find(other)
+                if pos != -1:
+                    outputs.extend((pos, sig) for sig in sigs)
+            self._outputs[pattern] = outputs
+
+        self.max_pattern_len = max((len(p) for p in by_pattern), default=0)
+        # Matching lower-cased text case-sensitively is several times faster than
+        # re.IGNORECASE; the latter is kept for text whose length changes when
+        # lower-cased (offsets would drift otherwise).
+        source = _trie_regex(by_pattern)
+        self.regex = re.compile(source) if by_pattern else None
+        self.regex_ci = re.compile(source, re.IGNORECASE) if by_pattern else None
+
+    @classmethod
+    def load(cls, path: str | os.PathLike | None = None) -> "FingerprintDB":
+        with open(path or _DEFAULT_PATH, encoding="utf-8") as fh:
+            data = json.load(fh)
+        return cls(
+            Signature(tech["name"], tech["category"], pattern.lower())
+            for tech in data["technologies"]
+            for pattern in tech["patterns"]
+            if pattern
+        )
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def outputs(self, matched: str) -> list[tuple[int, Signature]]:
+        return self._outputs.get(matched.lower(), [])
+
+    def scanner(self) -> "FingerprintScanner":
+        return FingerprintScanner(self)
+
+
+class FingerprintScanner:
+    """Incremental scanner: feed the document in chunks, then read :meth:`results`.
+
+    The last ``max_pattern_len - 1`` characters of every chunk are carried over
+    so signatures split between chunks are still found; only matches ending in
+    new text are considered, so nothing is scanned twice beyond that overlap.
+    """
+
+    def __init__(self, db: FingerprintDB) -> None:
+        self._db = db
+        self._tail = ""
+        self._offset = 0  # document offset of the start of _tail
+        self._found: dict[str, Detection] = {}
+
+    def feed(self, text: str) -> None:
+        regex = self._db.regex
+        if regex is None or not text:
+            return
+        buf = self._tail + text
+        seen = len(self._tail)
+        lowered = buf.lower()
+        matches = regex.finditer(lowered) if len(lowered) == len(buf) else self._db.regex_ci.finditer(buf)
+        for match in matches:
+            if match.end() <= seen:
+                continue  # already reported while scanning the previous chunk
+            start = match.start()
+            for pos, sig in self._db.outputs(match.group()):
+                if sig.name in self._found:
+                    continue
+                at = start + pos
+                snippet = buf[max(0, at - _SNIPPET_RADIUS) : at + len(sig.pattern) + _SNIPPET_RADIUS]
+                self._found[sig.name] = Detection(
+                    name=sig.name,
+                    category=sig.category,
+                    pattern=sig.pattern,
+                    offset=self._offset + at,
+                    snippet=" ".join(snippet.split()),
+                )
+        keep = max(self._db.max_pattern_len - 1, 0)
+        new_tail = buf[len(buf) - keep :] if keep else ""
+        self._offset += len(buf) - len(new_tail)
+        self._tail = new_tail
+
+    def results(self) -> list[Detection]:
+        """Detections ordered by position of first evidence."""
+        return sorted(self._found.values(), key=lambda d: d.offset)
+
+
+@lru_cache(maxsize=1)
+def default_db() -> FingerprintDB:
+    """Signature database from ``LP_FINGERPRINTS_PATH`` or the bundled file (loaded once per process)."""
+    return FingerprintDB.load(os.getenv("LP_FINGERPRINTS_PATH") or None)
+
+
+def detect_technologies(html: str, db: Optional[FingerprintDB] = None) -> list[Detection]:
+    """Scan a whole document and return the detected technologies."""
+    scanner = (db or default_db()).scanner()
+    scanner.feed(html)
+    return scanner.results()
@@ -1,28 +1,80 @@
 """HTML parsing utilities for LP Screening.
 
 Extracts key information from the landing page HTML for subsequent rule-based analysis.
+
+The page is processed in a single event-driven pass: a backend tokenizer emits
+start/end/data events and :class:`_FeatureCollector` accumulates every
+:class:`ParsedPage` field on the fly, without building a document tree. Two
+backends are available:
+
+* ``"html.parser"`` – the standard library tokenizer (always available, the
+  default). It yields exactly what the BeautifulSoup parser it replaced did,
+  malformed markup included (``tests/test_parser_parity.py``);
+* ``"lxml"`` – libxml2 via lxml's parser-target interface, selected with
+  ``LP_PARSER_BACKEND=lxml``. Faster, and the same on well-formed pages, but
+  libxml2 closes some elements implicitly where ``html.parser`` does not. It is
+  imported when the first page is parsed with it.
+
+Text statistics (word, sentence and character counts, a hash of the visible
+text and its SimHash fingerprint, see :mod:`app.parsers.simhash`) and the files
+the page loads (:class:`Subresource`) are collected during the same pass. Batch and crawl runs that hold many
+pages can drop the text itself (``keep_text=False`` / ``LP_KEEP_TEXT=0``) and
+keep only the hash and a bounded excerpt.
 """
 from __future__ import annotations
 
-from collections import defaultdict
+import codecs
+import hashlib
+import os
+import re
+import sys
 from dataclasses import dataclass, field
+from html.entities import html5
+from html.parser import HTMLParser
 from typing import List, Optional
 from urllib.parse import urlparse
 
-from bs4 import BeautifulSoup
+from app.collectors.charset import SNIFF_BYTES, detect_encoding, normalize_charset, sniff_encoding
+from app.parsers.fingerprints import ANALYTICS_CATEGORIES, Detection, FingerprintScanner, default_db
+from app.parsers.simhash import simhash, simhash_words
+
+__all__ = ["ParsedPage", "Subresource", "PageExtractor", "parse_html", "DEFAULT_BACKEND"]
+
+# lxml is opt-in: on malformed markup it can differ from the previous parser (see above).
+DEFAULT_BACKEND = os.getenv("LP_PARSER_BACKEND", "html.parser")
+
+# Keep the whole visible text in ParsedPage.text_content; with LP_KEEP_TEXT=0 only
+# its hash and the first LP_TEXT_EXCERPT_CHARS characters are kept.
+KEEP_TEXT = os.getenv("LP_KEEP_TEXT", "1").lower() not in ("0", "false", "no")
+TEXT_EXCERPT_CHARS = int(os.getenv("LP_TEXT_EXCERPT_CHARS", "1000"))
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass(slots=True, frozen=True)
+class Subresource:
+    """A file the page loads: a script, stylesheet, image or preloaded font."""
 
-__all__ = ["ParsedPage", "parse_html"]
+    url: str  # as written in the page
+    kind: str  # "script", "stylesheet", "image" or "font"
+    render_blocking: bool = False  # classic script or screen stylesheet in <head>
 
 
-@dataclass
+@dataclass(slots=True)
 class ParsedPage:
-    """Structured representation of the parsed landing page."""
+    """Structured representation of the parsed landing page.
+
+    Counts are computed once by the parser; when a page is built by hand they
+    are derived from ``headings`` / ``text_content`` if not given.
+    """
 
     title: Optional[str]
     meta_description: Optional[str]
     meta_keywords: Optional[str]
 
-    headings: dict[int, list[str]]  # level -> list of texts
+    headings: dict[int, list[str]]  # level -> texts, at most _MAX_HEADINGS per level
     images_total: int
     images_without_alt: int
 
@@ -30,99 +82,567 @@ class ParsedPage:
     external_links: int
     external_nofollow: int
 
+    internal_links: List[str] = field(default_factory=list)  # unique hrefs as written, up to _MAX_INTERNAL_LINKS
+    subresources: List[Subresource] = field(default_factory=list)  # unique URLs, up to _MAX_SUBRESOURCES
+
     analytics: List[str] = field(default_factory=list)
+    technologies: List[Detection] = field(default_factory=list)  # see app.parsers.fingerprints
+
+    text_content: str = ""  # visible text, or only its first characters when text_truncated
+    text_truncated: bool = False
+    text_hash: Optional[str] = None  # blake2b of the full visible text
+    simhash: Optional[int] = None  # 64-bit SimHash of the full visible text and the headings
+
+    heading_counts: Optional[dict[int, int]] = None  # level -> number of headings, including those not kept
+    word_count: Optional[int] = None
+    sentence_count: Optional[int] = None
+    char_count: Optional[int] = None  # length of the full visible text
+
+    def __post_init__(self) -> None:
+        if self.heading_counts is None:
+            self.heading_counts = {level: len(texts) for level, texts in self.headings.items()}
+        if self.word_count is None:
+            self.word_count = len(self.text_content.split())
+        if self.sentence_count is None:
+            self.sentence_count = _count_sentences(self.text_content)
+        if self.char_count is None:
+            self.char_count = len(self.text_content)
+        if self.text_hash is None:
+            self.text_hash = _text_hash(self.text_content)
+        if self.simhash is None:
+            self.simhash = simhash(self.text_content, self.headings)
 
-    text_content: str = ""
 
-    @property
-    def word_count(self) -> int:
-        return len(self.text_content.split())
+# Elements whose content is not part of the visible text.
+_SKIP_TAGS = frozenset({"script", "style", "noscript"})
 
+# Void elements never receive an end tag and are not pushed on the open-element stack.
+_VOID_TAGS = frozenset(
+    {
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+        "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound",
+        "command", "frame", "image", "isindex", "nextid", "spacer",
+    }
+)
 
-# Patterns to detect popular analytics scripts
-_ANALYTICS_PATTERNS: dict[str, str] = {
-    "googletagmanager": "Google Tag Manager",
-    "analytics.js": "Google Analytics",
-    "gtag/js": "Google Analytics (gtag)",
-    "mc.yandex": "Yandex Metrika",
-    "metrika": "Yandex Metrika",
-}
+_HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3}
 
+# Elements of <head>; any other start tag means the body has begun.
+_HEAD_TAGS = frozenset({"html", "head", "title", "base", "meta", "link", "script", "style", "noscript", "template"})
 
-def _detect_analytics(soup: BeautifulSoup) -> List[str]:
-    found: set[str] = set()
-    for script in soup.find_all("script"):
-        src = script.get("src", "").lower()
-        inline_content = script.string or ""
-        for pattern, name in _ANALYTICS_PATTERNS.items():
-            if pattern in src or pattern in inline_content.lower():
-                found.add(name)
-    return sorted(found)
+# Files loaded by <link rel="preload" as="...">, by kind.
+_PRELOAD_KINDS = {"font": "font", "script": "script", "style": "stylesheet", "image": "image"}
 
+# Stylesheets for these media (or without media) block rendering on screen.
+_SCREEN_MEDIA = frozenset({"", "all", "screen"})
 
-def parse_html(html: str, page_url: str | None = None) -> ParsedPage:
-    """Parse HTML and extract structured information."""
-    soup = BeautifulSoup(html, "html.parser")
+# Subresources kept per page (probed by app.collectors.page_weight).
+_MAX_SUBRESOURCES = 300
 
-    # Remove script/style to simplify text extraction
-    for tag in soup(["script", "style", "noscript"]):
-        tag.extract()
+# Internal links kept per page (used by the crawler to discover pages).
+_MAX_INTERNAL_LINKS = 1000
 
-    title_tag = soup.title
-    title = title_tag.string.strip() if title_tag and title_tag.string else None
+# Heading texts kept per level and characters kept per heading (all are counted).
+_MAX_HEADINGS = 20
+_MAX_HEADING_CHARS = 200
 
-    def _meta(name: str) -> Optional[str]:
-        tag = soup.find("meta", attrs={"name": name})
-        if tag and tag.get("content"):
-            return tag["content"].strip()
+# A sentence ends with . ! ? or … followed by whitespace or the end of a text block.
+_SENTENCE_END = ".!?…"
+_SENTENCE_END_RE = re.compile(r"[.!?…](?=\s|$)")  # only the last mark of a run like "?!" matches
+
+
+def _string(children: list) -> str | None:
+    """BeautifulSoup's ``Tag.string``: the text of an element whose only child is a string.
+
+    ``children`` holds merged text as ``str``, comments as 1-tuples and
+    elements as lists of their own children.
+    """
+    if len(children) != 1:
         return None
+    child = children[0]
+    if isinstance(child, list):
+        return _string(child)
+    return child if isinstance(child, str) else child[0]
+
+
+def _count_sentences(text: str) -> int:
+    """Sentence count of one text block; a block without final punctuation counts as one more.
+
+    Landing pages are full of headings, buttons and list items without a full
+    stop; each such block is treated as a sentence.
+    """
+    if not text:
+        return 0
+    count = len(_SENTENCE_END_RE.findall(text))
+    if text[-1] not in _SENTENCE_END:
+        count += 1
+    return count
+
+
+class _FeatureCollector:
+    """Accumulates ParsedPage fields from a stream of tokenizer events.
+
+    Implements lxml's parser-target protocol (``start``/``end``/``data``/``close``)
+    and is driven by :class:`_StdlibTokenizer` for the standard library backend.
+    Technologies come from a :class:`FingerprintScanner` fed with the raw text by
+    :class:`PageExtractor`.
+    """
+
+    def __init__(
+        self,
+        page_url: str | None = None,
+        scanner: FingerprintScanner | None = None,
+        keep_text: bool | None = None,
+        excerpt_chars: int | None = None,
+    ) -> None:
+        self._domain = urlparse(page_url).netloc if page_url else ""
+        self._scanner = scanner
+        self._keep_text = KEEP_TEXT if keep_text is None else keep_text
+        self._excerpt_chars = TEXT_EXCERPT_CHARS if excerpt_chars is None else excerpt_chars
+
+        self._stack: list[str] = []  # open non-void elements
+        self._skip_depth = 0  # >0 while inside script/style/noscript
+        self._pending: list[str] = []  # consecutive character data, merged before stripping
+
+        self._title_path: list[list] | None = None  # children of the open elements of the first <title>
+        self._title: str | None = None
+        self._title_seen = False
+        self._meta: dict[str, str | None] = {}
+
+        # (level, parts) per heading in document order; open ones are also on _open_headings
+        self._headings: list[tuple[int, list[str]]] = []
+        self._open_headings: list[tuple[str, list[str]]] = []
+
+        self._images_total = 0
+        self._images_without_alt = 0
+        self._forms = 0
+        self._external_links = 0
+        self._external_nofollow = 0
+        self._internal_links: dict[str, None] = {}  # insertion-ordered set
+        self._subresources: dict[str, Subresource] = {}  # by URL, in document order
+        self._in_body = False  # a start tag that cannot be in <head> was seen
+        self._text: list[str] = []
+
+    # -- text handling -------------------------------------------------------
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        text = "".join(self._pending).strip()
+        self._pending.clear()
+        if not text:
+            return
+        self._text.append(text)
+        for _, parts in self._open_headings:
+            parts.append(text)
+
+    def data(self, text: str) -> None:
+        if self._title_path is not None:
+            siblings = self._title_path[-1]
+            if siblings and isinstance(siblings[-1], str):
+                siblings[-1] += text
+            else:
+                siblings.append(text)
+        if self._skip_depth:
+            return
+        self._pending.append(text)
+
+    # -- tag handling --------------------------------------------------------
+
+    def start(self, tag: str, attrs: dict) -> None:
+        tag = tag.lower()
+        self._flush()
+
+        if self._title_path is not None:
+            node: list = []
+            self._title_path[-1].append(node)
+            if tag not in _VOID_TAGS:
+                self._title_path.append(node)
+
+        if self._skip_depth:
+            # Content of skipped elements is tracked only to keep the stack balanced.
+            if tag in _SKIP_TAGS:
+                self._skip_depth += 1
+            if tag not in _VOID_TAGS:
+                self._stack.append(tag)
+            return
+
+        if not self._in_body and tag not in _HEAD_TAGS:
+            self._in_body = True
+
+        if tag in _SKIP_TAGS:
+            if tag == "script" and attrs.get("src"):
+                blocking = not (
+                    self._in_body
+                    or "async" in attrs
+                    or "defer" in attrs
+                    or (attrs.get("type") or "").strip().lower() == "module"
+                )
+                self._add_subresource(attrs["src"], "script", blocking)
+            self._skip_depth = 1
+            self._stack.append(tag)
+            return
+
+        if tag == "title" and not self._title_seen:
+            self._title_seen = True
+            self._title_path = [[]]
+        elif tag == "meta":
+            name = attrs.get("name")
+            if name in ("description", "keywords") and name not in self._meta:
+                content = attrs.get("content")
+                self._meta[name] = content.strip() if content else None
+        elif tag in _HEADING_LEVELS:
+            parts: list[str] = []
+            self._headings.append((_HEADING_LEVELS[tag], parts))
+            self._open_headings.append((tag, parts))
+        elif tag == "img":
+            self._images_total += 1
+            if not attrs.get("alt"):
+                self._images_without_alt += 1
+            # Without src the browser picks one srcset candidate; the first stands for it.
+            src = attrs.get("src") or (attrs.get("srcset") or "").split(",")[0].strip().partition(" ")[0]
+            if src:
+                self._add_subresource(src, "image")
+        elif tag == "link":
+            href = attrs.get("href")
+            if href:
+                self._add_link(href, attrs)
+        elif tag == "form":
+            self._forms += 1
+        elif tag == "a":
+            href = attrs.get("href")
+            if href is not None:
+                self._count_link(href, attrs.get("rel") or "")
+
+        if tag not in _VOID_TAGS:
+            self._stack.append(tag)
 
-    meta_description = _meta("description")
-    meta_keywords = _meta("keywords")
+    def end(self, tag: str) -> None:
+        tag = tag.lower()
+        self._flush()
+        if tag in _VOID_TAGS or tag not in self._stack:
+            return  # stray end tag
+        # Close the most recently opened element with this name and everything inside it.
+        while self._stack:
+            closed = self._stack.pop()
+            self._on_close(closed)
+            if closed == tag:
+                break
 
-    headings: dict[int, list[str]] = defaultdict(list)
-    for level in (1, 2, 3):
-        for tag in soup.find_all(f"h{level}"):
-            text = tag.get_text(strip=True)
+    def _on_close(self, tag: str) -> None:
+        if self._title_path is not None:
+            if len(self._title_path) > 1:
+                self._title_path.pop()
+            else:
+                self._finish_title()
+        if self._skip_depth and tag not in _SKIP_TAGS:
+            return  # element opened inside skipped content
+        if tag in _SKIP_TAGS:
+            self._skip_depth -= 1
+        elif tag in _HEADING_LEVELS:
+            for i in range(len(self._open_headings) - 1, -1, -1):
+                if self._open_headings[i][0] == tag:
+                    del self._open_headings[i]
+                    break
+
+    def _add_link(self, href: str, attrs: dict) -> None:
+        rel = (attrs.get("rel") or "").lower().split()
+        if "stylesheet" in rel and "alternate" not in rel:
+            media = (attrs.get("media") or "").strip().lower()
+            blocking = not self._in_body and media in _SCREEN_MEDIA and "disabled" not in attrs
+            self._add_subresource(href, "stylesheet", blocking)
+        elif "modulepreload" in rel:
+            self._add_subresource(href, "script")
+        elif "preload" in rel:
+            kind = _PRELOAD_KINDS.get((attrs.get("as") or "").strip().lower())
+            if kind is not None:
+                self._add_subresource(href, kind)
+
+    def _add_subresource(self, url: str, kind: str, render_blocking: bool = False) -> None:
+        url = url.strip()
+        if (
+            not url
+            or url.startswith("#")
+            or url[:11].lower().startswith(("data:", "blob:", "javascript:"))
+            or url in self._subresources
+            or len(self._subresources) >= _MAX_SUBRESOURCES
+        ):
+            return
+        # Scripts and stylesheets of a site repeat on every page: share the strings.
+        self._subresources[url] = Subresource(sys.intern(url), kind, render_blocking)
+
+    def _count_link(self, href: str, rel: str) -> None:
+        parts = urlparse(href)
+        netloc = parts.netloc
+        if not netloc or (self._domain and netloc.endswith(self._domain)):
+            # relative URL or same domain => internal
+            if (
+                parts.scheme in ("", "http", "https")
+                and not href.startswith("#")
+                and len(self._internal_links) < _MAX_INTERNAL_LINKS
+            ):
+                # Menu and footer links repeat on every page of a site: share the strings.
+                self._internal_links[sys.intern(href.strip())] = None
+            return
+        self._external_links += 1
+        if "nofollow" in rel.lower().split():
+            self._external_nofollow += 1
+
+    # -- result --------------------------------------------------------------
+
+    def _finish_title(self) -> None:
+        # Like the BeautifulSoup parser: None unless the title holds a single string.
+        title = _string(self._title_path[0])
+        self._title = title.strip() if title else None
+        self._title_path = None
+
+    def comment(self, text: str) -> None:
+        self._flush()
+        if self._title_path is not None:
+            self._title_path[-1].append((text,))
+
+    def close(self) -> ParsedPage:
+        self._flush()
+        if self._title_path is not None:  # unterminated <title>
+            self._finish_title()
+
+        headings: dict[int, list[str]] = {}
+        heading_counts: dict[int, int] = {}
+        for level, parts in self._headings:
+            text = "".join(parts)
+            if not text:
+                continue
+            heading_counts[level] = heading_counts.get(level, 0) + 1
+            kept = headings.setdefault(level, [])
+            if len(kept) < _MAX_HEADINGS:
+                # Menus and section titles repeat across the pages of a site: share the strings.
+                kept.append(sys.intern(text[:_MAX_HEADING_CHARS]))
+
+        # Text statistics in one pass over the whole text rather than per text block.
+        text = " ".join(self._text)
+        char_count = len(text)
+        text_hash = _text_hash(text)
+        words = text.split()
+        word_count = len(words)
+        fingerprint = simhash_words(words, headings)
+        # Block ends are followed by the joining space, so the regex counts them as _count_sentences does.
+        unterminated = sum(block[-1] not in _SENTENCE_END for block in self._text)
+        sentence_count = len(_SENTENCE_END_RE.findall(text)) + unterminated
+        truncated = False
+        if not self._keep_text and char_count > self._excerpt_chars:
+            text, truncated = text[: self._excerpt_chars], True
+
+        technologies = self._scanner.results() if self._scanner is not None else []
+        return ParsedPage(
+            title=self._title,
+            meta_description=self._meta.get("description"),
+            meta_keywords=self._meta.get("keywords"),
+            headings=headings,
+            images_total=self._images_total,
+            images_without_alt=self._images_without_alt,
+            forms_count=self._forms,
+            external_links=self._external_links,
+            external_nofollow=self._external_nofollow,
+            internal_links=list(self._internal_links),
+            subresources=list(self._subresources.values()),
+            analytics=sorted({t.name for t in technologies if t.category in ANALYTICS_CATEGORIES}),
+            technologies=technologies,
+            text_content=text,
+            text_truncated=truncated,
+            text_hash=text_hash,
+            simhash=fingerprint,
+            heading_counts=heading_counts,
+            word_count=word_count,
+            sentence_count=sentence_count,
+            char_count=char_count,
+        )
+
+
+_DECIMAL_PREFIX = re.compile(r"([0-9]+)(.*)", re.S)
+_HEX_PREFIX = re.compile(r"([0-9a-fA-F]+)(.*)", re.S)
+
+
+def _numeric_reference(code: int) -> str:
+    """Character of a numeric reference, resolved as in the HTML spec."""
+    if code == 0 or code > 0x10FFFF or 0xD800 <= code <= 0xDFFF:
+        return "\ufffd"
+    if 0x80 <= code <= 0x9F:  # windows-1252 bytes written as references
+        try:
+            return bytes([code]).decode("cp1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(code)
+
+
+class _StdlibTokenizer(HTMLParser):
+    """Feeds standard library tokenizer events into a :class:`_FeatureCollector`."""
+
+    def __init__(self, collector: _FeatureCollector) -> None:
+        # Character references are resolved below, the way the BeautifulSoup tree builder does.
+        super().__init__(convert_charrefs=False)
+        self._collector = collector
+        # Void elements closed implicitly; a later explicit </tag> for them is ignored.
+        self._already_closed: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        self._collector.start(tag, {k: v if v is not None else "" for k, v in attrs})
+        if tag in _VOID_TAGS:
+            self._collector.end(tag)
+            self._already_closed.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._collector.start(tag, {k: v if v is not None else "" for k, v in attrs})
+        self._collector.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._already_closed:
+            self._already_closed.remove(tag)
+            return
+        self._collector.end(tag)
+
+    def handle_data(self, data):
+        self._collector.data(data)
+
+    def handle_entityref(self, name):
+        # An unknown name is kept as written, without its semicolon.
+        self._collector.data(html5.get(name + ";", "&" + name))
+
+    def handle_charref(self, name):
+        digits, base = (name[1:], 16) if name[:1] in "xX" else (name, 10)
+        match = (_HEX_PREFIX if base == 16 else _DECIMAL_PREFIX).match(digits)
+        if match is None:
+            self._collector.data(name)
+            return
+        self._collector.data(_numeric_reference(int(match.group(1), base)) + match.group(2))
+
+    def handle_comment(self, data):
+        self._collector.comment(data)
+
+    def handle_decl(self, decl):
+        self._collector.comment(decl)
+
+    def handle_pi(self, data):
+        self._collector.comment(data)
+
+
+class PageExtractor:
+    """Incremental single-pass extractor.
+
+    Feed the document in one or more chunks and call :meth:`close` to obtain the
+    :class:`ParsedPage`::
+
+        extractor = PageExtractor(page_url)
+        for chunk in chunks:
+            extractor.feed(chunk)
+        parsed = extractor.close()
+
+    Chunks may be ``str`` or raw ``bytes``. Bytes are decoded incrementally, so
+    a multi-byte character split across chunks is handled correctly. When no
+    ``encoding`` is given and the server did not declare one (see
+    :meth:`begin`), the first :data:`~app.collectors.charset.SNIFF_BYTES` are
+    buffered and inspected for a BOM or ``<meta charset>``. Only the current
+    chunk and the extracted features are held in memory, never the whole
+    document. The chosen encoding is available as ``encoding`` /
+    ``encoding_source``.
+    """
+
+    def __init__(
+        self,
+        page_url: str | None = None,
+        backend: str | None = None,
+        encoding: str | None = None,
+        keep_text: bool | None = None,
+    ) -> None:
+        backend = backend or DEFAULT_BACKEND
+        self.encoding: str | None = None
+        self.encoding_source: str | None = None
+        self._decoder = None
+        self._head = bytearray()  # bytes held back until the encoding is known
+        if encoding:
+            self._set_encoding(encoding, "declared")
+        self._scanner = default_db().scanner()
+        self._collector = _FeatureCollector(page_url, self._scanner, keep_text)
+        if backend == "lxml":
+            try:
+                from lxml import etree
+            except ImportError:
+                raise ValueError("lxml backend requested but lxml is not installed") from None
+            self._syntax_error = etree.XMLSyntaxError
+            self._parser = etree.HTMLParser(target=self._collector, recover=True)
+        elif backend == "html.parser":
+            self._parser = _StdlibTokenizer(self._collector)
+        else:
+            raise ValueError(f"Unknown parser backend: {backend}")
+        self.backend = backend
+
+    def _set_encoding(self, encoding: str, source: str) -> None:
+        self.encoding = normalize_charset(encoding) or "utf-8"
+        self.encoding_source = source
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+
+    def begin(self, content_type: str | None) -> None:
+        """Use the charset from the Content-Type header unless an encoding was given explicitly."""
+        if self.encoding is None and content_type:
+            encoding, source = sniff_encoding(content_type, b"")
+            if encoding:
+                self._set_encoding(encoding, source)
+
+    def feed(self, chunk: str | bytes) -> None:
+        if isinstance(chunk, bytes):
+            if self._decoder is None:
+                self._head += chunk
+                if len(self._head) < SNIFF_BYTES:
+                    return
+                chunk = self._settle_encoding()
+            chunk = self._decoder.decode(chunk)
+        if chunk:
+            self._scanner.feed(chunk)
+            self._parser.feed(chunk)
+
+    def _settle_encoding(self) -> bytes:
+        """Pick the encoding from the buffered head and return the buffered bytes."""
+        head = bytes(self._head)
+        self._head.clear()
+        encoding, source = sniff_encoding(None, head)
+        if encoding is None:
+            # Only a bounded sample is available while streaming.
+            encoding, source = detect_encoding(None, head)
+        self._set_encoding(encoding, source)
+        return head
+
+    def close(self) -> ParsedPage:
+        if self._decoder is None and self._head:  # document shorter than the sniff window
+            head = self._settle_encoding()
+            text = self._decoder.decode(head)
             if text:
-                headings[level].append(text)
-
-    imgs = soup.find_all("img")
-    images_total = len(imgs)
-    images_without_alt = sum(1 for img in imgs if not img.get("alt"))
-
-    forms_count = len(soup.find_all("form"))
-
-    # External links (absolute URLs pointing outside current domain)
-    external_links = 0
-    external_nofollow = 0
-    domain = urlparse(page_url).netloc if page_url else ""
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        parsed = urlparse(href)
-        if not parsed.netloc:  # relative URL => internal
-            continue
-        if domain and parsed.netloc.endswith(domain):
-            continue  # internal link within same domain
-        external_links += 1
-        rel_vals = {val.lower() for val in a.get("rel", [])}
-        if "nofollow" in rel_vals:
-            external_nofollow += 1
-
-    analytics = _detect_analytics(soup)
-
-    text_content = soup.get_text(" ", strip=True)
-
-    return ParsedPage(
-        title=title,
-        meta_description=meta_description,
-        meta_keywords=meta_keywords,
-        headings=dict(headings),
-        images_total=images_total,
-        images_without_alt=images_without_alt,
-        forms_count=forms_count,
-        external_links=external_links,
-        external_nofollow=external_nofollow,
-        analytics=analytics,
-        text_content=text_content,
-    ) 
\ No newline at end of file
+                self._scanner.feed(text)
+                self._parser.feed(text)
+        if self._decoder is not None:
+            tail = self._decoder.decode(b"", final=True)
+            if tail:
+                self._scanner.feed(tail)
+                self._parser.feed(tail)
+        if self.backend == "lxml":
+            try:
+                return self._parser.close()
+            except self._syntax_error:  # e.g. empty document
+                return self._collector.close()
+        self._parser.close()
+        return self._collector.close()
+
+
+def parse_html(
+    html: str | bytes,
+    page_url: str | None = None,
+    backend: str | None = None,
+    encoding: str | None = None,
+    keep_text: bool | None = None,
+) -> ParsedPage:
+    """Parse HTML (text or raw bytes) and extract structured information.
+
+    ``keep_text=False`` keeps only a hash and an excerpt of the visible text
+    (default: ``LP_KEEP_TEXT``).
+    """
+    extractor = PageExtractor(page_url, backend=backend, encoding=encoding, keep_text=keep_text)
+    extractor.feed(html)
+    return extractor.close()
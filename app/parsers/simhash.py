@@ -0,0 +1,134 @@
+"""Near-duplicate fingerprints of landing pages for LP Screening.
+
+A page is reduced to a 64-bit SimHash of its features:
+
+* every run of :data:`SHINGLE_WORDS` consecutive whitespace-separated words
+  of the visible text (case-insensitive), with weight 1;
+* every run of words within a heading, tagged with the heading level, with
+  weight :data:`HEADING_WEIGHT` — two pages with the same text under a
+  different heading outline do not look identical.
+
+Each feature is hashed to 64 bits; bit ``i`` of the fingerprint is set when
+the features with bit ``i`` set outweigh those without it. Pages that differ
+in a few words (a city name, a phone number) get fingerprints that differ in
+a few bits, so the Hamming distance between fingerprints estimates how
+different two pages are (see :mod:`app.storage.similarity`).
+
+Feature hashes are built from CRC-32 of the words and a fixed mixing
+function, not ``hash()``, so fingerprints are the same in every process and
+can be stored. Each distinct word is hashed once, and the parser passes the
+word list it already splits for the word count (:func:`simhash_words`). The
+shingle hashing and bit counting use NumPy when it is installed.
+"""
+from __future__ import annotations
+
+import zlib
+from typing import Iterable, Mapping, Sequence
+
+try:  # Optional fast path
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+__all__ = ["FINGERPRINT_BITS", "SHINGLE_WORDS", "HEADING_WEIGHT", "simhash", "simhash_words", "hamming"]
+
+FINGERPRINT_BITS = 64
+SHINGLE_WORDS = 3
+HEADING_WEIGHT = 2
+
+_MASK = (1 << 64) - 1
+_K1 = 0x9E3779B97F4A7C15  # odd multipliers combining the word hashes of a shingle
+_K2 = 0xC2B2AE3D27D4EB4F
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits of two fingerprints."""
+    return (a ^ b).bit_count()
+
+
+def _word_table(words: Iterable[str]) -> dict[str, int]:
+    """CRC-32 of every distinct word, lower-cased."""
+    return {word: zlib.crc32(word.lower().encode("utf-8")) for word in set(words)}
+
+
+def _mix(z: int) -> int:
+    """SplitMix64 finalizer: spreads the combined word hashes over all 64 bits."""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
+
+
+def _shingles_python(words: list[int], tag: int) -> list[int]:
+    if len(words) < SHINGLE_WORDS:
+        return [_mix((sum(words) * _K1 + len(words) + tag) & _MASK)] if words else []
+    return [
+        _mix((a * _K1 + b * _K2 + c + tag) & _MASK)
+        for a, b, c in zip(words, words[1:], words[2:])
+    ]
+
+
+def _count_bits_python(features: Sequence[int]) -> list[int]:
+    """Number of features with each bit set."""
+    counts = [0] * FINGERPRINT_BITS
+    for feature in features:
+        for bit in range(FINGERPRINT_BITS):
+            if feature >> bit & 1:
+                counts[bit] += 1
+    return counts
+
+
+if np is not None:
+    # Row v holds the bits of byte value v, lowest first.
+    _BYTE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder="little").astype(np.int64)
+
+
+def _mix_numpy(z):
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _shingles_numpy(w):
+    with np.errstate(over="ignore"):  # uint64 arithmetic wraps around by design
+        return _mix_numpy(w[:-2] * np.uint64(_K1) + w[1:-1] * np.uint64(_K2) + w[2:])
+
+
+def _count_bits_numpy(features) -> list[int]:
+    """Number of features with each bit set.
+
+    Counts every value of each of the 8 bytes and multiplies by the bits of the values.
+    """
+    columns = features.astype("<u8").view(np.uint8).reshape(-1, 8)
+    histogram = np.stack([np.bincount(columns[:, i], minlength=256) for i in range(8)])
+    return (histogram @ _BYTE_BITS).ravel().tolist()
+
+
+def simhash_words(words: Sequence[str], headings: Mapping[int, Sequence[str]] | None = None) -> int:
+    """64-bit SimHash of a page's text, given as its words, and headings (0 for an empty page)."""
+    table = _word_table(words)
+    if np is not None and len(words) >= SHINGLE_WORDS:
+        text_features = _shingles_numpy(np.fromiter(map(table.__getitem__, words), np.uint64, len(words)))
+    else:
+        text_features = _shingles_python([table[word] for word in words], 0)
+    # Headings are few and short: plain Python is faster than NumPy calls per heading.
+    headings = [(level, heading.split()) for level, texts in (headings or {}).items() for heading in texts]
+    table = _word_table(word for _, heading in headings for word in heading)
+    heading_features = [
+        feature
+        for level, heading in headings
+        for feature in _shingles_python([table[word] for word in heading], level)
+    ]
+    # A feature of weight w counts as w copies of it.
+    heading_features *= HEADING_WEIGHT
+    if np is not None:
+        features = np.concatenate([np.asarray(f, dtype=np.uint64) for f in (text_features, heading_features)])
+        counts = _count_bits_numpy(features)
+    else:
+        features = text_features + heading_features
+        counts = _count_bits_python(features)
+    return sum(1 << bit for bit, count in enumerate(counts) if 2 * count > len(features))
+
+
+def simhash(text: str, headings: Mapping[int, Sequence[str]] | None = None) -> int:
+    """64-bit SimHash of a page's visible text and headings (0 for an empty page)."""
+    return simhash_words(text.split(), headings)
@@ -0,0 +1,143 @@
+"""Batch audit runner for LP Screening.
+
+Runs an audit coroutine over many URLs with a global concurrency cap and a
+per-host politeness limit, yielding results as soon as each one finishes.
+Only ``concurrency`` URLs are in flight at any moment, so memory use does not
+grow with the batch size.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Generic, Iterable, TypeVar
+from urllib.parse import urlparse
+
+__all__ = ["BatchStats", "HostLimiter", "run_batch"]
+
+T = TypeVar("T")
+
+
+@dataclass
+class BatchStats:
+    """Throughput statistics for a single batch."""
+
+    total: int = 0
+    succeeded: int = 0
+    failures: Counter = field(default_factory=Counter)  # stage -> count
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+    def record(self, failed_stage: str | None) -> None:
+        self.total += 1
+        if failed_stage:
+            self.failures[failed_stage] += 1
+        else:
+            self.succeeded += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "succeeded": self.succeeded,
+            "failures": dict(self.failures),
+            "elapsed_s": round(self.elapsed, 3),
+            "pages_per_s": round(self.pages_per_second, 2),
+        }
+
+
+@dataclass
+class _Outcome(Generic[T]):
+    url: str
+    result: T | None
+    failed_stage: str | None
+
+
+class HostLimiter:
+    """Per-host semaphores, dropped again once a host has no waiters."""
+
+    def __init__(self, per_host: int) -> None:
+        self._per_host = per_host
+        self._sems: dict[str, asyncio.Semaphore] = {}
+        self._users: Counter = Counter()
+
+    async def run(self, host: str, coro_fn: Callable[[], Awaitable[T]]) -> T:
+        sem = self._sems.setdefault(host, asyncio.Semaphore(self._per_host))
+        self._users[host] += 1
+        try:
+            async with sem:
+                return await coro_fn()
+        finally:
+            self._users[host] -= 1
+            if not self._users[host]:
+                del self._users[host]
+                self._sems.pop(host, None)
+
+
+async def run_batch(
+    urls: Iterable[str],
+    audit: Callable[[str], Awaitable[T]],
+    classify: Callable[[T], str | None],
+    concurrency: int = 10,
+    per_host: int = 2,
+    stats: BatchStats | None = None,
+) -> AsyncIterator[_Outcome[T]]:
+    """Audit ``urls`` concurrently and yield outcomes in completion order.
+
+    Args:
+        urls: URLs to audit; consumed lazily.
+        audit: Coroutine function running the pipeline for one URL.
+        classify: Returns the name of the failed stage for a result, or None on success.
+        concurrency: Maximum number of audits in flight.
+        per_host: Maximum number of concurrent audits against one host.
+        stats: Optional stats object updated as results arrive.
+
+    Yields:
+        One outcome per URL. Exceptions raised by ``audit`` are reported with
+        ``failed_stage="internal"`` instead of aborting the batch.
+    """
+    stats = stats if stats is not None else BatchStats()
+    hosts = HostLimiter(per_host)
+    queue: asyncio.Queue[_Outcome[T]] = asyncio.Queue(maxsize=concurrency)
+    url_iter = iter(urls)
+
+    async def worker() -> None:
+        for url in url_iter:  # shared iterator: each URL is taken by exactly one worker
+            try:
+                result = await hosts.run(urlparse(url).netloc, lambda: audit(url))
+                outcome = _Outcome(url, result, classify(result))
+            except Exception:  # noqa: BLE001
+                outcome = _Outcome(url, None, "internal")
+            await queue.put(outcome)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    done = asyncio.gather(*workers)
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            finished, _ = await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in finished:
+                getter.cancel()
+                break
+            outcome = getter.result()
+            stats.record(outcome.failed_stage)
+            yield outcome
+        # Drain results that were queued right before the workers finished.
+        while not queue.empty():
+            outcome = queue.get_nowait()
+            stats.record(outcome.failed_stage)
+            yield outcome
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        stats.finished_at = time.perf_counter()
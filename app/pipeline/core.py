@@ -0,0 +1,375 @@
+"""Audit pipeline for LP Screening.
+
+The audit is a sequence of pluggable :class:`Stage` objects sharing an
+:class:`AuditContext`. :class:`AuditPipeline` runs them in order and records,
+for every stage, wall-clock and CPU time; the totals feed the ``Server-Timing``
+response header and the Prometheus metrics exposed at ``/metrics``.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional, Sequence
+
+from app.ai.gpt_client import AIResult, ai_enabled, analyze_with_gpt_async
+from app.analyzers.basic import RuleResult
+from app.analyzers.text import TextScores, analyze_text
+from app.collectors.http_fetcher import FetchResult, fetch_html_async
+from app.collectors.page_weight import PageWeightCollector
+from app.collectors.site_files import SiteFiles, SiteFilesCollector
+from app.parsers.html_parser import PageExtractor, ParsedPage
+from app.pipeline.executor import CPUExecutor
+from app.pipeline.metrics import PipelineMetrics
+from app.storage.similarity import NearDuplicate, SimilarityIndex
+
+__all__ = [
+    "StageTiming",
+    "AuditContext",
+    "Stage",
+    "FetchStage",
+    "ParseStage",
+    "SiteStage",
+    "PageWeightStage",
+    "SimilarityStage",
+    "TextStage",
+    "RulesStage",
+    "AIStage",
+    "AuditPipeline",
+]
+
+
+@dataclass
+class StageTiming:
+    wall: float  # seconds
+    cpu: Optional[float] = None  # seconds of CPU of the stage's own work; None when not measured
+
+
+@dataclass
+class AuditContext:
+    """State shared by the stages of one audit run."""
+
+    url: str
+    keywords: tuple[str, ...] = ()  # scored by TextStage
+    fetch: Optional[FetchResult] = None
+    parsed: Optional[ParsedPage] = None
+    site: Optional[SiteFiles] = None  # robots.txt / sitemap of the page's origin
+    site_task: Optional[asyncio.Future] = None  # started alongside the page download
+    text: Optional[TextScores] = None
+    rules: Optional[list[RuleResult]] = None
+    ai: Optional[AIResult] = None
+    ai_failed: bool = False
+    near_duplicate: Optional[NearDuplicate] = None  # nearest indexed page with almost the same content
+    ai_reused: bool = False  # ``ai`` was taken from ``near_duplicate`` instead of a model call
+    cached: bool = False  # served from cache after revalidation; later stages skipped
+    timings: dict[str, StageTiming] = field(default_factory=dict)
+    cpu: dict[str, float] = field(default_factory=dict)  # CPU seconds reported by stages that await (parse, rules)
+
+    @property
+    def outcome(self) -> str:
+        """One of ``success``, ``cached``, ``fetch_error``, ``ssl_error``, ``ai_failure``."""
+        if self.cached:
+            return "cached"
+        if self.fetch is None or not self.fetch.success:
+            if self.fetch is not None and self.fetch.error and self.fetch.error.startswith("SSL error"):
+                return "ssl_error"
+            return "fetch_error"
+        if self.ai_failed:
+            return "ai_failure"
+        return "success"
+
+    @property
+    def bytes_fetched(self) -> int:
+        return self.fetch.bytes_read if self.fetch else 0
+
+    @property
+    def html_size(self) -> int:
+        if self.fetch is None:
+            return 0
+        if self.fetch.content is not None:
+            return len(self.fetch.content)
+        return self.fetch.bytes_read if self.fetch.streamed else 0
+
+    def server_timing(self) -> str:
+        """Format stage timings as a ``Server-Timing`` header value."""
+        return ", ".join(
+            f"{name};dur={timing.wall * 1000:.1f}" for name, timing in self.timings.items()
+        )
+
+
+class Stage:
+    """A single pipeline step. Subclasses set ``name`` and implement :meth:`run`.
+
+    Stages whose :meth:`run` never awaits set ``awaits = False`` and have their CPU
+    time measured around the call. Across an await the thread's CPU clock also
+    counts other coroutines, so stages that await report it in ``ctx.cpu`` if they can.
+    """
+
+    name: str = "stage"
+    awaits: bool = True
+
+    def should_run(self, ctx: AuditContext) -> bool:
+        return True
+
+    async def run(self, ctx: AuditContext) -> None:
+        raise NotImplementedError
+
+
+class FetchStage(Stage):
+    """Downloads the page.
+
+    With ``stream_parse`` the body is fed chunk by chunk into an incremental
+    :class:`PageExtractor` while it downloads, so the HTML is never held in
+    memory as a whole; parsing then happens here instead of in :class:`ParseStage`.
+    """
+
+    name = "fetch"
+
+    def __init__(
+        self,
+        stream_parse: bool = False,
+        site_files: SiteFilesCollector | None = None,
+        keep_text: bool | None = None,
+    ) -> None:
+        self.stream_parse = stream_parse
+        self.site_files = site_files
+        self.keep_text = keep_text
+
+    def should_run(self, ctx: AuditContext) -> bool:
+        return ctx.fetch is None  # may be pre-filled, e.g. by cache revalidation
+
+    async def run(self, ctx: AuditContext) -> None:
+        if self.site_files is not None and ctx.site_task is None:
+            # robots.txt and sitemaps download while the page does; SiteStage collects them.
+            ctx.site_task = asyncio.ensure_future(self.site_files.get(ctx.url))
+        if not self.stream_parse:
+            ctx.fetch = await fetch_html_async(ctx.url)
+            return
+        extractor = PageExtractor(ctx.url, keep_text=self.keep_text)
+        ctx.fetch = await fetch_html_async(ctx.url, sink=extractor)
+        if ctx.fetch.success:
+            ctx.parsed = extractor.close()
+            ctx.fetch.encoding = extractor.encoding
+            ctx.fetch.encoding_source = extractor.encoding_source
+
+
+class ParseStage(Stage):
+    name = "parse"
+
+    def __init__(self, executor: CPUExecutor | None = None, keep_text: bool | None = None) -> None:
+        self.executor = executor or CPUExecutor()
+        self.keep_text = keep_text  # None: LP_KEEP_TEXT
+
+    def should_run(self, ctx: AuditContext) -> bool:
+        return ctx.parsed is None and bool(ctx.fetch and ctx.fetch.success and ctx.fetch.content)
+
+    async def run(self, ctx: AuditContext) -> None:
+        ctx.parsed, ctx.cpu[self.name] = await self.executor.parse(
+            ctx.fetch.content, ctx.url, ctx.fetch.encoding, self.keep_text
+        )
+
+
+class SiteStage(Stage):
+    """Waits for the robots.txt / sitemap information of the page's origin.
+
+    The download is normally started by :class:`FetchStage`, so this stage only
+    accounts for the time it takes beyond fetching and parsing the page, and at
+    most ``SiteFilesCollector.wait`` seconds: a large sitemap finishes in the
+    background, and this audit reports the sitemap rules as unknown.
+    """
+
+    name = "site"
+
+    def __init__(self, site_files: SiteFilesCollector) -> None:
+        self.site_files = site_files
+
+    def should_run(self, ctx: AuditContext) -> bool:
+        return ctx.site is None and (ctx.parsed is not None or ctx.site_task is not None)
+
+    async def run(self, ctx: AuditContext) -> None:
+        task, ctx.site_task = ctx.site_task, None
+        if ctx.parsed is None:  # page failed; nothing to check against
+            task.cancel()
+            return
+        ctx.site = await self.site_files.get_within(ctx.url, task)
+
+
+class PageWeightStage(Stage):
+    """Probes the page's scripts, styles, images and fonts into ``fetch.page_weight`` for the rules."""
+
+    name = "weight"
+
+    def __init__(self, collector: PageWeightCollector) -> None:
+        self.collector = collector
+
+    def should_run(self, ctx: AuditContext) -> bool:
+        return ctx.parsed is not None and ctx.fetch.page_weight is None
+
+    async def run(self, ctx: AuditContext) -> None:
+        ctx.fetch.page_weight = await self.collector.collect(ctx.parsed, ctx.fetch, ctx.url)
+
+
+class SimilarityStage(Stage):
+    """Indexes the page's fingerprint and looks up its nearest near-duplicate (see app.storage.similarity)."""
+
+    name = "similarity"
+    awaits = False
+
+    def __init__(self, index: SimilarityIndex) -> None:
+        self.index = index
+
+    def should_run(self, ctx: AuditContext) -> bool:
+        return ctx.parsed is not None
+
+    async def run(self, ctx: AuditContext) -> None:
+        parsed = ctx.parsed
+        ctx.near_duplicate = self.index.nearest(ctx.url, parsed.simhash, parsed.word_count)
+        self.index.add(ctx.url, parsed.simhash, parsed.word_count)
+
+
+class TextStage(Stage):
+    """Local readability and keyword relevance; runs inline (well under a millisecond per page)."""
+
+    name = "text"
+    awaits = False
+
+    def should_run(self, ctx: AuditContext) -> bool:
+        return ctx.parsed is not None
+
+    async def run(self, ctx: AuditContext) -> None:
+        ctx.text = analyze_text(ctx.parsed, ctx.keywords)
+
+
+class RulesStage(Stage):
+    name = "rules"
+
+    def __init__(self, executor: CPUExecutor | None = None) -> None:
+        self.executor = executor or CPUExecutor()
+
+    def should_run(self, ctx: AuditContext) -> bool:
+        return ctx.parsed is not None
+
+    async def run(self, ctx: AuditContext) -> None:
+        ctx.rules, ctx.cpu[self.name] = await self.executor.evaluate(ctx.parsed, ctx.fetch, ctx.site)
+
+
+class AIStage(Stage):
+    """AI recommendations; with a similarity index, those of an analyzed near-duplicate are reused."""
+
+    name = "ai"
+
+    def __init__(self, similarity: SimilarityIndex | None = None) -> None:
+        self.similarity = similarity
+
+    def should_run(self, ctx: AuditContext) -> bool:
+        return ctx.parsed is not None and ai_enabled()
+
+    async def run(self, ctx: AuditContext) -> None:
+        parsed = ctx.parsed
+        if self.similarity is not None:
+            reused = self.similarity.reusable_ai(ctx.url, parsed.simhash, parsed.word_count)
+            if reused is not None:
+                ctx.near_duplicate, ctx.ai = reused
+                ctx.ai_reused = True
+                return
+        ctx.ai = await analyze_with_gpt_async(parsed)
+        ctx.ai_failed = ctx.ai is None
+        if ctx.ai is not None and self.similarity is not None:
+            self.similarity.set_ai(ctx.url, ctx.ai)
+
+
+class AuditPipeline:
+    """Runs stages in order and records per-stage timing."""
+
+    def __init__(self, stages: Sequence[Stage], metrics: PipelineMetrics | None = None) -> None:
+        self.stages = list(stages)
+        self.metrics = metrics
+
+    @classmethod
+    def default(
+        cls,
+        metrics: PipelineMetrics | None = None,
+        executor: CPUExecutor | None = None,
+        stream_parse: bool = False,
+        site_files: SiteFilesCollector | None = None,
+        ai: bool = True,
+        keep_text: bool | None = None,
+        similarity: SimilarityIndex | None = None,
+        page_weight: PageWeightCollector | None = None,
+    ) -> "AuditPipeline":
+        executor = executor or CPUExecutor()
+        stages: list[Stage] = [FetchStage(stream_parse, site_files, keep_text), ParseStage(executor, keep_text)]
+        if site_files is not None:
+            stages.append(SiteStage(site_files))
+        if page_weight is not None:
+            stages.append(PageWeightStage(page_weight))
+        if similarity is not None:
+            stages.append(SimilarityStage(similarity))
+        stages.extend([TextStage(), RulesStage(executor)])
+        if ai:
+            stages.append(AIStage(similarity))
+        return cls(stages, metrics)
+
+    async def run(
+        self,
+        url: str,
+        ctx: AuditContext | None = None,
+        keywords: Sequence[str] = (),
+        on_stage: Callable[[str, AuditContext], None] | None = None,
+    ) -> AuditContext:
+        """Run all stages for ``url``.
+
+        An existing context (e.g. one whose fetch was already done during cache
+        revalidation) can be passed in; its recorded timings are kept.
+        ``on_stage`` is called after every stage that ran, e.g. to stream
+        partial results before the slower stages finish.
+        """
+        ctx = ctx if ctx is not None else AuditContext(url=url, keywords=tuple(keywords))
+        start = time.perf_counter() - sum(t.wall for t in ctx.timings.values())
+        for stage in self.stages:
+            if stage.should_run(ctx):
+                with self.timed(ctx, stage.name, cpu=not stage.awaits):
+                    await stage.run(ctx)
+                if on_stage is not None:
+                    on_stage(stage.name, ctx)
+        self._observe(ctx, time.perf_counter() - start)
+        return ctx
+
+    @contextmanager
+    def timed(self, ctx: AuditContext, name: str, cpu: bool = False) -> Iterator[None]:
+        """Time a block as stage ``name`` (also usable for work outside the pipeline, e.g. rendering).
+
+        The block's CPU time is measured only with ``cpu=True``, for blocks that never
+        await; otherwise the figure reported in ``ctx.cpu[name]`` is used, if any.
+        """
+        wall0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            used = time.thread_time() - cpu0 if cpu else ctx.cpu.get(name)
+            ctx.timings[name] = StageTiming(time.perf_counter() - wall0, used)
+
+    def observe_stage(self, ctx: AuditContext, name: str) -> None:
+        """Report a stage timed with :meth:`timed` after :meth:`run` has finished."""
+        if self.metrics is not None and name in ctx.timings:
+            timing = ctx.timings[name]
+            self.metrics.stage_seconds.observe(timing.wall, name, ctx.outcome)
+            if timing.cpu is not None:
+                self.metrics.stage_cpu_seconds.observe(timing.cpu, name, ctx.outcome)
+
+    def finish(self, ctx: AuditContext) -> None:
+        """Report a context whose stages were run outside :meth:`run`."""
+        self._observe(ctx, sum(t.wall for t in ctx.timings.values()))
+
+    def _observe(self, ctx: AuditContext, total: float) -> None:
+        if self.metrics is None:
+            return
+        outcome = ctx.outcome
+        for name in ctx.timings:
+            self.observe_stage(ctx, name)
+        self.metrics.audit_seconds.observe(total, outcome)
+        if ctx.bytes_fetched:
+            self.metrics.bytes_fetched.inc(amount=ctx.bytes_fetched)
+        if ctx.html_size:
+            self.metrics.html_bytes.observe(ctx.html_size)
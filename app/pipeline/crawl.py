@@ -0,0 +1,309 @@
+"""Site crawl mode for LP Screening.
+
+Starting from a landing page, :class:`SiteCrawler` walks internal links
+breadth-first up to a depth and page limit, runs every page through the audit
+pipeline (fetch → parse → robots/sitemap → rules, no AI) and rolls the results
+up into a :class:`CrawlSummary`.
+
+Memory stays bounded on large sites: pages are yielded as they finish and only
+compact aggregates are kept; the frontier holds URLs only and never more than
+``max_pages`` of them; visited URLs are tracked in a Bloom filter.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+from urllib.parse import urljoin, urlsplit
+
+from app.analyzers.basic import RuleResult, RuleStatus
+from app.collectors.site_files import SiteFilesCollector
+from app.pipeline.batch import HostLimiter
+from app.pipeline.core import AuditContext, AuditPipeline
+from app.storage.bloom import ScalableBloomFilter
+from app.storage.cache import normalize_url
+
+__all__ = ["CrawlConfig", "CrawlPage", "CrawlSummary", "SiteCrawler"]
+
+# Product token matched against robots.txt groups.
+ROBOTS_AGENT = "LP-Screening"
+
+# Links to files that are certainly not HTML pages are not followed.
+_SKIP_EXTENSIONS = frozenset(
+    {
+        ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".bmp", ".avif",
+        ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip", ".rar", ".7z", ".gz",
+        ".mp3", ".mp4", ".avi", ".mov", ".webm", ".css", ".js", ".json", ".xml", ".txt",
+        ".woff", ".woff2", ".ttf", ".eot", ".exe", ".dmg", ".apk",
+    }
+)
+
+
+@dataclass
+class CrawlConfig:
+    max_pages: int = 100
+    max_depth: int = 3  # link hops from the start page
+    concurrency: int = 10
+    per_host: int = 4
+    respect_robots: bool = True
+    delay: Optional[float] = None  # seconds between requests; None = robots.txt Crawl-delay (or none)
+
+
+@dataclass
+class CrawlPage:
+    """Audit outcome of one crawled page."""
+
+    url: str
+    depth: int
+    status_code: Optional[int]
+    error: Optional[str]
+    title: Optional[str] = None
+    description: Optional[str] = None
+    rules: list[RuleResult] = field(default_factory=list)
+
+    @property
+    def errors(self) -> int:
+        return sum(r.status == RuleStatus.ERROR for r in self.rules)
+
+    @property
+    def warnings(self) -> int:
+        return sum(r.status == RuleStatus.WARNING for r in self.rules)
+
+    def as_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "depth": self.depth,
+            "status_code": self.status_code,
+            "error": self.error,
+            "title": self.title,
+            "rules": [{"name": r.name, "status": r.status.value, "message": r.message} for r in self.rules],
+        }
+
+
+class CrawlSummary:
+    """Site-level roll-up of crawled pages, built incrementally."""
+
+    def __init__(self, worst_pages: int = 10, samples: int = 5) -> None:
+        self.started_at = time.perf_counter()
+        self.finished_at: float | None = None
+        self.pages = 0
+        self.failed = 0  # pages that could not be fetched or parsed
+        self.skipped_robots = 0  # links not followed because robots.txt disallows them
+        self.depths: Counter = Counter()
+        self._rules: dict[str, Counter] = {}  # rule name -> status -> pages
+        self._worst: list[tuple[int, int, str]] = []  # min-heap of (score, -order, url)
+        self._worst_n = worst_pages
+        self._samples = samples
+        self._titles: dict[str, list] = {}  # text -> [count, sample urls]
+        self._descriptions: dict[str, list] = {}
+
+    def add(self, page: CrawlPage) -> None:
+        self.pages += 1
+        self.depths[page.depth] += 1
+        if page.error:
+            self.failed += 1
+            return
+        for rule in page.rules:
+            self._rules.setdefault(rule.name, Counter())[rule.status.value] += 1
+        score = page.errors * 3 + page.warnings
+        if score:
+            item = (score, -self.pages, page.url)
+            if len(self._worst) < self._worst_n:
+                heapq.heappush(self._worst, item)
+            elif item > self._worst[0]:
+                heapq.heapreplace(self._worst, item)
+        self._count(self._titles, page.title, page.url)
+        self._count(self._descriptions, page.description, page.url)
+
+    def _count(self, index: dict[str, list], text: Optional[str], url: str) -> None:
+        if not text:
+            return
+        entry = index.setdefault(text, [0, []])
+        entry[0] += 1
+        if len(entry[1]) < self._samples:
+            entry[1].append(url)
+
+    @staticmethod
+    def _duplicates(index: dict[str, list]) -> list[dict]:
+        dups = [{"text": text, "pages": count, "examples": urls} for text, (count, urls) in index.items() if count > 1]
+        return sorted(dups, key=lambda d: d["pages"], reverse=True)
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def as_dict(self) -> dict:
+        audited = self.pages - self.failed
+        rules = {}
+        for name, counts in sorted(self._rules.items()):
+            total = sum(counts.values())
+            rules[name] = {
+                **{status.value: counts.get(status.value, 0) for status in RuleStatus},
+                "failure_rate": round((total - counts.get(RuleStatus.OK.value, 0)) / total, 3) if total else 0.0,
+            }
+        return {
+            "pages": self.pages,
+            "audited": audited,
+            "failed": self.failed,
+            "skipped_robots": self.skipped_robots,
+            "depths": {str(d): n for d, n in sorted(self.depths.items())},
+            "elapsed_s": round(self.elapsed, 3),
+            "pages_per_s": round(self.pages / self.elapsed, 2) if self.elapsed > 0 else 0.0,
+            "rules": rules,
+            "worst_pages": [
+                {"url": url, "score": score} for score, _, url in sorted(self._worst, reverse=True)
+            ],
+            "duplicate_titles": self._duplicates(self._titles),
+            "duplicate_descriptions": self._duplicates(self._descriptions),
+        }
+
+
+class _Throttle:
+    """Spaces out request starts by at least ``delay`` seconds."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if self.delay <= 0:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.delay
+
+
+class SiteCrawler:
+    """Breadth-first crawler over the internal links of one site.
+
+    Args:
+        pipeline: Audit pipeline run for every page (normally without the AI stage).
+        site_files: robots.txt / sitemap collector (robots rules, Crawl-delay).
+        config: Crawl limits.
+    """
+
+    def __init__(
+        self,
+        pipeline: AuditPipeline,
+        site_files: SiteFilesCollector | None = None,
+        config: CrawlConfig | None = None,
+    ) -> None:
+        self.pipeline = pipeline
+        self.site_files = site_files
+        self.config = config or CrawlConfig()
+
+    async def crawl(self, start_url: str, summary: CrawlSummary | None = None) -> AsyncIterator[CrawlPage]:
+        """Crawl from ``start_url`` and yield pages in completion order."""
+        cfg = self.config
+        summary = summary if summary is not None else CrawlSummary()
+
+        robots = None
+        delay = cfg.delay or 0.0
+        if self.site_files is not None and (cfg.respect_robots or cfg.delay is None):
+            robots = (await self.site_files.get(start_url)).robots
+            if cfg.delay is None and robots is not None:
+                delay = float(robots.crawl_delay(ROBOTS_AGENT) or 0)
+        if not cfg.respect_robots:
+            robots = None
+
+        hosts = {urlsplit(normalize_url(start_url)).netloc}
+        seen = ScalableBloomFilter(error_rate=0.001)
+        seen.add(normalize_url(start_url))
+        frontier: asyncio.Queue[tuple[str, int]] = asyncio.Queue()
+        frontier.put_nowait((start_url, 0))
+        scheduled = 1
+        results: asyncio.Queue[CrawlPage] = asyncio.Queue(maxsize=cfg.concurrency)
+        limiter = HostLimiter(cfg.per_host)
+        throttle = _Throttle(delay)
+
+        def schedule(links: list[str], base: str, depth: int) -> None:
+            nonlocal scheduled
+            for href in links:
+                if scheduled >= cfg.max_pages:
+                    return
+                url = normalize_url(urljoin(base, href))
+                parts = urlsplit(url)
+                if parts.scheme not in ("http", "https") or parts.netloc not in hosts:
+                    continue
+                name = parts.path.rsplit("/", 1)[-1]
+                if "." in name and name[name.rfind(".") :].lower() in _SKIP_EXTENSIONS:
+                    continue
+                if seen.add(url):  # already scheduled (or a ~0.1% Bloom false positive)
+                    continue
+                if robots is not None and not robots.can_fetch(ROBOTS_AGENT, url):
+                    summary.skipped_robots += 1
+                    continue
+                frontier.put_nowait((url, depth))
+                scheduled += 1
+
+        async def visit(url: str, depth: int) -> CrawlPage:
+            await throttle.wait()
+            ctx = await self.pipeline.run(url)
+            page = _to_page(ctx, depth)
+            if ctx.fetch is not None and ctx.fetch.final_url and depth == 0:
+                # Follow the start page's redirect (http -> https, www) when scoping the crawl.
+                hosts.add(urlsplit(normalize_url(ctx.fetch.final_url)).netloc)
+            if ctx.parsed is not None and depth < cfg.max_depth:
+                schedule(ctx.parsed.internal_links, ctx.fetch.final_url or url, depth + 1)
+            return page
+
+        async def worker() -> None:
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    try:
+                        page = await limiter.run(urlsplit(url).netloc, lambda: visit(url, depth))
+                    except Exception as exc:  # noqa: BLE001
+                        page = CrawlPage(url, depth, None, f"Internal error: {exc}")
+                    await results.put(page)
+                finally:
+                    frontier.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, cfg.concurrency))]
+        done = asyncio.ensure_future(frontier.join())
+        try:
+            while True:
+                getter = asyncio.ensure_future(results.get())
+                finished, _ = await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in finished:
+                    getter.cancel()
+                    break
+                page = getter.result()
+                summary.add(page)
+                yield page
+            while not results.empty():
+                page = results.get_nowait()
+                summary.add(page)
+                yield page
+        finally:
+            done.cancel()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            summary.finished_at = time.perf_counter()
+
+
+def _to_page(ctx: AuditContext, depth: int) -> CrawlPage:
+    fetch = ctx.fetch
+    error = fetch.error if fetch is not None else "Not fetched"
+    if error is None and ctx.parsed is None:
+        error = "Not parsed"
+    page = CrawlPage(
+        url=ctx.url,
+        depth=depth,
+        status_code=fetch.status_code if fetch is not None else None,
+        error=error,
+    )
+    if ctx.parsed is not None:
+        page.title = ctx.parsed.title
+        page.description = ctx.parsed.meta_description
+        page.rules = ctx.rules or []
+    return page
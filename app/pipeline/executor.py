@@ -0,0 +1,195 @@
+"""CPU offload for the audit pipeline.
+
+Parsing (and optionally rule evaluation) is pure-Python CPU work. Running it on
+the event-loop thread blocks every other request and limits a uvicorn worker to
+one core. :class:`CPUExecutor` sends that work to a process pool instead, with a
+bounded number of pending jobs so that a large batch waits for free workers
+rather than queueing every page's HTML in memory.
+
+With ``workers=0`` (the default) everything runs inline, as before.
+
+Rule evaluation is micro-batched: pages that reach the rules stage in the same
+event-loop iteration are evaluated together by the columnar evaluator in
+:mod:`app.analyzers.vectorized` (one pool job per batch when offloaded).
+
+:meth:`CPUExecutor.parse` and :meth:`CPUExecutor.evaluate` also return the CPU
+time of the job, measured in the thread that ran it (a pool worker when
+offloaded); a batch's CPU time is split evenly between its pages.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Callable, Optional, Sequence, TypeVar
+
+from app.analyzers.basic import RuleResult, evaluate_basic
+from app.analyzers.vectorized import PageItem, evaluate_batch
+from app.collectors.http_fetcher import FetchResult
+from app.collectors.site_files import SiteFiles
+from app.parsers.html_parser import ParsedPage, parse_html
+
+__all__ = ["CPUExecutor"]
+
+T = TypeVar("T")
+
+
+def _cpu_job(fn: Callable[..., T], *args) -> tuple[T, float]:
+    """Run ``fn`` and return its result with the CPU seconds it took in this thread."""
+    cpu0 = time.thread_time()
+    result = fn(*args)
+    return result, time.thread_time() - cpu0
+
+
+def _parse_job(content: bytes, page_url: str | None, encoding: str | None, keep_text: bool | None) -> ParsedPage:
+    return parse_html(content, page_url, encoding=encoding, keep_text=keep_text)
+
+
+def _warm_job() -> None:
+    """Load the parser backend and the fingerprint database of this process."""
+    parse_html(b"<html><head><title>warm</title></head><body><p>warm</p></body></html>")
+
+
+def _rules_job(parsed: ParsedPage, fetch: FetchResult, site: SiteFiles | None) -> list[RuleResult]:
+    return evaluate_basic(parsed, fetch, site)
+
+
+def _rules_batch_job(items: list[PageItem]) -> list[list[RuleResult]]:
+    return evaluate_batch(items)
+
+
+class CPUExecutor:
+    """Runs parsing and rule evaluation inline or in a process pool."""
+
+    def __init__(
+        self,
+        workers: int = 0,
+        max_pending: int | None = None,
+        offload_rules: bool = False,
+        rules_batch: int = 256,
+    ) -> None:
+        self.workers = workers
+        self.offload_rules = offload_rules and workers > 0
+        self.rules_batch = rules_batch  # max pages evaluated together; <= 1 disables batching
+        self._rules_queue: list[tuple[PageItem, asyncio.Future]] = []
+        self._rules_flush: Optional[asyncio.Handle] = None
+        self._tasks: set[asyncio.Task] = set()  # batches being evaluated
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending: asyncio.Semaphore | None = None
+        self._max_pending = max_pending or max(1, workers * 2)
+        if workers > 0:
+            # "spawn" keeps children independent of the parent's event loop and threads;
+            # they only import the parser and analyzer modules.
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    @classmethod
+    def from_env(cls) -> "CPUExecutor":
+        """Build from ``LP_CPU_WORKERS``, ``LP_CPU_MAX_PENDING``, ``LP_CPU_OFFLOAD_RULES`` and ``LP_RULES_BATCH_SIZE``."""
+        workers = int(os.getenv("LP_CPU_WORKERS", "0"))
+        if workers < 0:  # -1 = one worker per core
+            workers = os.cpu_count() or 1
+        max_pending = int(os.getenv("LP_CPU_MAX_PENDING", "0")) or None
+        offload_rules = os.getenv("LP_CPU_OFFLOAD_RULES", "").lower() in ("1", "true", "yes")
+        rules_batch = int(os.getenv("LP_RULES_BATCH_SIZE", "256"))
+        return cls(workers, max_pending, offload_rules, rules_batch)
+
+    async def warm(self) -> None:
+        """Start the worker processes and load the parser up front so the first audits don't pay for it."""
+        if self._pool is None:
+            _warm_job()
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _warm_job) for _ in range(self.workers)))
+
+    async def parse(
+        self,
+        content: bytes,
+        page_url: str | None = None,
+        encoding: str | None = None,
+        keep_text: bool | None = None,
+    ) -> tuple[ParsedPage, float]:
+        """Parse raw HTML bytes; only the compact ParsedPage (and the CPU time) comes back from the worker."""
+        return await self._submit(_parse_job, content, page_url, encoding, keep_text)
+
+    async def evaluate(
+        self, parsed: ParsedPage, fetch: FetchResult, site: SiteFiles | None = None
+    ) -> tuple[list[RuleResult], float]:
+        if self.rules_batch > 1:
+            return await self._enqueue_rules((parsed, fetch, site))
+        if not self.offload_rules:
+            return _cpu_job(evaluate_basic, parsed, fetch, site)
+        # Rules never look at the body; don't ship it to the worker again.
+        return await self._submit(_rules_job, parsed, replace(fetch, content=None), site)
+
+    async def evaluate_many(self, items: Sequence[PageItem]) -> list[list[RuleResult]]:
+        """Evaluate the rules for many pages at once (columnar evaluation when NumPy is available)."""
+        results, _ = await self._evaluate_many(items)
+        return results
+
+    async def _evaluate_many(self, items: Sequence[PageItem]) -> tuple[list[list[RuleResult]], float]:
+        if not self.offload_rules:
+            return _cpu_job(evaluate_batch, items)
+        items = [(parsed, replace(fetch, content=None), site) for parsed, fetch, site in items]
+        return await self._submit(_rules_batch_job, items)
+
+    def _enqueue_rules(self, item: PageItem) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._rules_queue.append((item, future))
+        if len(self._rules_queue) >= self.rules_batch:
+            self._flush_rules()
+        elif self._rules_flush is None:
+            # Flush on the next loop iteration: no added latency, pages finishing together share a batch.
+            self._rules_flush = loop.call_soon(self._flush_rules)
+        return future
+
+    def _flush_rules(self) -> None:
+        if self._rules_flush is not None:
+            self._rules_flush.cancel()
+            self._rules_flush = None
+        batch, self._rules_queue = self._rules_queue, []
+        if batch:
+            task = asyncio.ensure_future(self._run_rules(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_rules(self, batch: list[tuple[PageItem, asyncio.Future]]) -> None:
+        try:
+            results, cpu = await self._evaluate_many([item for item, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as exc:  # noqa: BLE001 - reported to every waiting audit
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result((result, cpu / len(batch)))
+
+    async def _submit(self, fn: Callable[..., T], *args) -> tuple[T, float]:
+        if self._pool is None:
+            return _cpu_job(fn, *args)
+        if self._pending is None:  # created lazily so it binds to the running loop
+            self._pending = asyncio.Semaphore(self._max_pending)
+        async with self._pending:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, _cpu_job, fn, *args)
+
+    def shutdown(self) -> None:
+        """Cancel queued and running rule batches (their audits see CancelledError) and stop the pool."""
+        if self._rules_flush is not None:
+            self._rules_flush.cancel()
+            self._rules_flush = None
+        for _, future in self._rules_queue:
+            future.cancel()
+        self._rules_queue = []
+        for task in self._tasks:
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,130 @@
+"""Minimal Prometheus-compatible metrics for the audit pipeline.
+
+Only what the service needs is implemented (counters and fixed-bucket
+histograms with labels), rendered in the Prometheus text exposition format.
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Iterable, Sequence
+
+__all__ = ["Counter", "Histogram", "PipelineMetrics"]
+
+# Seconds; covers sub-millisecond parsing up to slow AI calls.
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                yield f"{self.name}{_labels(self.label_names, labels)} {_fmt(value)}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count], sum
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts, total = self._series.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    le = f'le="{_fmt(bound)}"'
+                    yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+                cumulative += counts[-1]
+                inf = 'le="+Inf"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, inf)} {cumulative}"
+                yield f"{self.name}_sum{_labels(self.label_names, labels)} {total[0]!r}"
+                yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+class PipelineMetrics:
+    """Latency and volume metrics recorded by :class:`~app.pipeline.core.AuditPipeline`."""
+
+    def __init__(self) -> None:
+        self.stage_seconds = Histogram(
+            "lp_stage_duration_seconds",
+            "Wall-clock duration of a pipeline stage.",
+            ("stage", "outcome"),
+        )
+        self.stage_cpu_seconds = Histogram(
+            "lp_stage_cpu_seconds",
+            "CPU time of a pipeline stage (parse and rules measured where they run, e.g. in a pool worker).",
+            ("stage", "outcome"),
+        )
+        self.audit_seconds = Histogram(
+            "lp_audit_duration_seconds",
+            "End-to-end duration of an audit.",
+            ("outcome",),
+        )
+        self.bytes_fetched = Counter("lp_fetched_bytes_total", "Response body bytes downloaded.")
+        self.html_bytes = Histogram(
+            "lp_html_size_bytes",
+            "Size of fetched HTML documents.",
+            buckets=(10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000),
+        )
+        self._extra: list[Counter | Histogram] = []
+
+    def register(self, metric: Counter | Histogram) -> Counter | Histogram:
+        """Add a metric owned by another component to the /metrics output."""
+        self._extra.append(metric)
+        return metric
+
+    def render(self) -> str:
+        metrics = [
+            self.stage_seconds,
+            self.stage_cpu_seconds,
+            self.audit_seconds,
+            self.bytes_fetched,
+            self.html_bytes,
+            *self._extra,
+        ]
+        lines = [line for metric in metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,375 @@
+"""Scheduled change monitoring of URL portfolios for LP Screening.
+
+:class:`Monitor` keeps a registry of :class:`MonitorTarget` URLs and re-checks
+each of them on its own interval from one scheduler task:
+
+* the schedule is a heap ordered by due time; a new target is first checked
+  at a random point of its interval, so a bulk import is spread out;
+* due checks are released at a steady ``rate`` (checks per second) under a
+  global and a per-host concurrency cap, so a backlog (e.g. after a restart)
+  is worked off evenly instead of in a burst;
+* every check is a conditional GET (ETag / Last-Modified) whose body hash is
+  compared with the previous one; only pages that really changed go through
+  parsing, rules and the AI stage of the pipeline;
+* the interval adapts: it shrinks after a change and grows while the page
+  stays the same, between ``min_interval`` and ``max_interval``;
+* a rule that gets worse (OK → WARNING/ERROR, WARNING → ERROR) raises a
+  :class:`MonitorAlert`.
+
+Targets can be persisted in a :class:`SQLiteStore` to survive restarts.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Iterable, Optional, Sequence
+from urllib.parse import urlparse
+
+from app.analyzers.basic import BASIC_RULES, RuleResult
+from app.collectors.http_fetcher import fetch_html_async
+from app.pipeline.batch import HostLimiter
+from app.pipeline.core import AuditContext, AuditPipeline
+from app.storage.cache import SQLiteStore, normalize_url
+
+__all__ = ["MonitorConfig", "MonitorTarget", "MonitorAlert", "Monitor"]
+
+logger = logging.getLogger(__name__)
+
+# Rule statuses are kept per target as one character per rule ("-" = not reported).
+_STATUS_CHARS = {"OK": "O", "WARNING": "W", "ERROR": "E"}
+_CHAR_STATUSES = {char: status for status, char in _STATUS_CHARS.items()}
+_SEVERITY = {"-": -1, "O": 0, "W": 1, "E": 2}
+
+
+@dataclass
+class MonitorConfig:
+    rate: float = 20.0  # checks started per second at most
+    concurrency: int = 20
+    per_host: int = 2
+    default_interval: float = 3600.0  # seconds
+    min_interval: float = 300.0
+    max_interval: float = 7 * 86400.0
+    speedup: float = 0.5  # interval factor after the page changed
+    slowdown: float = 1.5  # interval factor after an unchanged check
+    jitter: float = 0.1  # ± share of the interval, so checks do not line up
+    max_alerts: int = 1000  # alerts kept in memory
+
+    @classmethod
+    def from_env(cls) -> "MonitorConfig":
+        return cls(
+            rate=float(os.getenv("LP_MONITOR_RATE", "20")),
+            concurrency=int(os.getenv("LP_MONITOR_CONCURRENCY", "20")),
+            per_host=int(os.getenv("LP_MONITOR_PER_HOST", "2")),
+            default_interval=float(os.getenv("LP_MONITOR_INTERVAL", "3600")),
+            min_interval=float(os.getenv("LP_MONITOR_MIN_INTERVAL", "300")),
+            max_interval=float(os.getenv("LP_MONITOR_MAX_INTERVAL", str(7 * 86400))),
+        )
+
+
+@dataclass(slots=True)
+class MonitorTarget:
+    """A monitored URL with its schedule and what was seen last time."""
+
+    url: str
+    base_interval: float  # as requested
+    interval: float  # current, adapted to how often the page changes
+    next_due: float = 0.0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    statuses: str = ""  # one character per rule of Monitor.rule_names
+    checks: int = 0
+    changes: int = 0
+    failures: int = 0
+    last_checked: Optional[float] = None
+    last_changed: Optional[float] = None
+    last_error: Optional[str] = None
+    seq: int = 0  # heap entry currently scheduling this target
+
+
+@dataclass
+class MonitorAlert:
+    url: str
+    rule: str
+    before: str
+    after: str
+    message: str
+    at: float
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class Monitor:
+    """Registry of monitored URLs and the scheduler that re-checks them."""
+
+    def __init__(
+        self,
+        pipeline: AuditPipeline,
+        config: MonitorConfig | None = None,
+        store: SQLiteStore | None = None,
+        on_change: Callable[[MonitorTarget, AuditContext], None] | None = None,
+        on_alert: Callable[[MonitorAlert], None] | None = None,
+        rule_names: Sequence[str] | None = None,
+    ) -> None:
+        self.pipeline = pipeline
+        self.config = config or MonitorConfig()
+        self.store = store
+        self.on_change = on_change
+        self.on_alert = on_alert
+        self.rule_names = tuple(rule_names if rule_names is not None else (rule.name for rule in BASIC_RULES))
+        self._rule_index = {name: i for i, name in enumerate(self.rule_names)}
+        self.alerts: deque[MonitorAlert] = deque(maxlen=self.config.max_alerts)
+        self.stats: Counter = Counter()  # checks, changed, unchanged, failed, alerts
+        self._targets: dict[str, MonitorTarget] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count(1)
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.config.concurrency)
+        self._hosts = HostLimiter(self.config.per_host)
+        self._next_slot = 0.0
+        self._runner: asyncio.Task | None = None
+        self._checks: set[asyncio.Task] = set()
+
+    # Registry -------------------------------------------------------------
+
+    async def add(self, urls: Iterable[str], interval: float | None = None) -> int:
+        """Start monitoring ``urls``; returns how many were new.
+
+        For URLs already monitored only the requested interval is updated.
+        URL normalization and the store write run in a thread, so a large
+        import does not stall the event loop. Raises ValueError if ``interval``
+        is outside ``min_interval`` … ``max_interval``: the adaptive schedule
+        would move it into that range after the first change anyway.
+        """
+        config = self.config
+        if interval is not None and not config.min_interval <= interval <= config.max_interval:
+            raise ValueError(
+                f"interval must be between {config.min_interval:g} and {config.max_interval:g} seconds"
+            )
+        interval = interval or config.default_interval
+        normalized = await asyncio.to_thread(lambda: [normalize_url(url) for url in urls])
+        now = time.time()
+        changed: list[MonitorTarget] = []
+        added = 0
+        for url in normalized:
+            target = self._targets.get(url)
+            if target is None:
+                target = MonitorTarget(url=url, base_interval=interval, interval=interval)
+                self._targets[url] = target
+                self._schedule(target, now + random.uniform(0, interval))
+                added += 1
+            else:
+                target.base_interval = target.interval = interval
+            changed.append(target)
+        if self.store is not None:
+            rows = [(target.url, self._dump(target)) for target in changed]
+            await asyncio.to_thread(self.store.put_many, rows, now)
+        return added
+
+    async def remove(self, url: str) -> bool:
+        target = self._targets.pop(normalize_url(url), None)
+        if target is None:
+            return False
+        if self.store is not None:
+            await asyncio.to_thread(self.store.delete, [target.url])
+        return True  # its heap entry is skipped as stale
+
+    def get(self, url: str) -> Optional[MonitorTarget]:
+        return self._targets.get(normalize_url(url))
+
+    def targets(self, limit: int = 100, offset: int = 0) -> list[MonitorTarget]:
+        return list(itertools.islice(self._targets.values(), offset, offset + limit))
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def describe(self, target: MonitorTarget) -> dict:
+        data = self._dump(target)
+        data.pop("seq")
+        return data
+
+    # Scheduler ------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Load persisted targets (in a thread) and start the scheduler on the running loop."""
+        if self._runner is not None:
+            return
+        if self.store is not None:
+            rows = await asyncio.to_thread(lambda: list(self.store.items()))
+            for url, data in rows:
+                target = self._load(data)
+                self._targets[url] = target
+                self._schedule(target, target.next_due)
+        self._runner = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._runner is None:
+            return
+        self._runner.cancel()
+        for task in list(self._checks):
+            task.cancel()
+        await asyncio.gather(self._runner, *self._checks, return_exceptions=True)
+        self._runner = None
+
+    def backlog(self, now: float | None = None) -> int:
+        """Targets whose check is overdue."""
+        now = time.time() if now is None else now
+        return sum(1 for target in self._targets.values() if target.next_due <= now)
+
+    def _schedule(self, target: MonitorTarget, due: float) -> None:
+        target.next_due = due
+        target.seq = next(self._seq)
+        heapq.heappush(self._heap, (due, target.seq, target.url))
+        if self._heap[0][1] == target.seq:
+            self._wakeup.set()  # earlier than what the scheduler is waiting for
+
+    async def _run(self) -> None:
+        while True:
+            target = await self._next_due()
+            await self._pace()
+            await self._slots.acquire()
+            task = asyncio.ensure_future(self._check_and_release(target))
+            self._checks.add(task)
+            task.add_done_callback(self._checks.discard)
+
+    async def _next_due(self) -> MonitorTarget:
+        heap = self._heap
+        while True:
+            while heap:
+                due, seq, url = heap[0]
+                target = self._targets.get(url)
+                if target is not None and target.seq == seq:
+                    break
+                heapq.heappop(heap)  # removed or rescheduled
+            self._wakeup.clear()
+            if not heap:
+                await self._wakeup.wait()
+                continue
+            delay = heap[0][0] - time.time()
+            if delay <= 0:
+                heapq.heappop(heap)
+                target.seq = 0  # in flight: not in the heap
+                return target
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _pace(self) -> None:
+        """Release at most ``rate`` checks per second, evenly spaced."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.config.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _check_and_release(self, target: MonitorTarget) -> None:
+        try:
+            await self._hosts.run(urlparse(target.url).netloc, lambda: self.check(target))
+        except Exception:  # noqa: BLE001 - a failing check must not stop the monitor
+            logger.exception("Monitor check of %s failed", target.url)
+        finally:
+            self._slots.release()
+            if self._targets.get(target.url) is target:
+                jitter = 1 + random.uniform(-self.config.jitter, self.config.jitter)
+                self._schedule(target, time.time() + target.interval * jitter)
+                await self._save(target)
+
+    # Checks ---------------------------------------------------------------
+
+    async def check(self, target: MonitorTarget) -> bool:
+        """Check one target now; True if the page changed."""
+        now = time.time()
+        target.checks += 1
+        target.last_checked = now
+        self.stats["checks"] += 1
+        fetch = await fetch_html_async(target.url, etag=target.etag, last_modified=target.last_modified)
+        if not fetch.success and not fetch.not_modified:
+            target.failures += 1
+            target.last_error = fetch.error or f"HTTP {fetch.status_code}"
+            self.stats["failed"] += 1
+            return False
+        target.last_error = None
+        target.etag = fetch.etag or target.etag
+        target.last_modified = fetch.last_modified or target.last_modified
+        first = target.content_hash is None
+        if fetch.not_modified or fetch.content_hash == target.content_hash:
+            self.stats["unchanged"] += 1
+            target.interval = min(self.config.max_interval, target.interval * self.config.slowdown)
+            return False
+
+        # Changed (or first seen): the full pipeline runs on the body already downloaded.
+        ctx = await self.pipeline.run(target.url, AuditContext(url=target.url, fetch=fetch))
+        target.content_hash = fetch.content_hash
+        self.stats["changed"] += 1
+        if not first:
+            target.changes += 1
+            target.last_changed = now
+            target.interval = max(self.config.min_interval, target.interval * self.config.speedup)
+        if ctx.rules is not None:
+            statuses = self._encode(ctx.rules)
+            if not first:
+                self._alert(target, statuses, ctx.rules, now)
+            target.statuses = statuses
+        if self.on_change is not None:
+            self.on_change(target, ctx)
+        return True
+
+    def _encode(self, rules: list[RuleResult]) -> str:
+        chars = ["-"] * len(self.rule_names)
+        for rule in rules:
+            index = self._rule_index.get(rule.name)
+            if index is not None:
+                chars[index] = _STATUS_CHARS.get(rule.status.value, "-")
+        return "".join(chars)
+
+    def _alert(self, target: MonitorTarget, statuses: str, rules: list[RuleResult], now: float) -> None:
+        messages = {rule.name: rule.message for rule in rules}
+        for name, before, after in zip(self.rule_names, target.statuses, statuses):
+            if _SEVERITY[before] >= 0 and _SEVERITY[after] > _SEVERITY[before]:
+                alert = MonitorAlert(
+                    url=target.url,
+                    rule=name,
+                    before=_CHAR_STATUSES[before],
+                    after=_CHAR_STATUSES[after],
+                    message=messages.get(name, ""),
+                    at=now,
+                )
+                self.alerts.append(alert)
+                self.stats["alerts"] += 1
+                logger.warning("Rule %r regressed on %s: %s -> %s", name, target.url, alert.before, alert.after)
+                if self.on_alert is not None:
+                    self.on_alert(alert)
+
+    # Persistence ----------------------------------------------------------
+
+    def _dump(self, target: MonitorTarget) -> dict:
+        data = {f.name: getattr(target, f.name) for f in fields(target)}
+        # Statuses are stored by rule name so that changes to the rule set survive a restart.
+        data["statuses"] = {
+            name: _CHAR_STATUSES[char]
+            for name, char in zip(self.rule_names, target.statuses)
+            if char != "-"
+        }
+        return data
+
+    def _load(self, data: dict) -> MonitorTarget:
+        statuses = data.pop("statuses", {}) or {}
+        data.pop("seq", None)
+        target = MonitorTarget(**data)
+        if statuses:
+            target.statuses = "".join(_STATUS_CHARS.get(statuses.get(name, ""), "-") for name in self.rule_names)
+        return target
+
+    async def _save(self, target: MonitorTarget) -> None:
+        if self.store is not None:
+            # Snapshot on the loop, write and commit in a worker thread.
+            await asyncio.to_thread(self.store.put, [target.url], self._dump(target), time.time())
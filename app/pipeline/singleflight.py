@@ -0,0 +1,45 @@
+"""In-flight request coalescing ("single flight") for LP Screening.
+
+Concurrent callers asking for the same key share one running coroutine instead
+of each starting their own. The shared work runs as a separate task, so a
+caller that goes away (e.g. a client disconnect) does not cancel it for the
+others.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+__all__ = ["SingleFlight"]
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Deduplicates concurrent calls by key."""
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Task[T]] = {}
+        self.executed = 0  # calls that started the work
+        self.coalesced = 0  # calls that joined work already in flight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn`` for ``key`` unless a call for the same key is already running."""
+        task = self._inflight.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task[T]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every waiter went away
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,250 @@
+"""Bulk export of audit results for LP Screening.
+
+Exporters write many audits to one binary stream, one audit at a time, so
+memory use does not depend on the number of audits:
+
+* ``jsonl`` — one JSON object per line, ``{"url", "failed_stage", "result"}``
+  with the full audit (the same shape as the NDJSON of ``/audit/batch``);
+* ``csv`` — one flat row per audit (see :data:`COLUMNS`), one column per rule;
+* ``parquet`` — the same flat rows in a columnar file, written in row groups
+  of ``row_group_size`` audits. Requires the optional ``pyarrow`` package,
+  imported when the first Parquet exporter is created.
+
+:func:`export_stream` runs an exporter over an async stream of audits and
+yields the encoded bytes as they are produced, for ``StreamingResponse``.
+"""
+from __future__ import annotations
+
+import csv
+import importlib.util
+import io
+import json
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Optional
+
+from app.analyzers.basic import BASIC_RULES
+from app.schemas import AuditResponse
+
+__all__ = [
+    "COLUMNS",
+    "EXPORTERS",
+    "MEDIA_TYPES",
+    "CSVExporter",
+    "JSONLExporter",
+    "ParquetExporter",
+    "export_stream",
+    "flatten_audit",
+    "parquet_available",
+]
+
+# Flat columns of CSV / Parquet rows and their types; one "rule: <name>" column per rule follows.
+COLUMNS: list[tuple[str, type]] = [
+    ("url", str),
+    ("failed_stage", str),
+    ("success", bool),
+    ("status_code", int),
+    ("ssl_ok", bool),
+    ("error", str),
+    ("encoding", str),
+    ("title", str),
+    ("description_present", bool),
+    ("h1_count", int),
+    ("h2_count", int),
+    ("h3_count", int),
+    ("forms", int),
+    ("technologies", str),
+    ("language", str),
+    ("words", int),
+    ("sentences", int),
+    ("flesch", float),
+    ("readability", str),
+    ("relevance", float),
+    ("page_weight_kb", float),
+    ("render_blocking", int),
+    ("ai_readability", str),
+    ("ai_recommendations", str),
+]
+RULE_COLUMNS = [f"rule: {rule.name}" for rule in BASIC_RULES]
+
+MEDIA_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def flatten_audit(url: str, audit: Optional[AuditResponse], failed_stage: Optional[str] = None) -> dict:
+    """One flat row (:data:`COLUMNS` + rule columns) for an audit; missing values are None."""
+    row: dict = dict.fromkeys([name for name, _ in COLUMNS] + RULE_COLUMNS)
+    row["url"] = url
+    row["failed_stage"] = failed_stage
+    if audit is None:
+        return row
+    fetch = audit.fetch
+    row.update(
+        success=fetch.success,
+        status_code=fetch.status_code,
+        ssl_ok=fetch.ssl_ok,
+        error=fetch.error,
+        encoding=fetch.encoding,
+    )
+    if audit.parse is not None:
+        parse = audit.parse
+        row.update(
+            title=parse.title,
+            description_present=parse.description_present,
+            h1_count=parse.h1_count,
+            h2_count=parse.h2_count,
+            h3_count=parse.h3_count,
+            forms=parse.forms,
+            technologies=", ".join(t.name for t in parse.technologies),
+        )
+    if audit.text is not None:
+        text = audit.text
+        row.update(
+            language=text.language,
+            words=text.words,
+            sentences=text.sentences,
+            flesch=text.flesch,
+            readability=text.readability,
+            relevance=text.relevance,
+        )
+    if audit.weight is not None:
+        row["page_weight_kb"] = round(audit.weight.total_bytes / 1024, 1)
+        row["render_blocking"] = len(audit.weight.render_blocking)
+    if audit.ai is not None:
+        row["ai_readability"] = audit.ai.readability
+        row["ai_recommendations"] = " | ".join(audit.ai.recommendations)
+    for rule in audit.rules or ():
+        key = f"rule: {rule.name}"
+        if key in row:
+            row[key] = rule.status.value
+    return row
+
+
+class JSONLExporter:
+    """Full audits, one JSON object per line."""
+
+    def __init__(self, out: BinaryIO) -> None:
+        self._out = out
+
+    def write(self, url: str, audit: Optional[AuditResponse], failed_stage: Optional[str] = None) -> None:
+        record = {
+            "url": url,
+            "failed_stage": failed_stage,
+            "result": audit.model_dump(mode="json") if audit is not None else None,
+        }
+        self._out.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def close(self) -> None:
+        self._out.flush()
+
+
+class CSVExporter:
+    """Flat rows with a header line, UTF-8.
+
+    ``header=False`` leaves the header out, e.g. when appending to an existing file.
+    """
+
+    def __init__(self, out: BinaryIO, header: bool = True) -> None:
+        self._text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+        self._writer = csv.DictWriter(self._text, [name for name, _ in COLUMNS] + RULE_COLUMNS)
+        if header:
+            self._writer.writeheader()
+
+    def write(self, url: str, audit: Optional[AuditResponse], failed_stage: Optional[str] = None) -> None:
+        self._writer.writerow(flatten_audit(url, audit, failed_stage))
+
+    def close(self) -> None:
+        self._text.flush()
+        self._text.detach()  # leave ``out`` open for the caller
+
+
+class ParquetExporter:
+    """Flat rows in a Parquet file, written one row group at a time."""
+
+    def __init__(self, out: BinaryIO, row_group_size: int = 1000) -> None:
+        if not parquet_available():
+            raise RuntimeError("Parquet export requires the pyarrow package")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        arrow_types = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+        self._schema = pa.schema(
+            [(name, arrow_types[kind]) for name, kind in COLUMNS] + [(name, pa.string()) for name in RULE_COLUMNS]
+        )
+        self._writer = pq.ParquetWriter(out, self._schema, compression="zstd")
+        self._row_group_size = row_group_size
+        self._columns: dict[str, list] = {name: [] for name in self._schema.names}
+        self._rows = 0
+
+    def write(self, url: str, audit: Optional[AuditResponse], failed_stage: Optional[str] = None) -> None:
+        for name, value in flatten_audit(url, audit, failed_stage).items():
+            self._columns[name].append(value)
+        self._rows += 1
+        if self._rows >= self._row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        self._writer.write_table(self._pa.table(self._columns, schema=self._schema))
+        self._columns = {name: [] for name in self._schema.names}
+        self._rows = 0
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+EXPORTERS = {"jsonl": JSONLExporter, "csv": CSVExporter, "parquet": ParquetExporter}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that keeps written bytes until they are taken with :meth:`drain`."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def export_stream(
+    fmt: str,
+    items: AsyncIterable[tuple[str, Optional[AuditResponse], Optional[str]]],
+) -> AsyncIterator[bytes]:
+    """Encode ``(url, audit, failed_stage)`` items in format ``fmt`` as they arrive.
+
+    For Parquet, bytes are produced once per row group and for the footer.
+    """
+    sink = _ChunkSink()
+    exporter = EXPORTERS[fmt](sink)
+    async for url, audit, failed_stage in items:
+        exporter.write(url, audit, failed_stage)
+        data = sink.drain()
+        if data:
+            yield data
+    exporter.close()
+    data = sink.drain()
+    if data:
+        yield data
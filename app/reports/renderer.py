@@ -1,20 +1,50 @@
-"""HTML report renderer for LP Screening."""
+"""HTML report renderer for LP Screening.
+
+Templates are loaded and compiled once, when the module is imported, and are
+not checked for changes afterwards. Besides :func:`render_report`, which
+returns the whole page, reports can be streamed: :func:`stream_report` yields
+a single-page report piece by piece and :func:`stream_summary` renders the
+combined report of a batch while its audits are still arriving.
+"""
 from __future__ import annotations
 
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import AsyncIterable, AsyncIterator, Iterator, List
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-from app.analyzers.basic import RuleResult, RuleStatus
-from app.main import FetchInfo, ParseInfo, AIResponse  # type: ignore circular
+from app.analyzers.basic import BASIC_RULES, RuleResult, RuleStatus
+from app.schemas import AIResponse, AuditResponse, FetchInfo, ParseInfo, TextInfo
+
+__all__ = ["SummaryTotals", "render_report", "stream_report", "stream_summary"]
 
 # Template directory is relative to this file's location
 _TEMPLATE_DIR = Path(__file__).parent / "templates"
-_ENV = Environment(
-    loader=FileSystemLoader(str(_TEMPLATE_DIR)),
-    autoescape=select_autoescape(["html", "xml"]),
-)
+
+
+def _environment(enable_async: bool = False) -> Environment:
+    return Environment(
+        loader=FileSystemLoader(str(_TEMPLATE_DIR)),
+        autoescape=select_autoescape(["html", "xml"]),
+        auto_reload=False,
+        enable_async=enable_async,
+    )
+
+
+_ENV = _environment()
+# The summary iterates over audits as they finish, which needs Jinja's async mode.
+_ASYNC_ENV = _environment(enable_async=True)
+_REPORT = _ENV.get_template("report.html")
+_SUMMARY = _ASYNC_ENV.get_template("summary.html")
+
+# Template output is buffered into chunks of about this size before it is sent.
+_CHUNK_CHARS = 16 * 1024
+
+
+def _report_vars(url, fetch, parse, rules, ai, text) -> dict:
+    return dict(url=url, fetch=fetch, parse=parse, rules=rules, text=text, ai=ai, RuleStatus=RuleStatus)
 
 
 def render_report(
@@ -23,7 +53,90 @@ def render_report(
     parse: ParseInfo | None,
     rules: List[RuleResult] | None,
     ai: AIResponse | None,
+    text: TextInfo | None = None,
 ) -> str:
     """Render HTML report using Jinja2 template."""
-    tmpl = _ENV.get_template("report.html")
-    return tmpl.render(url=url, fetch=fetch, parse=parse, rules=rules, ai=ai, RuleStatus=RuleStatus) 
\ No newline at end of file
+    return _REPORT.render(**_report_vars(url, fetch, parse, rules, ai, text))
+
+
+def _chunked(parts: Iterator[str]) -> Iterator[str]:
+    buffer: list[str] = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= _CHUNK_CHARS:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_report(
+    url: str,
+    fetch: FetchInfo,
+    parse: ParseInfo | None,
+    rules: List[RuleResult] | None,
+    ai: AIResponse | None,
+    text: TextInfo | None = None,
+) -> Iterator[str]:
+    """Same report as :func:`render_report`, yielded in chunks as it is rendered."""
+    return _chunked(_REPORT.generate(**_report_vars(url, fetch, parse, rules, ai, text)))
+
+
+@dataclass
+class SummaryTotals:
+    """Aggregates of a batch, filled in while its rows are rendered."""
+
+    pages: int = 0
+    failed: Counter = field(default_factory=Counter)  # failed stage -> pages
+    violations: Counter = field(default_factory=Counter)  # rule -> pages with WARNING or ERROR
+    errors: Counter = field(default_factory=Counter)  # rule -> pages with ERROR
+
+    def add(self, audit: AuditResponse | None, failed_stage: str | None) -> None:
+        self.pages += 1
+        if failed_stage:
+            self.failed[failed_stage] += 1
+        for rule in (audit.rules if audit is not None else None) or ():
+            if rule.status != RuleStatus.OK:
+                self.violations[rule.name] += 1
+            if rule.status == RuleStatus.ERROR:
+                self.errors[rule.name] += 1
+
+
+async def stream_summary(
+    items: AsyncIterable[tuple[str, AuditResponse | None, str | None]],
+    title: str = "Сводный отчёт",
+    rule_names: List[str] | None = None,
+) -> AsyncIterator[str]:
+    """Render the combined report of many audits, one table row per finished audit.
+
+    Args:
+        items: ``(url, audit, failed_stage)`` in completion order; consumed
+            lazily, so rows are sent as audits finish and only one audit is
+            held at a time.
+        title: Heading of the report.
+        rule_names: Rule columns; defaults to the basic rules.
+
+    The totals at the end of the page are rendered after the last row.
+    """
+    totals = SummaryTotals()
+    rule_names = list(rule_names) if rule_names is not None else [rule.name for rule in BASIC_RULES]
+
+    async def rows():
+        async for url, audit, failed_stage in items:
+            totals.add(audit, failed_stage)
+            statuses = {rule.name: rule.status.value for rule in (audit.rules or ())} if audit is not None else {}
+            yield url, audit, failed_stage, statuses
+
+    buffer: list[str] = []
+    size = 0
+    async for part in _SUMMARY.generate_async(title=title, rule_names=rule_names, rows=rows(), totals=totals):
+        buffer.append(part)
+        size += len(part)
+        # Flush after every table row (the header row included): the next row waits for an audit.
+        if size >= _CHUNK_CHARS or "</tr>" in part:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
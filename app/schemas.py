@@ -0,0 +1,241 @@
+"""Response models of the LP Screening API.
+
+Shared by the API endpoints, the report renderer and the exporters, so that
+none of them has to import :mod:`app.main`. :func:`audit_response` builds an
+:class:`AuditResponse` from the context of a finished pipeline run.
+"""
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+from app.analyzers.basic import RuleStatus
+from app.collectors.page_weight import PageAsset, PageWeight
+from app.pipeline.core import AuditContext
+
+__all__ = [
+    "FetchInfo",
+    "TechnologyInfo",
+    "ParseInfo",
+    "RuleResponse",
+    "KeywordInfo",
+    "TextInfo",
+    "AIResponse",
+    "NearDuplicateInfo",
+    "AssetInfo",
+    "PageWeightInfo",
+    "AuditResponse",
+    "audit_response",
+]
+
+
+class FetchInfo(BaseModel):
+    success: bool
+    ssl_ok: bool
+    status_code: int | None = None
+    error: str | None = None
+    encoding: str | None = None
+    encoding_source: str | None = None
+
+
+class TechnologyInfo(BaseModel):
+    name: str
+    category: str
+    offset: int  # позиция первого совпадения в HTML (в символах)
+    snippet: str
+
+
+class ParseInfo(BaseModel):
+    title: str | None
+    description_present: bool
+    h1_count: int
+    h2_count: int
+    h3_count: int
+    forms: int
+    technologies: list[TechnologyInfo] = []
+    simhash: str | None = None  # отпечаток текста и заголовков (16 hex-символов) для поиска почти-дубликатов
+    rules: list["RuleResponse"] | None = None
+
+
+class RuleResponse(BaseModel):
+    name: str
+    status: RuleStatus
+    message: str
+
+
+class KeywordInfo(BaseModel):
+    keyword: str
+    count: int
+    density: float  # % слов страницы
+    tfidf: float
+    in_title: bool
+    in_headings: bool
+
+
+class TextInfo(BaseModel):
+    """Локальная оценка текста: читаемость по Флешу и релевантность ключевым словам."""
+
+    language: str
+    words: int
+    sentences: int
+    words_per_sentence: float
+    syllables_per_word: float
+    flesch: float
+    readability: str  # easy / medium / hard — та же шкала, что у ИИ
+    relevance: float | None = None  # 0–100, только при заданных ключевых словах
+    keywords: list[KeywordInfo] = []
+
+
+class AIResponse(BaseModel):
+    readability: str
+    recommendations: list[str]
+
+
+class NearDuplicateInfo(BaseModel):
+    """Ближайшая из уже проверенных страниц с почти тем же содержимым."""
+
+    url: str
+    distance: int  # число различающихся бит отпечатков
+    ai_reused: bool = False  # рекомендации ИИ взяты у этой страницы
+
+
+class AssetInfo(BaseModel):
+    url: str
+    kind: str  # script / stylesheet / image / font
+    size: int | None = None  # байт при передаче (после сжатия); None — не удалось определить
+    status: int | None = None
+    content_type: str | None = None
+    compressed: bool = False
+    cache_ttl: int | None = None  # сколько секунд браузер может не перезапрашивать файл; None — не указано
+    render_blocking: bool = False
+    error: str | None = None
+
+
+class PageWeightInfo(BaseModel):
+    """Вес страницы вместе со скриптами, стилями, изображениями и шрифтами."""
+
+    total_bytes: int  # HTML + проверенные ресурсы
+    html_bytes: int  # HTML после распаковки
+    assets: int  # проверено ресурсов
+    found: int  # ресурсов на странице
+    skipped: int  # не проверены: сверх лимита или не уложились в бюджет времени
+    unknown_size: int
+    cache_hits: int  # результаты взяты из кэша по URL ресурса
+    bytes_by_kind: dict[str, int]
+    largest: list[AssetInfo]  # крупнейшие файлы
+    render_blocking: list[AssetInfo]
+    uncompressed: list[AssetInfo]  # текстовые файлы без gzip / brotli
+    short_cache: list[AssetInfo]  # кэшируются меньше недели или без Cache-Control
+
+
+def _asset_info(asset: PageAsset) -> AssetInfo:
+    probe = asset.probe
+    return AssetInfo(
+        url=asset.url,
+        kind=asset.kind,
+        size=probe.size,
+        status=probe.status,
+        content_type=probe.content_type,
+        compressed=probe.compressed,
+        cache_ttl=probe.cache_ttl,
+        render_blocking=asset.render_blocking,
+        error=probe.error,
+    )
+
+
+def _page_weight_info(weight: PageWeight) -> PageWeightInfo:
+    return PageWeightInfo(
+        total_bytes=weight.total_bytes,
+        html_bytes=weight.html_bytes,
+        assets=len(weight.assets),
+        found=weight.found,
+        skipped=weight.skipped,
+        unknown_size=weight.unknown_size,
+        cache_hits=weight.cache_hits,
+        bytes_by_kind=weight.bytes_by_kind(),
+        largest=[_asset_info(a) for a in weight.largest()],
+        render_blocking=[_asset_info(a) for a in weight.render_blocking],
+        uncompressed=[_asset_info(a) for a in weight.uncompressed],
+        short_cache=[_asset_info(a) for a in weight.short_cache],
+    )
+
+
+class AuditResponse(BaseModel):
+    message: str
+    fetch: FetchInfo
+    parse: ParseInfo | None = None
+    rules: list[RuleResponse] | None = None
+    text: TextInfo | None = None
+    ai: AIResponse | None = None
+    near_duplicate: NearDuplicateInfo | None = None
+    weight: PageWeightInfo | None = None
+
+
+def audit_response(ctx: AuditContext) -> AuditResponse:
+    """Собирает AuditResponse из контекста выполненного конвейера."""
+    fetch_result = ctx.fetch
+    fetch_info = FetchInfo(
+        success=fetch_result.success,
+        ssl_ok=fetch_result.ssl_ok,
+        status_code=fetch_result.status_code,
+        error=fetch_result.error,
+        encoding=fetch_result.encoding,
+        encoding_source=fetch_result.encoding_source,
+    )
+
+    parse_info: ParseInfo | None = None
+    parsed = ctx.parsed
+    if parsed is not None:
+        parse_info = ParseInfo(
+            title=parsed.title,
+            description_present=bool(parsed.meta_description),
+            h1_count=parsed.heading_counts.get(1, 0),
+            h2_count=parsed.heading_counts.get(2, 0),
+            h3_count=parsed.heading_counts.get(3, 0),
+            forms=parsed.forms_count,
+            technologies=[
+                TechnologyInfo(name=t.name, category=t.category, offset=t.offset, snippet=t.snippet)
+                for t in parsed.technologies
+            ],
+            simhash=f"{parsed.simhash:016x}" if parsed.simhash is not None else None,
+        )
+
+    rules_resp: list[RuleResponse] | None = None
+    if ctx.rules is not None:
+        rules_resp = [RuleResponse(name=r.name, status=r.status, message=r.message) for r in ctx.rules]
+
+    text_info: TextInfo | None = None
+    if ctx.text is not None:
+        text = ctx.text
+        text_info = TextInfo(
+            language=text.language,
+            words=text.words,
+            sentences=text.sentences,
+            words_per_sentence=text.words_per_sentence,
+            syllables_per_word=text.syllables_per_word,
+            flesch=text.flesch,
+            readability=text.readability,
+            relevance=text.relevance,
+            keywords=[KeywordInfo(**vars(k)) for k in text.keywords],
+        )
+
+    ai_resp: AIResponse | None = None
+    if ctx.ai is not None:
+        ai_resp = AIResponse(
+            readability=ctx.ai.readability,
+            recommendations=ctx.ai.recommendations,
+        )
+
+    return AuditResponse(
+        message="Аудит выполнен.",
+        fetch=fetch_info,
+        parse=parse_info,
+        rules=rules_resp,
+        text=text_info,
+        ai=ai_resp,
+        near_duplicate=(
+            NearDuplicateInfo(url=ctx.near_duplicate.url, distance=ctx.near_duplicate.distance, ai_reused=ctx.ai_reused)
+            if ctx.near_duplicate is not None
+            else None
+        ),
+        weight=_page_weight_info(fetch_result.page_weight) if fetch_result.page_weight is not None else None,
+    )
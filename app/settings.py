@@ -0,0 +1,78 @@
+"""Application settings for LP Screening.
+
+:class:`Settings` holds what :func:`app.main.create_app` reads from the
+environment to assemble the service: the audit cache, which optional
+collectors run, where persistent state (cache, history, similarity index,
+monitored URLs) lives and which heavy subsystems are loaded at startup rather
+than on first use. :func:`get_settings` reads the environment once per
+process; with explicit settings (for example in a script or a benchmark) no
+database is opened unless the settings name it.
+
+Tuning knobs of individual components (:class:`~app.pipeline.executor.CPUExecutor`,
+:class:`~app.collectors.site_files.SiteFilesCollector`, the monitor's rate,
+the AI client, ...) are still read from the environment by their ``from_env``
+constructors.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+__all__ = ["PRELOAD_MODULES", "Settings", "get_settings"]
+
+# Subsystems that are imported on first use unless named in LP_PRELOAD.
+PRELOAD_MODULES = {
+    "ai": "openai",  # AI client (app.ai.gpt_client imports it on the first model call)
+    "reports": "app.reports.renderer",  # HTML reports (jinja2)
+    "export": "app.reports.export",  # CSV / Parquet export (pyarrow, when installed)
+}
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class Settings:
+    cache_ttl: float = 600.0  # seconds an audit result is served without revalidation
+    cache_max_entries: int = 1000
+    cache_db: Optional[str] = None  # SQLite file of the persistent cache tier
+    site_files: bool = True  # robots.txt and sitemap checks
+    page_weight: bool = True  # probe scripts, styles, images and fonts of every page
+    stream_parse: bool = False  # parse pages while they download
+    history_db: Optional[str] = None  # SQLite file of the audit history; None disables history
+    similarity: bool = True  # near-duplicate index and AI result reuse
+    similarity_db: Optional[str] = None  # SQLite file of the similarity index
+    monitor_db: Optional[str] = None  # SQLite file of monitored URLs
+    static_dir: str = "app/static"
+    preload: tuple[str, ...] = ()  # keys of PRELOAD_MODULES imported at startup
+
+    def __post_init__(self) -> None:
+        unknown = set(self.preload) - PRELOAD_MODULES.keys()
+        if unknown:
+            raise ValueError(f"Unknown LP_PRELOAD entries: {', '.join(sorted(unknown))}")
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            cache_ttl=float(os.getenv("LP_CACHE_TTL", "600")),
+            cache_max_entries=int(os.getenv("LP_CACHE_MAX_ENTRIES", "1000")),
+            cache_db=os.getenv("LP_CACHE_DB") or None,
+            site_files=_flag("LP_SITE_FILES", "1"),
+            page_weight=_flag("LP_PAGE_WEIGHT", "1"),
+            stream_parse=_flag("LP_STREAM_PARSE", ""),
+            history_db=os.getenv("LP_HISTORY_DB") or None,
+            similarity=_flag("LP_SIMILARITY", "1"),
+            similarity_db=os.getenv("LP_SIMILARITY_DB") or None,
+            monitor_db=os.getenv("LP_MONITOR_DB") or None,
+            static_dir=os.getenv("LP_STATIC_DIR", "app/static"),
+            preload=tuple(name.strip() for name in os.getenv("LP_PRELOAD", "").split(",") if name.strip()),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Settings from the environment, read on the first call."""
+    return Settings.from_env()
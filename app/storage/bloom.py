@@ -0,0 +1,108 @@
+"""Bloom filters for LP Screening.
+
+Compact set membership for large URL sets (sitemap contents, crawl frontiers)
+where an occasional false positive is acceptable and false negatives are not.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+
+__all__ = ["BloomFilter", "ScalableBloomFilter"]
+
+
+def _hashes(item: str) -> tuple[int, int]:
+    """Two independent 64-bit hashes for double hashing (Kirsch–Mitzenmacher).
+
+    Uses a stable digest rather than ``hash()`` (randomized per process) so
+    filters stay valid when pickled to other processes.
+    """
+    digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for ``capacity`` items at ``error_rate``."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0  # items added (duplicates included)
+
+    def add(self, item: str) -> bool:
+        """Add ``item``; return True if it was (probably) already present."""
+        return self._add(*_hashes(item))
+
+    def __contains__(self, item: str) -> bool:
+        return self._contains(*_hashes(item))
+
+    def _add(self, h1: int, h2: int) -> bool:
+        present = True
+        bits, m = self._bits, self.num_bits
+        for i in range(self.num_hashes):
+            pos = (h1 + i * h2) % m
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+        if not present:
+            self.count += 1
+        return present
+
+    def _contains(self, h1: int, h2: int) -> bool:
+        bits, m = self._bits, self.num_bits
+        for i in range(self.num_hashes):
+            pos = (h1 + i * h2) % m
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows as items are added.
+
+    Starts with ``initial_capacity`` and appends filters of doubling capacity
+    (and tightening error rate) when the current one is full, so memory stays
+    proportional to the number of items while the overall false positive rate
+    stays below ``error_rate``.
+    """
+
+    def __init__(self, initial_capacity: int = 1024, error_rate: float = 0.01) -> None:
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self._filters: list[BloomFilter] = []
+
+    def add(self, item: str) -> bool:
+        """Add ``item``; return True if it was (probably) already present."""
+        h1, h2 = _hashes(item)
+        if any(f._contains(h1, h2) for f in self._filters):
+            return True
+        if not self._filters or self._filters[-1].count >= self._filters[-1].capacity:
+            n = len(self._filters)
+            self._filters.append(
+                BloomFilter(self.initial_capacity * 2**n, self.error_rate * 0.5 ** (n + 1))
+            )
+        self._filters[-1]._add(h1, h2)
+        return False
+
+    def __contains__(self, item: str) -> bool:
+        h1, h2 = _hashes(item)
+        return any(f._contains(h1, h2) for f in self._filters)
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self._filters)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(f.nbytes for f in self._filters)
@@ -0,0 +1,193 @@
+"""Audit result cache for LP Screening.
+
+Audits are cached by normalized URL in an in-memory LRU with a TTL, optionally
+backed by a SQLite file so that entries survive restarts. Expired entries are
+not discarded: they keep their HTTP validators (ETag / Last-Modified) and the
+body digest so the caller can revalidate them with a conditional GET and skip
+parsing, rules and the AI call when the page has not changed.
+
+Lookups and writes are coroutines: the memory tier is used on the event loop,
+SQLite reads and commits run in a worker thread.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Iterable, Iterator, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+__all__ = ["CacheEntry", "CacheStats", "SQLiteStore", "AuditCache", "normalize_url"]
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for use as a cache key.
+
+    Lower-cases scheme and host, drops the default port and the fragment and
+    replaces an empty path with ``/``. The query string is kept as is.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+@dataclass
+class CacheEntry:
+    """Cached audit payload together with what is needed to revalidate it."""
+
+    payload: dict
+    final_url: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: Optional[str]
+    stored_at: float
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0  # served fresh from cache
+    misses: int = 0  # no entry, full pipeline
+    revalidated: int = 0  # stale entry confirmed unchanged (304 or same body hash)
+    refreshed: int = 0  # stale entry whose page changed, full pipeline
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class SQLiteStore:
+    """Tiny key → JSON store on top of SQLite used as the persistent cache tier."""
+
+    def __init__(self, path: str, table: str = "audit_cache", max_entries: int = 100_000) -> None:
+        self._table = table
+        self._max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_stored_at ON {table}(stored_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT value FROM {self._table} WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, keys: Iterable[str], value: dict, stored_at: float) -> None:
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, stored_at) VALUES (?, ?, ?)",
+                [(key, data, stored_at) for key in keys],
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune()
+            self._conn.commit()
+
+    def put_many(self, items: Iterable[tuple[str, dict]], stored_at: float) -> None:
+        """Store several ``(key, value)`` pairs in one transaction."""
+        rows = [(key, json.dumps(value, ensure_ascii=False), stored_at) for key, value in items]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, stored_at) VALUES (?, ?, ?)", rows
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune()
+            self._conn.commit()
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany(f"DELETE FROM {self._table} WHERE key = ?", [(key,) for key in keys])
+            self._conn.commit()
+
+    def items(self) -> Iterator[tuple[str, dict]]:
+        """All stored ``(key, value)`` pairs, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT key, value FROM {self._table} ORDER BY stored_at").fetchall()
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def _prune(self) -> None:
+        """Drop the oldest rows once the table grows beyond ``max_entries``."""
+        self._conn.execute(
+            f"DELETE FROM {self._table} WHERE key IN ("
+            f"SELECT key FROM {self._table} ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self._max_entries,),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class AuditCache:
+    """Two-tier (memory LRU + optional SQLite) cache of audit results."""
+
+    def __init__(self, ttl: float = 600, max_entries: int = 1000, store: SQLiteStore | None = None) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store = store
+        self.stats = CacheStats()
+        self._memory: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    def is_fresh(self, entry: CacheEntry, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        return now - entry.stored_at < self.ttl
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for ``key`` (fresh or stale) or None."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+        if self.store is not None:
+            data = await asyncio.to_thread(self.store.get, key)
+            if data is not None:
+                entry = CacheEntry(**data)
+                self._remember(key, entry)
+                return entry
+        return None
+
+    async def put(self, keys: Iterable[str], entry: CacheEntry) -> None:
+        keys = list(dict.fromkeys(keys))
+        for key in keys:
+            self._remember(key, entry)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.put, keys, asdict(entry), entry.stored_at)
+
+    async def touch(self, keys: Iterable[str], entry: CacheEntry, etag: str | None = None, last_modified: str | None = None) -> CacheEntry:
+        """Mark a revalidated entry as fresh again, updating its validators."""
+        renewed = CacheEntry(
+            payload=entry.payload,
+            final_url=entry.final_url,
+            etag=etag or entry.etag,
+            last_modified=last_modified or entry.last_modified,
+            content_hash=entry.content_hash,
+            stored_at=time.time(),
+        )
+        await self.put(keys, renewed)
+        return renewed
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._memory)
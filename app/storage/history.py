@@ -0,0 +1,397 @@
+"""Persistent audit history for LP Screening.
+
+Every completed audit run is appended to a SQLite database in WAL mode, so
+reads never wait for writes. The request path only puts the run on a queue:
+a background writer thread drains the queue and commits whatever has piled
+up in one transaction (group commit), so under load many runs share a commit.
+
+Layout, chosen to keep rows small and queries index-only with millions of runs:
+
+* ``urls``    – one row per normalized URL with its domain and the id/time of
+  its latest run ("latest audit per URL" is a primary-key or domain-index
+  lookup, not a scan over runs);
+* ``runs``    – one row per run: url id, time, fetch outcome and the full
+  response as zlib-compressed JSON; indexed by (url, time) and time;
+* ``rules`` / ``rule_results`` – rule names interned to ids and one
+  ``(run, rule, status)`` row per rule result, for status trends.
+
+:func:`diff_payloads` compares two stored runs field by field.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+from urllib.parse import urlsplit
+
+from app.storage.cache import normalize_url
+
+__all__ = ["RunRecord", "HistoryStore", "diff_payloads"]
+
+logger = logging.getLogger(__name__)
+
+_STATUSES = ("OK", "WARNING", "ERROR")
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    domain TEXT NOT NULL,
+    latest_run INTEGER,
+    latest_at REAL
+);
+CREATE INDEX IF NOT EXISTS urls_domain ON urls(domain);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    url_id INTEGER NOT NULL,
+    audited_at REAL NOT NULL,
+    success INTEGER NOT NULL,
+    status_code INTEGER,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_url_time ON runs(url_id, audited_at);
+CREATE INDEX IF NOT EXISTS runs_time ON runs(audited_at);
+CREATE TABLE IF NOT EXISTS rules (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS rule_results (
+    run_id INTEGER NOT NULL,
+    rule_id INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    PRIMARY KEY (run_id, rule_id)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass
+class RunRecord:
+    """One audit run waiting to be written."""
+
+    url: str  # normalized by the writer
+    payload: dict  # AuditResponse as JSON-compatible data
+    audited_at: float
+
+
+def _domain(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class HistoryStore:
+    """Append-only audit history with a batched background writer."""
+
+    def __init__(self, path: str, batch_size: int = 500, max_pending: int = 10_000) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.dropped = 0  # runs not recorded because the write queue was full
+        self.written = 0
+        self._conn = _connect(path)  # used by the writer thread only
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._read = _connect(path)
+        self._read_lock = threading.Lock()
+        self._url_ids: dict[str, int] = {}
+        self._rule_ids: dict[str, int] = {}
+        self._load_rule_ids()
+        self._queue: queue.Queue[Optional[RunRecord]] = queue.Queue(max_pending)
+        self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def from_env(cls, path: str) -> "HistoryStore":
+        """Store at ``path`` tuned by ``LP_HISTORY_BATCH`` and ``LP_HISTORY_MAX_PENDING``."""
+        return cls(
+            path,
+            batch_size=int(os.getenv("LP_HISTORY_BATCH", "500")),
+            max_pending=int(os.getenv("LP_HISTORY_MAX_PENDING", "10000")),
+        )
+
+    # Writing --------------------------------------------------------------
+
+    def record(self, url: str, payload: dict, audited_at: float | None = None) -> bool:
+        """Queue a run for writing; never blocks. False if the queue is full."""
+        run = RunRecord(url, payload, time.time() if audited_at is None else audited_at)
+        try:
+            self._queue.put_nowait(run)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self) -> None:
+        """Wait until every queued run is written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write what is queued, stop the writer and close the database."""
+        self._queue.put(None)
+        self._writer.join()
+        with self._read_lock:
+            self._read.close()
+        self._conn.close()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            # Group commit: take whatever else is already waiting.
+            while first is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                if batch[-1] is None:
+                    break
+            runs = [run for run in batch if run is not None]
+            try:
+                if runs:
+                    self._write(runs)
+                    self.written += len(runs)
+            except Exception:  # keep the writer alive; the batch is lost
+                logger.exception("Failed to write %d audit runs to history", len(runs))
+                self._conn.rollback()
+                self._url_ids.clear()  # ids of rolled-back inserts must not be reused
+                self._load_rule_ids()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write(self, runs: list[RunRecord]) -> None:
+        conn = self._conn
+        rule_rows: list[tuple[int, int, int]] = []
+        latest: dict[int, tuple[int, float]] = {}
+        with conn:  # one transaction per batch
+            for run in runs:
+                url_id = self._url_id(normalize_url(run.url))
+                fetch = run.payload.get("fetch") or {}
+                cursor = conn.execute(
+                    "INSERT INTO runs (url_id, audited_at, success, status_code, payload) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        url_id,
+                        run.audited_at,
+                        int(bool(fetch.get("success"))),
+                        fetch.get("status_code"),
+                        zlib.compress(json.dumps(run.payload, ensure_ascii=False).encode("utf-8")),
+                    ),
+                )
+                run_id = cursor.lastrowid
+                for rule in run.payload.get("rules") or ():
+                    rule_rows.append((run_id, self._rule_id(rule["name"]), _STATUS_CODES.get(rule["status"], 2)))
+                if url_id not in latest or latest[url_id][1] <= run.audited_at:
+                    latest[url_id] = (run_id, run.audited_at)
+            conn.executemany(
+                "INSERT OR REPLACE INTO rule_results (run_id, rule_id, status) VALUES (?, ?, ?)", rule_rows
+            )
+            conn.executemany(
+                "UPDATE urls SET latest_run = ?, latest_at = ? WHERE id = ? AND (latest_at IS NULL OR latest_at <= ?)",
+                [(run_id, at, url_id, at) for url_id, (run_id, at) in latest.items()],
+            )
+
+    def _load_rule_ids(self) -> None:
+        self._rule_ids = {name: rule_id for rule_id, name in self._conn.execute("SELECT id, name FROM rules")}
+
+    def _url_id(self, url: str) -> int:
+        url_id = self._url_ids.get(url)
+        if url_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO urls (url, domain) VALUES (?, ?)", (url, _domain(url)))
+            url_id = self._conn.execute("SELECT id FROM urls WHERE url = ?", (url,)).fetchone()[0]
+            if len(self._url_ids) >= 100_000:
+                self._url_ids.clear()
+            self._url_ids[url] = url_id
+        return url_id
+
+    def _rule_id(self, name: str) -> int:
+        rule_id = self._rule_ids.get(name)
+        if rule_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO rules (name) VALUES (?)", (name,))
+            rule_id = self._conn.execute("SELECT id FROM rules WHERE name = ?", (name,)).fetchone()[0]
+            self._rule_ids[name] = rule_id
+        return rule_id
+
+    # Queries --------------------------------------------------------------
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> list[tuple]:
+        with self._read_lock:
+            return self._read.execute(sql, tuple(params)).fetchall()
+
+    def _summaries(self, rows: list[tuple]) -> list[dict]:
+        """Run summaries with rule status counts for rows of (id, url, audited_at, success, status_code)."""
+        counts: dict[int, Counter] = {row[0]: Counter() for row in rows}
+        if counts:
+            marks = ",".join("?" * len(counts))
+            for run_id, status, n in self._query(
+                f"SELECT run_id, status, COUNT(*) FROM rule_results WHERE run_id IN ({marks}) GROUP BY run_id, status",
+                counts,
+            ):
+                counts[run_id][_STATUSES[status]] = n
+        return [
+            {
+                "id": run_id,
+                "url": url,
+                "audited_at": audited_at,
+                "success": bool(success),
+                "status_code": status_code,
+                "rules": {status: counts[run_id][status] for status in _STATUSES},
+            }
+            for run_id, url, audited_at, success, status_code in rows
+        ]
+
+    def runs(self, url: str, limit: int = 20, before: float | None = None) -> list[dict]:
+        """Runs of ``url``, newest first; ``before`` pages back by audit time."""
+        rows = self._query(
+            "SELECT r.id, u.url, r.audited_at, r.success, r.status_code FROM urls u"
+            " JOIN runs r ON r.url_id = u.id"
+            " WHERE u.url = ? AND r.audited_at < ? ORDER BY r.audited_at DESC LIMIT ?",
+            (normalize_url(url), before if before is not None else float("inf"), limit),
+        )
+        return self._summaries(rows)
+
+    def latest(self, url: str | None = None, domain: str | None = None, limit: int = 100, offset: int = 0) -> list[dict]:
+        """Latest run per URL: for one URL, or for every URL of ``domain``."""
+        if url is not None:
+            where, params = "u.url = ?", [normalize_url(url)]
+        elif domain is not None:
+            where, params = "u.domain = ?", [domain.lower()]
+        else:
+            raise ValueError("url or domain is required")
+        rows = self._query(
+            "SELECT r.id, u.url, r.audited_at, r.success, r.status_code FROM urls u"
+            f" JOIN runs r ON r.id = u.latest_run WHERE {where} ORDER BY u.url LIMIT ? OFFSET ?",
+            [*params, limit, offset],
+        )
+        return self._summaries(rows)
+
+    def get(self, run_id: int) -> Optional[dict]:
+        """A stored run with its full response payload."""
+        rows = self._query(
+            "SELECT r.id, u.url, r.audited_at, r.success, r.status_code, r.payload FROM runs r"
+            " JOIN urls u ON u.id = r.url_id WHERE r.id = ?",
+            (run_id,),
+        )
+        if not rows:
+            return None
+        run_id, url, audited_at, success, status_code, payload = rows[0]
+        return {
+            "id": run_id,
+            "url": url,
+            "audited_at": audited_at,
+            "success": bool(success),
+            "status_code": status_code,
+            "payload": json.loads(zlib.decompress(payload)),
+        }
+
+    def trend(
+        self,
+        url: str | None = None,
+        domain: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        bucket: float = 86400,
+    ) -> list[dict]:
+        """Rule status counts per time bucket (seconds), oldest first."""
+        if url is not None:
+            where, params = "u.url = ?", [normalize_url(url)]
+        elif domain is not None:
+            where, params = "u.domain = ?", [domain.lower()]
+        else:
+            raise ValueError("url or domain is required")
+        rows = self._query(
+            "SELECT CAST(r.audited_at / ? AS INTEGER) AS b, rl.name, rr.status, COUNT(*)"
+            " FROM urls u JOIN runs r ON r.url_id = u.id"
+            " JOIN rule_results rr ON rr.run_id = r.id JOIN rules rl ON rl.id = rr.rule_id"
+            f" WHERE {where} AND r.audited_at >= ? AND r.audited_at < ?"
+            " GROUP BY b, rl.name, rr.status ORDER BY b, rl.name",
+            [bucket, *params, since or 0.0, until if until is not None else float("inf")],
+        )
+        points: dict[tuple[int, str], dict] = {}
+        for b, rule, status, n in rows:
+            point = points.setdefault((b, rule), {"t": b * bucket, "rule": rule, **dict.fromkeys(_STATUSES, 0)})
+            point[_STATUSES[status]] = n
+        return list(points.values())
+
+    def diff(self, a: int, b: int) -> Optional[dict]:
+        """Field-level differences between runs ``a`` and ``b``."""
+        before, after = self.get(a), self.get(b)
+        if before is None or after is None:
+            return None
+        meta = ("id", "url", "audited_at")
+        return {
+            "a": {key: before[key] for key in meta},
+            "b": {key: after[key] for key in meta},
+            "changes": diff_payloads(before["payload"], after["payload"]),
+        }
+
+    def stats(self) -> dict:
+        # Rows are never deleted and rowids of rolled-back inserts are reused, so the
+        # largest id is the row count: a b-tree lookup instead of a scan of the table.
+        # Unlike a counter kept by the writer, it includes runs written by other processes.
+        (runs,), = self._query("SELECT MAX(id) FROM runs")
+        (urls,), = self._query("SELECT MAX(id) FROM urls")
+        return {
+            "runs": runs or 0,
+            "urls": urls or 0,
+            "written": self.written,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+        }
+
+
+# Diffs ----------------------------------------------------------------------
+
+# Keys that identify items of lists compared by identity rather than position.
+_ITEM_KEYS = ("name", "keyword")
+
+
+def _item_key(value: list) -> Optional[str]:
+    for key in _ITEM_KEYS:
+        if all(isinstance(item, dict) and key in item for item in value):
+            return key
+    return None
+
+
+def _flatten(value: Any, prefix: str, out: dict[str, Any]) -> None:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(item, f"{prefix}.{key}" if prefix else str(key), out)
+        return
+    key = _item_key(value) if isinstance(value, list) and value else None
+    if key is None:
+        out[prefix] = value
+        return
+    for item in value:
+        _flatten({k: v for k, v in item.items() if k != key}, f"{prefix}[{item[key]}]", out)
+
+
+def diff_payloads(before: dict, after: dict) -> list[dict]:
+    """Changed fields between two audit payloads as ``{"field", "before", "after"}``.
+
+    Nested fields are addressed by dotted paths; rules, technologies and
+    keywords by name (``rules[Title].status``). Fields missing on one side are None.
+    """
+    old: dict[str, Any] = {}
+    new: dict[str, Any] = {}
+    _flatten(before, "", old)
+    _flatten(after, "", new)
+    return [
+        {"field": field, "before": old.get(field), "after": new.get(field)}
+        for field in sorted(old.keys() | new.keys())
+        if old.get(field) != new.get(field)
+    ]
@@ -0,0 +1,385 @@
+"""Near-duplicate index of audited pages for LP Screening.
+
+Pages are indexed by the 64-bit SimHash the parser computes for every page
+(:mod:`app.parsers.simhash`); two pages are near-duplicates when their
+fingerprints differ in at most ``max_distance`` bits.
+
+A lookup does not compare the query with every page (multi-index hashing).
+The fingerprint is cut into 4 bands of 16 bits, and every band value maps to
+the pages that have it. Fingerprints that differ in at most ``max_distance``
+bits differ in at most ``max_distance // 4`` bits of at least one band
+(pigeonhole principle), so the candidates are the pages whose value in some
+band is within that many bits of the query's: for the default distance of 6,
+each band value and its 16 one-bit neighbours. No near-duplicate is missed,
+and with 500 000 unrelated pages a bucket holds about 8 of them, so a lookup
+checks a few hundred candidates instead of the whole index.
+
+Landing pages are short, so a changed city name and phone number already
+move the fingerprint by 2–5 bits, while different pages built on the same
+template stay 15+ bits apart; hence the default of 6.
+
+The index also keeps the AI recommendations of analyzed pages, so that a
+near-identical page can reuse them instead of another model call
+(:meth:`SimilarityIndex.reusable_ai`), and groups the pages of a domain into
+clusters of near-duplicates (:meth:`SimilarityIndex.clusters`). Entries can
+persist in a :class:`~app.storage.cache.SQLiteStore`: updates only queue the
+changed entry, and a background writer thread commits what has piled up in one
+transaction; :meth:`SimilarityIndex.load` reads the stored entries in a thread.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from itertools import combinations
+from typing import Generic, Hashable, Iterator, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from app.ai.gpt_client import AIResult
+from app.parsers.simhash import FINGERPRINT_BITS, hamming
+from app.storage.cache import SQLiteStore, normalize_url
+
+__all__ = ["IndexedPage", "NearDuplicate", "SimilarityStats", "SimilarityIndex"]
+
+logger = logging.getLogger(__name__)
+
+_BANDS = 4
+_BAND_BITS = FINGERPRINT_BITS // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+MAX_DISTANCE = 11  # beyond this, probing 2+ bits per band gets slow and near-duplicates get loose
+
+K = TypeVar("K", bound=Hashable)
+
+
+@dataclass(slots=True)
+class IndexedPage:
+    url: str  # normalized
+    domain: str
+    simhash: int
+    indexed_at: float
+    ai: Optional[AIResult] = None  # recommendations of this page, reusable by its near-duplicates
+
+
+@dataclass(slots=True)
+class NearDuplicate:
+    url: str
+    distance: int  # differing fingerprint bits
+
+
+@dataclass
+class SimilarityStats:
+    lookups: int = 0
+    matches: int = 0  # lookups that found a near-duplicate
+    ai_reused: int = 0  # AI results taken from a near-duplicate instead of a model call
+    dropped: int = 0  # updates not persisted because the write queue was full
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _domain(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+class _BandTables(Generic[K]):
+    """Fingerprints by band value, for candidates within ``max_distance`` bits."""
+
+    def __init__(self, max_distance: int) -> None:
+        radius = max_distance // _BANDS
+        # Every band value differing from the query's in at most ``radius`` bits.
+        self._probes = [
+            sum(1 << bit for bit in bits) for r in range(radius + 1) for bits in combinations(range(_BAND_BITS), r)
+        ]
+        self._tables: list[dict[int, dict[K, int]]] = [{} for _ in range(_BANDS)]
+
+    @staticmethod
+    def _keys(simhash: int) -> Iterator[int]:
+        return (simhash >> (band * _BAND_BITS) & _BAND_MASK for band in range(_BANDS))
+
+    def add(self, key: K, simhash: int) -> None:
+        for table, value in zip(self._tables, self._keys(simhash)):
+            table.setdefault(value, {})[key] = simhash
+
+    def discard(self, key: K, simhash: int) -> None:
+        for table, value in zip(self._tables, self._keys(simhash)):
+            bucket = table.get(value)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del table[value]
+
+    def candidates(self, simhash: int) -> dict[K, int]:
+        """Entries that may be within ``max_distance`` bits, with their fingerprints."""
+        found: dict[K, int] = {}
+        for table, value in zip(self._tables, self._keys(simhash)):
+            for probe in self._probes:
+                bucket = table.get(value ^ probe)
+                if bucket:
+                    found.update(bucket)
+        return found
+
+
+class SimilarityIndex:
+    """In-memory LSH index of page fingerprints, optionally backed by SQLite.
+
+    Args:
+        max_distance: Largest Hamming distance between near-duplicates.
+        max_entries: Pages kept; the least recently indexed are dropped first.
+        min_words: Pages with fewer words are neither indexed nor matched:
+            the fingerprints of near-empty pages (app shells, stubs) say little
+            about their content.
+        store: Optional persistent tier; read by :meth:`load`.
+        max_pending: Updates waiting for the store writer at most.
+    """
+
+    def __init__(
+        self,
+        max_distance: int = 6,
+        max_entries: int = 500_000,
+        min_words: int = 50,
+        store: SQLiteStore | None = None,
+        max_pending: int = 10_000,
+    ) -> None:
+        if not 0 <= max_distance <= MAX_DISTANCE:
+            raise ValueError(f"max_distance must be between 0 and {MAX_DISTANCE}")
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.min_words = min_words
+        self.store = store
+        self.stats = SimilarityStats()
+        self._tables: _BandTables[str] = _BandTables(max_distance)
+        self._pages: OrderedDict[str, IndexedPage] = OrderedDict()
+        self._domains: dict[str, set[str]] = {}
+        # (url, entry) to store, or (url, None) to delete; None stops the writer.
+        self._queue: queue.Queue[Optional[tuple[str, Optional[dict]]]] = queue.Queue(max_pending)
+        self._writer: threading.Thread | None = None
+        if store is not None:
+            self._writer = threading.Thread(target=self._run, name="similarity-writer", daemon=True)
+            self._writer.start()
+
+    @classmethod
+    def from_env(cls, path: str | None = None) -> "SimilarityIndex":
+        """Index tuned by ``LP_SIMILARITY_*``, persisted at ``path`` when given."""
+        max_entries = int(os.getenv("LP_SIMILARITY_MAX_ENTRIES", "500000"))
+        return cls(
+            max_distance=int(os.getenv("LP_SIMILARITY_MAX_DISTANCE", "6")),
+            max_entries=max_entries,
+            min_words=int(os.getenv("LP_SIMILARITY_MIN_WORDS", "50")),
+            store=SQLiteStore(path, table="similarity", max_entries=max_entries) if path else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(self, url: str) -> Optional[IndexedPage]:
+        return self._pages.get(normalize_url(url))
+
+    async def load(self) -> int:
+        """Index the stored entries, oldest first, in a worker thread; returns how many were read.
+
+        Meant for startup, before the index is updated from the event loop.
+        """
+        if self.store is None:
+            return 0
+        return await asyncio.to_thread(self._load)
+
+    def _load(self) -> int:
+        count = 0
+        for url, data in self.store.items():
+            ai = data.get("ai")
+            self._insert(
+                IndexedPage(
+                    url=url,
+                    domain=_domain(url),
+                    simhash=int(data["simhash"], 16),
+                    indexed_at=data["indexed_at"],
+                    ai=AIResult(ai["readability"], ai["recommendations"]) if ai else None,
+                )
+            )
+            count += 1
+        return count
+
+    # Updating ---------------------------------------------------------------
+
+    def add(self, url: str, simhash: int, words: int) -> bool:
+        """Index a page (replacing its previous fingerprint); False if it is too short to index.
+
+        The page keeps its AI result if its fingerprint stayed within ``max_distance``.
+        """
+        key = normalize_url(url)
+        previous = self._pages.get(key)
+        if words < self.min_words:
+            if previous is not None:
+                self.remove(key)
+            return False
+        ai = None
+        if previous is not None:
+            if hamming(previous.simhash, simhash) <= self.max_distance:
+                ai = previous.ai
+            self._discard(previous)
+        page = IndexedPage(key, _domain(key), simhash, time.time(), ai)
+        self._insert(page)
+        self._save(page)
+        return True
+
+    def set_ai(self, url: str, ai: AIResult) -> None:
+        """Remember the AI result of an indexed page."""
+        page = self._pages.get(normalize_url(url))
+        if page is not None:
+            page.ai = AIResult(ai.readability, list(ai.recommendations))
+            self._save(page)
+
+    def remove(self, url: str) -> bool:
+        page = self._pages.get(normalize_url(url))
+        if page is None:
+            return False
+        self._discard(page)
+        self._enqueue(page.url, None)
+        return True
+
+    def _insert(self, page: IndexedPage) -> None:
+        self._pages[page.url] = page
+        self._pages.move_to_end(page.url)
+        self._tables.add(page.url, page.simhash)
+        self._domains.setdefault(page.domain, set()).add(page.url)
+        while len(self._pages) > self.max_entries:
+            self._discard(next(iter(self._pages.values())))
+
+    def _discard(self, page: IndexedPage) -> None:
+        del self._pages[page.url]
+        self._tables.discard(page.url, page.simhash)
+        urls = self._domains[page.domain]
+        urls.discard(page.url)
+        if not urls:
+            del self._domains[page.domain]
+
+    def _save(self, page: IndexedPage) -> None:
+        if self.store is None:
+            return
+        data = {
+            "simhash": f"{page.simhash:016x}",
+            "indexed_at": page.indexed_at,
+            "ai": {"readability": page.ai.readability, "recommendations": page.ai.recommendations} if page.ai else None,
+        }
+        self._enqueue(page.url, data)
+
+    def _enqueue(self, url: str, data: Optional[dict]) -> None:
+        """Queue a store update for the writer thread; never blocks."""
+        if self.store is None:
+            return
+        try:
+            self._queue.put_nowait((url, data))
+        except queue.Full:
+            self.stats.dropped += 1
+
+    def flush(self) -> None:
+        """Wait until every queued update is stored."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            while first is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                if batch[-1] is None:
+                    break
+            # The last update of a URL wins; stored and deleted URLs are then disjoint.
+            latest = dict(update for update in batch if update is not None)
+            try:
+                rows = [(url, data) for url, data in latest.items() if data is not None]
+                if rows:
+                    self.store.put_many(rows, time.time())
+                deleted = [url for url, data in latest.items() if data is None]
+                if deleted:
+                    self.store.delete(deleted)
+            except Exception:  # keep the writer alive; these updates are lost
+                logger.exception("Failed to store %d similarity index entries", len(latest))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    # Queries ----------------------------------------------------------------
+
+    def near(self, simhash: int, exclude: str | None = None, limit: int = 10) -> list[NearDuplicate]:
+        """Indexed pages within ``max_distance`` of a fingerprint, nearest first."""
+        exclude = normalize_url(exclude) if exclude else None
+        found = []
+        for url, other in self._tables.candidates(simhash).items():
+            distance = hamming(other, simhash)
+            if distance <= self.max_distance and url != exclude:
+                found.append(NearDuplicate(url, distance))
+        found.sort(key=lambda match: (match.distance, match.url))
+        return found[:limit]
+
+    def nearest(self, url: str, simhash: int, words: int) -> Optional[NearDuplicate]:
+        """The nearest other page of the index, if any is a near-duplicate."""
+        if words < self.min_words:
+            return None
+        self.stats.lookups += 1
+        found = self.near(simhash, exclude=url, limit=1)
+        if found:
+            self.stats.matches += 1
+        return found[0] if found else None
+
+    def reusable_ai(self, url: str, simhash: int, words: int) -> Optional[tuple[NearDuplicate, AIResult]]:
+        """The AI result of the nearest other analyzed near-duplicate of a page, if any."""
+        if words < self.min_words:
+            return None
+        for match in self.near(simhash, exclude=url, limit=len(self._pages)):
+            ai = self._pages[match.url].ai
+            if ai is not None:
+                self.stats.ai_reused += 1
+                return match, AIResult(ai.readability, list(ai.recommendations))
+        return None
+
+    def clusters(self, domain: str, min_size: int = 2) -> list[list[IndexedPage]]:
+        """Groups of near-duplicate pages of a domain, largest first.
+
+        A page belongs to a group if it is a near-duplicate of any page of the
+        group, so pages at the two ends of a long chain can differ more than
+        ``max_distance`` bits. Works on a snapshot of the domain's pages, so it
+        can run in a thread while the index is updated.
+        """
+        pages = [self._pages[url] for url in list(self._domains.get(domain.lower(), ()))]
+        tables: _BandTables[int] = _BandTables(self.max_distance)
+        for i, page in enumerate(pages):
+            tables.add(i, page.simhash)
+        parent = list(range(len(pages)))
+
+        def root(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, page in enumerate(pages):
+            for j, other in tables.candidates(page.simhash).items():
+                if j > i and root(i) != root(j) and hamming(page.simhash, other) <= self.max_distance:
+                    parent[root(j)] = root(i)
+
+        groups: dict[int, list[IndexedPage]] = {}
+        for i, page in enumerate(pages):
+            groups.setdefault(root(i), []).append(page)
+        result = [sorted(group, key=lambda page: page.url) for group in groups.values() if len(group) >= min_size]
+        result.sort(key=lambda group: (-len(group), group[0].url))
+        return result
+
+    def close(self) -> None:
+        """Store what is queued, stop the writer and close the store."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if self.store is not None:
+            self.store.close()
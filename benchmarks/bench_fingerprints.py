@@ -0,0 +1,87 @@
+"""Micro-benchmark for the technology fingerprint engine.
+
+Shows that scan time grows with page size but stays flat as the signature
+database grows, and compares it with the naive approach (one substring search
+per signature).
+
+Usage::
+
+    python -m benchmarks.bench_fingerprints
+"""
+from __future__ import annotations
+
+import random
+import string
+import time
+
+from app.parsers.fingerprints import FingerprintDB, Signature, default_db
+
+_ALPHABET = string.ascii_lowercase + string.digits + ".-/_"
+
+
+def _synthetic_db(size: int, seed: int = 1) -> FingerprintDB:
+    """The bundled signatures padded with random domain-like patterns up to ``size``."""
+    rnd = random.Random(seed)
+    signatures = list(default_db().signatures)
+    while len(signatures) < size:
+        host = "".join(rnd.choices(_ALPHABET, k=rnd.randint(8, 24)))
+        signatures.append(Signature(f"Synthetic {len(signatures)}", "synthetic", f"cdn.{host}.com"))
+    return FingerprintDB(signatures[:size])
+
+
+def _page(size: int, seed: int = 2) -> str:
+    """Script-heavy HTML of roughly ``size`` characters with a few real signatures."""
+    rnd = random.Random(seed)
+    parts = ['<script async src="https://www.googletagmanager.com/gtm.js?id=GTM-ABC"></script>']
+    total = 0
+    while total < size:
+        word = "".join(rnd.choices(string.ascii_letters + "   ", k=rnd.randint(20, 80)))
+        chunk = f'<div class="c{rnd.randint(0, 99)}"><a href="/p/{rnd.randint(0, 9999)}">{word}</a></div>\n'
+        parts.append(chunk)
+        total += len(chunk)
+    parts.append('<script src="//code.jivosite.com/widget/x"></script>')
+    return "".join(parts)
+
+
+def _best(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _scan(db: FingerprintDB, html: str) -> None:
+    scanner = db.scanner()
+    scanner.feed(html)
+    scanner.results()
+
+
+def _naive(patterns: list[str], html: str) -> None:
+    lowered = html.lower()
+    [p for p in patterns if p in lowered]
+
+
+def main() -> None:
+    page = _page(500_000)
+    print(f"Page size {len(page) / 1024:.0f} KB; time per scan, ms (best of 5)\n")
+    print(f"{'signatures':>10} {'trie regex':>12} {'naive loop':>12}")
+    for size in (len(default_db()), 1_000, 5_000, 20_000):
+        db = _synthetic_db(size)
+        patterns = sorted({s.pattern for s in db.signatures}, key=len, reverse=True)
+        trie = _best(lambda: _scan(db, page)) * 1000
+        naive = _best(lambda: _naive(patterns, page)) * 1000
+        print(f"{size:>10} {trie:>12.1f} {naive:>12.1f}")
+
+    db = default_db()
+    print(f"\nBundled database ({len(db)} signatures); time per scan by page size")
+    print(f"{'page KB':>10} {'ms':>10} {'MB/s':>10}")
+    for size in (50_000, 200_000, 1_000_000, 4_000_000):
+        html = _page(size)
+        seconds = _best(lambda: _scan(db, html))
+        print(f"{len(html) / 1024:>10.0f} {seconds * 1000:>10.1f} {len(html) / seconds / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
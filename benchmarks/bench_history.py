@@ -0,0 +1,108 @@
+"""Benchmark for the audit history store.
+
+Records synthetic audit runs (many URLs across domains, spread over 90 days)
+through :class:`HistoryStore` and reports:
+
+* the cost of ``record()`` on the request path (it only enqueues);
+* background write throughput and database size per run;
+* latency of the history queries on the filled database.
+
+Usage::
+
+    python -m benchmarks.bench_history [runs] [db path]
+"""
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from app.storage.history import HistoryStore
+
+_RULES = [
+    "SSL", "Title", "Meta description", "H1", "Длина текста", "Читаемость", "Alt-тексты", "Формы",
+    "Аналитика", "Размер страницы", "robots.txt", "Индексация", "sitemap.xml", "URL в sitemap",
+]
+_DAY = 86400
+
+
+def _payload(rnd: random.Random, url: str) -> dict:
+    return {
+        "message": "Аудит выполнен.",
+        "fetch": {"success": True, "ssl_ok": True, "status_code": 200, "error": None, "encoding": "utf-8"},
+        "parse": {
+            "title": f"Страница {url}",
+            "description_present": rnd.random() < 0.8,
+            "h1_count": rnd.choice([0, 1, 1, 2]),
+            "h2_count": rnd.randint(0, 8),
+            "h3_count": rnd.randint(0, 12),
+            "forms": rnd.randint(0, 2),
+            "technologies": [{"name": "Yandex.Metrika", "category": "analytics", "offset": 812, "snippet": "mc.yandex.ru"}],
+        },
+        "rules": [
+            {"name": name, "status": rnd.choices(("OK", "WARNING", "ERROR"), (6, 3, 1))[0], "message": f"{name}: ..."}
+            for name in _RULES
+        ],
+        "text": {"language": "ru", "words": rnd.randint(100, 3000), "flesch": round(rnd.uniform(10, 80), 1)},
+        "ai": {"readability": "medium", "recommendations": [f"Рекомендация {i}" for i in range(5)]},
+    }
+
+
+def _timed(fn, repeat: int = 30) -> float:
+    """Median latency in ms."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(runs: int = 200_000, path: str | None = None) -> None:
+    path = path or os.path.join(tempfile.mkdtemp(), "history.db")
+    rnd = random.Random(1)
+    domains = [f"site{d}.example" for d in range(50)]
+    urls = [f"https://{domain}/page/{p}" for domain in domains for p in range(100)]
+    templates = [_payload(rnd, url) for url in urls[:200]]
+    now = time.time()
+    start = now - 90 * _DAY
+
+    store = HistoryStore(path, max_pending=runs + 1)
+    enqueue = 0.0
+    started = time.perf_counter()
+    for i in range(runs):
+        url = urls[i % len(urls)]
+        at = start + (now - start) * i / runs
+        t0 = time.perf_counter()
+        store.record(url, templates[i % len(templates)], at)
+        enqueue += time.perf_counter() - t0
+    store.flush()
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(path + ext) for ext in ("", "-wal") if os.path.exists(path + ext))
+    print(f"{runs:,} runs, {len(urls):,} URLs on {len(domains)} domains -> {path}")
+    print(f"record(): {enqueue / runs * 1e6:.1f} µs per call on the request path")
+    print(f"writer:   {runs / elapsed:,.0f} runs/s, {size / runs:,.0f} bytes per run on disk\n")
+
+    url, domain = urls[123], domains[7]
+    run_ids = [row["id"] for row in store.runs(url, 2)]
+    queries = {
+        "runs(url, 20)": lambda: store.runs(url, 20),
+        "latest(url)": lambda: store.latest(url=url),
+        "latest(domain, 100)": lambda: store.latest(domain=domain, limit=100),
+        "trend(url, 90 days)": lambda: store.trend(url=url),
+        "trend(domain, 7 days, hourly)": lambda: store.trend(domain=domain, since=now - 7 * _DAY, bucket=3600),
+        "get(run)": lambda: store.get(run_ids[0]),
+        "diff(a, b)": lambda: store.diff(run_ids[1], run_ids[0]),
+        "stats()": store.stats,
+    }
+    print(f"{'query':>32} {'median ms':>10}")
+    for name, query in queries.items():
+        print(f"{name:>32} {_timed(query):>10.2f}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,90 @@
+"""Benchmark for the monitoring scheduler.
+
+Registers many targets with :class:`Monitor` (the check itself is replaced by
+a short sleep, so no network is involved) and measures over a time window:
+
+* the cost of registering the portfolio;
+* how evenly checks are started: per-second counts of check starts (min,
+  median, max) for a portfolio whose due times are spread over its interval,
+  and for the same portfolio when every target is overdue at once (the state
+  after a restart), which must be worked off at ``rate`` without a spike;
+* scheduler lateness: how long after its due time a check starts.
+
+Usage::
+
+    python -m benchmarks.bench_monitor [targets] [rate] [seconds]
+"""
+from __future__ import annotations
+
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter
+
+from app.pipeline.core import AuditPipeline
+from app.pipeline.metrics import PipelineMetrics
+from app.pipeline.monitor import Monitor, MonitorConfig, MonitorTarget
+
+
+class _DryMonitor(Monitor):
+    """Monitor whose checks only sleep and record when they started."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.started: list[float] = []
+        self.lateness: list[float] = []
+
+    async def check(self, target: MonitorTarget) -> bool:
+        now = time.time()
+        self.started.append(now)
+        self.lateness.append(max(0.0, now - target.next_due))
+        await asyncio.sleep(0.05)  # network round trip
+        return False
+
+
+def _report(label: str, monitor: _DryMonitor, window_start: float, seconds: int) -> None:
+    per_second = Counter(int(at - window_start) for at in monitor.started)
+    counts = [per_second.get(second, 0) for second in range(seconds)]
+    lateness = sorted(monitor.lateness) or [0.0]
+    p99 = lateness[int(len(lateness) * 0.99) - 1] if len(lateness) > 1 else lateness[0]
+    print(
+        f"{label:>10} {len(monitor.started):>8,} {min(counts):>6} {statistics.median(counts):>7.0f} "
+        f"{max(counts):>6} {statistics.median(lateness) * 1000:>10.1f} {p99 * 1000:>10.1f}"
+    )
+
+
+async def _run(label: str, targets: int, rate: float, seconds: int, overdue: bool) -> None:
+    # With interval = targets / rate every target comes due once per interval at the configured rate.
+    interval = targets / rate
+    config = MonitorConfig(rate=rate, concurrency=200, per_host=4, default_interval=interval)
+    monitor = _DryMonitor(AuditPipeline([], PipelineMetrics()), config)
+    urls = [f"https://site{i % 5000}.example/page/{i}" for i in range(targets)]
+    started = time.perf_counter()
+    await monitor.add(urls)
+    if overdue:
+        for target in monitor.targets(targets):
+            monitor._schedule(target, time.time() - 60)
+    registered = time.perf_counter() - started
+    window_start = time.time()
+    await monitor.start()
+    await asyncio.sleep(seconds)
+    await monitor.stop()
+    print(f"{label}: registered {targets:,} targets in {registered * 1000:.0f} ms", file=sys.stderr)
+    _report(label, monitor, window_start, seconds)
+
+
+def main(targets: int = 50_000, rate: float = 200.0, seconds: int = 10) -> None:
+    print(f"{targets:,} targets at {rate:.0f} checks/s, {seconds} s window\n")
+    print(f"{'portfolio':>10} {'checks':>8} {'min/s':>6} {'median/s':>7} {'max/s':>6} {'late ms':>10} {'late p99':>10}")
+    asyncio.run(_run("spread", targets, rate, seconds, overdue=False))
+    asyncio.run(_run("overdue", targets, rate, seconds, overdue=True))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if args else 50_000,
+        float(args[1]) if len(args) > 1 else 200.0,
+        int(args[2]) if len(args) > 2 else 10,
+    )
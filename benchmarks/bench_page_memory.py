@@ -0,0 +1,80 @@
+"""Memory benchmark for parsed pages held by batch and crawl runs.
+
+Parses synthetic landing pages of one site (shared menu, unique body text),
+keeps every :class:`ParsedPage` in a list as a batch or crawl run does, and
+reports the memory retained per page (``tracemalloc``) with the full text kept
+and with only its hash and an excerpt (``keep_text=False``).
+
+Usage::
+
+    python -m benchmarks.bench_page_memory
+"""
+from __future__ import annotations
+
+import gc
+import random
+import time
+import tracemalloc
+
+from app.parsers.html_parser import parse_html
+
+_WORDS = (
+    "доставка скидка заказать бесплатно консультация гарантия цена отзывы клиентов "
+    "landing page offer delivery discount order free support service quality"
+).split()
+_MENU = ["Главная", "Каталог", "Доставка и оплата", "Отзывы", "Контакты", "О компании"]
+
+
+def _html(seed: int, words: int = 1500) -> str:
+    rnd = random.Random(seed)
+    parts = [
+        f"<html><head><title>Страница {seed}: предложение дня</title>"
+        f'<meta name="description" content="Описание страницы {seed} для поисковых систем и соцсетей">'
+        '<script async src="https://mc.yandex.ru/metrika/tag.js"></script></head><body>'
+    ]
+    parts.append("<nav>" + "".join(f'<a href="/{i}"><h3>{name}</h3></a>' for i, name in enumerate(_MENU)) + "</nav>")
+    parts.append(f"<h1>Предложение номер {seed}</h1>")
+    written = 0
+    while written < words:
+        n = rnd.randint(20, 60)
+        sentence = " ".join(rnd.choices(_WORDS, k=n)).capitalize()
+        if rnd.random() < 0.2:
+            parts.append(f"<h2>{' '.join(rnd.choices(_WORDS, k=4))}</h2>")
+        parts.append(f'<p>{sentence}. <a href="/p/{rnd.randint(0, 500)}">подробнее</a></p>')
+        parts.append(f'<img src="/img/{rnd.randint(0, 99)}.jpg" alt="">')
+        written += n
+    parts.append("<form><input name=phone><button>Отправить заявку</button></form></body></html>")
+    return "".join(parts)
+
+
+def _retained(pages: int, keep_text: bool) -> tuple[float, float]:
+    """Bytes retained per page and parse time per page (ms)."""
+    docs = [_html(seed).encode("utf-8") for seed in range(pages)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    kept = [parse_html(doc, f"https://example.com/p/{i}", keep_text=keep_text) for i, doc in enumerate(docs)]
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    assert len(kept) == pages
+    return size / pages, elapsed / pages * 1000
+
+
+def main(pages: int = 1000) -> None:
+    sample = parse_html(_html(0).encode("utf-8"), "https://example.com/p/0")
+    print(
+        f"{pages} pages, ~{len(_html(0)) / 1024:.0f} KB HTML and {sample.word_count} words each;"
+        " memory retained per parsed page\n"
+    )
+    print(f"{'mode':>22} {'bytes/page':>12} {'parse ms/page':>14}")
+    for label, keep_text in (("full text", True), ("hash + excerpt", False)):
+        per_page, ms = _retained(pages, keep_text)
+        print(f"{label:>22} {per_page:>12,.0f} {ms:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
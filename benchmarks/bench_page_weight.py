@@ -0,0 +1,99 @@
+"""Benchmark for the page-weight collector.
+
+Serves ``pages`` landing pages from a local server that answers every request
+after ``latency`` seconds. Each page loads 24 files: 16 shared by all pages
+(framework scripts, styles and fonts from a "CDN") and 8 of its own images.
+Measures the time to probe the files of every page in turn:
+
+* one probe at a time, without the cache — what a naive sequential checker costs;
+* ``concurrency`` probes at a time, without the cache;
+* ``concurrency`` probes at a time with the per-URL cache shared by all pages;
+
+and, for the last, the number of requests the server received.
+
+Usage::
+
+    python -m benchmarks.bench_page_weight [pages] [latency]
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+
+from aiohttp import web
+
+from app.collectors.http_fetcher import FetchResult, close_session
+from app.collectors.page_weight import PageWeightCollector
+from app.parsers.html_parser import parse_html
+
+_PORT = 8132
+_SHARED = 16
+_OWN = 8
+
+
+def _page(n: int) -> bytes:
+    shared = "".join(
+        f'<link rel="stylesheet" href="/cdn/style{i}.css">' if i < 4 else f'<script src="/cdn/lib{i}.js" defer></script>'
+        for i in range(_SHARED)
+    )
+    own = "".join(f'<img src="/img/{n}-{i}.jpg" alt="">' for i in range(_OWN))
+    return f"<html><head><title>Page {n}</title>{shared}</head><body><h1>Offer</h1>{own}</body></html>".encode()
+
+
+async def _serve(latency: float, stats: dict) -> web.AppRunner:
+    async def asset(request: web.Request) -> web.Response:
+        stats["requests"] += 1
+        await asyncio.sleep(latency)
+        return web.Response(
+            body=b"" if request.method == "HEAD" else b"x" * 20_000,
+            headers={"Content-Length": "20000", "Cache-Control": "max-age=86400", "Content-Type": "image/jpeg"},
+        )
+
+    app = web.Application()
+    app.router.add_route("*", "/{path:.*}", asset)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", _PORT).start()
+    return runner
+
+
+async def _run(pages: int, latency: float) -> None:
+    stats = {"requests": 0}
+    runner = await _serve(latency, stats)
+    base = f"http://127.0.0.1:{_PORT}/"
+    parsed = [parse_html(_page(n), base) for n in range(pages)]
+    fetch = FetchResult(content=None, status_code=200, final_url=base, ssl_ok=False, bytes_read=0)
+
+    async def per_page(concurrency: int, cached: bool) -> float:
+        collector = PageWeightCollector(concurrency=concurrency, budget=600, ttl=3600 if cached else 0)
+        stats["requests"] = 0
+        started = time.perf_counter()
+        for page in parsed:
+            weight = await collector.collect(page, fetch, base)
+            assert len(weight.assets) == _SHARED + _OWN and weight.complete
+        return (time.perf_counter() - started) / pages * 1000
+
+    try:
+        print(f"{pages} pages of {_SHARED + _OWN} files ({_SHARED} shared), {latency * 1000:.0f} ms per request")
+        for label, concurrency, cached in (
+            ("sequential, no cache", 1, False),
+            ("6 concurrent, no cache", 6, False),
+            ("6 concurrent, cache", 6, True),
+        ):
+            ms = await per_page(concurrency, cached)
+            print(f"  {label:24} {ms:8.1f} ms/page  {stats['requests'] / pages:5.1f} requests/page")
+    finally:
+        await close_session()
+        await runner.cleanup()
+
+
+def main(pages: int = 20, latency: float = 0.03) -> None:
+    asyncio.run(_run(pages, latency))
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.03,
+    )
@@ -0,0 +1,125 @@
+"""Benchmark for rule evaluation: per-page registry vs columnar batch evaluator.
+
+Evaluates the basic rules over synthetic crawl batches (10k+ pages of one
+site, with robots.txt and sitemap information) three ways and checks that the
+results are identical:
+
+* per page – ``evaluate_basic`` for every page, as the single-audit path does;
+* batch    – ``evaluate_batch``: NumPy columns, per-page result lists built at the end;
+* counts   – ``evaluate_matrix(...).counts()``: statuses only, no per-page objects.
+
+Most of the time goes into extracting features (splitting the text into words,
+matching robots.txt rules), which both paths do once per page; the second
+table times only the rule decisions over already extracted features.
+
+Usage::
+
+    python -m benchmarks.bench_rules
+"""
+from __future__ import annotations
+
+import random
+import time
+from urllib.robotparser import RobotFileParser
+
+from app.analyzers.basic import BASIC_RULES, evaluate_basic
+from app.analyzers.rules import default_thresholds
+from app.analyzers.vectorized import PageItem, evaluate_batch, evaluate_matrix, pack_features, select_outcomes
+from app.collectors.http_fetcher import FetchResult
+from app.collectors.site_files import SiteFiles
+from app.parsers.html_parser import ParsedPage
+
+_WORDS = "лендинг купить доставка скидка заказать отзывы цена гарантия landing offer free".split()
+
+
+def _site() -> SiteFiles:
+    site = SiteFiles(origin="https://example.com", robots_status=200, sitemaps=["https://example.com/sitemap.xml"])
+    robots = RobotFileParser()
+    robots.parse(["User-agent: *", "Disallow: /cart/", "Disallow: /search"])
+    site.robots = robots
+    for i in range(0, 20_000, 2):
+        site._urls.add(f"https://example.com/p/{i}")
+        site.sitemap_urls += 1
+    return site
+
+
+def _items(n: int, seed: int = 1) -> list[PageItem]:
+    rnd = random.Random(seed)
+    site = _site()
+    texts = [" ".join(rnd.choices(_WORDS, k=k)) for k in (80, 250, 600, 1200, 2500)]
+    items = []
+    for i in range(n):
+        images = rnd.randint(0, 12)
+        parsed = ParsedPage(
+            title=rnd.choice([None, "Купить со скидкой", "Лендинг: доставка по всей России за 1 день"]),
+            meta_description=rnd.choice([None, "Коротко", "Описание страницы " * rnd.randint(3, 12)]),
+            meta_keywords=None,
+            headings={1: ["Заголовок"] * rnd.choice([0, 1, 1, 1, 2])},
+            images_total=images,
+            images_without_alt=rnd.randint(0, images),
+            forms_count=rnd.choice([0, 1, 1, 2]),
+            external_links=rnd.randint(0, 20),
+            external_nofollow=0,
+            analytics=rnd.choice([[], ["Yandex.Metrika"], ["Google Analytics", "Google Tag Manager"]]),
+            text_content=rnd.choice(texts),
+        )
+        fetch = FetchResult(
+            content=None,
+            status_code=200,
+            final_url=rnd.choice([f"https://example.com/p/{i}", f"https://example.com/search?q={i}"]),
+            ssl_ok=rnd.random() < 0.95,
+            bytes_read=rnd.randint(20_000, 1_500_000),
+            truncated=rnd.random() < 0.01,
+        )
+        items.append((parsed, fetch, site))
+    return items
+
+
+def _best(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _decisions(items: list[PageItem]) -> tuple[float, float]:
+    """Time the rule decisions alone: per page over feature dicts vs NumPy columns."""
+    thresholds = default_thresholds()
+    steps, extractors = BASIC_RULES.plan(thresholds)
+    rows = [{name: extract(*item) for name, extract in extractors} for item in items]
+    columns, _ = pack_features(items, [name for name, _ in extractors])
+    rules = [rule for rule, _ in steps]
+
+    def per_page() -> None:
+        for values in rows:
+            for rule, params in steps:
+                rule.decide(values, params)
+
+    return _best(per_page), _best(lambda: select_outcomes(rules, thresholds, columns, len(items)))
+
+
+def main() -> None:
+    print("End to end (feature extraction + rules + result objects)\n")
+    print(f"{'pages':>8} {'per page, s':>12} {'batch, s':>10} {'counts, s':>10} {'speedup':>8} {'µs/page':>8}")
+    for n in (1_000, 10_000, 50_000):
+        items = _items(n)
+        assert evaluate_batch(items) == [evaluate_basic(*item) for item in items]
+        per_page = _best(lambda: [evaluate_basic(*item) for item in items])
+        batch = _best(lambda: evaluate_batch(items))
+        counts = _best(lambda: evaluate_matrix(items).counts())
+        print(
+            f"{n:>8} {per_page:>12.3f} {batch:>10.3f} {counts:>10.3f}"
+            f" {per_page / batch:>7.1f}x {batch / n * 1e6:>8.1f}"
+        )
+
+    print("\nRule decisions only (features already extracted)\n")
+    print(f"{'pages':>8} {'per page, ms':>13} {'columns, ms':>12} {'speedup':>8}")
+    for n in (1_000, 10_000, 50_000):
+        per_page, columnar = _decisions(_items(n))
+        print(f"{n:>8} {per_page * 1000:>13.1f} {columnar * 1000:>12.1f} {per_page / columnar:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
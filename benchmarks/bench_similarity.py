@@ -0,0 +1,85 @@
+"""Benchmark for near-duplicate detection.
+
+Measures:
+
+* the cost of the SimHash fingerprint next to the rest of parsing, on the
+  synthetic landing pages of ``bench_page_memory``;
+* fingerprint distances between copies of a page that differ only in the
+  city name, and between different pages of the same template;
+* the LSH index with ``pages`` fingerprints spread over 1000 domains: time to
+  add a page, lookup time against a linear scan of all fingerprints, recall
+  of the city copies, and the time to group one domain into clusters.
+
+Usage::
+
+    python -m benchmarks.bench_similarity [pages]
+"""
+from __future__ import annotations
+
+import itertools
+import random
+import statistics
+import sys
+import time
+
+from app.parsers.html_parser import parse_html
+from app.parsers.simhash import hamming, simhash
+from app.storage.similarity import SimilarityIndex
+from benchmarks.bench_page_memory import _html
+
+_CITIES = ["Москве", "Казани", "Самаре", "Омске", "Перми", "Туле", "Уфе", "Твери", "Рязани", "Курске"]
+
+
+def _city_copy(seed: int, city: str) -> str:
+    html = _html(seed, words=400)
+    return html.replace("предложение дня", f"доставка в {city}").replace(
+        "Отправить заявку", f"Отправить заявку, офис в {city}, телефон +7 900 {len(city):03d}"
+    )
+
+
+def _best(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(pages: int = 200_000) -> None:
+    docs = [_html(seed).encode("utf-8") for seed in range(200)]
+    parsed = [parse_html(doc) for doc in docs]
+    parse_ms = _best(lambda: [parse_html(doc) for doc in docs]) / len(docs) * 1000
+    fingerprint_ms = _best(lambda: [simhash(page.text_content, page.headings) for page in parsed]) / len(docs) * 1000
+    print(f"parse {parse_ms:.2f} ms/page, of which fingerprint {fingerprint_ms:.2f} ms\n")
+
+    copies = {city: parse_html(_city_copy(1, city)).simhash for city in _CITIES}
+    same_city = [hamming(a, b) for a, b in itertools.combinations(copies.values(), 2)]
+    template = [hamming(a.simhash, b.simhash) for a, b in itertools.combinations(parsed[:50], 2)]
+    print(f"distance, city copies:         min {min(same_city)}, median {statistics.median(same_city):.0f}, max {max(same_city)}")
+    print(f"distance, same-template pages: min {min(template)}, median {statistics.median(template):.0f}, max {max(template)}\n")
+
+    rnd = random.Random(0)
+    index = SimilarityIndex(max_entries=pages + len(_CITIES))
+    fingerprints = [rnd.getrandbits(64) for _ in range(pages)]
+    started = time.perf_counter()
+    for i, fingerprint in enumerate(fingerprints):
+        index.add(f"https://site{i % 1000}.example/page/{i}", fingerprint, 500)
+    add_us = (time.perf_counter() - started) / pages * 1e6
+    for city, fingerprint in copies.items():
+        index.add(f"https://site0.example/{city}", fingerprint, 500)
+
+    queries = [rnd.getrandbits(64) for _ in range(1000)]
+    lookup_ms = _best(lambda: [index.near(q) for q in queries]) / len(queries) * 1000
+    scan_ms = _best(lambda: [[f for f in fingerprints if hamming(f, q) <= index.max_distance] for q in queries[:20]], 1) / 20 * 1000
+    found = [len(index.near(fingerprint, exclude=f"https://site0.example/{city}")) for city, fingerprint in copies.items()]
+    cluster_ms = _best(lambda: index.clusters("site0.example")) * 1000
+    sizes = [len(group) for group in index.clusters("site0.example")]
+    print(f"index of {pages:,} pages, max distance {index.max_distance}")
+    print(f"  add {add_us:.1f} us/page; lookup {lookup_ms:.3f} ms vs linear scan {scan_ms:.1f} ms")
+    print(f"  city copies found per copy: {min(found)}–{max(found)} of {len(copies) - 1}")
+    print(f"  clusters of site0.example ({pages // 1000 + len(copies)} pages): {sizes} in {cluster_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
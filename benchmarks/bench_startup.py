@@ -0,0 +1,169 @@
+"""Benchmark for API startup time and per-process memory.
+
+Every measurement runs in a fresh interpreter, so nothing is imported in
+advance. For the API process, the child imports :mod:`app.main`, builds the
+app with :func:`app.main.create_app`, starts it in uvicorn and sends
+``audits`` ``POST /audit`` requests (AI off) for a page served by a local
+server. It reports:
+
+* import time of ``app.main`` plus building the app, and startup time (the
+  lifespan hook: parser warm-up, monitoring);
+* the first and the median later ``/audit`` latency;
+* peak RSS of the process after the audits;
+* which of the heavy optional modules (openai, jinja2, requests, pyarrow)
+  the process loaded.
+
+The same is measured with every lazily loaded subsystem imported up front
+(``LP_PRELOAD=ai,reports,export`` plus ``requests``). This is what every
+worker used to pay. The last two rows are a process-pool worker
+(:mod:`app.pipeline.executor` with the parser warmed), lean and with the
+HTTP clients imported.
+
+Usage::
+
+    python -m benchmarks.bench_startup [audits] [repeat]
+"""
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_PORT = 8133
+_API_PORT = 8134
+_HEAVY = ("openai", "jinja2", "requests", "pyarrow")
+_PAGE = (
+    "<html><head><title>Startup benchmark</title><meta name='description' content='Landing page'></head>"
+    "<body><h1>Offer</h1><p>" + "Fast delivery of everything you need. " * 60 + "</p>"
+    "<form><input name='phone'><button>Send</button></form></body></html>"
+).encode()
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+async def _api(audits: int, eager: bool) -> dict:
+    import asyncio
+
+    started = time.perf_counter()
+    if eager:
+        import requests  # noqa: F401
+    from app.main import create_app
+    from app.settings import Settings
+
+    application = create_app(Settings(preload=("ai", "reports", "export") if eager else ()))
+    imported = time.perf_counter() - started
+
+    import aiohttp
+    import uvicorn
+    from aiohttp import web
+
+    async def page(_: web.Request) -> web.Response:
+        return web.Response(body=_PAGE, content_type="text/html")
+
+    site_app = web.Application()
+    site_app.router.add_get("/{path:.*}", page)
+    runner = web.AppRunner(site_app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", _PORT).start()
+
+    server = uvicorn.Server(uvicorn.Config(application, port=_API_PORT, log_level="warning", lifespan="on"))
+    started = time.perf_counter()
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.001)
+    startup = time.perf_counter() - started
+
+    latencies = []
+    async with aiohttp.ClientSession() as session:
+        for n in range(audits):
+            started = time.perf_counter()
+            body = {"url": f"http://127.0.0.1:{_PORT}/landing?n={n}"}  # distinct URLs: no cache hits
+            async with session.post(f"http://127.0.0.1:{_API_PORT}/audit", json=body) as response:
+                assert response.status == 200, await response.text()
+                await response.read()
+            latencies.append(time.perf_counter() - started)
+    server.should_exit = True
+    await serving
+    await runner.cleanup()
+    return {
+        "import_ms": imported * 1000,
+        "startup_ms": startup * 1000,
+        "first_ms": latencies[0] * 1000,
+        "audit_ms": statistics.median(latencies[1:] or latencies) * 1000,
+        "rss_mb": _peak_rss_mb(),
+    }
+
+
+def _worker(eager: bool) -> dict:
+    started = time.perf_counter()
+    if eager:
+        import aiohttp  # noqa: F401
+        import requests  # noqa: F401
+    from app.pipeline.executor import _warm_job
+
+    _warm_job()
+    return {"import_ms": (time.perf_counter() - started) * 1000, "rss_mb": _peak_rss_mb()}
+
+
+def _child(kind: str, audits: int) -> None:
+    import asyncio
+
+    eager = kind.endswith("eager")
+    result = asyncio.run(_api(audits, eager)) if kind.startswith("api") else _worker(eager)
+    result["loaded"] = [name for name in _HEAVY if name in sys.modules]
+    print(json.dumps(result))
+
+
+def _measure(kind: str, audits: int, repeat: int) -> dict:
+    runs = []
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}  # AI off
+    env["LP_CPU_WORKERS"] = "0"
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--child", kind, str(audits)],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    result = {key: statistics.median(run[key] for run in runs) for key in runs[0] if key != "loaded"}
+    result["loaded"] = runs[0]["loaded"]
+    return result
+
+
+def main(audits: int = 20, repeat: int = 3) -> None:
+    print(f"median of {repeat} fresh processes; API: {audits} x POST /audit without AI")
+    print(f"  {'':22} {'import':>8} {'startup':>8} {'1st audit':>10} {'audit':>8} {'peak RSS':>9}  loaded")
+    for label, kind in (
+        ("API, lazy", "api"),
+        ("API, all preloaded", "api-eager"),
+        ("pool worker, lazy", "worker"),
+        ("pool worker, eager", "worker-eager"),
+    ):
+        r = _measure(kind, audits, repeat)
+        api = kind.startswith("api")
+        timings = (
+            f"{r['startup_ms']:6.0f}ms {r['first_ms']:8.1f}ms {r['audit_ms']:6.1f}ms"
+            if api
+            else f"{'':8} {'':10} {'':8}"
+        )
+        loaded = ", ".join(r["loaded"]) or "-"
+        print(f"  {label:22} {r['import_ms']:6.0f}ms {timings} {r['rss_mb']:7.1f}MB  {loaded}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        _child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+        )
@@ -0,0 +1,45 @@
+"""Benchmark for local readability and keyword-relevance scoring.
+
+Parses synthetic landing pages (see ``bench_page_memory``) and times
+:func:`analyze_texts` over the whole batch and :func:`analyze_text` page by
+page, without keywords (readability only) and with a set of keywords, for
+pages kept with their full text and for compact pages (hash + excerpt).
+
+Usage::
+
+    python -m benchmarks.bench_text
+"""
+from __future__ import annotations
+
+import time
+
+from app.analyzers.text import analyze_text, analyze_texts
+from app.parsers.html_parser import parse_html
+from benchmarks.bench_page_memory import _html
+
+_KEYWORDS = ["доставка", "скидка", "бесплатная консультация", "отзывы клиентов", "delivery service"]
+
+
+def _best(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(pages: int = 2000) -> None:
+    docs = [_html(seed).encode("utf-8") for seed in range(pages)]
+    print(f"{pages} pages, ~{sum(map(len, docs)) / pages / 1024:.0f} KB HTML each; ms per page\n")
+    print(f"{'text':>10} {'keywords':>9} {'batch':>8} {'per page':>9}")
+    for label, keep_text in (("full", True), ("excerpt", False)):
+        parsed = [parse_html(doc, f"https://example.com/p/{i}", keep_text=keep_text) for i, doc in enumerate(docs)]
+        for keywords in ((), _KEYWORDS):
+            batch = _best(lambda: analyze_texts(parsed, keywords))
+            single = _best(lambda: [analyze_text(page, keywords) for page in parsed])
+            print(f"{label:>10} {len(keywords):>9} {batch / pages * 1000:>8.3f} {single / pages * 1000:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Synthetic landing-page corpus for the benchmark suite.
+
+Pages are generated deterministically from a seed and a target size (10 KB to
+10 MB by default) with a realistic mix of sections: headings, paragraphs,
+images (some without ``alt``), internal and external links, inline and
+external scripts (analytics, tag managers, chats), CTA buttons and lead forms.
+Every page is written in UTF-8 and in windows-1251; half of the pages declare
+their charset only in ``<meta>``, the rest also in the Content-Type header
+sent by :mod:`benchmarks.corpus_server`.
+
+The corpus is a directory of ``.html`` files plus ``manifest.json``::
+
+    python -m benchmarks.corpus /tmp/lp-corpus --sizes 10k,100k,1m,10m --per-size 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+__all__ = ["DEFAULT_SIZES", "ENCODINGS", "CorpusPage", "landing_page", "generate", "load_manifest", "parse_size"]
+
+DEFAULT_SIZES = (10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)
+ENCODINGS = ("utf-8", "windows-1251")
+
+# Only characters that windows-1251 can encode.
+_WORDS = (
+    "доставка скидка заказать бесплатно консультация гарантия цена отзывы клиентов быстро "
+    "надёжно качество опыт специалисты выгодно акция подарок сертификат сегодня результат "
+    "landing page offer delivery discount order free support service quality"
+).split()
+_HEADINGS = ["Почему выбирают нас", "Наши услуги", "Как мы работаем", "Отзывы клиентов", "Цены", "Гарантии"]
+_MENU = ["Главная", "Каталог", "Доставка и оплата", "Отзывы", "Контакты", "О компании"]
+_SCRIPTS = [
+    '<script async src="https://mc.yandex.ru/metrika/tag.js"></script>',
+    '<script async src="https://www.googletagmanager.com/gtag/js?id=G-BENCH"></script>',
+    "<script>window.dataLayer = window.dataLayer || []; function gtag(){dataLayer.push(arguments);}</script>",
+    '<script src="//code.jivosite.com/widget/bench" async></script>',
+    '<script src="https://cdn.example.com/app.js" defer></script>',
+]
+
+
+@dataclass
+class CorpusPage:
+    path: str  # relative to the corpus directory
+    size: int  # target size class, bytes
+    bytes: int  # actual size of the file
+    encoding: str
+    charset_header: bool  # the server names the charset in Content-Type
+
+
+def parse_size(text: str) -> int:
+    """``"10k"`` / ``"1m"`` / ``"512"`` -> bytes."""
+    text = text.strip().lower()
+    factor = {"k": 1024, "m": 1024 * 1024}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+def _label(size: int) -> str:
+    return f"{size // (1024 * 1024)}m" if size >= 1024 * 1024 else f"{size // 1024}k"
+
+
+def _sentence(rnd: random.Random) -> str:
+    return " ".join(rnd.choices(_WORDS, k=rnd.randint(8, 30))).capitalize() + "."
+
+
+def _section(rnd: random.Random, index: int) -> str:
+    parts = [f"<section id=\"s{index}\"><h2>{rnd.choice(_HEADINGS)} — {index}</h2>"]
+    for _ in range(rnd.randint(1, 3)):
+        if rnd.random() < 0.4:
+            parts.append(f"<h3>{' '.join(rnd.choices(_WORDS, k=3)).capitalize()}</h3>")
+        parts.append(f"<p>{' '.join(_sentence(rnd) for _ in range(rnd.randint(2, 5)))} ")
+        parts.append(f'<a href="/p/{rnd.randint(0, 999)}">подробнее</a></p>')
+    for _ in range(rnd.randint(0, 3)):
+        alt = f' alt="{rnd.choice(_WORDS)}"' if rnd.random() < 0.8 else ""
+        parts.append(f'<img src="/img/{rnd.randint(0, 999)}.jpg"{alt} width="640" height="480">')
+    if rnd.random() < 0.3:
+        parts.append(f'<a href="https://partner{rnd.randint(0, 20)}.example/">Партнёр</a>')
+    if rnd.random() < 0.15:
+        parts.append(
+            '<form action="/lead" method="post"><input name="name" placeholder="Имя">'
+            '<input name="phone" type="tel" placeholder="Телефон"><button>Оставить заявку</button></form>'
+        )
+    if rnd.random() < 0.2:
+        parts.append('<a class="btn" href="#order">Заказать сейчас</a>')
+    if rnd.random() < 0.05:
+        parts.append(rnd.choice(_SCRIPTS))
+    parts.append("</section>\n")
+    return "".join(parts)
+
+
+def landing_page(seed: int, size: int, encoding: str = "utf-8") -> bytes:
+    """A landing page of about ``size`` bytes (at least one full section) in ``encoding``."""
+    rnd = random.Random(seed * 7919 + size)
+    head = (
+        f'<!DOCTYPE html><html lang="ru"><head><meta charset="{encoding}">'
+        f"<title>Предложение {seed}: {rnd.choice(_HEADINGS).lower()}</title>"
+        f'<meta name="description" content="{_sentence(rnd)}">'
+        f'<meta name="viewport" content="width=device-width, initial-scale=1">'
+        + "".join(rnd.sample(_SCRIPTS, k=rnd.randint(1, 3)))
+        + "</head><body>"
+        + "<nav>"
+        + "".join(f'<a href="/{i}">{name}</a>' for i, name in enumerate(_MENU))
+        + "</nav>"
+        + f"<h1>Предложение номер {seed}</h1>"
+    )
+    tail = (
+        '<form id="order" action="/order" method="post"><input name="phone" type="tel">'
+        "<button>Отправить заявку</button></form></body></html>"
+    )
+    parts = [head]
+    # Cyrillic letters take two bytes in UTF-8 and one in windows-1251; budget in encoded bytes.
+    budget = size - len((head + tail).encode(encoding))
+    index = 0
+    while budget > 0 or index == 0:
+        section = _section(rnd, index)
+        parts.append(section)
+        budget -= len(section.encode(encoding))
+        index += 1
+    parts.append(tail)
+    return "".join(parts).encode(encoding)
+
+
+def generate(
+    directory: str | Path,
+    sizes: tuple[int, ...] = DEFAULT_SIZES,
+    per_size: int = 3,
+    encodings: tuple[str, ...] = ENCODINGS,
+) -> list[CorpusPage]:
+    """Write the corpus to ``directory`` (skipping files that already exist) and return its manifest."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    pages = []
+    for size in sizes:
+        for seed in range(per_size):
+            for encoding in encodings:
+                name = f"{_label(size)}-{encoding}-{seed}.html"
+                path = directory / name
+                if not path.exists():
+                    path.write_bytes(landing_page(seed, size, encoding))
+                pages.append(CorpusPage(name, size, path.stat().st_size, encoding, charset_header=seed % 2 == 0))
+    (directory / "manifest.json").write_text(
+        json.dumps([asdict(page) for page in pages], ensure_ascii=False, indent=1), encoding="utf-8"
+    )
+    return pages
+
+
+def load_manifest(directory: str | Path) -> list[CorpusPage]:
+    data = json.loads((Path(directory) / "manifest.json").read_text(encoding="utf-8"))
+    return [CorpusPage(**item) for item in data]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--sizes", default="10k,100k,1m,10m", help="comma-separated size classes")
+    parser.add_argument("--per-size", type=int, default=3, help="pages per size class and encoding")
+    args = parser.parse_args()
+    pages = generate(args.directory, tuple(parse_size(s) for s in args.sizes.split(",")), args.per_size)
+    print(f"{len(pages)} pages, {sum(page.bytes for page in pages) / 1024 / 1024:.1f} MB in {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Local HTTP stand-in for landing pages, serving a :mod:`benchmarks.corpus` directory.
+
+Each page is served at ``/<file name>``; any query string is ignored, so
+``/10k-utf-8-0.html?n=17`` can be used to defeat the audit cache. Latency
+before the first byte and a per-response throttle can be simulated.
+
+Usage::
+
+    python -m benchmarks.corpus_server /tmp/lp-corpus --port 8098 --latency 0.05 --throttle 1m
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from aiohttp import web
+
+from benchmarks.corpus import load_manifest, parse_size
+
+_CHUNK = 16 * 1024
+
+
+def make_app(directory: str | Path, latency: float = 0.0, throttle: int = 0) -> web.Application:
+    """Build the server application.
+
+    Args:
+        directory: Corpus directory with ``manifest.json``.
+        latency: Delay before the response headers (seconds).
+        throttle: Bytes per second per response (0 — unlimited).
+    """
+    directory = Path(directory)
+    pages = {page.path: page for page in load_manifest(directory)}
+    bodies = {name: (directory / name).read_bytes() for name in pages}
+    stats = {"requests": 0, "bytes": 0}
+
+    async def page(request: web.Request) -> web.StreamResponse:
+        name = request.match_info["name"]
+        info = pages.get(name)
+        if info is None:
+            raise web.HTTPNotFound()
+        stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        body = bodies[name]
+        content_type = f"text/html; charset={info.encoding}" if info.charset_header else "text/html"
+        if not throttle:
+            stats["bytes"] += len(body)
+            return web.Response(body=body, headers={"Content-Type": content_type})
+        response = web.StreamResponse(headers={"Content-Type": content_type, "Content-Length": str(len(body))})
+        await response.prepare(request)
+        for start in range(0, len(body), _CHUNK):
+            chunk = body[start : start + _CHUNK]
+            await response.write(chunk)
+            stats["bytes"] += len(chunk)
+            await asyncio.sleep(len(chunk) / throttle)
+        await response.write_eof()
+        return response
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get("/stats", get_stats)
+    app.router.add_get("/{name}", page)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--latency", type=float, default=0.0, help="delay before every response, seconds")
+    parser.add_argument("--throttle", default="0", help="bytes per second per response, e.g. 512k (0 — unlimited)")
+    args = parser.parse_args()
+    web.run_app(
+        make_app(args.directory, args.latency, parse_size(args.throttle)),
+        host=args.host,
+        port=args.port,
+        print=None,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Local stand-in for the OpenAI chat completions endpoint.
+
+Answers ``POST /v1/chat/completions`` with canned JSON in the shape the GPT
+client expects, including batched prompts (one entry per ``### Page <id>``).
+Latency and rate limiting can be simulated to exercise timeouts and retries,
+and batched answers can be cut short or garbled to exercise their splitting
+(the client tests in ``tests/test_gpt_client.py`` use all of these).
+
+Usage::
+
+    python -m benchmarks.openai_stub --port 8099 --latency 0.3 --rate-limit-every 5
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=stub uvicorn app.main:app
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import time
+
+from aiohttp import web
+
+_PAGE_RE = re.compile(r"^### Page (\d+)$", re.MULTILINE)
+_TITLE_RE = re.compile(r"^Title: (.*)$", re.MULTILINE)
+
+STATS = web.AppKey("stats", dict)
+
+
+def _recommendations(snapshot: str) -> list[str]:
+    # Tied to the page's title so that a client mixing up pages of a batch is noticed.
+    title = next(iter(_TITLE_RE.findall(snapshot)), "N/A")
+    return [f"{title}: recommendation {i}" for i in range(1, 6)]
+
+
+def _answer(prompt: str, batch_missing: int = 0, garbled: bool = False) -> str:
+    ids = [int(i) for i in _PAGE_RE.findall(prompt)]
+    if not ids:
+        return json.dumps({"readability": "medium", "recommendations": _recommendations(prompt)})
+    if garbled:
+        return "Sorry, here are my thoughts: " + prompt[:40]
+    snapshots = _PAGE_RE.split(prompt)[2::2]
+    pages = [
+        {"id": i, "readability": "medium", "recommendations": _recommendations(snapshot)}
+        for i, snapshot in zip(ids, snapshots)
+    ]
+    return json.dumps({"pages": pages[: len(pages) - batch_missing]})
+
+
+def make_app(
+    latency: float = 0.0,
+    rate_limit_every: int = 0,
+    retry_after: str = "0.05",
+    batch_missing: int = 0,
+    garbled: bool = False,
+) -> web.Application:
+    """Build the stub application.
+
+    Args:
+        latency: Delay before every answer (seconds).
+        rate_limit_every: Answer every N-th request with 429 (0 disables).
+        retry_after: ``Retry-After`` header of the 429 answers.
+        batch_missing: Leave out the last N pages of every batched answer.
+        garbled: Answer batched prompts with prose instead of JSON.
+    """
+    stats = {"requests": 0, "rate_limited": 0, "pages": 0}
+
+    async def completions(request: web.Request) -> web.Response:
+        stats["requests"] += 1
+        if rate_limit_every and stats["requests"] % rate_limit_every == 0:
+            stats["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status=429,
+                headers={"Retry-After": retry_after},
+            )
+
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        stats["pages"] += max(1, len(_PAGE_RE.findall(prompt)))
+        if latency:
+            await asyncio.sleep(latency)
+        return web.json_response(
+            {
+                "id": f"chatcmpl-stub-{stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": _answer(prompt, batch_missing, garbled)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 50, "total_tokens": len(prompt) // 4 + 50},
+            }
+        )
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app[STATS] = stats
+    app.router.add_post("/v1/chat/completions", completions)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="delay before every answer, seconds")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every N-th request with 429")
+    args = parser.parse_args()
+    web.run_app(make_app(args.latency, args.rate_limit_every), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""Reproducible benchmark suite for LP Screening.
+
+``run`` measures, on the synthetic corpus of :mod:`benchmarks.corpus`:
+
+* per-stage microbenchmarks for every size class and encoding — encoding
+  detection and decoding, ``parse_html``, ``evaluate_basic``, ``analyze_text``
+  and ``render_report`` (median ms per call);
+* end-to-end ``POST /audit`` throughput and latency percentiles at several
+  concurrency levels, against the API started with uvicorn, the corpus served
+  by :mod:`benchmarks.corpus_server` and :mod:`benchmarks.openai_stub` in
+  place of OpenAI (each in its own process).
+
+Results are written as a JSON baseline. ``compare`` (or ``run --baseline``)
+checks results against a baseline and exits with status 1 if any of them is
+worse by more than ``--threshold``.
+
+Usage::
+
+    python -m benchmarks.suite run --output baseline.json
+    python -m benchmarks.suite run --baseline baseline.json --threshold 0.15
+    python -m benchmarks.suite compare baseline.json current.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import aiohttp
+
+from app.analyzers.basic import evaluate_basic
+from app.analyzers.text import analyze_text
+from app.collectors.charset import detect_encoding
+from app.collectors.http_fetcher import FetchResult
+from app.parsers.html_parser import parse_html
+from app.pipeline.core import AuditContext
+from app.reports.renderer import render_report
+from app.schemas import audit_response
+from benchmarks.corpus import DEFAULT_SIZES, generate, parse_size
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+
+# Results ------------------------------------------------------------------
+
+
+def _result(value: float, unit: str, better: str = "lower") -> dict:
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def _measure(fn: Callable[[], object], min_time: float = 0.5, min_samples: int = 5, sample_time: float = 0.002) -> float:
+    """Median ms per call over samples of at least ``sample_time`` each (fast calls are looped)."""
+    t0 = time.perf_counter()
+    fn()  # warm-up, also sizes the samples
+    loops = max(1, int(sample_time / max(time.perf_counter() - t0, 1e-9)))
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < min_samples or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - t0) * 1000 / loops)
+    return statistics.median(samples)
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# Microbenchmarks ------------------------------------------------------------
+
+
+def micro(corpus: Path, pages: list) -> dict:
+    results = {}
+    for page in pages:
+        if not page.path.endswith("-0.html"):
+            continue  # one page per size class and encoding
+        body = (corpus / page.path).read_bytes()
+        url = f"https://bench.example/{page.path}"
+        content_type = f"text/html; charset={page.encoding}" if page.charset_header else "text/html"
+        label = f"{page.path.split('-')[0]}.{page.encoding}"
+
+        def decode():
+            encoding, _ = detect_encoding(content_type, body)
+            return body.decode(encoding, errors="replace")
+
+        encoding, source = detect_encoding(content_type, body)
+        fetch = FetchResult(
+            content=body, status_code=200, final_url=url, ssl_ok=True, encoding=encoding, encoding_source=source
+        )
+        parsed = parse_html(body, url, encoding=encoding)
+        ctx = AuditContext(url=url, fetch=fetch)
+        ctx.parsed = parsed
+        ctx.rules = evaluate_basic(parsed, fetch)
+        ctx.text = analyze_text(parsed)
+        audit = audit_response(ctx)
+
+        stages = {
+            "decode": decode,
+            "parse": lambda: parse_html(body, url, encoding=encoding),
+            "rules": lambda: evaluate_basic(parsed, fetch),
+            "text": lambda: analyze_text(parsed),
+            "render": lambda: render_report(url, audit.fetch, audit.parse, audit.rules, audit.ai, audit.text),
+        }
+        for stage, fn in stages.items():
+            ms = _measure(fn)
+            results[f"micro.{stage}.{label}"] = _result(ms, "ms")
+            print(f"  {stage:>7} {label:>16} {ms:>10.3f} ms", file=sys.stderr)
+    return results
+
+
+# End-to-end -------------------------------------------------------------------
+
+
+def _spawn(args: list[str], env: dict | None = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", *args],
+        cwd=_ROOT,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up in {timeout:.0f} s")
+            await asyncio.sleep(0.2)
+
+
+async def _load(api: str, page_urls: list[str], concurrency: int, requests: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+    timeout = aiohttp.ClientTimeout(total=120)
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency), timeout=timeout) as session:
+
+        async def worker() -> None:
+            nonlocal errors
+            for n in counter:
+                # A unique query string per request keeps the audit cache out of the measurement.
+                url = f"{page_urls[n % len(page_urls)]}?n={n}-{time.monotonic_ns()}"
+                t0 = time.perf_counter()
+                try:
+                    async with session.post(f"{api}/audit", json={"url": url}) as response:
+                        await response.read()
+                        ok = response.status == 200
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    ok = False
+                latencies.append((time.perf_counter() - t0) * 1000)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rps": _result(requests / elapsed, "req/s", "higher"),
+        "p50_ms": _result(_percentile(latencies, 0.5), "ms"),
+        "p90_ms": _result(_percentile(latencies, 0.9), "ms"),
+        "p99_ms": _result(_percentile(latencies, 0.99), "ms"),
+        "errors": _result(errors, "requests"),
+    }
+
+
+def _check_free(port: int) -> None:
+    with socket.socket() as sock:
+        if sock.connect_ex(("127.0.0.1", port)) == 0:
+            raise SystemExit(f"port {port} is already in use; pick other ports with --port")
+
+
+def e2e(corpus: Path, pages: list, args: argparse.Namespace) -> dict:
+    ports = {"corpus": args.port, "stub": args.port + 1, "api": args.port + 2}
+    for port in ports.values():
+        _check_free(port)
+    processes = [
+        _spawn(["benchmarks.corpus_server", str(corpus), "--port", str(ports["corpus"]), "--latency", str(args.page_latency)]),
+        _spawn(["benchmarks.openai_stub", "--port", str(ports["stub"]), "--latency", str(args.ai_latency)]),
+        _spawn(
+            ["uvicorn", "app.main:app", "--port", str(ports["api"]), "--log-level", "warning"],
+            env={
+                "OPENAI_API_KEY": "stub",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{ports['stub']}/v1",
+                "LP_HISTORY_DB": "",
+                "LP_CACHE_DB": "",
+            },
+        ),
+    ]
+    api = f"http://127.0.0.1:{ports['api']}"
+    max_size = parse_size(args.e2e_max_size)
+    page_urls = [f"http://127.0.0.1:{ports['corpus']}/{page.path}" for page in pages if page.size <= max_size]
+    results = {}
+    try:
+
+        async def run() -> None:
+            await _wait_ready(f"http://127.0.0.1:{ports['corpus']}/stats")
+            await _wait_ready(f"http://127.0.0.1:{ports['stub']}/stats")
+            await _wait_ready(f"{api}/cache/stats")
+            await _load(api, page_urls, 4, 20)  # warm-up: pools, process pool, imports
+            for concurrency in args.concurrency:
+                stats = await _load(api, page_urls, concurrency, args.requests)
+                for name, value in stats.items():
+                    results[f"e2e.c{concurrency}.{name}"] = value
+                print(
+                    f"  c={concurrency:<4} {stats['rps']['value']:>8.1f} req/s  p50 {stats['p50_ms']['value']:.0f} ms"
+                    f"  p90 {stats['p90_ms']['value']:.0f} ms  p99 {stats['p99_ms']['value']:.0f} ms"
+                    f"  errors {stats['errors']['value']:.0f}",
+                    file=sys.stderr,
+                )
+
+        asyncio.run(run())
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+    return results
+
+
+# Baselines ------------------------------------------------------------------
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(baseline: dict, current: dict, threshold: float, noise_ms: float = 0.05) -> list[str]:
+    """Print a comparison table and return the names of regressed results.
+
+    Changes of timings smaller than ``noise_ms`` are never reported as regressions.
+    """
+    regressions = []
+    print(f"{'result':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, now in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<40} {'—':>12} {now['value']:>12.3f} {'new':>8}")
+            continue
+        if base["value"] == 0:
+            change = 0.0 if now["value"] == 0 else float("inf")
+        else:
+            change = (now["value"] - base["value"]) / base["value"]
+        worse = change > threshold if now["better"] == "lower" else change < -threshold
+        if now["unit"] == "ms" and abs(now["value"] - base["value"]) < noise_ms:
+            worse = False
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<40} {base['value']:>12.3f} {now['value']:>12.3f} {change:>+8.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def run(args: argparse.Namespace) -> int:
+    corpus = Path(args.corpus)
+    sizes = tuple(parse_size(s) for s in args.sizes.split(","))
+    pages = generate(corpus, sizes, per_size=args.per_size)
+    print(f"corpus: {len(pages)} pages in {corpus}", file=sys.stderr)
+    results = {}
+    if not args.no_micro:
+        print("microbenchmarks:", file=sys.stderr)
+        results.update(micro(corpus, pages))
+    if not args.no_e2e:
+        print("end-to-end /audit:", file=sys.stderr)
+        results.update(e2e(corpus, pages, args))
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": {
+                "sizes": args.sizes,
+                "per_size": args.per_size,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "page_latency": args.page_latency,
+                "ai_latency": args.ai_latency,
+                "e2e_max_size": args.e2e_max_size,
+            },
+        },
+        "results": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"results: {output}", file=sys.stderr)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        return 1 if compare(baseline, report, args.threshold, args.noise) else 0
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite and write a JSON baseline")
+    run_parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "lp-corpus"))
+    run_parser.add_argument("--sizes", default=",".join(f"{s // 1024}k" for s in DEFAULT_SIZES))
+    run_parser.add_argument("--per-size", type=int, default=2, help="pages per size class and encoding")
+    run_parser.add_argument("--output", default=f"benchmarks/results/{datetime.now():%Y%m%d-%H%M%S}.json")
+    run_parser.add_argument("--no-micro", action="store_true")
+    run_parser.add_argument("--no-e2e", action="store_true")
+    run_parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 10, 50])
+    run_parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    run_parser.add_argument("--e2e-max-size", default="1m", help="largest page size class used end to end")
+    run_parser.add_argument("--page-latency", type=float, default=0.02, help="corpus server latency, seconds")
+    run_parser.add_argument("--ai-latency", type=float, default=0.1, help="OpenAI stand-in latency, seconds")
+    run_parser.add_argument("--port", type=int, default=8180, help="first of three consecutive ports")
+    run_parser.add_argument("--baseline", help="compare with this baseline")
+    run_parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    run_parser.add_argument("--noise", type=float, default=0.05, help="timing changes below this many ms are ignored")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    compare_parser.add_argument("--noise", type=float, default=0.05, help="timing changes below this many ms are ignored")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        sys.exit(run(args))
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    current = json.loads(Path(args.current).read_text(encoding="utf-8"))
+    sys.exit(1 if compare(baseline, current, args.threshold, args.noise) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Audit cache: conditional-GET revalidation and the memory / SQLite tiers.
+
+The revalidation tests audit pages of a local aiohttp site that sends ETag /
+Last-Modified (or nothing) and counts the requests it answers, so each test
+sees whether a cached audit was served as is, revalidated with a 304 or an
+unchanged body, or audited again. Robots.txt / sitemap, page weight, the
+similarity index and the AI stage are off.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from aiohttp import web
+
+from app.ai import gpt_client
+from app.ai.gpt_client import GPTClient
+from app.main import Services
+from app.settings import Settings
+from app.storage.cache import AuditCache, CacheEntry, SQLiteStore, normalize_url
+
+
+class _Site:
+    """Pages with and without validators; records what the fetcher asks for."""
+
+    def __init__(self) -> None:
+        self.title = "Первая версия"
+        self.etag = '"v1"'
+        self.last_modified = "Wed, 21 Oct 2026 07:28:00 GMT"
+        self.requests: Counter[str] = Counter()  # path -> requests answered
+        self.not_modified = 0  # 304 answers
+        self.conditional: list[tuple[str | None, str | None]] = []  # (If-None-Match, If-Modified-Since)
+
+    def html(self) -> str:
+        return f"<html><head><title>{self.title}</title></head><body><h1>{self.title}</h1></body></html>"
+
+    async def page(self, request: web.Request) -> web.Response:
+        self.requests[request.path] += 1
+        if_none_match = request.headers.get("If-None-Match")
+        if_modified_since = request.headers.get("If-Modified-Since")
+        self.conditional.append((if_none_match, if_modified_since))
+        validators = {"Last-Modified": self.last_modified}
+        if self.etag is not None:
+            validators["ETag"] = self.etag
+        if if_none_match is not None:
+            unchanged = if_none_match == self.etag
+        else:
+            unchanged = if_modified_since == self.last_modified
+        if unchanged:
+            self.not_modified += 1
+            return web.Response(status=304, headers=validators)
+        return web.Response(text=self.html(), content_type="text/html", headers=validators)
+
+    async def plain(self, request: web.Request) -> web.Response:
+        self.requests[request.path] += 1
+        return web.Response(text=self.html(), content_type="text/html")
+
+    async def moved(self, request: web.Request) -> web.Response:
+        self.requests[request.path] += 1
+        raise web.HTTPMovedPermanently("/page")
+
+
+@asynccontextmanager
+async def _serve(site: _Site) -> AsyncIterator[str]:
+    app = web.Application()
+    app.router.add_get("/page", site.page)
+    app.router.add_get("/plain", site.plain)
+    app.router.add_get("/moved", site.moved)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        await runner.cleanup()
+
+
+@asynccontextmanager
+async def _services(monkeypatch, **settings) -> AsyncIterator[Services]:
+    monkeypatch.setattr(gpt_client, "_client", GPTClient(api_key=None))  # the AI stage is skipped
+    services = Services(Settings(site_files=False, page_weight=False, similarity=False, **settings))
+    try:
+        yield services
+    finally:
+        await services.stop()
+
+
+# Revalidation -----------------------------------------------------------------
+
+def test_fresh_entry_is_served_without_a_request(monkeypatch):
+    async def main():
+        site = _Site()
+        async with _serve(site) as origin, _services(monkeypatch) as services:
+            first = await services._audit_cached(f"{origin}/page", [])
+            second = await services._audit_cached(f"{origin}/page", [])
+            stats = services.audit_cache.stats
+        assert site.requests["/page"] == 1
+        assert (stats.misses, stats.hits) == (1, 1)
+        assert second.audit == first.audit
+        assert second.server_timing.startswith("cache;desc=hit")
+
+    asyncio.run(main())
+
+
+def test_stale_entry_is_revalidated_with_304(monkeypatch):
+    async def main():
+        site = _Site()
+        async with _serve(site) as origin, _services(monkeypatch, cache_ttl=0) as services:
+            first = await services._audit_cached(f"{origin}/page", [])
+            site.title = "Не отдаётся: сервер отвечает 304"
+            second = await services._audit_cached(f"{origin}/page", [])
+            stats = services.audit_cache.stats
+        assert site.conditional == [(None, None), ('"v1"', site.last_modified)]
+        assert site.not_modified == 1
+        assert (stats.misses, stats.revalidated, stats.refreshed) == (1, 1, 0)
+        assert second.audit == first.audit
+        assert second.server_timing.endswith("cache;desc=revalidated")
+
+    asyncio.run(main())
+
+
+def test_last_modified_alone_is_sent(monkeypatch):
+    async def main():
+        site = _Site()
+        site.etag = None
+        async with _serve(site) as origin, _services(monkeypatch, cache_ttl=0) as services:
+            await services._audit_cached(f"{origin}/page", [])
+            await services._audit_cached(f"{origin}/page", [])
+            stats = services.audit_cache.stats
+        assert site.conditional[1] == (None, site.last_modified)
+        assert site.not_modified == 1
+        assert stats.revalidated == 1
+
+    asyncio.run(main())
+
+
+def test_unchanged_body_without_validators_is_revalidated(monkeypatch):
+    async def main():
+        site = _Site()
+        async with _serve(site) as origin, _services(monkeypatch, cache_ttl=0) as services:
+            first = await services._audit_cached(f"{origin}/plain", [])
+            second = await services._audit_cached(f"{origin}/plain", [])
+            stats = services.audit_cache.stats
+        assert site.requests["/plain"] == 2  # full body both times, same hash
+        assert (stats.revalidated, stats.refreshed) == (1, 0)
+        assert second.audit == first.audit
+
+    asyncio.run(main())
+
+
+def test_changed_page_is_audited_again(monkeypatch):
+    async def main():
+        site = _Site()
+        async with _serve(site) as origin, _services(monkeypatch, cache_ttl=0) as services:
+            await services._audit_cached(f"{origin}/page", [])
+            site.title, site.etag = "Вторая версия", '"v2"'
+            second = await services._audit_cached(f"{origin}/page", [])
+            stale_validator = await services.audit_cache.get(normalize_url(f"{origin}/page"))
+            third = await services._audit_cached(f"{origin}/plain", [])
+            site.title = "Третья версия"
+            fourth = await services._audit_cached(f"{origin}/plain", [])
+            stats = services.audit_cache.stats
+        assert second.audit.parse.title == "Вторая версия"
+        assert stale_validator.etag == '"v2"'  # the new entry keeps the new validators
+        assert (third.audit.parse.title, fourth.audit.parse.title) == ("Вторая версия", "Третья версия")
+        assert (stats.revalidated, stats.refreshed) == (0, 2)
+
+    asyncio.run(main())
+
+
+def test_revalidation_touches_the_final_url_key(monkeypatch):
+    async def main():
+        site = _Site()
+        async with _serve(site) as origin, _services(monkeypatch, cache_ttl=0) as services:
+            cache = services.audit_cache
+            await services._audit_cached(f"{origin}/moved", [])
+            stored = await cache.get(normalize_url(f"{origin}/page"))
+            assert stored is not None and stored.final_url == f"{origin}/page"
+
+            await services._audit_cached(f"{origin}/moved", [])
+            assert cache.stats.revalidated == 1
+            renewed = await cache.get(normalize_url(f"{origin}/page"))
+            assert renewed.stored_at > stored.stored_at
+            assert await cache.get(normalize_url(f"{origin}/moved")) is renewed
+
+            # The page itself is now served from the renewed entry without a request.
+            cache.ttl = 600
+            await services._audit_cached(f"{origin}/page", [])
+            assert cache.stats.hits == 1
+        assert site.requests == {"/moved": 2, "/page": 2}
+
+    asyncio.run(main())
+
+
+def test_cache_survives_restart(monkeypatch, tmp_path):
+    db = str(tmp_path / "cache.db")
+
+    async def main():
+        site = _Site()
+        async with _serve(site) as origin:
+            async with _services(monkeypatch, cache_db=db) as services:
+                first = await services._audit_cached(f"{origin}/page", [])
+            async with _services(monkeypatch, cache_db=db) as services:
+                second = await services._audit_cached(f"{origin}/page", [])
+                assert services.audit_cache.stats.hits == 1
+        assert site.requests["/page"] == 1
+        assert second.audit == first.audit
+
+    asyncio.run(main())
+
+
+# Memory and SQLite tiers --------------------------------------------------------
+
+def _entry(stored_at: float, title: str = "x") -> CacheEntry:
+    return CacheEntry({"title": title}, f"https://example.com/{title}", '"e"', None, "hash", stored_at)
+
+
+def test_ttl():
+    cache = AuditCache(ttl=60)
+    entry = _entry(stored_at=1000.0)
+    assert cache.is_fresh(entry, now=1059.9)
+    assert not cache.is_fresh(entry, now=1060.0)
+
+
+def test_memory_tier_is_lru():
+    async def main():
+        cache = AuditCache(max_entries=2)
+        await cache.put(["a"], _entry(1.0, "a"))
+        await cache.put(["b"], _entry(2.0, "b"))
+        assert await cache.get("a") is not None  # "a" is now the most recent
+        await cache.put(["c"], _entry(3.0, "c"))
+        assert len(cache) == 2
+        assert await cache.get("b") is None
+        assert (await cache.get("a")).payload == {"title": "a"}
+        assert (await cache.get("c")).payload == {"title": "c"}
+
+    asyncio.run(main())
+
+
+def test_sqlite_tier_backs_the_memory_tier(tmp_path):
+    async def main():
+        store = SQLiteStore(str(tmp_path / "cache.db"))
+        cache = AuditCache(ttl=60, max_entries=1, store=store)
+        await cache.put(["a", "a-final"], _entry(1.0, "a"))
+        await cache.put(["b"], _entry(2.0, "b"))
+        assert len(cache) == 1  # "a" is evicted from memory only
+
+        entry = await cache.get("a-final")
+        assert entry == _entry(1.0, "a")  # stale, but kept with its validators
+        assert not cache.is_fresh(entry)
+        assert await cache.get("missing") is None
+
+        renewed = await cache.touch(["a", "a-final"], entry, etag='"f"')
+        store.close()
+        reopened = AuditCache(ttl=60, store=SQLiteStore(str(tmp_path / "cache.db")))
+        assert await reopened.get("a") == renewed
+        assert renewed.etag == '"f"' and renewed.last_modified is None
+        assert reopened.is_fresh(renewed)
+        reopened.store.close()
+
+    asyncio.run(main())
+
+
+def test_sqlite_store_drops_the_oldest_rows(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.db"), max_entries=3)
+    for n in range(99):
+        store.put([f"k{n}"], {"n": n}, stored_at=float(n))
+    assert len(list(store.items())) == 99  # pruned every 100 writes
+    store.put_many([("k99", {"n": 99})], stored_at=99.0)
+    assert [key for key, _ in store.items()] == ["k97", "k98", "k99"]
+    store.close()
@@ -0,0 +1,252 @@
+"""GPT client against the local OpenAI stub (``benchmarks/openai_stub.py``).
+
+Every test starts the stub on a free port and points a fresh
+:class:`~app.ai.gpt_client.GPTClient` at it; the stub's request counters show
+what went over the wire. Backoff delays are recorded instead of slept.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from aiohttp import web
+
+from app.ai import gpt_client
+from app.ai.gpt_client import GPTClient, _build_user_prompt, _ResultCache, estimate_tokens
+from app.parsers.html_parser import ParsedPage, parse_html
+from app.storage.cache import SQLiteStore
+from benchmarks.openai_stub import STATS, make_app
+
+
+@asynccontextmanager
+async def _stub(**options) -> AsyncIterator[tuple[str, dict]]:
+    """Run the stub; yields its base URL and its request counters."""
+    app = make_app(**options)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    try:
+        yield f"http://{host}:{port}/v1", app[STATS]
+    finally:
+        await runner.cleanup()
+
+
+def _client(base_url: str, **options) -> GPTClient:
+    options.setdefault("cache", _ResultCache())
+    options.setdefault("max_retries", 0)
+    return GPTClient("test-key", base_url, **options)
+
+
+def _page(n: int) -> ParsedPage:
+    html = f"<html><head><title>Page {n}</title></head><body><h1>Offer {n}</h1><form></form></body></html>"
+    return parse_html(html.encode())
+
+
+def _record_backoff(monkeypatch) -> list[float]:
+    """Record the delays the client would sleep between retries and retry at once."""
+    delays: list[float] = []
+    backoff = GPTClient._backoff
+
+    def record(attempt: int, exc: Exception) -> float:
+        delays.append(backoff(attempt, exc))
+        return 0.0
+
+    monkeypatch.setattr(GPTClient, "_backoff", staticmethod(record))
+    return delays
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_single_page():
+    async def main():
+        async with _stub() as (url, stats):
+            client = _client(url)
+            result = await client.analyze(_page(1))
+            await client.close()
+        assert stats["requests"] == 1
+        assert result.readability == "medium"
+        assert result.recommendations[0] == "Page 1: recommendation 1"
+        assert len(result.recommendations) == 5
+
+    _run(main())
+
+
+def test_retries_on_rate_limit_with_retry_after(monkeypatch):
+    delays = _record_backoff(monkeypatch)
+
+    async def main():
+        async with _stub(rate_limit_every=2) as (url, stats):
+            client = _client(url, max_retries=2)
+            first = await client.analyze(_page(1))  # request 1
+            second = await client.analyze(_page(2))  # request 2 is rate limited, request 3 succeeds
+            await client.close()
+        assert first is not None and second is not None
+        assert stats == {"requests": 3, "rate_limited": 1, "pages": 2}
+
+    _run(main())
+    assert delays == [0.05]
+
+
+def test_retry_after_is_capped(monkeypatch):
+    delays = _record_backoff(monkeypatch)
+
+    async def main():
+        async with _stub(rate_limit_every=1, retry_after="3600") as (url, stats):
+            client = _client(url, max_retries=2)
+            result = await client.analyze(_page(1))
+            await client.close()
+        assert result is None
+        assert stats["requests"] == 3
+
+    _run(main())
+    assert delays == [30.0, 30.0]
+
+
+def test_unusable_retry_after_falls_back_to_jittered_backoff(monkeypatch):
+    delays = _record_backoff(monkeypatch)
+
+    async def main():
+        async with _stub(rate_limit_every=1, retry_after="Wed, 21 Oct 2015 07:28:00 GMT") as (url, stats):
+            client = _client(url, max_retries=3)
+            assert await client.analyze(_page(1)) is None
+            await client.close()
+        assert stats["requests"] == 4
+
+    _run(main())
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays):
+        assert 0 <= delay <= 0.5 * 2**attempt
+
+
+def test_timeout():
+    async def main():
+        async with _stub(latency=1.0) as (url, stats):
+            client = _client(url, timeout=0.2, max_retries=1)
+            started = time.perf_counter()
+            result = await client.analyze(_page(1))
+            elapsed = time.perf_counter() - started
+            await client.close()
+            requests = stats["requests"]
+        assert result is None
+        assert requests == 2  # a timeout is retried
+        assert elapsed < 1.0
+
+    _run(main())
+
+
+def test_cache_is_keyed_by_model_and_prompt_version(monkeypatch):
+    async def main():
+        async with _stub() as (url, stats):
+            cache = _ResultCache()
+            first = _client(url, cache=cache, model="model-a")
+            other = _client(url, cache=cache, model="model-b")
+            page = _page(1)
+
+            result = await first.analyze(page)
+            assert await first.analyze(page) == result
+            assert (stats["requests"], cache.hits) == (1, 1)
+
+            await other.analyze(page)
+            assert stats["requests"] == 2
+
+            monkeypatch.setattr(gpt_client, "PROMPT_VERSION", "test")
+            await first.analyze(page)
+            assert stats["requests"] == 3
+            await first.close()
+            await other.close()
+
+    _run(main())
+
+
+def test_persistent_cache_survives_the_client(tmp_path):
+    path = str(tmp_path / "ai.db")
+
+    async def main():
+        async with _stub() as (url, stats):
+            client = _client(url, cache=_ResultCache(store=SQLiteStore(path, table="ai_cache")))
+            result = await client.analyze(_page(1))
+            await client.close()
+
+            cache = _ResultCache(store=SQLiteStore(path, table="ai_cache"))
+            client = _client(url, cache=cache)
+            assert await client.analyze(_page(1)) == result
+            await client.close()
+        assert stats["requests"] == 1
+        assert cache.hits == 1
+
+    _run(main())
+
+
+def test_batch_is_split_into_page_results():
+    async def main():
+        async with _stub() as (url, stats):
+            client = _client(url, batch_size=4)
+            results = await client.analyze_many([_page(n) for n in range(3)])
+            await client.close()
+        assert stats == {"requests": 1, "rate_limited": 0, "pages": 3}
+        assert [r.recommendations[0] for r in results] == [f"Page {n}: recommendation 1" for n in range(3)]
+
+    _run(main())
+
+
+def test_pages_missing_from_a_short_batch_answer_are_retried_alone():
+    async def main():
+        async with _stub(batch_missing=1) as (url, stats):
+            client = _client(url, batch_size=4)
+            results = await client.analyze_many([_page(n) for n in range(3)])
+            await client.close()
+        assert stats["requests"] == 2  # the batch, then page 2 on its own
+        assert [r.recommendations[0] for r in results] == [f"Page {n}: recommendation 1" for n in range(3)]
+
+    _run(main())
+
+
+def test_garbled_batch_answer_falls_back_to_single_pages():
+    async def main():
+        async with _stub(garbled=True) as (url, stats):
+            client = _client(url, batch_size=4)
+            results = await client.analyze_many([_page(n) for n in range(3)])
+            await client.close()
+        assert stats["requests"] == 4
+        assert [r.recommendations[0] for r in results] == [f"Page {n}: recommendation 1" for n in range(3)]
+
+    _run(main())
+
+
+def test_token_budget_splits_batches():
+    pages = [_page(n) for n in range(5)]
+    cost = estimate_tokens(_build_user_prompt(pages[0]))
+    assert all(estimate_tokens(_build_user_prompt(page)) == cost for page in pages)
+
+    client = GPTClient("test-key", batch_size=10, batch_token_budget=2 * cost)
+    assert client.plan_batches([_build_user_prompt(page) for page in pages]) == [[0, 1], [2, 3], [4]]
+
+    async def main():
+        async with _stub() as (url, stats):
+            # Micro-batching: pages queued by concurrent analyze() calls are flushed
+            # as soon as the next one would exceed the budget.
+            client = _client(url, batch_size=10, batch_token_budget=2 * cost, batch_wait=0.05)
+            results = await asyncio.gather(*(client.analyze(page) for page in pages))
+            await client.close()
+        assert stats == {"requests": 3, "rate_limited": 0, "pages": 5}
+        assert [r.recommendations[0] for r in results] == [f"Page {n}: recommendation 1" for n in range(5)]
+
+    _run(main())
+
+
+def test_close_cancels_queued_batches():
+    async def main():
+        async with _stub(latency=1.0) as (url, _):
+            client = _client(url, batch_size=4, batch_wait=0.01)
+            calls = [asyncio.ensure_future(client.analyze(_page(n))) for n in range(3)]
+            await asyncio.sleep(0.2)  # the batch is in flight
+            await client.close()
+            assert await asyncio.gather(*calls) == [None, None, None]
+            assert not client._tasks
+
+    _run(main())
@@ -0,0 +1,271 @@
+"""Parity of the single-pass parser with the BeautifulSoup parser it replaced.
+
+``_baseline_parse`` is the ``parse_html`` of the original implementation
+(BeautifulSoup with ``html.parser``), kept here as the reference. Both
+backends of :func:`app.parsers.html_parser.parse_html` must produce the same
+fields on a corpus of hand-written landing pages, malformed snippets and
+randomly generated pages (seeded, so failures reproduce).
+
+The stdlib backend must match on every page. The lxml backend follows
+libxml2's tree construction, which closes some elements implicitly where
+``html.parser`` does not (``<h1>Un<p>closed</h1>``); it must match on
+well-formed pages, and its known differences on malformed markup are listed
+as expected failures.
+
+ParsedPage keeps at most ``_MAX_HEADINGS`` headings per level and
+``_MAX_HEADING_CHARS`` characters of each; the baseline's headings are cut
+the same way before comparing. Analytics detection is not compared: the baseline removed scripts before
+looking at them, so it never found anything.
+"""
+from __future__ import annotations
+
+import random
+from collections import defaultdict
+from typing import Optional
+from urllib.parse import urlparse
+
+import bs4  # the reference implementation; see requirements-dev.txt
+import lxml  # noqa: F401 - both backends are always compared
+import pytest
+
+from app.parsers.html_parser import _MAX_HEADING_CHARS, _MAX_HEADINGS, DEFAULT_BACKEND, PageExtractor, parse_html
+
+PAGE_URL = "https://shop.example.com/landing"
+BACKENDS = ["html.parser", "lxml"]
+
+
+def _baseline_parse(html: str, page_url: str | None = None) -> dict:
+    """Fields of ParsedPage as the BeautifulSoup implementation computed them."""
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.extract()
+
+    title_tag = soup.title
+    title = title_tag.string.strip() if title_tag and title_tag.string else None
+
+    def _meta(name: str) -> Optional[str]:
+        tag = soup.find("meta", attrs={"name": name})
+        if tag and tag.get("content"):
+            return tag["content"].strip()
+        return None
+
+    headings: dict[int, list[str]] = defaultdict(list)
+    for level in (1, 2, 3):
+        for tag in soup.find_all(f"h{level}"):
+            text = tag.get_text(strip=True)
+            if text:
+                headings[level].append(text)
+
+    imgs = soup.find_all("img")
+    external_links = external_nofollow = 0
+    domain = urlparse(page_url).netloc if page_url else ""
+    for a in soup.find_all("a", href=True):
+        parsed = urlparse(a["href"])
+        if not parsed.netloc or (domain and parsed.netloc.endswith(domain)):
+            continue
+        external_links += 1
+        if "nofollow" in {val.lower() for val in a.get("rel", [])}:
+            external_nofollow += 1
+
+    return {
+        "title": title,
+        "meta_description": _meta("description"),
+        "meta_keywords": _meta("keywords"),
+        "headings": dict(headings),
+        "images_total": len(imgs),
+        "images_without_alt": sum(1 for img in imgs if not img.get("alt")),
+        "forms_count": len(soup.find_all("form")),
+        "external_links": external_links,
+        "external_nofollow": external_nofollow,
+        "text_content": soup.get_text(" ", strip=True),
+    }
+
+
+def _expected(html: str) -> dict:
+    fields = _baseline_parse(html, PAGE_URL)
+    fields["headings"] = {
+        level: [text[:_MAX_HEADING_CHARS] for text in texts[:_MAX_HEADINGS]]
+        for level, texts in fields["headings"].items()
+    }
+    return fields
+
+
+def _fields(html: str, backend: str) -> dict:
+    return _page_fields(parse_html(html, PAGE_URL, backend=backend, keep_text=True))
+
+
+def _page_fields(page) -> dict:
+    return {key: getattr(page, key) for key in _baseline_parse("", None)}
+
+
+# -- corpus --------------------------------------------------------------------
+
+LANDING_PAGES = [
+    """<!DOCTYPE html>
+<html lang="ru"><head>
+<meta charset="utf-8"><title>  Доставка цветов в Москве </title>
+<meta name="description" content=" Букеты за 2 часа. ">
+<meta name="keywords" content="цветы, доставка">
+<link rel="stylesheet" href="/style.css">
+<script src="https://www.googletagmanager.com/gtag/js?id=G-1" async></script>
+<script>window.dataLayer = []; function gtag(){dataLayer.push(arguments)}</script>
+<style>h1 { color: red }</style>
+</head><body>
+<header><nav><a href="/">Главная</a> <a href="https://vk.com/shop" rel="nofollow noopener">VK</a></nav></header>
+<h1>Свежие цветы &mdash; с доставкой</h1>
+<p>Соберём букет за <b>30 минут</b> и привезём за 2 часа.</p>
+<h2>Каталог</h2><ul><li>Розы</li><li>Тюльпаны</li></ul>
+<img src="/a.jpg" alt="Розы"><img src="/b.jpg"><img src="/c.jpg" alt="">
+<h2>Заказ</h2>
+<form action="/order"><input name="phone" placeholder="Телефон"><button>Заказать</button></form>
+<noscript><img src="https://mc.yandex.ru/watch/1" alt=""></noscript>
+<footer><a href="https://shop.example.com/privacy">Политика</a> <a href="https://partner.example.org/">Партнёр</a></footer>
+</body></html>""",
+    """<html><head><title>Online course</title></head><body>
+<section><h1>Learn <em>Python</em> in 4 weeks</h1><h3>For beginners</h3>
+<p>Lessons&nbsp;every day. <a href="//cdn.example.net/brochure.pdf">Brochure</a></p>
+<div><h2>Program</h2><ol><li>Basics</li><li>Web</li></ol></div>
+<form method="post"><input type="email" name="email"><input type="submit" value="Sign up"></form>
+<form><textarea name="q"></textarea></form></section>
+<!-- a comment with <h1>markup</h1> -->
+</body></html>""",
+    "<title>Only title</title>",
+    "",
+    "<html><body><p>No title, no headings, just text.</p></body></html>",
+]
+
+MALFORMED = [
+    "<h1>Un<p>closed</h1>",
+    "<h3>x<li>y</h3>",
+    "<h1>a<h2>b</h2>c</h1>",
+    "<title>T</title><h2>x<div>y</div>z</h2>",
+    "<p><h1>in p</h1></p>",
+    "<h1>a</h2>b</h1>",
+    "<form><form></form></form>",
+    "<h1><b>bo<i>ld</b>it</i></h1>",
+    "<a href='http://e.com'>x<a href='http://f.com' rel=nofollow>y</a>",
+    "<div><h2>never closed",
+    "</h1>stray end tags</div></p>",
+    "<img src=x alt><img src=y alt=''><IMG SRC=z ALT=ok>",
+    "<title>a <b>b</b></title><h1>x</h1>",
+    "<meta name=description><meta name=description content='second'>",
+    "<script>document.write('<h1>not a heading</h1>')</script><h1>real</h1>",
+    "<style>p{}</style><noscript><h2>hidden</h2></noscript><h2>shown</h2>",
+    "<h2>a &amp; b &lt;c&gt; &#1092; &unknown;</h2>",
+    "<a href=https://shop.example.com.evil.org/>lookalike</a><a href='mailto:x@y.z'>mail</a>",
+]
+
+# Malformed markup on which libxml2 builds a different tree than html.parser.
+LXML_DIFFERS = {
+    "<h1>Un<p>closed</h1>",
+    "<h3>x<li>y</h3>",
+    "<h1>a</h2>b</h1>",
+    "<title>a <b>b</b></title><h1>x</h1>",  # title content is raw text
+    "<h2>a &amp; b &lt;c&gt; &#1092; &unknown;</h2>",  # unknown entity kept with its semicolon
+}
+
+_WORDS = "купить доставка цена скидка offer free trial заказ telegram 24/7 гарантия качество".split()
+_INLINE = ["b", "i", "span", "em", "strong", "a"]
+_BLOCK = ["div", "p", "section", "ul", "li", "h1", "h2", "h3", "form"]
+_PHRASING_ONLY = {"p", "h1", "h2", "h3"}
+
+
+def _random_page(rnd: random.Random, malformed: bool) -> str:
+    """A random page; ``malformed`` drops and misplaces end tags and nests elements freely."""
+    out: list[str] = []
+    if rnd.random() < 0.8:
+        out.append(f"<head><title>{' '.join(rnd.choices(_WORDS, k=3))}</title>")
+        for name in ("description", "keywords"):
+            if rnd.random() < 0.6:
+                out.append(f'<meta name="{name}" content=" {rnd.choice(_WORDS)} ">')
+        out.append("</head>")
+    out.append("<body>")
+    stack: list[str] = []
+    for _ in range(rnd.randint(5, 40)):
+        roll = rnd.random()
+        if roll < 0.3:
+            out.append(" ".join(rnd.choices(_WORDS, k=rnd.randint(1, 6))) + rnd.choice(["", ".", "!", " "]))
+        elif roll < 0.5:
+            if malformed:
+                tag = rnd.choice(_BLOCK if not stack or stack[-1] not in _INLINE else _INLINE)
+            else:  # valid nesting: only phrasing content inside headings, paragraphs and inline elements
+                phrasing = any(t in _PHRASING_ONLY or t in _INLINE for t in stack)
+                tag = rnd.choice(_INLINE if phrasing else _BLOCK)
+                if tag == "a" and "a" in stack:
+                    tag = "span"
+            attrs = ""
+            if tag == "a":
+                href = rnd.choice(["/page", "https://shop.example.com/x", "https://other.example.org/", "#top"])
+                rel = rnd.choice(["", " rel=nofollow", ' rel="noopener NOFOLLOW"'])
+                attrs = f' href="{href}"{rel}'
+            out.append(f"<{tag}{attrs}>")
+            stack.append(tag)
+        elif roll < 0.75 and stack:
+            tag = stack.pop()
+            if malformed and rnd.random() < 0.3:
+                if rnd.random() < 0.5:
+                    continue  # end tag left out
+                tag = rnd.choice(_BLOCK + _INLINE)  # wrong end tag
+            out.append(f"</{tag}>")
+        elif roll < 0.85:
+            alt = rnd.choice(["", ' alt=""', ' alt="фото"', " alt"])
+            out.append(f'<img src="/{rnd.randint(1, 99)}.jpg"{alt}>')
+        elif roll < 0.9:
+            out.append(rnd.choice(["<br>", "<hr>", "&amp;", "&nbsp;", "<!-- c -->", "<input name=q>"]))
+        else:
+            out.append(rnd.choice(["<script>var x = '<h1>'</script>", "<style>h2{}</style>", "<noscript>js</noscript>"]))
+    while stack and not malformed:
+        out.append(f"</{stack.pop()}>")
+    out.append("</body>")
+    return "".join(out)
+
+
+RANDOM_WELL_FORMED = [_random_page(random.Random(seed), malformed=False) for seed in range(200)]
+RANDOM_MALFORMED = [_random_page(random.Random(seed), malformed=True) for seed in range(200, 600)]
+
+
+# -- tests ---------------------------------------------------------------------
+
+
+def test_default_backend_is_stdlib():
+    # Only the stdlib backend matches the baseline on malformed markup.
+    assert DEFAULT_BACKEND == "html.parser"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("html", LANDING_PAGES, ids=range(len(LANDING_PAGES)))
+def test_landing_pages(html, backend):
+    assert _fields(html, backend) == _expected(html)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("html", MALFORMED)
+def test_malformed_snippets(html, backend, request):
+    if backend == "lxml" and html in LXML_DIFFERS:
+        request.applymarker(pytest.mark.xfail(reason="libxml2 closes the element implicitly", strict=True))
+    assert _fields(html, backend) == _expected(html)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_random_well_formed_pages(backend):
+    for seed, html in enumerate(RANDOM_WELL_FORMED):
+        assert _fields(html, backend) == _expected(html), f"seed {seed}"
+
+
+def test_random_malformed_pages():
+    for seed, html in enumerate(RANDOM_MALFORMED, start=200):
+        assert _fields(html, "html.parser") == _expected(html), f"seed {seed}"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_bytes_and_chunked_input(backend):
+    """Raw bytes and any split into chunks give the same page as one string."""
+    html = LANDING_PAGES[0]
+    expected = _fields(html, backend)
+    assert _page_fields(parse_html(html.encode(), PAGE_URL, backend=backend, keep_text=True)) == expected
+    data = html.encode("utf-8")
+    for size in (1, 7, 64):
+        extractor = PageExtractor(PAGE_URL, backend=backend, keep_text=True)
+        for start in range(0, len(data), size):
+            extractor.feed(data[start : start + size])
+        assert _page_fields(extractor.close()) == expected, f"chunk size {size}"
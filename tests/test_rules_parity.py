@@ -0,0 +1,268 @@
+"""Parity of the columnar rule evaluation with the per-page one.
+
+:func:`app.analyzers.vectorized.evaluate_batch` must return exactly what
+:func:`app.analyzers.basic.evaluate_basic` returns for each page: the same
+rules, statuses and messages, in the same order. The pages are generated
+(seeded, so failures reproduce) with and without robots.txt / sitemap data and
+page weight, including empty and truncated downloads, and are evaluated with
+the bundled thresholds and with an override file.
+"""
+from __future__ import annotations
+
+import dataclasses
+import json
+import random
+from collections import Counter
+from urllib.robotparser import RobotFileParser
+
+import numpy  # noqa: F401 - the columnar path is what is compared; see requirements-dev.txt
+import pytest
+
+from app.analyzers import rules as rules_module
+from app.analyzers.basic import BASIC_RULES, evaluate_basic
+from app.analyzers.rules import default_thresholds, load_thresholds
+from app.analyzers.vectorized import MIN_BATCH, PageItem, evaluate_batch, evaluate_matrix
+from app.collectors.http_fetcher import FetchResult
+from app.collectors.page_weight import LONG_CACHE_TTL, AssetProbe, PageAsset, PageWeight
+from app.collectors.site_files import SiteFiles, _url_key
+from app.parsers.html_parser import parse_html
+from benchmarks.corpus import landing_page
+
+ORIGIN = "https://shop.example.com"
+
+_WORDS = "скидка доставка заказ товар цена гарантия качество быстро удобно выгодно".split()
+_SHORT_WORDS = "да мы дом кот сад лес вот там тут все".split()  # easy to read
+_SCRIPTS = (
+    "<script>gtag('config', 'G-XXXX');</script>",
+    '<script src="https://mc.yandex.ru/metrika/tag.js"></script>',
+    "<script>console.log(1)</script>",
+)
+
+
+def _random_html(rnd: random.Random, n: int) -> bytes:
+    """A small page whose every feature the rules read varies around its thresholds."""
+    parts = ["<html><head>"]
+    if rnd.random() < 0.8:
+        parts.append(f"<title>{'Заголовок ' * rnd.randint(0, 9)}{n}</title>")
+    if rnd.random() < 0.7:
+        parts.append(f'<meta name="description" content="{"описание " * rnd.randint(0, 25)}">')
+    parts.extend(rnd.sample(_SCRIPTS, k=rnd.randint(0, 3)))
+    parts.append("</head><body>")
+    parts.extend(f"<h1>Предложение {n}</h1>" for _ in range(rnd.choice((0, 1, 1, 2))))
+    for _ in range(rnd.randint(0, 6)):
+        alt = f' alt="фото {n}"' if rnd.random() < 0.5 else ""
+        parts.append(f'<img src="/img/{rnd.randint(1, 99)}.jpg"{alt}>')
+    sentences = rnd.choice((0, 3, 20, 60, 400))
+    vocabulary = rnd.choice((_WORDS, _SHORT_WORDS))
+    for _ in range(sentences):
+        words = rnd.choices(vocabulary, k=rnd.choice((3, 8, 25)))
+        parts.append(f"<p>{' '.join(words).capitalize()}.</p>")
+    parts.extend("<form><input name=phone></form>" for _ in range(rnd.randint(0, 2)))
+    parts.append("</body></html>")
+    return "".join(parts).encode()
+
+
+def _robots(lines: list[str]) -> RobotFileParser:
+    robots = RobotFileParser()
+    robots.parse(lines)
+    return robots
+
+
+_SITE_KINDS = ("none", "full", "missing", "robots_error", "pending", "robots_only", "truncated")
+
+
+def _site(rnd: random.Random, urls: list[str], kind: str) -> SiteFiles | None:
+    """No site data, or one of the states a SiteFiles snapshot can be in."""
+    if kind == "none":
+        return None
+    site = SiteFiles(ORIGIN)
+    if kind == "robots_error":
+        site.robots_error = "timeout"
+    elif kind == "missing":
+        site.robots_status = 404
+        site.sitemap_error = "HTTP 404"
+    elif kind == "pending":
+        site.complete = False
+    else:
+        site.robots_status = 200
+        site.robots = _robots(["User-agent: Yandex", "Disallow: /private", "", "User-agent: *", "Disallow: /admin"])
+        if kind == "robots_only":
+            site.complete = False
+            return site
+        site.sitemaps = [f"{ORIGIN}/sitemap.xml"]
+        site.sitemap_truncated = kind == "truncated"
+        for url in urls:
+            if rnd.random() < 0.6:
+                site._urls.add(_url_key(url))
+                site.sitemap_urls += 1
+    return site
+
+
+def _asset(rnd: random.Random, n: int) -> PageAsset:
+    kind, content_type = rnd.choice(
+        (
+            ("stylesheet", "text/css"),
+            ("script", "application/javascript"),
+            ("font", "font/woff2"),
+            ("image", "image/jpeg"),
+        )
+    )
+    probe = AssetProbe(
+        f"{ORIGIN}/static/{kind}-{n}",
+        status=rnd.choice((200, 200, 200, 206, 404, None)),
+        size=rnd.choice((None, 900, 40_000, 300_000, 900_000, 4_000_000)),
+        content_type=content_type,
+        content_encoding=rnd.choice((None, "gzip", "br")),
+        cache_ttl=rnd.choice((None, 0, 3600, LONG_CACHE_TTL, 365 * 24 * 3600)),
+    )
+    if probe.status is None:
+        probe.error = "timeout"
+    blocking = kind in ("stylesheet", "script") and rnd.random() < 0.7
+    return PageAsset(probe.url, kind, blocking, probe)
+
+
+def _weight(rnd: random.Random, html_bytes: int) -> PageWeight | None:
+    if rnd.random() < 0.3:
+        return None
+    assets = [_asset(rnd, n) for n in range(rnd.choice((0, 1, 3, 8, 20)))]
+    return PageWeight(html_bytes, assets=assets, found=len(assets), skipped=rnd.choice((0, 0, 2)))
+
+
+def _items(seed: int, count: int) -> list[PageItem]:
+    rnd = random.Random(seed)
+    urls = [f"{ORIGIN}/{'private/' if n % 7 == 0 else ''}page-{n}" for n in range(count)]
+    sites = [_site(rnd, urls, kind) for kind in _SITE_KINDS]  # pages of one site share its snapshot
+    large = landing_page(0, 1_100_000)  # over page_size.max_mb without being cut
+    large_page = parse_html(large, f"{ORIGIN}/large")
+    items: list[PageItem] = []
+    for n, url in enumerate(urls):
+        kind = rnd.choice(("random", "random", "landing", "empty", "truncated", "large"))
+        if kind == "large":
+            html = large
+        elif kind == "landing":
+            html = landing_page(n, rnd.choice((10_000, 60_000)))
+        elif kind == "empty":
+            html = b""
+        else:
+            html = _random_html(rnd, n)
+        bytes_read = len(html)
+        truncated = kind == "truncated"
+        if truncated:
+            # Cut mid-markup at the download limit, as the fetcher does.
+            html = html[: rnd.randint(0, len(html))]
+            bytes_read = rnd.choice((len(html), 2 * 1024 * 1024))
+        fetch = FetchResult(
+            html,
+            200,
+            "" if kind == "empty" and rnd.random() < 0.5 else url,
+            ssl_ok=rnd.random() < 0.8,
+            bytes_read=bytes_read,
+            truncated=truncated,
+            page_weight=_weight(rnd, bytes_read),
+        )
+        parsed = large_page if kind == "large" else parse_html(html, url)
+        items.append((parsed, fetch, rnd.choice(sites)))
+    return items
+
+
+@pytest.fixture(scope="module")
+def items() -> list[PageItem]:
+    return _items(seed=1, count=300)
+
+
+@pytest.fixture
+def override(tmp_path) -> dict:
+    path = tmp_path / "rules.json"
+    path.write_text(
+        json.dumps(
+            {
+                "title": {"min_length": 5, "max_length": 40},
+                "forms": {"enabled": False},
+                "page_weight": {"max_mb": 0.5},
+                "caching": {"max_percent": 0},
+            }
+        ),
+        encoding="utf-8",
+    )
+    return load_thresholds(path)
+
+
+def test_items_cover_every_outcome(items):
+    """The corpus must reach every outcome of every rule, or parity proves little."""
+    matrix = evaluate_matrix(items)
+    for rule, choice in zip(matrix.rules, matrix.choices):
+        assert set(choice.tolist()) == set(range(len(rule.outcomes))), rule.id
+
+
+def test_batch_matches_per_page(items):
+    assert len(items) >= MIN_BATCH  # the columnar path is taken
+    assert evaluate_batch(items) == [evaluate_basic(*item) for item in items]
+
+
+def test_batch_matches_per_page_with_overrides(items, override):
+    expected = [BASIC_RULES.evaluate(*item, thresholds=override) for item in items]
+    assert evaluate_batch(items, thresholds=override) == expected
+    assert not any(result.name == BASIC_RULES["forms"].name for page in expected for result in page)
+
+
+@pytest.mark.parametrize("kind", ["without_site", "without_weight", "empty"])
+def test_batch_matches_per_page_on_uniform_batches(items, kind):
+    """Columns of a single value (no site data at all, no weight, only empty pages)."""
+    if kind == "without_site":
+        batch = [(parsed, fetch, None) for parsed, fetch, _ in items]
+    elif kind == "without_weight":
+        batch = [
+            (parsed, dataclasses.replace(fetch, page_weight=None), site) for parsed, fetch, site in items
+        ]
+    else:
+        batch = [(parse_html(b""), FetchResult(b"", 200, "", True), None)] * MIN_BATCH
+    assert evaluate_batch(batch) == [evaluate_basic(*item) for item in batch]
+
+
+def test_counts_match_results(items):
+    matrix = evaluate_matrix(items)
+    expected: dict[str, Counter] = {}
+    for page in matrix.results():
+        for result in page:
+            expected.setdefault(result.name, Counter())[result.status] += 1
+    assert {name: counter for name, counter in matrix.counts().items() if counter} == expected
+
+
+def test_small_batches_are_evaluated_per_page(items):
+    batch = items[: MIN_BATCH - 1]
+    assert evaluate_batch(batch) == [evaluate_basic(*item) for item in batch]
+
+
+# Thresholds -------------------------------------------------------------------
+
+def test_load_thresholds_merges_overrides(tmp_path):
+    bundled = load_thresholds()
+    path = tmp_path / "rules.json"
+    path.write_text(
+        json.dumps({"title": {"min_length": 10}, "forms": {"enabled": False}, "custom": {"limit": 3}}),
+        encoding="utf-8",
+    )
+    merged = load_thresholds(path)
+
+    assert merged["title"] == {"min_length": 10, "max_length": bundled["title"]["max_length"]}
+    assert merged["forms"] == {"enabled": False}
+    assert merged["custom"] == {"limit": 3}
+    assert {k: v for k, v in merged.items() if k not in ("title", "forms", "custom")} == {
+        k: v for k, v in bundled.items() if k != "title"
+    }
+    assert load_thresholds() == bundled  # the bundled file is re-read, not modified
+    assert "forms" not in {rule.id for rule in BASIC_RULES.active(merged)}
+
+
+def test_default_thresholds_read_the_env_override(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"title": {"max_length": 30}}), encoding="utf-8")
+    monkeypatch.setenv("LP_RULES_CONFIG", str(path))
+    default_thresholds.cache_clear()
+    try:
+        assert default_thresholds()["title"]["max_length"] == 30
+        assert default_thresholds() is default_thresholds()  # loaded once
+    finally:
+        default_thresholds.cache_clear()
+    monkeypatch.delenv("LP_RULES_CONFIG")
+    assert rules_module.default_thresholds() == load_thresholds()